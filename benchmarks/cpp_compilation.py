@@ -0,0 +1,65 @@
+"""
+Compares compilation time of C++ programs in the base image and in the derived one with precompiled `bits/stdc++.h`
+
+Requires running Docker daemon. The derived image is built on the first run, which takes a while.
+Usage: python -m benchmarks.cpp_compilation [--repeats 5]
+"""
+import argparse
+import statistics
+import time
+import typing as t
+
+from driver.libs.containers import CppContainer, container_pool
+from driver.libs.types import DerivedImage
+
+PROGRAMS: t.Mapping[str, bytes] = {
+    'bits/stdc++.h': (
+        b'#include <bits/stdc++.h>\n'
+        b'using namespace std;\n'
+        b'int main() { vector<int> v(3); iota(v.begin(), v.end(), 1); cout << accumulate(v.begin(), v.end(), 0); }\n'
+    ),
+    'iostream': (
+        b'#include <iostream>\n'
+        b'int main() { int a, b; std::cin >> a >> b; std::cout << a + b; }\n'
+    ),
+}
+
+
+class _BaseImageCppContainer(CppContainer):
+    """Compiles with the same command, but in the base image, i.e. without precompiled headers"""
+
+    @property
+    def _derived_image(self) -> t.Optional[DerivedImage]:
+        return None
+
+
+def measure(container_class: t.Type[CppContainer], source_code: bytes, repeats: int) -> t.List[float]:
+    """Returns seconds spent on each compilation (compilation cache is bypassed)"""
+    durations = []
+    container = container_class(time_limit=2, memory_limit='512m')
+    with container:
+        container._upload_source('benchmark.cpp', source_code)
+        command, _ = container._build_code_compilation_command('benchmark.cpp')
+        for _ in range(repeats):
+            started_at = time.perf_counter()
+            exit_code, output = container._sandbox.exec_run(command)
+            durations.append(time.perf_counter() - started_at)
+            assert exit_code == 0, output
+    return durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeats', type=int, default=5, help='Compilations per program and image')
+    args = parser.parse_args()
+
+    print(f'{"header":<15} {"base image, ms":>15} {"with PCH, ms":>13} {"speedup":>8}')
+    for header, source_code in PROGRAMS.items():
+        base = statistics.median(measure(_BaseImageCppContainer, source_code, args.repeats))
+        derived = statistics.median(measure(CppContainer, source_code, args.repeats))
+        print(f'{header:<15} {base * 1000:>15.0f} {derived * 1000:>13.0f} {base / derived:>7.1f}x')
+    container_pool.close()
+
+
+if __name__ == '__main__':
+    main()
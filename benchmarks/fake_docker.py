@@ -0,0 +1,347 @@
+"""
+Docker clients that record interactions with a real daemon and replay them without it
+
+Only the part of docker SDK that is used by the driver synchronously is supported. Interactions are replayed in order
+of their kinds, so the scenario must be the same as the recorded one. Unique identifiers (markers, names of files)
+in recorded commands are replaced with the actual ones in replayed output.
+
+If there is no recorded interaction, a synthetic one is replayed: every program behaves like `cat`
+(its stdout is its stdin) and every other command succeeds with empty output. Uploaded files are kept in memory,
+so inputs of programs are known
+"""
+import base64
+import io
+import itertools
+import json
+import posixpath
+import re
+import shlex
+import tarfile
+import typing as t
+from collections import defaultdict, deque
+from pathlib import Path
+
+from docker.errors import ImageNotFound
+from docker.models.containers import ExecResult
+
+# Markers and generated names of files (uuid4 either with or without hyphens)
+_UNIQUE_ID_PATTERN = re.compile(r'[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}')
+
+# Measurements printed by the run script for a synthetic program
+_SYNTHETIC_STATS = '0 -1 -1 0.01 0.01 0.00 4096'
+
+_Interaction: t.TypeAlias = t.Dict[str, t.Any]
+_Archive: t.TypeAlias = t.Union[bytes, t.Iterable[bytes]]
+
+
+def _encode(data: t.Optional[bytes]) -> t.Optional[str]:
+    return None if data is None else base64.b64encode(data).decode()
+
+
+def _decode(data: t.Optional[str]) -> t.Optional[bytes]:
+    return None if data is None else base64.b64decode(data)
+
+
+class Cassette:
+    """Recorded interactions, grouped by their kinds"""
+
+    def __init__(self, interactions: t.Iterable[_Interaction] = ()):
+        self.__interactions: t.List[_Interaction] = list(interactions)
+        self.__queues: t.DefaultDict[str, t.Deque[_Interaction]] = defaultdict(deque)
+        for interaction in self.__interactions:
+            self.__queues[interaction['kind']].append(interaction)
+
+    @classmethod
+    def load(cls, path: Path) -> 'Cassette':
+        return cls(json.loads(path.read_text()))
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.__interactions, indent=1))
+
+    def record(self, kind: str, **values: t.Any) -> None:
+        self.__interactions.append({'kind': kind, **values})
+
+    def replay(self, kind: str) -> t.Optional[_Interaction]:
+        """Returns the next recorded interaction of passed kind, `None` if all of them have been replayed"""
+        queue = self.__queues[kind]
+        return queue.popleft() if queue else None
+
+
+def _substitute(recorded_command: str, command: str, data: t.Optional[bytes]) -> t.Optional[bytes]:
+    """Replaces unique identifiers of the recorded command with the ones of the actual command in `data`"""
+    if not data:
+        return data
+    pairs = zip(_UNIQUE_ID_PATTERN.findall(recorded_command), _UNIQUE_ID_PATTERN.findall(command))
+    for recorded, actual in pairs:
+        data = data.replace(recorded.encode(), actual.encode())
+    return data
+
+
+def _read_archive(data: _Archive) -> bytes:
+    return data if isinstance(data, bytes) else b''.join(data)
+
+
+class _FakeImage:
+    def __init__(self, id: str):
+        self.id = id
+
+
+class _RecordingImages:
+    def __init__(self, images: t.Any, cassette: Cassette):
+        self.__images = images
+        self.__cassette = cassette
+
+    def get(self, name: str) -> t.Any:
+        try:
+            image = self.__images.get(name)
+        except ImageNotFound:
+            self.__cassette.record('image', name=name, id=None)
+            raise
+        self.__cassette.record('image', name=name, id=image.id)
+        return image
+
+    def pull(self, name: str, **kwargs: t.Any) -> t.Any:
+        image = self.__images.pull(name, **kwargs)
+        self.__cassette.record('image', name=name, id=image.id)
+        return image
+
+    def build(self, **kwargs: t.Any) -> t.Any:
+        image, logs = self.__images.build(**kwargs)
+        self.__cassette.record('image', name=kwargs.get('tag'), id=image.id)
+        return image, logs
+
+
+class _RecordingApi:
+    def __init__(self, api: t.Any, cassette: Cassette):
+        self.__api = api
+        self.__cassette = cassette
+        # Key - id of exec, value - its command and output that has been streamed so far
+        self.__execs: t.Dict[str, t.Tuple[str, t.List[t.Tuple[t.Optional[str], t.Optional[str]]]]] = {}
+
+    def exec_create(self, container: str, cmd: str, **kwargs: t.Any) -> t.Dict[str, str]:
+        result = self.__api.exec_create(container, cmd, **kwargs)
+        self.__execs[result['Id']] = (cmd, [])
+        return result
+
+    def exec_start(self, exec_id: str, **kwargs: t.Any) -> t.Iterator[t.Tuple[t.Optional[bytes], t.Optional[bytes]]]:
+        _, chunks = self.__execs[exec_id]
+        for stdout, stderr in self.__api.exec_start(exec_id, **kwargs):
+            chunks.append((_encode(stdout), _encode(stderr)))
+            yield stdout, stderr
+
+    def exec_inspect(self, exec_id: str) -> t.Dict[str, t.Any]:
+        result = self.__api.exec_inspect(exec_id)
+        command, chunks = self.__execs.pop(exec_id)
+        self.__cassette.record('exec_stream', command=command, chunks=chunks, exit_code=result['ExitCode'])
+        return result
+
+
+class _RecordingContainer:
+    def __init__(self, container: t.Any, api: _RecordingApi, cassette: Cassette):
+        self.__container = container
+        self.__cassette = cassette
+        self.id = container.id
+        self.client = type('Client', (), {'api': api})()
+
+    @property
+    def attrs(self) -> t.Dict[str, t.Any]:
+        return self.__container.attrs
+
+    @property
+    def status(self) -> str:
+        return self.__container.status
+
+    def start(self) -> None:
+        self.__container.start()
+
+    def reload(self) -> None:
+        self.__container.reload()
+
+    def remove(self, **kwargs: t.Any) -> None:
+        self.__container.remove(**kwargs)
+
+    def put_archive(self, path: str, data: _Archive) -> bool:
+        return self.__container.put_archive(path, _read_archive(data))
+
+    def get_archive(self, path: str) -> t.Tuple[t.List[bytes], t.Dict[str, t.Any]]:
+        chunks, stat = self.__container.get_archive(path)
+        data = b''.join(chunks)
+        self.__cassette.record('get_archive', path=path, data=_encode(data))
+        return [data], stat
+
+    def exec_run(self, cmd: str, demux: bool = False, **kwargs: t.Any) -> ExecResult:
+        result = self.__container.exec_run(cmd, demux=demux, **kwargs)
+        stdout, stderr = result.output if demux else (result.output, None)
+        self.__cassette.record(
+            'exec_run', command=cmd, exit_code=result.exit_code, stdout=_encode(stdout), stderr=_encode(stderr)
+        )
+        return result
+
+
+class RecordingDockerClient:
+    """Proxy of the real client, which records responses of the daemon to the cassette"""
+
+    def __init__(self, client: t.Any, cassette: Cassette):
+        self.__client = client
+        self.__cassette = cassette
+        self.containers = self
+        self.images = _RecordingImages(client.images, cassette)
+        self.__api = _RecordingApi(client.api, cassette)
+
+    def create(self, **kwargs: t.Any) -> _RecordingContainer:
+        container = self.__client.containers.create(**kwargs)
+        # Attributes are recorded once, they don't change between exec sessions
+        self.__cassette.record('create', attrs={
+            'Config': {'WorkingDir': container.attrs['Config'].get('WorkingDir')},
+            'Image': container.attrs['Image'],
+        })
+        return _RecordingContainer(container, self.__api, self.__cassette)
+
+
+class _ReplayingImages:
+    def __init__(self, cassette: Cassette):
+        self.__cassette = cassette
+
+    def __replay(self, name: str) -> _FakeImage:
+        interaction = self.__cassette.replay('image')
+        if interaction is None:
+            return _FakeImage(f'sha256:synthetic-{name}')
+        if interaction['id'] is None:
+            raise ImageNotFound(name)
+        return _FakeImage(interaction['id'])
+
+    def get(self, name: str) -> _FakeImage:
+        return self.__replay(name)
+
+    def pull(self, name: str, **kwargs: t.Any) -> _FakeImage:
+        return self.__replay(name)
+
+    def build(self, tag: str, **kwargs: t.Any) -> t.Tuple[_FakeImage, t.List[t.Any]]:
+        return self.__replay(tag), []
+
+
+class _ReplayingApi:
+    def __init__(self, client: 'ReplayingDockerClient', cassette: Cassette):
+        self.__client = client
+        self.__cassette = cassette
+        self.__ids = itertools.count()
+        # Key - id of exec, value - its command and replayed interaction
+        self.__execs: t.Dict[str, t.Tuple[str, _Interaction]] = {}
+
+    def exec_create(self, container: str, cmd: str, **kwargs: t.Any) -> t.Dict[str, str]:
+        exec_id = f'exec-{next(self.__ids)}'
+        interaction = self.__cassette.replay('exec_stream') or self.__client.synthesize_exec(container, cmd)
+        self.__execs[exec_id] = (cmd, interaction)
+        return {'Id': exec_id}
+
+    def exec_start(self, exec_id: str, **kwargs: t.Any) -> t.Iterator[t.Tuple[t.Optional[bytes], t.Optional[bytes]]]:
+        command, interaction = self.__execs[exec_id]
+        for stdout, stderr in interaction['chunks']:
+            yield (
+                _substitute(interaction['command'], command, _decode(stdout)),
+                _substitute(interaction['command'], command, _decode(stderr)),
+            )
+
+    def exec_inspect(self, exec_id: str) -> t.Dict[str, t.Any]:
+        _, interaction = self.__execs.pop(exec_id)
+        return {'ExitCode': interaction['exit_code']}
+
+
+class _ReplayingContainer:
+    def __init__(self, id: str, attrs: t.Dict[str, t.Any], client: 'ReplayingDockerClient', cassette: Cassette):
+        self.id = id
+        self.attrs = attrs
+        self.status = 'created'
+        self.client = client
+        self.__cassette = cassette
+        # Files that have been uploaded to the container (absolute path -> content)
+        self.files: t.Dict[str, bytes] = {}
+
+    def start(self) -> None:
+        self.status = 'running'
+
+    def reload(self) -> None:
+        pass
+
+    def remove(self, **kwargs: t.Any) -> None:
+        self.status = 'removed'
+
+    def resolve(self, path: str) -> str:
+        return posixpath.normpath(posixpath.join(self.attrs['Config']['WorkingDir'] or '/', path))
+
+    def put_archive(self, path: str, data: _Archive) -> bool:
+        with tarfile.open(fileobj=io.BytesIO(_read_archive(data))) as archive:
+            for member in archive.getmembers():
+                file = archive.extractfile(member)
+                if file is not None:
+                    self.files[self.resolve(posixpath.join(path, member.name))] = file.read()
+        return True
+
+    def get_archive(self, path: str) -> t.Tuple[t.List[bytes], t.Dict[str, t.Any]]:
+        interaction = self.__cassette.replay('get_archive')
+        if interaction is not None:
+            return [_decode(interaction['data']) or b''], {}
+
+        # Synthetic compiled binary
+        content = self.files.get(self.resolve(path), b'\x7fELF')
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w') as archive:
+            info = tarfile.TarInfo(posixpath.basename(path))
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+        return [buffer.getvalue()], {}
+
+    def exec_run(self, cmd: str, demux: bool = False, **kwargs: t.Any) -> ExecResult:
+        interaction = self.__cassette.replay('exec_run')
+        if interaction is None:
+            return ExecResult(exit_code=0, output=(b'', b'') if demux else b'')
+
+        stdout = _substitute(interaction['command'], cmd, _decode(interaction['stdout']))
+        stderr = _substitute(interaction['command'], cmd, _decode(interaction['stderr']))
+        return ExecResult(exit_code=interaction['exit_code'], output=(stdout, stderr) if demux else stdout)
+
+
+class ReplayingDockerClient:
+    """Fake client that replays interactions recorded by `RecordingDockerClient` (or synthetic ones)"""
+
+    def __init__(self, cassette: t.Optional[Cassette] = None):
+        self.__cassette = cassette or Cassette()
+        self.__ids = itertools.count()
+        self.__containers: t.Dict[str, _ReplayingContainer] = {}
+        self.containers = self
+        self.images = _ReplayingImages(self.__cassette)
+        self.api = _ReplayingApi(self, self.__cassette)
+
+    def create(self, image: str, working_dir: t.Optional[str] = None, **kwargs: t.Any) -> _ReplayingContainer:
+        interaction = self.__cassette.replay('create')
+        if interaction is None:
+            attrs = {'Config': {'WorkingDir': working_dir}, 'Image': f'sha256:synthetic-{image}'}
+        else:
+            attrs = interaction['attrs']
+
+        container = _ReplayingContainer(f'container-{next(self.__ids)}', attrs, self, self.__cassette)
+        self.__containers[container.id] = container
+        return container
+
+    def synthesize_exec(self, container_id: str, command: str) -> _Interaction:
+        """Output of the run script (or of the batch script) for the program that prints its input"""
+        container = self.__containers[container_id]
+        arguments = shlex.split(command)
+        script = posixpath.basename(arguments[1]) if len(arguments) > 1 else ''
+
+        def run(marker: str, stdin_file: str) -> bytes:
+            stdin = container.files.pop(container.resolve(stdin_file), b'')
+            return stdin + f'{marker} {_SYNTHETIC_STATS}\n'.encode()
+
+        if script == 'batch.sh':
+            marker, stdin_prefix, tests_count = arguments[3], arguments[6], int(arguments[7])
+            stdout = b''
+            for index in range(tests_count):
+                output = run(marker, f'{stdin_prefix}-{index}')
+                stdout += f'{marker} {index} {len(output)} 0\n'.encode() + output
+        elif script in ('run.sh', 'zygote-run.sh'):
+            stdout = run(arguments[2], arguments[5])
+        else:
+            stdout = b''
+        return {'command': command, 'chunks': [(_encode(stdout), None)], 'exit_code': 0}
@@ -0,0 +1,161 @@
+"""
+Measures duration of each phase of a request (creation of a container, its setup, upload of source code, compilation,
+execution, processing of results, teardown) for every language
+
+Backends:
+- `real` - containers are run by the Docker daemon;
+- `record` - same as `real`, but responses of the daemon are recorded to the cassette;
+- `replay` - responses are replayed from the cassette (synthetic ones are used if the cassette doesn't exist),
+  so no Docker daemon is required and the overhead of the driver itself is measured;
+- `local` - programs are run by the local sandbox (compilers and interpreters of the host are used).
+
+Usage: python -m benchmarks.phases [--backend replay] [--cassette PATH] [--output results.json]
+"""
+import argparse
+import json
+import platform
+import statistics
+import tempfile
+import time
+import typing as t
+from pathlib import Path
+from unittest import mock
+
+import docker
+from benchmarks.fake_docker import Cassette, RecordingDockerClient, ReplayingDockerClient
+
+from driver.config import DERIVED_IMAGES_REPOSITORY
+from driver.libs.cache import CompilationCache
+from driver.libs.containers import ContainerPool, ContainersFactory, _base_containers
+from driver.libs.containers.backends import DockerBackend, ExecutionBackend, LocalBackend
+from driver.libs.containers.images import ImageBuilder
+from driver.libs.enums import Phase, ProgrammingLanguage
+from driver.libs.files import create_file_creator
+from driver.libs.profiling import PhaseRecorder
+from driver.libs.types import CodeExecutionCommandOptions
+
+DEFAULT_CASSETTE = Path(__file__).parent / 'cassettes' / 'phases.json'
+
+# Programs that print their input
+PROGRAMS: t.Mapping[ProgrammingLanguage, str] = {
+    ProgrammingLanguage.PYTHON: 'import sys\nsys.stdout.write(sys.stdin.read())\n',
+    ProgrammingLanguage.PYPY: 'import sys\nsys.stdout.write(sys.stdin.read())\n',
+    ProgrammingLanguage.CPP: '#include <iostream>\nint main() { std::cout << std::cin.rdbuf(); }\n',
+    ProgrammingLanguage.PASCAL_ABC: 'var c: char;\nbegin\n  while not eof do begin read(c); write(c); end;\nend.\n',
+}
+
+
+def run_submission(language: ProgrammingLanguage, tests: t.Sequence[str]) -> None:
+    """Judges the program of the language on the tests and checks its output"""
+    with create_file_creator(PROGRAMS[language], language) as file_creator:
+        container = ContainersFactory.get(language)(time_limit=2, memory_limit='256m')
+        with container:
+            for stdin in tests:
+                options = CodeExecutionCommandOptions(
+                    filename=file_creator.filename, stdin=stdin, source_code=file_creator.content
+                )
+                result = container.execute(options)
+                assert result.output == stdin, f'{language}: unexpected output {result.output!r}'
+
+
+def create_docker_backend(client_factory: t.Callable[[], docker.DockerClient]) -> DockerBackend:
+    """Returns backend with empty pool of containers, so creation and setup of containers are measured too"""
+    pool = ContainerPool(min_size=0, max_size=1, idle_timeout=60, client_factory=client_factory)
+    return DockerBackend(pool, ImageBuilder(DERIVED_IMAGES_REPOSITORY, client_factory=client_factory))
+
+
+def measure(
+        language: ProgrammingLanguage,
+        backend: ExecutionBackend,
+        submissions: int,
+        tests: int
+) -> t.Dict[Phase, t.List[float]]:
+    """
+    Returns durations of phases of judging `submissions` programs of the language on `tests` tests each.
+    The compilation cache is disabled, so every phase is passed. The backend is closed afterwards
+    """
+    recorder = PhaseRecorder()
+    with tempfile.TemporaryDirectory() as cache_dir, \
+            mock.patch.object(_base_containers, 'execution_backend', backend), \
+            mock.patch.object(_base_containers, 'compilation_cache', CompilationCache(Path(cache_dir), max_size=0)):
+        with recorder.activate():
+            for submission in range(submissions):
+                run_submission(language, [f'{submission} {test}\n' for test in range(tests)])
+            backend.close()
+    return recorder.durations
+
+
+def summarize(durations: t.Sequence[float]) -> t.Dict[str, float]:
+    milliseconds = sorted(duration * 1000 for duration in durations)
+    return {
+        'count': len(milliseconds),
+        'mean_ms': statistics.mean(milliseconds),
+        'median_ms': statistics.median(milliseconds),
+        'p95_ms': milliseconds[min(len(milliseconds) - 1, int(len(milliseconds) * 0.95))],
+        'min_ms': milliseconds[0],
+        'max_ms': milliseconds[-1],
+    }
+
+
+def run(
+        backend: str,
+        cassette_path: Path,
+        languages: t.Sequence[ProgrammingLanguage],
+        submissions: int,
+        tests: int
+) -> t.Dict[str, t.Any]:
+    """Runs the benchmark and returns its results in the form that is saved to JSON"""
+    cassette = Cassette.load(cassette_path) if backend == 'replay' and cassette_path.exists() else Cassette()
+    client: t.Any = None
+    if backend == 'replay':
+        client = ReplayingDockerClient(cassette)
+    elif backend == 'record':
+        client = RecordingDockerClient(docker.from_env(), cassette)
+    elif backend == 'real':
+        client = docker.from_env()
+
+    results = {}
+    for language in languages:
+        execution_backend = LocalBackend() if backend == 'local' else create_docker_backend(lambda: client)
+        durations = measure(language, execution_backend, submissions, tests)
+        results[language.name.lower()] = {
+            phase.value: summarize(durations[phase]) for phase in Phase if durations.get(phase)
+        }
+
+    if backend == 'record':
+        cassette.save(cassette_path)
+    return {
+        'backend': backend,
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'submissions': submissions,
+        'tests': tests,
+        'phases': results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=('real', 'record', 'replay', 'local'), default='replay')
+    parser.add_argument('--cassette', type=Path, default=DEFAULT_CASSETTE, help='Recorded responses of the daemon')
+    parser.add_argument('--output', type=Path, help='JSON file for results (they are printed if it is not passed)')
+    parser.add_argument('--language', choices=[language.name.lower() for language in PROGRAMS], action='append',
+                        help='Language to benchmark (all by default), can be passed several times')
+    parser.add_argument('--submissions', type=int, default=5, help='Programs judged per language')
+    parser.add_argument('--tests', type=int, default=10, help='Test cases per program')
+    args = parser.parse_args()
+
+    languages = [ProgrammingLanguage[name.upper()] for name in args.language] if args.language else list(PROGRAMS)
+    results = run(args.backend, args.cassette, languages, args.submissions, args.tests)
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2))
+    for language, phases in results['phases'].items():
+        print(language)
+        for phase, summary in phases.items():
+            print(f'  {phase:<20} {summary["count"]:>5} x {summary["median_ms"]:>9.2f} ms '
+                  f'(p95 {summary["p95_ms"]:.2f} ms)')
+
+
+if __name__ == '__main__':
+    main()
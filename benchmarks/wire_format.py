@@ -0,0 +1,110 @@
+"""
+Compares serialization cost of large requests and results in the JSON API and in the binary format of `/execute/binary`
+
+JSON requests pass source code and inputs in the query string (URL-encoded), JSON results are encoded the same way
+as FastAPI does it. Needs no Docker daemon.
+Usage: python -m benchmarks.wire_format [--tests 20] [--output-size 1048576] [--repeats 5]
+"""
+import argparse
+import functools
+import json
+import random
+import statistics
+import string
+import time
+import typing as t
+import urllib.parse
+
+from fastapi.encoders import jsonable_encoder
+
+from driver.libs import wire
+from driver.libs.enums import WireCompression
+from driver.libs.types import BinaryExecutionRequest, ProcessedContainerExecutionResult
+
+# Characters of typical outputs, including the ones that are escaped in JSON and in URLs
+ALPHABET = string.ascii_letters + string.digits + ' \n\t"\\/&=%'
+
+
+def generate(size: int, seed: int) -> str:
+    return ''.join(random.Random(seed).choices(ALPHABET, k=size))
+
+
+def measure(function: t.Callable[[], t.Any], repeats: int) -> float:
+    """Returns median of seconds spent on calls of the function"""
+    durations = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started_at)
+    return statistics.median(durations)
+
+
+def iter_request_formats(
+        request: BinaryExecutionRequest
+) -> t.Iterator[t.Tuple[str, t.Callable[[], bytes], t.Callable[[bytes], t.Any]]]:
+    """Yields name of the format, its encoder and decoder of requests"""
+    def encode_query() -> bytes:
+        query = {'source_code': request.source_code, 'stdin_list': [stdin.decode() for stdin in request.stdin_list]}
+        return urllib.parse.urlencode(query, doseq=True).encode()
+
+    yield 'query string', encode_query, lambda data: urllib.parse.parse_qs(data.decode())
+    yield 'binary', lambda: wire.encode_request(request), wire.decode_request
+
+
+def iter_result_formats(
+        results: t.List[ProcessedContainerExecutionResult]
+) -> t.Iterator[t.Tuple[str, t.Callable[[], bytes], t.Callable[[bytes], t.Any]]]:
+    """Yields name of the format, its encoder and decoder of results"""
+    yield 'JSON', lambda: json.dumps(jsonable_encoder(results)).encode(), json.loads
+
+    def encode_binary(compression: WireCompression) -> bytes:
+        compressor = wire.StreamCompressor(compression)
+        chunks = [compressor.compress(wire.MAGIC)]
+        chunks.extend(compressor.compress(wire.encode_result(result)) for result in results)
+        chunks.append(compressor.compress(wire.encode_end(len(results))))
+        chunks.append(compressor.finish())
+        return b''.join(chunks)
+
+    def decode_binary(compression: WireCompression) -> t.Callable[[bytes], t.Any]:
+        return lambda data: wire.decode_results(wire.decompress(data, compression, 1 << 40))
+
+    for compression in wire.supported_compressions():
+        name = 'binary' if compression is WireCompression.IDENTITY else f'binary + {compression.value}'
+        yield name, functools.partial(encode_binary, compression), decode_binary(compression)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tests', type=int, default=20, help='Number of test cases')
+    parser.add_argument('--output-size', type=int, default=1024 * 1024, help='Size of each input and output in bytes')
+    parser.add_argument('--repeats', type=int, default=5, help='Measurements of each format')
+    args = parser.parse_args()
+
+    request = BinaryExecutionRequest(
+        source_code=generate(64 * 1024, seed=0),
+        stdin_list=[generate(args.output_size, seed=index).encode() for index in range(args.tests)],
+        expected_output_list=None,
+    )
+    results = [
+        ProcessedContainerExecutionResult(
+            exit_code=0, output=generate(args.output_size, seed=index), execution_time=0.5, error_message='',
+            cpu_time=0.5, wall_time=0.6, peak_memory=64 * 1024 * 1024, verdict=None,
+        )
+        for index in range(args.tests)
+    ]
+
+    print(f'{"payload":<8} {"format":<15} {"encode, ms":>11} {"decode, ms":>11} {"size, MB":>9}')
+    payloads = (('request', iter_request_formats(request)), ('results', iter_result_formats(results)))
+    for payload, formats in payloads:
+        for name, encode, decode in formats:
+            data = encode()
+            encoding = measure(encode, args.repeats)
+            decoding = measure(lambda: decode(data), args.repeats)
+            print(
+                f'{payload:<8} {name:<15} {encoding * 1000:>11.1f} {decoding * 1000:>11.1f} '
+                f'{len(data) / 1024 / 1024:>9.1f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Compares cold start of the interpreter for each test case with forking it from the zygote
+
+Requires running Docker daemon. Usage: python -m benchmarks.zygote_startup [--tests 50] [--repeats 3]
+"""
+import argparse
+import statistics
+import time
+import typing as t
+
+from driver.libs.containers import PyPyContainer, PythonContainer, container_pool
+from driver.libs.containers._base_containers import InterpretedContainer
+from driver.libs.types import CodeExecutionCommandOptions
+
+# Short program, so the time of a test case is dominated by startup of the interpreter
+SOURCE_CODE = b'import sys\nprint(sum(map(int, sys.stdin.read().split())))\n'
+
+
+def measure(
+        container_class: t.Type[InterpretedContainer],
+        zygote: bool,
+        tests: int
+) -> t.Tuple[float, float, t.List[float]]:
+    """Returns seconds spent on the first test case, on all test cases and reported wall times of programs"""
+    options = CodeExecutionCommandOptions(filename='benchmark.py', stdin='2 3', source_code=SOURCE_CODE)
+    wall_times = []
+    first_test = 0.0
+
+    started_at = time.perf_counter()
+    with container_class(time_limit=2, memory_limit='128m', zygote=zygote) as container:
+        for index in range(tests):
+            result = container.execute(options)
+            assert result.output == '5\n', result
+            wall_times.append(result.wall_time)
+            if index == 0:
+                first_test = time.perf_counter() - started_at
+    return first_test, time.perf_counter() - started_at, wall_times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tests', type=int, default=50, help='Test cases per submission')
+    parser.add_argument('--repeats', type=int, default=3, help='Submissions per language and mode')
+    args = parser.parse_args()
+
+    print(f'{"container":<16} {"mode":<8} {"first test, ms":>15} {"per test, ms":>13} {"program wall, ms":>17}')
+    for container_class in (PythonContainer, PyPyContainer):
+        # Containers are created beforehand, so their creation is not measured
+        container_pool.warm_up(container_class(1, '128m')._docker_image, '128m')
+
+        for zygote in (False, True):
+            first_tests, per_test, wall_times = [], [], []
+            for _ in range(args.repeats):
+                first_test, total, walls = measure(container_class, zygote, args.tests)
+                first_tests.append(first_test)
+                per_test.append((total - first_test) / max(args.tests - 1, 1))
+                wall_times.extend(walls)
+
+            print(
+                f'{container_class.__name__:<16} {"zygote" if zygote else "cold":<8} '
+                f'{statistics.median(first_tests) * 1000:>15.1f} {statistics.median(per_test) * 1000:>13.1f} '
+                f'{statistics.median(wall_times) * 1000:>17.1f}'
+            )
+    container_pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-from os import environ
+from os import cpu_count, environ
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
@@ -11,7 +11,141 @@ USER_SCRIPTS_VOLUME_FULLNAME = f'{USER_SCRIPTS_VOLUME_PREFIX}_{USER_SCRIPTS_VOLU
 # Local files and folders
 LOCAL_USER_SCRIPTS_DIR = ROOT_DIR / environ.get('LOCAL_USER_SCRIPTS_DIR', 'tmp')
 
-# Files and folders inside each automatically created container
+# How source code gets into containers: "archive" (uploaded into tmpfs of the container)
+# or "volume" (written to `LOCAL_USER_SCRIPTS_DIR`, which is mounted into every container)
+SOURCE_UPLOAD_MODE = environ.get('SOURCE_UPLOAD_MODE', 'archive')
+
+# Files and folders inside each automatically created container.
+# Working directory is tmpfs, so relative paths below point to memory instead of the disk (except inputs).
+# Files in tmpfs are counted in memory usage of the container, its size is the maximum one, it isn't reserved
+DOCKER_SANDBOX_DIR = '/sandbox'
+DOCKER_SANDBOX_SIZE = environ.get('DOCKER_SANDBOX_SIZE', '256m')
 DOCKER_USER_SCRIPTS_DIR = 'user-scripts-local'
 DOCKER_COMPILED_FILES_DIR = 'compiled-scripts-local'
-DOCKER_TIME_OUTPUT_FILE = 'time-stdout-file'
+# Each execution reads its input from a separate read-only file. The directory is a volume of the container on the
+# disk, so inputs are limited neither by `DOCKER_SANDBOX_SIZE` nor by memory limit of the container
+DOCKER_STDIN_DIR = 'stdin-files'
+DOCKER_ZYGOTE_DIR = 'zygote'  # FIFOs of the zygote and of requests to it
+
+# Scripts that run programs, they are installed into every container (names are relative to the scripts directory)
+DOCKER_SCRIPTS_DIR = '/driver'
+RUN_SCRIPT = 'run.sh'  # Runs programs and measures used resources
+BATCH_SCRIPT = 'batch.sh'  # Runs all test cases in a single exec
+ZYGOTE_SCRIPT = 'zygote.py'  # Preloaded interpreter that forks a child per execution
+ZYGOTE_RUN_SCRIPT = 'zygote-run.sh'  # Same as the run script, but via the zygote
+
+# Where programs are executed: "docker" (containers of the pool) or "local" (subprocesses of the driver with rlimits).
+# Local sandbox doesn't isolate programs from the host, so it must be used only for trusted code (e.g. in tests)
+EXECUTION_BACKEND = environ.get('EXECUTION_BACKEND', 'docker')
+# Directory in which the local sandbox creates a working directory per lease (system temporary directory by default)
+LOCAL_SANDBOX_DIR = environ.get('LOCAL_SANDBOX_DIR') or None
+# Any command executed by the local sandbox is killed after this number of seconds (both wall and CPU time)
+LOCAL_SANDBOX_WALL_LIMIT = float(environ.get('LOCAL_SANDBOX_WALL_LIMIT', 60))
+# Maximum size of a file written by a command of the local sandbox in bytes
+LOCAL_SANDBOX_FILE_SIZE = int(environ.get('LOCAL_SANDBOX_FILE_SIZE', 256 * 1024 * 1024))
+# Maximum number of processes of the user that runs the driver (RLIMIT_NPROC is counted per user, not per command)
+LOCAL_SANDBOX_MAX_PROCESSES = int(environ.get('LOCAL_SANDBOX_MAX_PROCESSES', 4096))
+
+# Docker daemons among which containers are scheduled, separated by spaces. Capacity of each host (number of containers
+# leased at the same time and their total memory limit) is passed in the query, for example:
+# `unix:///var/run/docker.sock?slots=8&memory=16g tcp://10.0.0.2:2375?slots=16&memory=32g`.
+# If it is empty, the only daemon is taken from `DOCKER_HOST`, the same way `docker.from_env` does
+DOCKER_HOSTS = environ.get('DOCKER_HOSTS', '')
+DOCKER_HOSTS_HEALTH_CHECK_INTERVAL = float(environ.get('DOCKER_HOSTS_HEALTH_CHECK_INTERVAL', 5))  # Seconds
+# Host on which the same source has already been compiled (so its compilation cache entry, containers and derived
+# images are warm) or, for leases without a source, the image has already been used is preferred, unless its load (share of leased slots) is greater than the least one by this value
+SCHEDULER_AFFINITY_WEIGHT = float(environ.get('SCHEDULER_AFFINITY_WEIGHT', 0.25))
+# Number of the latest affinity keys (language and hash of the source, see `ExecutionBackend.lease`) remembered per host
+SCHEDULER_AFFINITY_KEYS = int(environ.get('SCHEDULER_AFFINITY_KEYS', 4096))
+
+# Derived images (e.g. with precompiled headers) are built by the driver and tagged in this repository
+DERIVED_IMAGES_REPOSITORY = environ.get('DERIVED_IMAGES_REPOSITORY', 'contester-driver-derived')
+# C++ programs are compiled in the derived image with precompiled `bits/stdc++.h`, which is stored in `DOCKER_PCH_DIR`
+CPP_PRECOMPILED_HEADERS = environ.get('CPP_PRECOMPILED_HEADERS', '1') == '1'
+DOCKER_PCH_DIR = '/pch'
+
+# Python and PyPy programs are forked from a preloaded interpreter instead of starting a new one for each test case
+ZYGOTE_MODE = environ.get('ZYGOTE_MODE', '0') == '1'
+
+# Maximum size of stdout (and, separately, stderr) of a single execution in bytes.
+# The program is killed as soon as it exceeds the limit, only first bytes of output are kept
+OUTPUT_LIMIT = int(environ.get('OUTPUT_LIMIT', 16 * 1024 * 1024))
+
+# Pool of pre-started containers (per docker image and memory limit)
+CONTAINERS_POOL_MIN_SIZE = int(environ.get('CONTAINERS_POOL_MIN_SIZE', 1))
+CONTAINERS_POOL_MAX_SIZE = int(environ.get('CONTAINERS_POOL_MAX_SIZE', 8))
+CONTAINERS_POOL_IDLE_TIMEOUT = float(environ.get('CONTAINERS_POOL_IDLE_TIMEOUT', 300))  # Seconds
+# Containers of these languages (names of `/execute`) and memory limits, separated by spaces, are pre-started
+# on startup of the driver, so the first submissions don't wait for them. Nothing is pre-started if either is empty
+CONTAINERS_WARM_UP_LANGUAGES = environ.get('CONTAINERS_WARM_UP_LANGUAGES', 'python pypy cpp pascal-abc')
+CONTAINERS_WARM_UP_MEMORY_LIMITS = environ.get('CONTAINERS_WARM_UP_MEMORY_LIMITS', '256m')
+# Async leases that wait for a free container (or capacity of a host) block a thread each. These threads are
+# separate from the default executor, so releases are never queued behind waiting leases. Threads are started
+# only when all of them are busy, so the limit must be larger than the number of leases that can wait at once
+CONTAINERS_LEASE_THREADS = int(environ.get('CONTAINERS_LEASE_THREADS', 1024))
+# Containers created by the driver are labelled with id of its instance and id of the session of the pool (a new one
+# on every start). Each session refreshes its heartbeat file in `DRIVER_SESSIONS_DIR` every reaper interval,
+# containers of the instance are removed once heartbeat of their session is stale (e.g. the driver has crashed).
+# So all drivers of an instance must share the directory (e.g. a volume), and the directory must outlive restarts;
+# drivers that share a Docker daemon but not the directory must have different ids of instances
+DRIVER_INSTANCE_ID = environ.get('DRIVER_INSTANCE_ID', 'driver')
+DRIVER_SESSIONS_DIR = ROOT_DIR / environ.get('DRIVER_SESSIONS_DIR', 'cache/sessions')
+# Containers leased for longer than this are considered leaked: they are killed and removed by the reaper,
+# as well as containers of the instance unknown to the pool. Seconds
+CONTAINERS_LEASE_TIMEOUT = float(environ.get('CONTAINERS_LEASE_TIMEOUT', 600))
+CONTAINERS_REAPER_INTERVAL = float(environ.get('CONTAINERS_REAPER_INTERVAL', 60))  # Seconds
+
+# Cache of compilation results (compiled binaries and compilation errors)
+LOCAL_COMPILATION_CACHE_DIR = ROOT_DIR / environ.get('LOCAL_COMPILATION_CACHE_DIR', 'cache/compilation')
+COMPILATION_CACHE_MAX_SIZE = int(environ.get('COMPILATION_CACHE_MAX_SIZE', 512 * 1024 * 1024))  # Bytes
+
+# Test sets that are uploaded once and referenced by id. Inputs and expected outputs are stored content-addressed,
+# so files shared by several test sets are stored once. When their total size exceeds the maximum one,
+# least recently used test sets are evicted (and must be uploaded again)
+LOCAL_TEST_SETS_DIR = ROOT_DIR / environ.get('LOCAL_TEST_SETS_DIR', 'cache/testsets')
+TEST_SETS_MAX_SIZE = int(environ.get('TEST_SETS_MAX_SIZE', 1024 * 1024 * 1024))  # Bytes
+
+# In-memory cache of results of test cases, keyed by language, image, source code, input and limits.
+# It is disabled by default (maximum size is 0), since results of identical executions are cached only if they are
+# deterministic enough: results of test cases that exceeded or used more than `RESULT_CACHE_TIME_MARGIN`
+# of the time limit are never cached, because their verdicts depend on load of the host
+RESULT_CACHE_MAX_SIZE = int(environ.get('RESULT_CACHE_MAX_SIZE', 0))  # Bytes
+RESULT_CACHE_TTL = float(environ.get('RESULT_CACHE_TTL', 3600))  # Seconds
+RESULT_CACHE_TIME_MARGIN = float(environ.get('RESULT_CACHE_TIME_MARGIN', 0.75))
+
+# Maximum number of test cases that can be executed simultaneously on the host (across all submissions)
+HOST_CPU_BUDGET = int(environ.get('HOST_CPU_BUDGET', cpu_count() or 1))
+
+# Cores that are dedicated to running test cases, in the format of cpuset (e.g. "2-7" or "2,3,5"). Each running
+# test case takes one of them (so at most that many test cases run simultaneously on each host) and is pinned to it
+# by `taskset`, and its container is restricted to the cores of its test cases (`cpuset_cpus`) with CFS quota
+# of `CPU_PINNING_QUOTA` of each core. Pinning is disabled if it is empty
+CPU_PINNING_CORES = environ.get('CPU_PINNING_CORES', '')
+CPU_PINNING_QUOTA = float(environ.get('CPU_PINNING_QUOTA', 1.0))
+# Cores of idle containers and compilers while pinning is enabled, so they don't disturb running programs.
+# By default all cores of the host except the pinned ones are used (the same core numbers are used on every host)
+CPU_HOUSEKEEPING_CORES = environ.get('CPU_HOUSEKEEPING_CORES', '')
+
+# Maximum number of submissions that are processed simultaneously (other requests wait for their turn)
+MAX_CONCURRENT_SUBMISSIONS = int(environ.get('MAX_CONCURRENT_SUBMISSIONS', 64))
+
+# Submissions are admitted only while their total memory limit (memory limit of a container multiplied by number
+# of containers of the submission) and number of test cases executed at the same time fit into capacity of the host.
+# Memory capacity is set in the format of Docker (e.g. "16g"), physical memory of the host is used if it is empty.
+# With `DOCKER_HOSTS` both values should be set to the total capacity of the hosts
+ADMISSION_MEMORY_CAPACITY = environ.get('ADMISSION_MEMORY_CAPACITY', '')
+ADMISSION_CPU_SLOTS = int(environ.get('ADMISSION_CPU_SLOTS', HOST_CPU_BUDGET))
+# Maximum number of submissions waiting for admission, further requests are rejected with 429 status
+ADMISSION_QUEUE_SIZE = int(environ.get('ADMISSION_QUEUE_SIZE', 256))
+
+# Maximum size of the body of `/execute/binary` after decompression, larger requests are rejected with 413 status
+BINARY_REQUEST_MAX_SIZE = int(environ.get('BINARY_REQUEST_MAX_SIZE', 256 * 1024 * 1024))  # Bytes
+
+# How many seconds results of finished jobs are kept
+JOBS_TTL = float(environ.get('JOBS_TTL', 3600))
+
+# Level of logs of the driver ("DEBUG" logs every command that is executed in containers)
+LOG_LEVEL = environ.get('LOG_LEVEL', 'WARNING').upper()
+
+# Spans of submissions and test cases are created via OpenTelemetry (it must be installed with `tracing` extra)
+TRACING = environ.get('TRACING', '0') == '1'
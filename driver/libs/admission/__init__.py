@@ -0,0 +1,189 @@
+import asyncio
+import collections
+import math
+import os
+import time
+import typing as t
+
+from docker.utils import parse_bytes
+
+from driver.config import (
+    ADMISSION_CPU_SLOTS,
+    ADMISSION_MEMORY_CAPACITY,
+    ADMISSION_QUEUE_SIZE,
+    MAX_CONCURRENT_SUBMISSIONS,
+)
+from driver.libs.enums import SubmissionPriority
+from driver.libs.types import AdmissionRequest, AdmissionStats
+
+# Weight of the latest submission in the average time for which resources are reserved
+_HOLD_TIME_SMOOTHING = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Queue of submissions is full, so the submission should be sent again in `retry_after` seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f'Too many submissions are waiting for admission, retry in {retry_after} seconds')
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """
+    Place of the submission in the queue. Resources are reserved while the ticket is entered:
+    `async with ticket` waits for admission and releases resources (or leaves the queue) on exit
+    """
+
+    def __init__(self, controller: 'AdmissionController', request: AdmissionRequest, priority: SubmissionPriority):
+        self.request = request
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        # Value of `time.monotonic()` at the moment the submission was admitted
+        self.admitted_at: t.Optional[float] = None
+        self.__controller = controller
+        self.__admitted = asyncio.get_running_loop().create_future()
+
+    @property
+    def wait_time(self) -> float:
+        """Seconds that the submission has spent in the queue (so far, if it isn't admitted yet)"""
+        return (self.admitted_at or time.monotonic()) - self.enqueued_at
+
+    def admit(self) -> None:
+        self.admitted_at = time.monotonic()
+        if not self.__admitted.done():
+            self.__admitted.set_result(None)
+
+    def release(self) -> None:
+        """Releases resources (or leaves the queue) without entering the ticket, it can be called more than once"""
+        self.__controller.release(self)
+
+    async def __aenter__(self) -> 'Ticket':
+        try:
+            await self.__admitted
+        except BaseException:
+            self.release()
+            raise
+        return self
+
+    async def __aexit__(self, *args: t.Any) -> None:
+        self.release()
+
+
+class AdmissionController:
+    """
+    Admits submissions while resources they reserve fit into capacity of the host, so a burst of submissions with
+    large memory limits doesn't overcommit it. Other submissions wait in queues of their priorities: submissions
+    are admitted in order of priority, then in order of arrival. The first submission in this order is never
+    overtaken, so submissions with large memory limits are not starved by smaller ones
+    """
+
+    def __init__(self, memory_capacity: int, cpu_slots: int, max_admitted: int, queue_size: int):
+        """
+        :param memory_capacity: Maximum total memory limit of containers of admitted submissions in bytes
+        :param cpu_slots: Maximum number of test cases of admitted submissions that are executed at the same time
+        :param max_admitted: Maximum number of admitted submissions
+        :param queue_size: Maximum number of submissions waiting for admission
+        """
+        self.memory_capacity = memory_capacity
+        self.cpu_slots = cpu_slots
+        self.__max_admitted = max_admitted
+        self.__queue_size = queue_size
+
+        self.__queues: t.Dict[SubmissionPriority, t.Deque[Ticket]] = {
+            priority: collections.deque() for priority in SubmissionPriority
+        }
+        self.__admitted: t.Set[Ticket] = set()
+        self.__reserved_memory = 0
+        self.__reserved_cpu_slots = 0
+        # Average time from admission of a submission to its release in seconds, it is used to suggest retry delay
+        self.__hold_time = 1.0
+
+    def enqueue(self, request: AdmissionRequest, priority: SubmissionPriority) -> Ticket:
+        """
+        Puts submission into the queue (it is admitted right away if there are enough resources)
+
+        :raises AdmissionRejected: If the submission can't be admitted right away, and the queue is full
+        :raises ValueError: If the submission requires more memory than capacity of the host
+        """
+        if request.memory > self.memory_capacity:
+            raise ValueError(
+                f'Submission requires {request.memory} bytes of memory, '
+                f'but capacity of the host is {self.memory_capacity} bytes!'
+            )
+        # Submission with greater parallelism than the host has is admitted, it just doesn't run tests at once
+        request = AdmissionRequest(request.memory, min(request.cpu_slots, self.cpu_slots))
+
+        ticket = Ticket(self, request, priority)
+        self.__queues[priority].append(ticket)
+        self.__dispatch()
+        # Submission that is admitted right away doesn't take a place in the queue
+        if ticket.admitted_at is None and self.__queued() > self.__queue_size:
+            self.__queues[priority].remove(ticket)
+            raise AdmissionRejected(self.retry_after())
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        """Releases resources of the admitted submission or removes the waiting one from the queue"""
+        if ticket in self.__admitted:
+            self.__admitted.remove(ticket)
+            self.__reserved_memory -= ticket.request.memory
+            self.__reserved_cpu_slots -= ticket.request.cpu_slots
+            if ticket.admitted_at is not None:
+                hold_time = time.monotonic() - ticket.admitted_at
+                self.__hold_time += _HOLD_TIME_SMOOTHING * (hold_time - self.__hold_time)
+        elif ticket in self.__queues[ticket.priority]:
+            self.__queues[ticket.priority].remove(ticket)
+        self.__dispatch()
+
+    def retry_after(self) -> int:
+        """Estimates in how many seconds the queue is going to have free places"""
+        queued = self.__queued()
+        if not queued:
+            return 1
+        return max(1, math.ceil(self.__hold_time * queued / max(1, len(self.__admitted))))
+
+    def stats(self) -> AdmissionStats:
+        return AdmissionStats(
+            memory_capacity=self.memory_capacity,
+            reserved_memory=self.__reserved_memory,
+            cpu_slots=self.cpu_slots,
+            reserved_cpu_slots=self.__reserved_cpu_slots,
+            admitted=len(self.__admitted),
+            queued={priority.value: len(queue) for priority, queue in self.__queues.items()},
+        )
+
+    def __queued(self) -> int:
+        return sum(len(queue) for queue in self.__queues.values())
+
+    def __fits(self, request: AdmissionRequest) -> bool:
+        return (
+            len(self.__admitted) < self.__max_admitted
+            and self.__reserved_memory + request.memory <= self.memory_capacity
+            and self.__reserved_cpu_slots + request.cpu_slots <= self.cpu_slots
+        )
+
+    def __dispatch(self) -> None:
+        """Admits submissions in order of priority and arrival until the next one doesn't fit"""
+        # Queues are created in order of priorities
+        for queue in self.__queues.values():
+            while queue:
+                ticket = queue[0]
+                if not self.__fits(ticket.request):
+                    return
+                queue.popleft()
+                self.__admitted.add(ticket)
+                self.__reserved_memory += ticket.request.memory
+                self.__reserved_cpu_slots += ticket.request.cpu_slots
+                ticket.admit()
+
+
+def _physical_memory() -> int:
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+
+
+admission_controller = AdmissionController(
+    memory_capacity=parse_bytes(ADMISSION_MEMORY_CAPACITY) if ADMISSION_MEMORY_CAPACITY else _physical_memory(),
+    cpu_slots=ADMISSION_CPU_SLOTS,
+    max_admitted=MAX_CONCURRENT_SUBMISSIONS,
+    queue_size=ADMISSION_QUEUE_SIZE,
+)
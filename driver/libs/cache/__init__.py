@@ -0,0 +1,2 @@
+from driver.libs.cache.compilation import CompilationCache, compilation_cache
+from driver.libs.cache.results import ResultCache, result_cache
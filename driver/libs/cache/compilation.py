@@ -0,0 +1,147 @@
+import base64
+import hashlib
+import json
+import threading
+import typing as t
+from collections import OrderedDict
+from pathlib import Path
+
+from driver.config import COMPILATION_CACHE_MAX_SIZE, LOCAL_COMPILATION_CACHE_DIR
+from driver.libs.types import CachedCompilation, CacheStats
+
+
+class CompilationCache:
+    """
+    Content-addressed cache of compilation results, shared across requests and containers
+
+    Each entry is stored on the host as two files: `<key>.json` with exit code and output of the compiler
+    and `<key>.bin` with compiled binary (only if compilation succeeded).
+    When total size of entries exceeds `max_size`, least recently used entries are evicted
+    """
+
+    def __init__(self, directory: Path, max_size: int):
+        """
+        :param directory: Directory on the host where entries are stored
+        :param max_size: Maximum total size of entries in bytes. If it is 0, nothing is cached
+        """
+        self.__directory = directory
+        self.__max_size = max_size
+        self.__lock = threading.Lock()
+        # Key - key of the entry, value - its size in bytes. The most recently used entries are at the end
+        self.__entries: t.Optional[OrderedDict[str, int]] = None
+        self.__size = 0
+
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    @staticmethod
+    def build_key(language: str, image_digest: str, flags: str, source: bytes) -> str:
+        """Returns hash of everything that affects result of compilation"""
+        hasher = hashlib.sha256()
+        for part in (language.encode(), image_digest.encode(), flags.encode(), source):
+            # Prefixing each part with its length, so different parts can't be mixed up
+            hasher.update(len(part).to_bytes(8, 'big'))
+            hasher.update(part)
+        return hasher.hexdigest()
+
+    def get(self, key: str) -> t.Optional[CachedCompilation]:
+        with self.__lock:
+            entries = self.__load_entries()
+            if key not in entries:
+                self.__misses += 1
+                return None
+
+            try:
+                entry = self.__read(key)
+            except (OSError, ValueError):
+                # Entry is broken or was removed by someone else
+                self.__remove(key)
+                self.__misses += 1
+                return None
+
+            entries.move_to_end(key)
+            self.__hits += 1
+            return entry
+
+    def put(self, key: str, entry: CachedCompilation) -> None:
+        meta = json.dumps({
+            'exit_code': entry.exit_code,
+            'stdout': base64.b64encode(entry.stdout).decode(),
+            'stderr': base64.b64encode(entry.stderr).decode(),
+        }).encode()
+        size = len(meta) + len(entry.binary or b'')
+        if size > self.__max_size:
+            return
+
+        with self.__lock:
+            entries = self.__load_entries()
+            if key in entries:
+                entries.move_to_end(key)
+                return
+
+            # Binary is written first, so entry without it is never treated as a valid one
+            if entry.binary is not None:
+                self.__path(key, 'bin').write_bytes(entry.binary)
+            self.__path(key, 'json').write_bytes(meta)
+
+            entries[key] = size
+            self.__size += size
+            self.__evict()
+
+    def stats(self) -> CacheStats:
+        with self.__lock:
+            entries = self.__load_entries()
+            return CacheStats(
+                hits=self.__hits,
+                misses=self.__misses,
+                evictions=self.__evictions,
+                entries=len(entries),
+                size=self.__size,
+            )
+
+    def __path(self, key: str, extension: str) -> Path:
+        return self.__directory / f'{key}.{extension}'
+
+    def __read(self, key: str) -> CachedCompilation:
+        meta = json.loads(self.__path(key, 'json').read_bytes())
+        binary = self.__path(key, 'bin').read_bytes() if meta['exit_code'] == 0 else None
+        return CachedCompilation(
+            exit_code=meta['exit_code'],
+            stdout=base64.b64decode(meta['stdout']),
+            stderr=base64.b64decode(meta['stderr']),
+            binary=binary,
+        )
+
+    def __load_entries(self) -> 'OrderedDict[str, int]':
+        """Builds index of entries that were stored by previous runs (oldest ones first)"""
+        if self.__entries is not None:
+            return self.__entries
+
+        self.__directory.mkdir(parents=True, exist_ok=True)
+        self.__entries = OrderedDict()
+        for meta_path in sorted(self.__directory.glob('*.json'), key=lambda path: path.stat().st_mtime):
+            key = meta_path.stem
+            binary_path = self.__path(key, 'bin')
+            size = meta_path.stat().st_size + (binary_path.stat().st_size if binary_path.exists() else 0)
+            self.__entries[key] = size
+            self.__size += size
+
+        self.__evict()
+        return self.__entries
+
+    def __evict(self) -> None:
+        assert self.__entries is not None
+        while self.__size > self.__max_size and self.__entries:
+            key = next(iter(self.__entries))
+            self.__remove(key)
+            self.__evictions += 1
+
+    def __remove(self, key: str) -> None:
+        assert self.__entries is not None
+        self.__size -= self.__entries.pop(key)
+        for extension in ('json', 'bin'):
+            self.__path(key, extension).unlink(missing_ok=True)
+
+
+compilation_cache = CompilationCache(directory=LOCAL_COMPILATION_CACHE_DIR, max_size=COMPILATION_CACHE_MAX_SIZE)
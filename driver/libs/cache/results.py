@@ -0,0 +1,102 @@
+import dataclasses
+import hashlib
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+
+from driver.config import RESULT_CACHE_MAX_SIZE, RESULT_CACHE_TTL
+from driver.libs.types import CacheStats, ProcessedContainerExecutionResult
+
+# Approximate size of an entry in memory apart from output of the program in bytes
+_ENTRY_OVERHEAD = 512
+
+
+class ResultCache:
+    """
+    In-memory cache of results of test cases, so identical executions (e.g. rejudges and resubmissions
+    of the same code) are not repeated. Entries expire after `ttl` seconds, and when total size
+    of entries exceeds `max_size`, least recently used entries are evicted
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        """
+        :param max_size: Maximum total size of entries in bytes. If it is 0, nothing is cached
+        :param ttl: How many seconds entries are kept
+        """
+        self.__max_size = max_size
+        self.__ttl = ttl
+        self.__lock = threading.Lock()
+        # Key - key of the entry, value - result, its size and value of `time.monotonic()` at the moment it expires.
+        # The most recently used entries are at the end
+        self.__entries: OrderedDict[str, t.Tuple[ProcessedContainerExecutionResult, int, float]] = OrderedDict()
+        self.__size = 0
+
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.__max_size > 0
+
+    @staticmethod
+    def build_key(*parts: t.Union[str, bytes]) -> str:
+        """Returns hash of everything that affects result of the execution"""
+        hasher = hashlib.sha256()
+        for part in parts:
+            data = part.encode() if isinstance(part, str) else part
+            # Prefixing each part with its length, so different parts can't be mixed up
+            hasher.update(len(data).to_bytes(8, 'big'))
+            hasher.update(data)
+        return hasher.hexdigest()
+
+    def get(self, key: str) -> t.Optional[ProcessedContainerExecutionResult]:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or entry[2] <= time.monotonic():
+                if entry is not None:
+                    self.__remove(key)
+                    self.__evictions += 1
+                self.__misses += 1
+                return None
+
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            # Copy is returned, so callers can't change the stored result
+            return dataclasses.replace(entry[0])
+
+    def put(self, key: str, result: ProcessedContainerExecutionResult) -> None:
+        size = _ENTRY_OVERHEAD + len(result.output.encode())
+        if size > self.__max_size:
+            return
+
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove(key)
+            self.__entries[key] = (dataclasses.replace(result), size, time.monotonic() + self.__ttl)
+            self.__size += size
+            self.__evict()
+
+    def stats(self) -> CacheStats:
+        with self.__lock:
+            return CacheStats(
+                hits=self.__hits,
+                misses=self.__misses,
+                evictions=self.__evictions,
+                entries=len(self.__entries),
+                size=self.__size,
+            )
+
+    def __evict(self) -> None:
+        # Expired entries are removed once they are requested, or as least recently used ones
+        while self.__size > self.__max_size and self.__entries:
+            self.__remove(next(iter(self.__entries)))
+            self.__evictions += 1
+
+    def __remove(self, key: str) -> None:
+        _, size, _ = self.__entries.pop(key)
+        self.__size -= size
+
+
+result_cache = ResultCache(max_size=RESULT_CACHE_MAX_SIZE, ttl=RESULT_CACHE_TTL)
@@ -0,0 +1,17 @@
+from driver.libs.checkers.checkers import Checker, ExactChecker, FloatChecker, TokensChecker
+from driver.libs.enums import CheckerMode
+
+# Default absolute and relative error of numbers compared by `FloatChecker`
+DEFAULT_FLOAT_EPSILON = 1e-6
+
+
+class CheckersFactory:
+    @staticmethod
+    def create(mode: CheckerMode, expected: bytes, epsilon: float = DEFAULT_FLOAT_EPSILON) -> Checker:
+        if mode is CheckerMode.EXACT:
+            return ExactChecker(expected)
+        if mode is CheckerMode.TOKENS:
+            return TokensChecker(expected)
+        if mode is CheckerMode.FLOAT:
+            return FloatChecker(expected, epsilon)
+        raise ValueError(f'Checker mode {mode} is not supported!')
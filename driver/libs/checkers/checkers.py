@@ -0,0 +1,137 @@
+import math
+import re
+import typing as t
+from abc import ABC, abstractmethod
+
+# Maximum length of a token that is compared as a number
+MAX_NUMBER_TOKEN_SIZE = 1024
+
+_TOKEN_PATTERN = re.compile(rb'\S+')
+
+
+class Checker(ABC):
+    """
+    Compares output of the program with the expected one.
+    Output is passed chunk by chunk as it arrives, so it is never kept entirely
+    """
+
+    def __init__(self, expected: bytes):
+        self._expected = expected
+        # Becomes `False` as soon as a difference is found, the rest of output is ignored after that
+        self._is_correct = True
+
+    @abstractmethod
+    def feed(self, chunk: bytes) -> None:
+        pass
+
+    @abstractmethod
+    def finish(self) -> bool:
+        """Returns whether the whole output matches the expected one"""
+        pass
+
+
+class ExactChecker(Checker):
+    """Output must be byte to byte equal to the expected one"""
+
+    def __init__(self, expected: bytes):
+        super().__init__(expected)
+        self.__position = 0
+
+    def feed(self, chunk: bytes) -> None:
+        if not self._is_correct:
+            return
+        end = self.__position + len(chunk)
+        self._is_correct = self._expected[self.__position:end] == chunk
+        self.__position = end
+
+    def finish(self) -> bool:
+        return self._is_correct and self.__position == len(self._expected)
+
+
+class TokensChecker(Checker):
+    """Output must consist of the same tokens as the expected one, whitespaces between tokens are ignored"""
+
+    def __init__(self, expected: bytes):
+        super().__init__(expected)
+        self.__expected_tokens = iter(expected.split())
+        # Expected token that corresponds to the token of output which is being read at the moment
+        self._token: t.Optional[bytes] = None
+        # Whether the last chunk has ended in the middle of a token
+        self.__in_token = False
+
+    def feed(self, chunk: bytes) -> None:
+        if not self._is_correct or not chunk:
+            return
+
+        for match in _TOKEN_PATTERN.finditer(chunk):
+            # Token at the very beginning of the chunk may be a continuation of the previous one
+            if match.start() > 0 or not self.__in_token:
+                self.__close_token()
+                self.__open_token()
+            if self._token is None:
+                # Output has more tokens than expected
+                self._is_correct = False
+                return
+            self._extend_token(match.group())
+        self.__in_token = not chunk[-1:].isspace()
+
+    def finish(self) -> bool:
+        self.__close_token()
+        # All the expected tokens must have been printed
+        return self._is_correct and next(self.__expected_tokens, None) is None
+
+    def _extend_token(self, part: bytes) -> None:
+        """Compares the next part of the current token"""
+        assert self._token is not None
+        offset = self.__offset
+        self.__offset += len(part)
+        if self._token[offset:self.__offset] != part:
+            self._is_correct = False
+
+    def _close_token(self) -> None:
+        """Checks the current token after it has been read entirely"""
+        assert self._token is not None
+        if self.__offset != len(self._token):
+            self._is_correct = False
+
+    def __open_token(self) -> None:
+        self._token = next(self.__expected_tokens, None)
+        self.__offset = 0
+
+    def __close_token(self) -> None:
+        if self._token is not None:
+            self._close_token()
+            self._token = None
+
+
+class FloatChecker(TokensChecker):
+    """
+    Same as `TokensChecker`, but if the expected token is a number,
+    it is compared with the token of output with absolute or relative error `epsilon`
+    """
+
+    def __init__(self, expected: bytes, epsilon: float):
+        super().__init__(expected)
+        self.__epsilon = epsilon
+        self.__buffer = bytearray()
+
+    def _extend_token(self, part: bytes) -> None:
+        self.__buffer += part
+        # Numbers are short, so long token can't match the expected one
+        if len(self.__buffer) > max(MAX_NUMBER_TOKEN_SIZE, len(self._token or b'')):
+            self._is_correct = False
+
+    def _close_token(self) -> None:
+        assert self._token is not None
+        actual, expected = bytes(self.__buffer), self._token
+        self.__buffer.clear()
+
+        if actual == expected:
+            return
+        try:
+            actual_number, expected_number = float(actual), float(expected)
+        except ValueError:
+            self._is_correct = False
+            return
+        if not math.isclose(actual_number, expected_number, rel_tol=self.__epsilon, abs_tol=self.__epsilon):
+            self._is_correct = False
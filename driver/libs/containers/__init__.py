@@ -1,9 +1,24 @@
+import logging
 import typing as t
 
 from driver.libs.containers._base_containers import _BaseContainer
 from driver.libs.containers.all_containers import CppContainer, PascalABCContainer, PyPyContainer, PythonContainer
+from driver.libs.containers.backends import (
+    DockerBackend,
+    ExecutionBackend,
+    LocalBackend,
+    MultiHostBackend,
+    Sandbox,
+    SandboxUnavailable,
+    create_execution_backend,
+    execution_backend,
+)
+from driver.libs.containers.cores import CoreAllocator, core_allocator, format_cpu_list, parse_cpu_list
+from driver.libs.containers.pool import ContainerPool, container_pool
 from driver.libs.enums import ProgrammingLanguage
 
+logger = logging.getLogger(__name__)
+
 ContainerClass: t.TypeAlias = t.Type[_BaseContainer]
 
 
@@ -21,3 +36,18 @@ class ContainersFactory:
         if class_ is None:
             raise ValueError(f'Language {language} is not specified in mapping!')
         return class_
+
+
+def warm_up_containers(languages: t.Iterable[ProgrammingLanguage], memory_limits: t.Iterable[str]) -> None:
+    """
+    Pre-starts sandboxes (`CONTAINERS_POOL_MIN_SIZE` containers of the pool) for each language and memory limit,
+    so the first submissions don't wait for them to be created. Failures are logged, sandboxes are created on lease
+    """
+    memory_limits = list(memory_limits)
+    for language in languages:
+        for memory_limit in memory_limits:
+            try:
+                ContainersFactory.get(language)(time_limit=1, memory_limit=memory_limit).warm_up()
+            except Exception:
+                logger.warning('Failed to warm up containers of %s with %s of memory', language.name, memory_limit,
+                               exc_info=True)
@@ -1,41 +1,90 @@
-import os
+import asyncio
+import contextlib
+import logging
+import posixpath
+import shlex
+import threading
 import typing as t
+import uuid
 from abc import ABC, abstractmethod
 
-import docker
-from docker.models.containers import Container
+from docker.models.containers import ExecResult
 
 from driver.config import (
+    BATCH_SCRIPT,
+    CPU_PINNING_QUOTA,
     DOCKER_COMPILED_FILES_DIR,
-    DOCKER_TIME_OUTPUT_FILE,
+    DOCKER_STDIN_DIR,
     DOCKER_USER_SCRIPTS_DIR,
+    DOCKER_ZYGOTE_DIR,
     LOCAL_USER_SCRIPTS_DIR,
-    USER_SCRIPTS_VOLUME_FULLNAME,
+    OUTPUT_LIMIT,
+    RUN_SCRIPT,
+    ZYGOTE_RUN_SCRIPT,
+    ZYGOTE_SCRIPT,
 )
-from driver.libs.containers.result_processor import ResultProcessor
+from driver.libs.cache import CompilationCache, compilation_cache
+from driver.libs.checkers import Checker
+from driver.libs.containers.async_client import STDOUT
+from driver.libs.containers.backends import Sandbox, execution_backend
+from driver.libs.containers.batch import BatchStreamParser
+from driver.libs.containers.cores import CoreAllocator
+from driver.libs.containers.output_capture import OutputCapture
+from driver.libs.containers.result_processor import MAX_STATS_LINE_SIZE, ResultProcessor
+from driver.libs.enums import Phase
+from driver.libs.files.utils import iter_file_archive, iter_files_archive, pack_file, unpack_file
+from driver.libs.profiling import measure_phase
 from driver.libs.types import (
+    BatchCodeExecutionCommandOptions,
+    CachedCompilation,
     CodeExecutionCommandOptions,
     CompiledFileData,
+    DerivedImage,
     ExecutableCommand,
     Filename,
     ProcessedContainerExecutionResult,
+    Stdin,
 )
 
-client = docker.from_env()
+logger = logging.getLogger(__name__)
+
+# Exit code that is used if the run script has been killed before it has printed exit code of the program
+_UNKNOWN_EXIT_CODE = -1
+# Compilers exit with small codes when they reject the source (e.g. 1 with diagnostics). Larger codes are used by
+# `timeout` (124) and for killed processes (128 + signal, e.g. 137 if the compiler has run out of memory)
+_MAX_COMPILER_EXIT_CODE = 123
 
 
 class _BaseContainer(ABC):
     """Base class of all containers for programming languages"""
 
-    def __init__(self, time_limit: int, memory_limit: str):
+    def __init__(self, time_limit: int, memory_limit: str, output_limit: int = OUTPUT_LIMIT):
         """
         :param time_limit: Integer message that represents how many seconds can be spent on a single code execution
         :param memory_limit: String with a units identification char (100000b, 1000k, 128m, 1g).
                              If a string is specified without a units character,
                              bytes are assumed as an intended unit
+        :param output_limit: Maximum size of stdout (and, separately, stderr) of a single code execution in bytes
         """
         self.__time_limit = time_limit
         self.__memory_limit = memory_limit
+        self.__output_limit = output_limit
+        # Source code that has been uploaded to the leased container (filename -> content)
+        self.__sources: t.Dict[Filename, bytes] = {}
+        # Key of the source that will be compiled in the next leased sandbox (see `set_affinity`)
+        self.__affinity_key: t.Optional[str] = None
+
+        # Counters of executions that are used to determine whether they overlapped in time
+        self.__executions_lock = threading.Lock()
+        self.__executions_started = 0
+        self.__executions_running = 0
+
+        # Dedicated cores of test cases that are running in the container (see `__pin`), and cores which
+        # the container is restricted to since test cases have started running in it (`None` - housekeeping ones)
+        self.__pinned_cores: t.List[int] = []
+        self.__container_cores: t.Optional[t.Tuple[int, ...]] = None
+        self.__pinning_lock = threading.Lock()
+        self.__apinning_lock = asyncio.Lock()
 
     @property
     @abstractmethod
@@ -47,6 +96,29 @@ class _BaseContainer(ABC):
         """
         pass
 
+    @property
+    def _derived_image(self) -> t.Optional[DerivedImage]:
+        """
+        Image that is built on top of `_docker_image` by the driver (for example, with precompiled headers).
+        If it is specified, containers are created from it. `None` means that `_docker_image` is used as is
+        """
+        return None
+
+    @property
+    def image_id(self) -> str:
+        """Id of the image of the leased sandbox, it changes whenever the image is rebuilt"""
+        return self._sandbox.image_id
+
+    @property
+    def _working_dir(self) -> str:
+        """Directory of the sandbox against which relative paths of all commands are resolved"""
+        return self._sandbox.working_dir
+
+    @property
+    def core_allocator(self) -> CoreAllocator:
+        """Dedicated cores of the host of the leased sandbox, `cpu_core` of test cases must be taken from it"""
+        return self._sandbox.core_allocator
+
     @abstractmethod
     def _build_code_execution_command(self, filename: Filename) -> ExecutableCommand:
         """
@@ -57,123 +129,731 @@ class _BaseContainer(ABC):
         """
         pass
 
-    def _build_full_code_execution_command(self, options: CodeExecutionCommandOptions) -> ExecutableCommand:
+    def _build_run_script_command(self, filename: Filename) -> t.Tuple[str, ExecutableCommand]:
+        """Returns path of the run script and command which it is invoked with (by default, the one that executes code)"""
+        return self._sandbox.script_path(RUN_SCRIPT), self._build_code_execution_command(filename)
+
+    def _build_full_code_execution_command(self, filename: Filename, stdin_file: str, marker: str) -> ExecutableCommand:
         """
-        Wraps result of `_build_code_execution_command` in all other necessary commands
-        (such as `time`, `timeout`, adds stdin pipe) via `ExecutionCommandBuilder`
+        Wraps result of `_build_code_execution_command` in the script that runs the program
+        with `timeout`, redirects stdin from the file that has been uploaded to the container,
+        cuts output that exceeds the limit and prints used resources after `marker`
         """
-        command = self._build_code_execution_command(options.filename)
-        # Aliases
-        stdin = options.stdin
-        timeout = self.__time_limit
-        # Building full command
-        # TODO: enforce "\n" character before redirecting file with execution time to stdout to avoid std::cout << "a" (without linebreak)
-        command_with_timeout = f'timeout {timeout} {command}'
-        command_with_time = f'time -f \"%e\" -o {DOCKER_TIME_OUTPUT_FILE} {command_with_timeout}'
-        command_with_time_output = f'{command_with_time} && cat {DOCKER_TIME_OUTPUT_FILE}'
-        command_wth_stdin = f'echo -e \"{stdin}\" | {command_with_time_output}'
-        full_command = f'sh -c \'{command_wth_stdin}\''
+        run_script, command = self._build_run_script_command(filename)
+        full_command = (
+            f'sh {run_script} {marker} {self.__time_limit} {self.__output_limit} {stdin_file} {command}'
+        )
 
-        print(full_command)
+        logger.debug('Executing %s', full_command)
         return full_command
 
+    def _upload_source(self, filename: Filename, source_code: t.Optional[bytes]) -> None:
+        """
+        Uploads source code to the directory with users' scripts inside the container.
+        If `source_code` is `None`, the file is expected to be in the mounted directory
+        """
+        if source_code is None or filename in self.__sources:
+            return
+        with measure_phase(Phase.SOURCE_UPLOAD):
+            archive = pack_file(filename, source_code, mode=0o444)
+            self._sandbox.put_archive(posixpath.join(self._working_dir, DOCKER_USER_SCRIPTS_DIR), archive)
+        self.__sources[filename] = source_code
+
+    async def _aupload_source(self, filename: Filename, source_code: t.Optional[bytes]) -> None:
+        """Async version of `_upload_source`"""
+        if source_code is None or filename in self.__sources:
+            return
+        with measure_phase(Phase.SOURCE_UPLOAD):
+            archive = pack_file(filename, source_code, mode=0o444)
+            await self._sandbox.aput_archive(posixpath.join(self._working_dir, DOCKER_USER_SCRIPTS_DIR), archive)
+        self.__sources[filename] = source_code
+
+    def _read_source(self, filename: Filename) -> bytes:
+        """Returns source code either uploaded to the container or saved to the mounted directory"""
+        if filename in self.__sources:
+            return self.__sources[filename]
+        return (LOCAL_USER_SCRIPTS_DIR / filename).read_bytes()
+
+    def _forget_source(self, filename: Filename) -> t.List[str]:
+        """Forgets about the source and returns paths of its files inside the container that must be removed"""
+        # Files in the mounted directory belong to their creators
+        if self.__sources.pop(filename, None) is None:
+            return []
+        return [posixpath.join(self._working_dir, DOCKER_USER_SCRIPTS_DIR, filename)]
+
+    def remove_source(self, filename: Filename) -> None:
+        """
+        Removes uploaded source code and files built from it (e.g. compiled binary) from the container,
+        so the same container can execute many sources one after another without filling its working directory
+        """
+        paths = self._forget_source(filename)
+        if paths:
+            self._sandbox.exec_run(shlex.join(['rm', '-f', *paths]))
+
+    async def aremove_source(self, filename: Filename) -> None:
+        """Async version of `remove_source`"""
+        paths = self._forget_source(filename)
+        if paths:
+            await self._sandbox.aexec_run(shlex.join(['rm', '-f', *paths]))
+
+    def _pack_stdin(self, stdin: Stdin) -> t.Tuple[str, t.Iterator[bytes]]:
+        """
+        Returns path of the file with input inside the container (relative to the working directory)
+        and tar archive with this file, which is built lazily, chunk by chunk
+        """
+        name = str(uuid.uuid4())
+        content = stdin.encode() if isinstance(stdin, str) else stdin
+        return f'{DOCKER_STDIN_DIR}/{name}', iter_file_archive(name, content, mode=0o444)
+
+    def _create_output_captures(self, checker: t.Optional[Checker]) -> t.Tuple[OutputCapture, OutputCapture]:
+        """
+        Returns captures of stdout and stderr. Measurements printed after stdout are held back.
+        If `checker` is passed, stdout is passed to it instead of being kept
+        """
+        stdout = OutputCapture(self.__output_limit, holdback=MAX_STATS_LINE_SIZE, checker=checker)
+        return stdout, OutputCapture(self.__output_limit)
+
+    def _run(
+            self,
+            filename: Filename,
+            stdin: Stdin,
+            checker: t.Optional[Checker] = None,
+            cpu_core: t.Optional[int] = None
+    ) -> ProcessedContainerExecutionResult:
+        """
+        Uploads input of the program to the container, executes the program and processes result
+
+        :param cpu_core: Dedicated core of the test case taken from `core_allocator`, if pinning is enabled.
+                         The program is pinned to it, and the container is restricted to cores of its test cases
+        """
+        with measure_phase(Phase.EXECUTION):
+            stdin_file, archive = self._pack_stdin(stdin)
+            self._sandbox.put_archive(posixpath.join(self._working_dir, DOCKER_STDIN_DIR), archive)
+
+            marker = uuid.uuid4().hex
+            code_execution_command = self._build_full_code_execution_command(filename, stdin_file, marker)
+            stdout, stderr = self._create_output_captures(checker)
+            with self.__pin(cpu_core), self.__track_execution() as is_exclusive:
+                # Output is read chunk by chunk instead of being buffered entirely
+                exec_id = self._sandbox.exec_create(self.__pinned_command(code_execution_command, cpu_core))
+                for stream, chunk in self._sandbox.exec_start(exec_id):
+                    (stdout if stream == STDOUT else stderr).feed(chunk)
+                exit_code = self._sandbox.exec_inspect(exec_id)
+
+        with measure_phase(Phase.RESULT_PROCESSING):
+            result_processor = ResultProcessor(self.__time_limit)
+            result = result_processor.handle_execution(exit_code, stdout, stderr, marker, is_exclusive(), checker)
+            result.cpu_core = cpu_core
+            return result
+
+    async def _arun(
+            self,
+            filename: Filename,
+            stdin: Stdin,
+            checker: t.Optional[Checker] = None,
+            cpu_core: t.Optional[int] = None
+    ) -> ProcessedContainerExecutionResult:
+        """Async version of `_run`"""
+        with measure_phase(Phase.EXECUTION):
+            stdin_file, archive = self._pack_stdin(stdin)
+            await self._sandbox.aput_archive(posixpath.join(self._working_dir, DOCKER_STDIN_DIR), archive)
+
+            marker = uuid.uuid4().hex
+            code_execution_command = self._build_full_code_execution_command(filename, stdin_file, marker)
+            stdout, stderr = self._create_output_captures(checker)
+            async with self.__apin(cpu_core):
+                with self.__track_execution() as is_exclusive:
+                    # Output is read chunk by chunk instead of being buffered entirely
+                    exec_id = await self._sandbox.aexec_create(self.__pinned_command(code_execution_command, cpu_core))
+                    async for stream, frame in self._sandbox.aexec_start(exec_id):
+                        (stdout if stream == STDOUT else stderr).feed(frame)
+                    exit_code = await self._sandbox.aexec_inspect(exec_id)
+
+        with measure_phase(Phase.RESULT_PROCESSING):
+            result_processor = ResultProcessor(self.__time_limit)
+            result = result_processor.handle_execution(exit_code, stdout, stderr, marker, is_exclusive(), checker)
+            result.cpu_core = cpu_core
+            return result
+
+    def _build_batch_execution_command(
+            self,
+            filename: Filename,
+            stdin_prefix: str,
+            tests_count: int,
+            marker: str
+    ) -> ExecutableCommand:
+        """Same as `_build_full_code_execution_command`, but the run script is invoked by the batch script"""
+        run_script, command = self._build_run_script_command(filename)
+        return (
+            f'sh {self._sandbox.script_path(BATCH_SCRIPT)} {run_script} {marker} {self.__time_limit} {self.__output_limit} '
+            f'{stdin_prefix} {tests_count} {command}'
+        )
+
+    @staticmethod
+    def _pack_stdin_list(stdin_list: t.Sequence[Stdin]) -> t.Tuple[str, t.Iterator[bytes]]:
+        """
+        Returns prefix of paths of the files with inputs inside the container (input of test case `i`
+        is saved to `<prefix>-<i>`) and tar archive with these files
+        """
+        name = str(uuid.uuid4())
+        files = (
+            (f'{name}-{index}', stdin.encode() if isinstance(stdin, str) else stdin)
+            for index, stdin in enumerate(stdin_list)
+        )
+        return f'{DOCKER_STDIN_DIR}/{name}', iter_files_archive(files, mode=0o444)
+
+    def _run_batch(
+            self,
+            filename: Filename,
+            stdin_list: t.Sequence[Stdin],
+            checkers: t.Sequence[t.Optional[Checker]],
+            cpu_core: t.Optional[int] = None
+    ) -> t.List[ProcessedContainerExecutionResult]:
+        """Executes the program against all the inputs in a single exec"""
+        stdin_prefix, archive = self._pack_stdin_list(stdin_list)
+        self._sandbox.put_archive(posixpath.join(self._working_dir, DOCKER_STDIN_DIR), archive)
+
+        marker = uuid.uuid4().hex
+        command = self._build_batch_execution_command(filename, stdin_prefix, len(stdin_list), marker)
+        parser = BatchStreamParser(marker, lambda index: self._create_output_captures(checkers[index]))
+        result_processor = ResultProcessor(self.__time_limit)
+
+        results: t.Dict[int, ProcessedContainerExecutionResult] = {}
+        # Results of test cases are processed while the batch is being executed, so the phases overlap
+        with measure_phase(Phase.EXECUTION), self.__pin(cpu_core), self.__track_execution() as is_exclusive:
+            exec_id = self._sandbox.exec_create(self.__pinned_command(command, cpu_core))
+            for stream, chunk in self._sandbox.exec_start(exec_id):
+                if stream != STDOUT:
+                    continue
+                for index, stdout, stderr in parser.feed(chunk):
+                    with measure_phase(Phase.RESULT_PROCESSING):
+                        results[index] = result_processor.handle_execution(
+                            _UNKNOWN_EXIT_CODE, stdout, stderr, marker, is_exclusive(), checkers[index]
+                        )
+                        results[index].cpu_core = cpu_core
+            exit_code = self._sandbox.exec_inspect(exec_id)
+
+        # Test cases whose frames haven't been printed
+        return [
+            results[index] if index in results else result_processor.handle_lost_execution(exit_code)
+            for index in range(len(stdin_list))
+        ]
+
+    async def _aiter_batch(
+            self,
+            filename: Filename,
+            stdin_list: t.Sequence[Stdin],
+            checkers: t.Sequence[t.Optional[Checker]],
+            cpu_core: t.Optional[int] = None
+    ) -> t.AsyncGenerator[ProcessedContainerExecutionResult, None]:
+        """Async version of `_run_batch`, which yields results as soon as they arrive"""
+        stdin_prefix, archive = self._pack_stdin_list(stdin_list)
+        await self._sandbox.aput_archive(posixpath.join(self._working_dir, DOCKER_STDIN_DIR), archive)
+
+        marker = uuid.uuid4().hex
+        command = self._build_batch_execution_command(filename, stdin_prefix, len(stdin_list), marker)
+        parser = BatchStreamParser(marker, lambda index: self._create_output_captures(checkers[index]))
+        result_processor = ResultProcessor(self.__time_limit)
+
+        # Test cases are executed one by one, so their frames are printed in order
+        completed = 0
+        async with self.__apin(cpu_core):
+            with measure_phase(Phase.EXECUTION), self.__track_execution() as is_exclusive:
+                exec_id = await self._sandbox.aexec_create(self.__pinned_command(command, cpu_core))
+                async for stream, frame in self._sandbox.aexec_start(exec_id):
+                    if stream != STDOUT:
+                        continue
+                    for index, stdout, stderr in parser.feed(frame):
+                        with measure_phase(Phase.RESULT_PROCESSING):
+                            result = result_processor.handle_execution(
+                                _UNKNOWN_EXIT_CODE, stdout, stderr, marker, is_exclusive(), checkers[index]
+                            )
+                            result.cpu_core = cpu_core
+                        yield result
+                        completed += 1
+                exit_code = await self._sandbox.aexec_inspect(exec_id)
+
+        # Test cases whose frames haven't been printed
+        for _ in range(completed, len(stdin_list)):
+            yield result_processor.handle_lost_execution(exit_code)
+
+    @staticmethod
+    def __pinned_command(command: ExecutableCommand, core: t.Optional[int]) -> ExecutableCommand:
+        """
+        Pins the program to its core. The container is restricted to the cores of all its test cases (running ones
+        and the ones that have run before), so otherwise programs running in it at the same time would share cores
+        """
+        return command if core is None else f'taskset -c {core} {command}'
+
+    def __add_container_core(self, core: int) -> t.Optional[t.Tuple[int, ...]]:
+        """
+        Adds the core to the cores of the container, returns the new ones if they have changed.
+        Cores are not removed until the container is moved back to housekeeping cores (see `_unpin_container`),
+        so test cases that are executed one by one on the same core don't update the container
+        """
+        cores = self.__container_cores or ()
+        if core in cores:
+            return None
+        self.__container_cores = tuple(sorted((*cores, core)))
+        return self.__container_cores
+
+    @contextlib.contextmanager
+    def __pin(self, core: t.Optional[int]) -> t.Iterator[None]:
+        """Restricts the container to `core` (and cores of other test cases) during the execution"""
+        if core is None:
+            yield
+            return
+
+        with self.__pinning_lock:
+            self.__pinned_cores.append(core)
+            cores = self.__add_container_core(core)
+            if cores is not None:
+                self._sandbox.set_cpus(cores, CPU_PINNING_QUOTA)
+        try:
+            yield
+        finally:
+            with self.__pinning_lock:
+                self.__pinned_cores.remove(core)
+
+    @contextlib.asynccontextmanager
+    async def __apin(self, core: t.Optional[int]) -> t.AsyncIterator[None]:
+        """Async version of `__pin`"""
+        if core is None:
+            yield
+            return
+
+        async with self.__apinning_lock:
+            self.__pinned_cores.append(core)
+            cores = self.__add_container_core(core)
+            if cores is not None:
+                await self._sandbox.aset_cpus(cores, CPU_PINNING_QUOTA)
+        try:
+            yield
+        finally:
+            self.__pinned_cores.remove(core)
+
+    def _unpin_container(self) -> None:
+        """
+        Moves the container back to housekeeping cores without quota, unless test cases are running in it.
+        It is done before compilation and before the container is released
+        """
+        with self.__pinning_lock:
+            if self.__container_cores is not None and not self.__pinned_cores:
+                self.__container_cores = None
+                self._sandbox.set_cpus(self._sandbox.core_allocator.housekeeping_cores, None)
+
+    async def _aunpin_container(self) -> None:
+        """Async version of `_unpin_container`"""
+        async with self.__apinning_lock:
+            if self.__container_cores is not None and not self.__pinned_cores:
+                self.__container_cores = None
+                await self._sandbox.aset_cpus(self._sandbox.core_allocator.housekeeping_cores, None)
+
+    @contextlib.contextmanager
+    def __track_execution(self) -> t.Iterator[t.Callable[[], bool]]:
+        """
+        Yields function which tells whether the execution had the container to itself,
+        i.e. no other execution was running in the container at the same time.
+        Only in this case cgroup statistics of the container belong to this execution
+        """
+        with self.__executions_lock:
+            started_before = self.__executions_started
+            is_alone = self.__executions_running == 0
+            self.__executions_started += 1
+            self.__executions_running += 1
+
+        try:
+            yield lambda: is_alone and self.__executions_started == started_before + 1
+        finally:
+            with self.__executions_lock:
+                self.__executions_running -= 1
+
     @abstractmethod
     def execute(self, options: CodeExecutionCommandOptions) -> ProcessedContainerExecutionResult:
         """Executes all the commands that are required to get results of passed program"""
         pass
 
+    @abstractmethod
+    async def aexecute(self, options: CodeExecutionCommandOptions) -> ProcessedContainerExecutionResult:
+        """Async version of `execute`, which doesn't block the event loop while the program is running"""
+        pass
+
+    @abstractmethod
+    def execute_batch(self, options: BatchCodeExecutionCommandOptions) -> t.List[ProcessedContainerExecutionResult]:
+        """
+        Same as calling `execute` for each input, but all test cases are executed by the batch script
+        in a single exec, which saves overhead of an exec per test case
+        """
+        pass
+
+    @abstractmethod
+    def aiter_batch(
+            self,
+            options: BatchCodeExecutionCommandOptions
+    ) -> t.AsyncGenerator[ProcessedContainerExecutionResult, None]:
+        """
+        Async version of `execute_batch`, which yields results in order as soon as they arrive.
+        The batch exec is stopped once the generator is closed
+        """
+        pass
+
+    async def aexecute_batch(
+            self,
+            options: BatchCodeExecutionCommandOptions
+    ) -> t.List[ProcessedContainerExecutionResult]:
+        return [result async for result in self.aiter_batch(options)]
+
+    @staticmethod
+    def _batch_checkers(options: BatchCodeExecutionCommandOptions) -> t.Sequence[t.Optional[Checker]]:
+        if options.checkers is None:
+            return [None] * len(options.stdin_list)
+        return options.checkers
+
+    def set_affinity(self, source_digest: str) -> None:
+        """
+        Makes the next lease prefer hosts on which the source has already been compiled (see `ExecutionBackend.lease`)
+
+        :param source_digest: Hash of source code, e.g. `ResultCache.build_key(source_code)`
+        """
+        self.__affinity_key = f'{type(self).__name__}:{source_digest}'
+
+    def warm_up(self) -> None:
+        """Pre-starts sandboxes of the image and memory limit of the container, so leases don't wait for them"""
+        execution_backend.warm_up(self._docker_image, self._derived_image, self.__memory_limit)
+
     def __enter__(self) -> "_BaseContainer":
-        # Read-only volume with users' scripts
-        if os.environ.get('DOCKER_FLAG') == '1':
-            # Mounting volume
-            scripts_volume = f'{USER_SCRIPTS_VOLUME_FULLNAME}:/{DOCKER_USER_SCRIPTS_DIR}:ro'
-        else:
-            # Mounting directory
-            scripts_volume = f'{LOCAL_USER_SCRIPTS_DIR}:/{DOCKER_USER_SCRIPTS_DIR}:ro'
-
-        # Creating and starting the container
-        self._container: Container = client.containers.create(
-            image=self._docker_image,
-            volumes=[scripts_volume],
-            mem_limit=self.__memory_limit,
-            tty=True,
-            detach=True,
+        # Leasing sandbox (e.g. pre-started container from the pool) from the execution backend
+        self._sandbox: Sandbox = execution_backend.lease(
+            self._docker_image, self._derived_image, self.__memory_limit, self.__affinity_key
         )
-
-        # Starting the container
-        self._container.start()
-        # Creating directory for compiled files and file for stdout of `time` command
-        self._container.exec_run(f'sh -c \'mkdir {DOCKER_COMPILED_FILES_DIR} && touch {DOCKER_TIME_OUTPUT_FILE}\'')
+        self.__sources = {}
+        # Idle containers are kept on housekeeping cores
+        self.__container_cores = None
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
-        # Stopping and deleting container
-        self._container.kill()
-        self._container.remove()
-        # pass
+        # Returning sandbox to the backend (container will be reset before the next lease)
+        try:
+            self._unpin_container()
+        finally:
+            execution_backend.release(self._sandbox)
+
+    async def __aenter__(self) -> "_BaseContainer":
+        self._sandbox = await execution_backend.alease(
+            self._docker_image, self._derived_image, self.__memory_limit, self.__affinity_key
+        )
+        self.__sources = {}
+        self.__container_cores = None
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        try:
+            await self._aunpin_container()
+        finally:
+            await execution_backend.arelease(self._sandbox)
 
 
 class InterpretedContainer(_BaseContainer, ABC):
     """Base class of all containers for interpreted programming languages"""
 
-    def __init__(self, time_limit: int, memory_limit: str):
-        super().__init__(time_limit, memory_limit)
+    def __init__(self, time_limit: int, memory_limit: str, output_limit: int = OUTPUT_LIMIT, zygote: bool = False):
+        """
+        :param zygote: Whether programs are forked from the zygote, i.e. the interpreter that is started once
+                       per lease of the container, instead of starting a new interpreter for each execution
+        """
+        super().__init__(time_limit, memory_limit, output_limit)
+        if zygote and self._zygote_interpreter is None:
+            raise ValueError(f'{type(self).__name__} does not support zygote mode!')
+        self.__zygote = zygote
+        # Whether the zygote is running in the leased container, `None` if it hasn't been started yet
+        self.__is_zygote_running: t.Optional[bool] = None
+        self.__zygote_lock = threading.Lock()
+        self.__async_zygote_lock = asyncio.Lock()
+
+    @property
+    def _zygote_interpreter(self) -> t.Optional[ExecutableCommand]:
+        """Interpreter that runs the zygote (see `scripts/zygote.py`), `None` if it can't run it"""
+        return None
+
+    def _build_zygote_start_command(self) -> ExecutableCommand:
+        """
+        Returns command that starts the zygote in background and waits until it is ready to serve requests.
+        Standard streams of the zygote are detached, so the command doesn't wait for it to exit
+        """
+        zygote_script = self._sandbox.script_path(ZYGOTE_SCRIPT)
+        start = f'{self._zygote_interpreter} {zygote_script} {DOCKER_ZYGOTE_DIR} </dev/null >/dev/null 2>&1'
+        wait = f'while [ ! -p {DOCKER_ZYGOTE_DIR}/requests ]; do sleep 0.01; done'
+        return f'sh -c \'{start} & timeout 10 sh -c "{wait}"\''
+
+    def _build_run_script_command(self, filename: Filename) -> t.Tuple[str, ExecutableCommand]:
+        if not self.__is_zygote_running:
+            return super()._build_run_script_command(filename)
+        return self._sandbox.script_path(ZYGOTE_RUN_SCRIPT), f'{DOCKER_ZYGOTE_DIR} {DOCKER_USER_SCRIPTS_DIR}/{filename}'
+
+    def _start_zygote(self) -> None:
+        """Starts the zygote once per lease. If it fails to start, programs are run by a new interpreter"""
+        with self.__zygote_lock:
+            if self.__zygote and self.__is_zygote_running is None:
+                exit_code, _ = self._sandbox.exec_run(self._build_zygote_start_command())
+                self.__is_zygote_running = exit_code == 0
+
+    async def _astart_zygote(self) -> None:
+        """Async version of `_start_zygote`"""
+        async with self.__async_zygote_lock:
+            if self.__zygote and self.__is_zygote_running is None:
+                result = await self._sandbox.aexec_run(self._build_zygote_start_command())
+                self.__is_zygote_running = result.exit_code == 0
 
     def execute(self, options: CodeExecutionCommandOptions) -> ProcessedContainerExecutionResult:
-        # Executing
-        code_execution_command = self._build_full_code_execution_command(options)
-        execution_result = self._container.exec_run(cmd=code_execution_command, stdin=True, demux=True)
-        print(execution_result)
+        self._upload_source(options.filename, options.source_code)
+        self._start_zygote()
+        return self._run(options.filename, options.stdin, options.checker, options.cpu_core)
+
+    async def aexecute(self, options: CodeExecutionCommandOptions) -> ProcessedContainerExecutionResult:
+        await self._aupload_source(options.filename, options.source_code)
+        await self._astart_zygote()
+        return await self._arun(options.filename, options.stdin, options.checker, options.cpu_core)
+
+    def execute_batch(self, options: BatchCodeExecutionCommandOptions) -> t.List[ProcessedContainerExecutionResult]:
+        self._upload_source(options.filename, options.source_code)
+        self._start_zygote()
+        return self._run_batch(options.filename, options.stdin_list, self._batch_checkers(options), options.cpu_core)
+
+    async def aiter_batch(
+            self,
+            options: BatchCodeExecutionCommandOptions
+    ) -> t.AsyncGenerator[ProcessedContainerExecutionResult, None]:
+        await self._aupload_source(options.filename, options.source_code)
+        await self._astart_zygote()
+        results = self._aiter_batch(
+            options.filename, options.stdin_list, self._batch_checkers(options), options.cpu_core
+        )
+        async with contextlib.aclosing(results):
+            async for result in results:
+                yield result
+
+    def __enter__(self) -> "_BaseContainer":
+        super().__enter__()
+        # The zygote is killed when the sandbox is released
+        self.__is_zygote_running = None
+        return self
 
-        # return execution_result
-        result_processor = ResultProcessor()
-        return result_processor.handle_execution(execution_result)
+    async def __aenter__(self) -> "_BaseContainer":
+        await super().__aenter__()
+        self.__is_zygote_running = None
+        return self
 
 
 class CompiledContainer(_BaseContainer, ABC):
     """Base class of all containers for compiled programming languages"""
 
-    def __init__(self, time_limit: int, memory_limit: str):
-        super().__init__(time_limit, memory_limit)
+    def __init__(self, time_limit: int, memory_limit: str, output_limit: int = OUTPUT_LIMIT):
+        super().__init__(time_limit, memory_limit, output_limit)
         # Key - original name of file, message name of compiled file
         self.__compiled_files_data: t.Dict[Filename, CompiledFileData] = {}
+        # Test cases can be executed in several threads (or tasks), but each file must be compiled only once
+        self.__compilation_lock = threading.Lock()
+        self.__async_compilation_lock = asyncio.Lock()
+
+    @property
+    def _compiler_flags(self) -> str:
+        """Flags that are passed to the compiler, for example: `-O2 -std=c++17`"""
+        return ''
 
     @abstractmethod
     def _build_code_compilation_command(self, filename: Filename) -> t.Tuple[ExecutableCommand, Filename]:
-        """Returns command that will compile code
+        """Returns command that will compile code with `_compiler_flags`
 
         For instance, if you want to compile C++ code, then this method should return string like this:
-        `g++ hello.cpp -o hello`
+        `g++ -O2 hello.cpp -o hello`
         """
         pass
 
-    def execute(self, options: CodeExecutionCommandOptions) -> ProcessedContainerExecutionResult:
+    def _compilation_cache_key(self, filename: Filename) -> str:
+        """
+        Returns key of compilation cache for passed file.
+        It depends on language, image of the container, compilation command and source code
+        """
+        # Compilation command is built for a constant filename, so it contains only compiler and its flags
+        extension = filename.rsplit('.', 1)[-1]
+        flags, _ = self._build_code_compilation_command(f'source.{extension}')
+        source = self._read_source(filename)
+        return CompilationCache.build_key(
+            language=type(self).__name__,
+            image_digest=self._sandbox.image_id,
+            flags=flags,
+            source=source,
+        )
+
+    @property
+    def _compiled_files_dir(self) -> str:
+        return posixpath.join(self._working_dir, DOCKER_COMPILED_FILES_DIR)
+
+    def _forget_source(self, filename: Filename) -> t.List[str]:
+        paths = super()._forget_source(filename)
+        compiled_file_data = self.__compiled_files_data.pop(filename, None)
+        if compiled_file_data is not None:
+            paths.append(posixpath.join(self._compiled_files_dir, compiled_file_data.filename))
+        return paths
+
+    def _compile(self, filename: Filename) -> CompiledFileData:
+        """Compiles file or, if the same source has already been compiled, takes its result from the cache"""
+        cache_key = self._compilation_cache_key(filename)
+        cached = compilation_cache.get(cache_key)
+        code_compilation_command, compiled_filename = self._build_code_compilation_command(filename)
+
+        if cached is not None:
+            # Injecting compiled binary instead of compiling the source once again
+            if cached.binary is not None:
+                archive = pack_file(compiled_filename, cached.binary, mode=0o755)
+                self._sandbox.put_archive(self._compiled_files_dir, archive)
+            return self.__compiled_file_data_from_cache(compiled_filename, cached)
+
+        # Compiling
+        logger.debug('Compiling %s', code_compilation_command)
+        compilation_result = self._sandbox.exec_run(code_compilation_command)
+
+        # Saving result of compilation to the cache
+        binary = None
+        if compilation_result.exit_code == 0:
+            archive = self._sandbox.get_archive(posixpath.join(self._compiled_files_dir, compiled_filename))
+            binary = unpack_file([archive])
+        if self.__is_cacheable(compilation_result):
+            self.__save_to_cache(cache_key, compilation_result, binary)
+
+        return CompiledFileData(filename=compiled_filename, compilation_result=compilation_result)
+
+    async def _acompile(self, filename: Filename) -> CompiledFileData:
+        """Async version of `_compile`"""
+        cache_key = await asyncio.to_thread(self._compilation_cache_key, filename)
+        cached = await asyncio.to_thread(compilation_cache.get, cache_key)
+        code_compilation_command, compiled_filename = self._build_code_compilation_command(filename)
+
+        if cached is not None:
+            # Injecting compiled binary instead of compiling the source once again
+            if cached.binary is not None:
+                archive = pack_file(compiled_filename, cached.binary, mode=0o755)
+                await self._sandbox.aput_archive(self._compiled_files_dir, archive)
+            return self.__compiled_file_data_from_cache(compiled_filename, cached)
+
+        # Compiling
+        logger.debug('Compiling %s', code_compilation_command)
+        compilation_result = await self._sandbox.aexec_run(code_compilation_command)
+
+        # Saving result of compilation to the cache
+        binary = None
+        if compilation_result.exit_code == 0:
+            compiled_file_path = posixpath.join(self._compiled_files_dir, compiled_filename)
+            binary = unpack_file([await self._sandbox.aget_archive(compiled_file_path)])
+        if self.__is_cacheable(compilation_result):
+            await asyncio.to_thread(self.__save_to_cache, cache_key, compilation_result, binary)
+
+        return CompiledFileData(filename=compiled_filename, compilation_result=compilation_result)
+
+    @staticmethod
+    def __compiled_file_data_from_cache(compiled_filename: Filename, cached: CachedCompilation) -> CompiledFileData:
+        compilation_result = ExecResult(exit_code=cached.exit_code, output=(cached.stdout, cached.stderr))
+        return CompiledFileData(filename=compiled_filename, compilation_result=compilation_result)
+
+    @staticmethod
+    def __is_cacheable(compilation_result: ExecResult) -> bool:
+        """
+        Only results that depend on the source alone are cached: successful compilations and errors reported by the
+        compiler. A compiler that has been killed (out of memory, by a signal or by timeout) may succeed next time
+        """
+        if compilation_result.exit_code == 0:
+            return True
+        stdout, stderr = compilation_result.output
+        return 0 < compilation_result.exit_code <= _MAX_COMPILER_EXIT_CODE and bool(stdout or stderr)
+
+    @staticmethod
+    def __save_to_cache(cache_key: str, compilation_result: ExecResult, binary: t.Optional[bytes]) -> None:
+        stdout, stderr = compilation_result.output
+        compilation_cache.put(cache_key, CachedCompilation(
+            exit_code=compilation_result.exit_code,
+            stdout=stdout or b'',
+            stderr=stderr or b'',
+            binary=binary,
+        ))
+
+    def __get_compiled_file_data(self, filename: Filename, source_code: t.Optional[bytes]) -> CompiledFileData:
+        # Checking if compilation is needed
+        with self.__compilation_lock:
+            if filename not in self.__compiled_files_data.keys():
+                self._upload_source(filename, source_code)
+                # Compiler doesn't run on dedicated cores of test cases (e.g. of the previous submission)
+                self._unpin_container()
+                # Saving data of compilation to `__compiled_files` hashmap
+                with measure_phase(Phase.COMPILATION):
+                    self.__compiled_files_data[filename] = self._compile(filename)
+        return self.__compiled_files_data[filename]
+
+    async def __aget_compiled_file_data(self, filename: Filename, source_code: t.Optional[bytes]) -> CompiledFileData:
         # Checking if compilation is needed
-        if options.filename not in self.__compiled_files_data.keys():
-            # Compiling
-            code_compilation_command, compiled_filename = self._build_code_compilation_command(options.filename)
-            print(code_compilation_command)
-            compilation_result = self._container.exec_run(cmd=code_compilation_command, demux=True)
+        async with self.__async_compilation_lock:
+            if filename not in self.__compiled_files_data.keys():
+                await self._aupload_source(filename, source_code)
+                await self._aunpin_container()
+                # Saving data of compilation to `__compiled_files` hashmap
+                with measure_phase(Phase.COMPILATION):
+                    self.__compiled_files_data[filename] = await self._acompile(filename)
+        return self.__compiled_files_data[filename]
 
-            # Saving data of compilation to `__compiled_files` hashmap
-            data = CompiledFileData(filename=compiled_filename, compilation_result=compilation_result)
-            self.__compiled_files_data[options.filename] = data
+    def execute(self, options: CodeExecutionCommandOptions) -> ProcessedContainerExecutionResult:
+        compiled_file_data = self.__get_compiled_file_data(options.filename, options.source_code)
 
         # Checking if compilation failed
-        compiled_file_data = self.__compiled_files_data[options.filename]
         if compiled_file_data.compilation_result.exit_code != 0:
             # Processing
             result_processor = ResultProcessor()
             return result_processor.handle_compilation(compiled_file_data.compilation_result)
 
         # Executing
-        execution_command_options = CodeExecutionCommandOptions(
-            filename=compiled_file_data.filename,
-            stdin=options.stdin
+        return self._run(compiled_file_data.filename, options.stdin, options.checker, options.cpu_core)
+
+    async def aexecute(self, options: CodeExecutionCommandOptions) -> ProcessedContainerExecutionResult:
+        compiled_file_data = await self.__aget_compiled_file_data(options.filename, options.source_code)
+
+        # Checking if compilation failed
+        if compiled_file_data.compilation_result.exit_code != 0:
+            # Processing
+            result_processor = ResultProcessor()
+            return result_processor.handle_compilation(compiled_file_data.compilation_result)
+
+        # Executing
+        return await self._arun(compiled_file_data.filename, options.stdin, options.checker, options.cpu_core)
+
+    def execute_batch(self, options: BatchCodeExecutionCommandOptions) -> t.List[ProcessedContainerExecutionResult]:
+        compiled_file_data = self.__get_compiled_file_data(options.filename, options.source_code)
+
+        # Each test case gets result of failed compilation
+        if compiled_file_data.compilation_result.exit_code != 0:
+            result_processor = ResultProcessor()
+            return [
+                result_processor.handle_compilation(compiled_file_data.compilation_result)
+                for _ in options.stdin_list
+            ]
+
+        return self._run_batch(
+            compiled_file_data.filename, options.stdin_list, self._batch_checkers(options), options.cpu_core
         )
-        code_execution_command = self._build_full_code_execution_command(execution_command_options)
-        execution_result = self._container.exec_run(cmd=code_execution_command, stdin=True, demux=True)
 
-        # Processing result
-        result_processor = ResultProcessor()
-        return result_processor.handle_execution(execution_result)
+    async def aiter_batch(
+            self,
+            options: BatchCodeExecutionCommandOptions
+    ) -> t.AsyncGenerator[ProcessedContainerExecutionResult, None]:
+        compiled_file_data = await self.__aget_compiled_file_data(options.filename, options.source_code)
+
+        # Each test case gets result of failed compilation
+        if compiled_file_data.compilation_result.exit_code != 0:
+            result_processor = ResultProcessor()
+            for _ in options.stdin_list:
+                yield result_processor.handle_compilation(compiled_file_data.compilation_result)
+            return
+
+        results = self._aiter_batch(
+            compiled_file_data.filename, options.stdin_list, self._batch_checkers(options), options.cpu_core
+        )
+        async with contextlib.aclosing(results):
+            async for result in results:
+                yield result
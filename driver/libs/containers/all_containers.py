@@ -1,46 +1,83 @@
 import typing as t
 
-from driver.config import DOCKER_COMPILED_FILES_DIR, DOCKER_USER_SCRIPTS_DIR
+from driver.config import (
+    CPP_PRECOMPILED_HEADERS,
+    DOCKER_COMPILED_FILES_DIR,
+    DOCKER_PCH_DIR,
+    DOCKER_USER_SCRIPTS_DIR,
+    OUTPUT_LIMIT,
+    ZYGOTE_MODE,
+)
 from driver.libs.containers._base_containers import CompiledContainer, InterpretedContainer
 from driver.libs.files.utils import get_compiled_filename
-from driver.libs.types import CodeExecutionCommandOptions, ExecutableCommand, Filename
+from driver.libs.types import CodeExecutionCommandOptions, DerivedImage, ExecutableCommand, Filename
 
 
 class PythonContainer(InterpretedContainer):
-    def __init__(self, time_limit: int, memory_limit: str):
-        super().__init__(time_limit, memory_limit)
+    def __init__(self, time_limit: int, memory_limit: str, output_limit: int = OUTPUT_LIMIT, zygote: bool = ZYGOTE_MODE):
+        super().__init__(time_limit, memory_limit, output_limit, zygote)
 
     @property
     def _docker_image(self) -> str:
         return 'python:3.8-alpine'
 
+    @property
+    def _zygote_interpreter(self) -> ExecutableCommand:
+        return 'python'
+
     def _build_code_execution_command(self, filename: Filename) -> ExecutableCommand:
         return f'python {DOCKER_USER_SCRIPTS_DIR}/{filename}'
 
 
 class PyPyContainer(InterpretedContainer):
-    def __init__(self, time_limit: int, memory_limit: str):
-        super().__init__(time_limit, memory_limit)
+    def __init__(self, time_limit: int, memory_limit: str, output_limit: int = OUTPUT_LIMIT, zygote: bool = ZYGOTE_MODE):
+        super().__init__(time_limit, memory_limit, output_limit, zygote)
 
     @property
     def _docker_image(self) -> str:
         return 'frolvlad/alpine-pypy'
 
+    @property
+    def _zygote_interpreter(self) -> ExecutableCommand:
+        return 'pypy3'
+
     def _build_code_execution_command(self, filename: Filename) -> ExecutableCommand:
         return f'pypy3 {DOCKER_USER_SCRIPTS_DIR}/{filename}'
 
 
 class CppContainer(CompiledContainer):
-    def __init__(self, time_limit: int, memory_limit: str):
-        super().__init__(time_limit, memory_limit)
+    def __init__(self, time_limit: int, memory_limit: str, output_limit: int = OUTPUT_LIMIT):
+        super().__init__(time_limit, memory_limit, output_limit)
 
     @property
     def _docker_image(self) -> str:
         return 'frolvlad/alpine-gxx'
 
+    @property
+    def _compiler_flags(self) -> str:
+        return '-O2 -std=c++17'
+
+    @property
+    def _derived_image(self) -> t.Optional[DerivedImage]:
+        if not CPP_PRECOMPILED_HEADERS:
+            return None
+        # Copy of `bits/stdc++.h` is precompiled with the same flags as programs, otherwise GCC would ignore it.
+        # Directory with it precedes system headers, so `#include <bits/stdc++.h>` picks up `stdc++.h.gch`
+        header = f'{DOCKER_PCH_DIR}/bits/stdc++.h'
+        return DerivedImage(base=self._docker_image, commands=(
+            f'mkdir -p {DOCKER_PCH_DIR}/bits',
+            # Location of the header depends on the distribution, so it is taken from the output of the preprocessor
+            f'cp "$(echo \'#include <bits/stdc++.h>\' | g++ -x c++ -H -E -o /dev/null - 2>&1 | head -n 1 | cut -d \' \' -f 2)" '
+            f'{header}',
+            f'g++ {self._compiler_flags} -x c++-header {header} -o {header}.gch',
+        ))
+
     def _build_code_compilation_command(self, filename: Filename) -> t.Tuple[ExecutableCommand, Filename]:
         compiled_filename = get_compiled_filename(filename)
-        command = f'g++ {DOCKER_USER_SCRIPTS_DIR}/{filename} -o {DOCKER_COMPILED_FILES_DIR}/{compiled_filename}'
+        command = (
+            f'g++ {self._compiler_flags} -I{DOCKER_PCH_DIR} {DOCKER_USER_SCRIPTS_DIR}/{filename} '
+            f'-o {DOCKER_COMPILED_FILES_DIR}/{compiled_filename}'
+        )
         return command, compiled_filename
 
     def _build_code_execution_command(self, filename: Filename) -> ExecutableCommand:
@@ -48,16 +85,23 @@ class CppContainer(CompiledContainer):
 
 
 class PascalABCContainer(CompiledContainer):
-    def __init__(self, time_limit: int, memory_limit: str):
-        super().__init__(time_limit, memory_limit)
+    def __init__(self, time_limit: int, memory_limit: str, output_limit: int = OUTPUT_LIMIT):
+        super().__init__(time_limit, memory_limit, output_limit)
 
     @property
     def _docker_image(self) -> str:
         return 'frolvlad/alpine-fpc:latest'
 
+    @property
+    def _compiler_flags(self) -> str:
+        return '-O2'
+
     def _build_code_compilation_command(self, filename: Filename) -> t.Tuple[ExecutableCommand, Filename]:
         compiled_filename = get_compiled_filename(filename)
-        command = f'fpc -o./{DOCKER_COMPILED_FILES_DIR}/{compiled_filename} {DOCKER_USER_SCRIPTS_DIR}/{filename}'
+        command = (
+            f'fpc {self._compiler_flags} -o./{DOCKER_COMPILED_FILES_DIR}/{compiled_filename} '
+            f'{DOCKER_USER_SCRIPTS_DIR}/{filename}'
+        )
         return command, compiled_filename
 
     def _build_code_execution_command(self, filename: Filename) -> ExecutableCommand:
@@ -66,11 +110,11 @@ class PascalABCContainer(CompiledContainer):
 
 if __name__ == '__main__':
     with PythonContainer(time_limit=2, memory_limit='128m') as container:
-        execution_options = CodeExecutionCommandOptions(filename='python_script.py', stdin=r'3\n4\n5')
+        execution_options = CodeExecutionCommandOptions(filename='python_script.py', stdin='3\n4\n5')
         result = container.execute(options=execution_options)
         print(result)
 
     with PascalABCContainer(time_limit=2, memory_limit='256m') as container:
-        execution_options = CodeExecutionCommandOptions(filename='pascal_script.pas', stdin=r'2 3')
+        execution_options = CodeExecutionCommandOptions(filename='pascal_script.pas', stdin='2 3')
         result = container.execute(options=execution_options)
         print(result)
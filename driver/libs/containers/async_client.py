@@ -0,0 +1,228 @@
+import asyncio
+import json
+import os
+import shlex
+import struct
+import typing as t
+from urllib.parse import quote, urlsplit
+
+from docker.errors import DockerException
+from docker.models.containers import ExecResult
+
+DEFAULT_DOCKER_SOCKET = '/var/run/docker.sock'
+
+# Identifiers of streams in multiplexed output of exec
+STDOUT = 1
+STDERR = 2
+
+
+class _Response:
+    """Response of Docker Engine API. Body is read from the socket lazily"""
+
+    def __init__(self, status: int, headers: t.Mapping[str, str], reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter):
+        self.status = status
+        self.headers = headers
+        self.__reader = reader
+        self.__writer = writer
+
+    async def iter_body(self, chunk_size: int = 64 * 1024) -> t.AsyncIterator[bytes]:
+        """Yields body of the response chunk by chunk"""
+        if self.headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await self.__reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    return
+                yield await self.__reader.readexactly(size)
+                # Line break after each chunk
+                await self.__reader.readline()
+
+        remaining = int(self.headers['content-length']) if 'content-length' in self.headers else None
+        while remaining is None or remaining > 0:
+            chunk = await self.__reader.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+    async def read(self) -> bytes:
+        return b''.join([chunk async for chunk in self.iter_body()])
+
+    async def close(self) -> None:
+        self.__writer.close()
+        try:
+            await self.__writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class _StreamDemultiplexer:
+    """
+    Splits multiplexed stream of exec into stdout and stderr
+
+    Each frame of the stream starts with 8 bytes header: stream identifier, 3 zero bytes and size of the frame
+    """
+
+    def __init__(self) -> None:
+        self.__buffer = bytearray()
+
+    def feed(self, data: bytes) -> t.Iterator[t.Tuple[int, bytes]]:
+        self.__buffer += data
+        while len(self.__buffer) >= 8:
+            stream, size = struct.unpack('>BxxxL', self.__buffer[:8])
+            if len(self.__buffer) < 8 + size:
+                return
+            frame = bytes(self.__buffer[8:8 + size])
+            del self.__buffer[:8 + size]
+            yield stream, frame
+
+
+class AsyncDockerClient:
+    """
+    Minimal asyncio client of Docker Engine API that works over unix socket or plain TCP (without TLS)
+
+    It implements only operations that are performed on every request (exec and archives),
+    all other operations (creation of containers, images, etc.) are done via `docker` package
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_DOCKER_SOCKET, address: t.Optional[t.Tuple[str, int]] = None):
+        """
+        :param socket_path: Path to unix socket of the daemon
+        :param address: Host and port of the daemon, if it is passed, the socket is not used
+        """
+        self.__socket_path = socket_path
+        self.__address = address
+
+    @classmethod
+    def from_url(cls, url: str) -> 'AsyncDockerClient':
+        """Creates client for `unix://<path>` or `tcp://<host>:<port>` URL, the default socket is used for others"""
+        if url.startswith('unix://'):
+            return cls(url[len('unix://'):])
+        if url.startswith('tcp://'):
+            parts = urlsplit(url)
+            return cls(address=(parts.hostname or 'localhost', parts.port or 2375))
+        return cls()
+
+    @classmethod
+    def from_env(cls) -> 'AsyncDockerClient':
+        """Takes address of the daemon from `DOCKER_HOST` environment variable, the same way `docker.from_env` does"""
+        return cls.from_url(os.environ.get('DOCKER_HOST', ''))
+
+    async def exec_run(self, container_id: str, cmd: str) -> ExecResult:
+        """Async analogue of `Container.exec_run(cmd, demux=True)`"""
+        exec_id = await self.exec_create(container_id, cmd)
+
+        stdout, stderr = bytearray(), bytearray()
+        async for stream, frame in self.exec_start(exec_id):
+            (stdout if stream == STDOUT else stderr).extend(frame)
+
+        exit_code = await self.exec_inspect(exec_id)
+        return ExecResult(exit_code=exit_code, output=(bytes(stdout) or None, bytes(stderr) or None))
+
+    async def exec_create(self, container_id: str, cmd: str) -> str:
+        body = {'AttachStdout': True, 'AttachStderr': True, 'Tty': False, 'Cmd': shlex.split(cmd)}
+        response = await self.__request('POST', f'/containers/{container_id}/exec', json_body=body)
+        return (await self.__json(response))['Id']
+
+    async def exec_start(self, exec_id: str) -> t.AsyncIterator[t.Tuple[int, bytes]]:
+        """Yields `(stream identifier, frame)` pairs as soon as they arrive"""
+        response = await self.__request('POST', f'/exec/{exec_id}/start', json_body={'Detach': False, 'Tty': False})
+        await self.__check(response)
+
+        demultiplexer = _StreamDemultiplexer()
+        try:
+            async for chunk in response.iter_body():
+                for frame in demultiplexer.feed(chunk):
+                    yield frame
+        finally:
+            await response.close()
+
+    async def exec_inspect(self, exec_id: str) -> int:
+        response = await self.__request('GET', f'/exec/{exec_id}/json')
+        return (await self.__json(response))['ExitCode']
+
+    async def get_archive(self, container_id: str, path: str) -> bytes:
+        response = await self.__request('GET', f'/containers/{container_id}/archive?path={quote(path)}')
+        await self.__check(response)
+        try:
+            return await response.read()
+        finally:
+            await response.close()
+
+    async def put_archive(self, container_id: str, path: str, data: t.Union[bytes, t.Iterable[bytes]]) -> None:
+        """
+        :param data: Tar archive. If it is passed as iterable of chunks, it is sent with chunked transfer encoding
+        """
+        response = await self.__request(
+            'PUT', f'/containers/{container_id}/archive?path={quote(path)}', data=data, content_type='application/x-tar'
+        )
+        await self.__check(response)
+        await response.close()
+
+    async def update_container(self, container_id: str, cpuset_cpus: str, cpu_period: int, cpu_quota: int) -> None:
+        """Async analogue of `Container.update`, only CPU limits are supported"""
+        body = {'CpusetCpus': cpuset_cpus, 'CpuPeriod': cpu_period, 'CpuQuota': cpu_quota}
+        response = await self.__request('POST', f'/containers/{container_id}/update', json_body=body)
+        await self.__json(response)
+
+    async def __request(
+            self,
+            method: str,
+            path: str,
+            json_body: t.Optional[t.Mapping[str, t.Any]] = None,
+            data: t.Union[bytes, t.Iterable[bytes]] = b'',
+            content_type: t.Optional[str] = None
+    ) -> _Response:
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            content_type = 'application/json'
+
+        if self.__address is not None:
+            reader, writer = await asyncio.open_connection(*self.__address)
+        else:
+            reader, writer = await asyncio.open_unix_connection(self.__socket_path)
+        head = f'{method} {path} HTTP/1.1\r\nHost: docker\r\nConnection: close\r\n'
+        if content_type is not None:
+            head += f'Content-Type: {content_type}\r\n'
+
+        if isinstance(data, bytes):
+            writer.write(f'{head}Content-Length: {len(data)}\r\n\r\n'.encode() + data)
+        else:
+            writer.write(f'{head}Transfer-Encoding: chunked\r\n\r\n'.encode())
+            # Chunks are usually read from files, so they are read in a separate thread not to block the event loop
+            chunks = iter(data)
+            while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                if chunk:
+                    writer.write(f'{len(chunk):x}\r\n'.encode() + chunk + b'\r\n')
+                    await writer.drain()
+            writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+        # Status line looks like `HTTP/1.1 200 OK`
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        return _Response(status, headers, reader, writer)
+
+    @staticmethod
+    async def __check(response: _Response) -> None:
+        if response.status >= 400:
+            try:
+                message = (await response.read()).decode(errors='replace')
+            finally:
+                await response.close()
+            raise DockerException(f'Docker API responded with {response.status}: {message}')
+
+    async def __json(self, response: _Response) -> t.Any:
+        await self.__check(response)
+        try:
+            return json.loads(await response.read())
+        finally:
+            await response.close()
+
+
+async_client = AsyncDockerClient.from_env()
@@ -0,0 +1,36 @@
+import typing as t
+
+from driver.config import DOCKER_HOSTS, EXECUTION_BACKEND, HOST_CPU_BUDGET
+from driver.libs.containers.backends.base import Archive, ExecutionBackend, Sandbox, SandboxUnavailable
+from driver.libs.containers.backends.docker_backend import DockerBackend, DockerSandbox
+from driver.libs.containers.backends.local_backend import LocalBackend, LocalSandbox
+from driver.libs.containers.backends.multi_host import (
+    MultiHostBackend,
+    ScheduledHost,
+    create_docker_host,
+    parse_docker_hosts,
+)
+from driver.libs.containers.images import image_builder
+from driver.libs.containers.pool import container_pool
+from driver.libs.enums import ExecutionBackendType
+from driver.libs.types import DockerHostConfig
+
+
+def create_execution_backend(
+        backend_type: ExecutionBackendType,
+        docker_hosts: t.Sequence[DockerHostConfig] = ()
+) -> ExecutionBackend:
+    """
+    :param docker_hosts: Docker daemons among which containers are scheduled.
+                         If it is empty, the daemon is taken from environment
+    """
+    if backend_type is ExecutionBackendType.LOCAL:
+        return LocalBackend()
+    if docker_hosts:
+        return MultiHostBackend([create_docker_host(config) for config in docker_hosts])
+    return DockerBackend(container_pool, image_builder)
+
+
+execution_backend = create_execution_backend(
+    ExecutionBackendType(EXECUTION_BACKEND), parse_docker_hosts(DOCKER_HOSTS, default_slots=HOST_CPU_BUDGET)
+)
@@ -0,0 +1,209 @@
+import asyncio
+import contextvars
+import functools
+import posixpath
+import typing as t
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+from docker.models.containers import ExecResult
+
+from driver.config import CONTAINERS_LEASE_THREADS
+from driver.libs.containers.async_client import STDOUT
+from driver.libs.containers.cores import CoreAllocator, core_allocator
+from driver.libs.enums import ReapReason
+from driver.libs.types import DerivedImage, PoolStats
+
+# Tar archive, either as a whole or as iterable of chunks
+Archive: t.TypeAlias = t.Union[bytes, t.Iterable[bytes]]
+
+# Threads of leases that may wait for capacity. If they shared the default executor with releases, leases waiting
+# for a container could take all of its threads, and the releases that would wake them up could never run
+_lease_executor = ThreadPoolExecutor(max_workers=CONTAINERS_LEASE_THREADS, thread_name_prefix='lease')
+
+
+class SandboxUnavailable(Exception):
+    """No sandbox can be leased right now (e.g. all hosts are unhealthy), the lease should be retried later"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Sandbox(ABC):
+    """
+    Isolated environment leased from an execution backend, in which programs are compiled and executed.
+    Its interface mirrors the part of Docker Engine API that containers use, every method has an async version
+    """
+
+    @property
+    @abstractmethod
+    def id(self) -> str:
+        pass
+
+    @property
+    @abstractmethod
+    def working_dir(self) -> str:
+        """Directory against which relative paths of all commands are resolved"""
+        pass
+
+    @property
+    @abstractmethod
+    def scripts_dir(self) -> str:
+        """Directory with scripts that run programs (see `scripts`)"""
+        pass
+
+    @property
+    @abstractmethod
+    def image_id(self) -> str:
+        """Identifier of the environment that compiles programs, it is a part of keys of the compilation cache"""
+        pass
+
+    @property
+    def core_allocator(self) -> CoreAllocator:
+        """Dedicated cores of the host of the sandbox, which test cases executed in it take"""
+        return core_allocator
+
+    def script_path(self, script: str) -> str:
+        return posixpath.join(self.scripts_dir, script)
+
+    @abstractmethod
+    def put_archive(self, path: str, archive: Archive) -> None:
+        """Extracts tar archive to the directory"""
+        pass
+
+    @abstractmethod
+    def get_archive(self, path: str) -> bytes:
+        """Returns tar archive with the file"""
+        pass
+
+    @abstractmethod
+    def exec_create(self, cmd: str) -> str:
+        """Prepares the command to be executed, returns id of the exec"""
+        pass
+
+    @abstractmethod
+    def exec_start(self, exec_id: str) -> t.Iterator[t.Tuple[int, bytes]]:
+        """Executes the command, yields `(stream identifier, chunk)` pairs as soon as they arrive"""
+        pass
+
+    @abstractmethod
+    def exec_inspect(self, exec_id: str) -> int:
+        """Returns exit code of the executed command"""
+        pass
+
+    def exec_run(self, cmd: str) -> ExecResult:
+        """Executes the command and returns its exit code and output, the same as `Container.exec_run(demux=True)`"""
+        exec_id = self.exec_create(cmd)
+        stdout, stderr = bytearray(), bytearray()
+        for stream, chunk in self.exec_start(exec_id):
+            (stdout if stream == STDOUT else stderr).extend(chunk)
+        return ExecResult(exit_code=self.exec_inspect(exec_id), output=(bytes(stdout) or None, bytes(stderr) or None))
+
+    def set_cpus(self, cores: t.Sequence[int], quota: t.Optional[float]) -> None:
+        """
+        Restricts all processes of the sandbox to the cores (see `cores.CoreAllocator`), it is ignored by default
+
+        :param quota: Share of each core the programs may use (e.g. 0.5 is half of each core), `None` means no limit
+        """
+        pass
+
+    async def aput_archive(self, path: str, archive: Archive) -> None:
+        await asyncio.to_thread(self.put_archive, path, archive)
+
+    async def aget_archive(self, path: str) -> bytes:
+        return await asyncio.to_thread(self.get_archive, path)
+
+    async def aset_cpus(self, cores: t.Sequence[int], quota: t.Optional[float]) -> None:
+        await asyncio.to_thread(self.set_cpus, cores, quota)
+
+    async def aexec_create(self, cmd: str) -> str:
+        return self.exec_create(cmd)
+
+    @abstractmethod
+    def aexec_start(self, exec_id: str) -> t.AsyncIterator[t.Tuple[int, bytes]]:
+        pass
+
+    async def aexec_inspect(self, exec_id: str) -> int:
+        return self.exec_inspect(exec_id)
+
+    async def aexec_run(self, cmd: str) -> ExecResult:
+        exec_id = await self.aexec_create(cmd)
+        stdout, stderr = bytearray(), bytearray()
+        async for stream, chunk in self.aexec_start(exec_id):
+            (stdout if stream == STDOUT else stderr).extend(chunk)
+        exit_code = await self.aexec_inspect(exec_id)
+        return ExecResult(exit_code=exit_code, output=(bytes(stdout) or None, bytes(stderr) or None))
+
+
+class ExecutionBackend(ABC):
+    """Leases sandboxes in which programs are executed"""
+
+    @abstractmethod
+    def lease(
+            self,
+            image: str,
+            derived_image: t.Optional[DerivedImage],
+            memory_limit: str,
+            affinity_key: t.Optional[str] = None
+    ) -> Sandbox:
+        """
+        Returns sandbox that is ready to execute programs
+
+        :param image: Docker image of the language
+        :param derived_image: Image built on top of `image`, which is used instead of it if the backend supports it
+        :param memory_limit: Memory limit of programs, the same as `memory_limit` of containers
+        :param affinity_key: Key of the source that will be compiled in the sandbox (its language and hash), backends
+                             with several hosts lease it where the same key has been leased, since the compilation
+                             cache is warm there
+        :raises SandboxUnavailable: If the backend can't lease sandboxes right now
+        """
+        pass
+
+    @abstractmethod
+    def release(self, sandbox: Sandbox) -> None:
+        """Returns sandbox which is no more needed, programs started in it are killed"""
+        pass
+
+    async def alease(
+            self,
+            image: str,
+            derived_image: t.Optional[DerivedImage],
+            memory_limit: str,
+            affinity_key: t.Optional[str] = None
+    ) -> Sandbox:
+        # Backends are synchronous, so they are used from a separate thread (with the context, as `asyncio.to_thread`)
+        lease = functools.partial(
+            contextvars.copy_context().run, self.lease, image, derived_image, memory_limit, affinity_key
+        )
+        return await asyncio.get_running_loop().run_in_executor(_lease_executor, lease)
+
+    async def arelease(self, sandbox: Sandbox) -> None:
+        await asyncio.to_thread(self.release, sandbox)
+
+    def check_available(self, memory_limit: str) -> None:
+        """
+        Raises `SandboxUnavailable` if sandboxes with the memory limit can't be leased right now, so submissions
+        are rejected before they are admitted
+        """
+        pass
+
+    def warm_up(self, image: str, derived_image: t.Optional[DerivedImage], memory_limit: str) -> None:
+        """Pre-starts sandboxes of the image and memory limit, if the backend keeps them (arguments are as of `lease`)"""
+        pass
+
+    def pool_stats(self) -> t.List[PoolStats]:
+        """Statistics of pre-started containers, if the backend keeps them"""
+        return []
+
+    def reap(self) -> None:
+        """Removes containers that have leaked (e.g. left by a crashed driver), if the backend creates containers"""
+        pass
+
+    def reaped(self) -> t.Dict[ReapReason, int]:
+        """Number of containers removed by `reap` for each reason"""
+        return {}
+
+    def close(self) -> None:
+        """Frees resources of the backend, e.g. removes idle containers"""
+        pass
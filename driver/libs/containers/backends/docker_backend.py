@@ -0,0 +1,160 @@
+import typing as t
+
+from docker.models.containers import Container, ExecResult
+
+from driver.config import DOCKER_SCRIPTS_DIR
+from driver.libs.containers.async_client import STDERR, STDOUT, AsyncDockerClient, async_client
+from driver.libs.containers.backends.base import Archive, ExecutionBackend, Sandbox
+from driver.libs.containers.cores import CoreAllocator, core_allocator, format_cpu_list
+from driver.libs.containers.images import ImageBuilder
+from driver.libs.containers.pool import ContainerPool
+from driver.libs.enums import ReapReason
+from driver.libs.types import DerivedImage, PoolStats
+
+# Period of CFS quota in microseconds (the default one of Docker) and the minimum quota accepted by Docker
+_CPU_PERIOD = 100000
+_MIN_CPU_QUOTA = 1000
+
+
+def _cpu_quota(cores: t.Sequence[int], quota: t.Optional[float]) -> int:
+    """Returns CFS quota of all the cores per `_CPU_PERIOD`, -1 means no limit"""
+    if quota is None:
+        return -1
+    return max(_MIN_CPU_QUOTA, int(quota * _CPU_PERIOD * len(cores)))
+
+
+class DockerSandbox(Sandbox):
+    """Container leased from the pool. Blocking calls go through `docker` package, async ones through `async_client`"""
+
+    def __init__(
+            self,
+            container: Container,
+            client: AsyncDockerClient = async_client,
+            allocator: CoreAllocator = core_allocator
+    ):
+        self.container = container
+        self.__client = client
+        self.__core_allocator = allocator
+
+    @property
+    def id(self) -> str:
+        return self.container.id
+
+    @property
+    def core_allocator(self) -> CoreAllocator:
+        return self.__core_allocator
+
+    @property
+    def working_dir(self) -> str:
+        return self.container.attrs['Config'].get('WorkingDir') or '/'
+
+    @property
+    def scripts_dir(self) -> str:
+        return DOCKER_SCRIPTS_DIR
+
+    @property
+    def image_id(self) -> str:
+        return self.container.attrs['Image']
+
+    def put_archive(self, path: str, archive: Archive) -> None:
+        self.container.put_archive(path, archive)
+
+    def get_archive(self, path: str) -> bytes:
+        chunks, _ = self.container.get_archive(path)
+        return b''.join(chunks)
+
+    def exec_create(self, cmd: str) -> str:
+        return self.container.client.api.exec_create(self.container.id, cmd)['Id']
+
+    def exec_start(self, exec_id: str) -> t.Iterator[t.Tuple[int, bytes]]:
+        for stdout_chunk, stderr_chunk in self.container.client.api.exec_start(exec_id, stream=True, demux=True):
+            if stdout_chunk:
+                yield STDOUT, stdout_chunk
+            if stderr_chunk:
+                yield STDERR, stderr_chunk
+
+    def exec_inspect(self, exec_id: str) -> int:
+        return self.container.client.api.exec_inspect(exec_id)['ExitCode']
+
+    def exec_run(self, cmd: str) -> ExecResult:
+        return self.container.exec_run(cmd, demux=True)
+
+    def set_cpus(self, cores: t.Sequence[int], quota: t.Optional[float]) -> None:
+        self.container.update(
+            cpuset_cpus=format_cpu_list(cores), cpu_period=_CPU_PERIOD, cpu_quota=_cpu_quota(cores, quota)
+        )
+
+    async def aput_archive(self, path: str, archive: Archive) -> None:
+        await self.__client.put_archive(self.container.id, path, archive)
+
+    async def aget_archive(self, path: str) -> bytes:
+        return await self.__client.get_archive(self.container.id, path)
+
+    async def aexec_create(self, cmd: str) -> str:
+        return await self.__client.exec_create(self.container.id, cmd)
+
+    async def aexec_start(self, exec_id: str) -> t.AsyncIterator[t.Tuple[int, bytes]]:
+        async for stream, frame in self.__client.exec_start(exec_id):
+            yield stream, frame
+
+    async def aexec_inspect(self, exec_id: str) -> int:
+        return await self.__client.exec_inspect(exec_id)
+
+    async def aexec_run(self, cmd: str) -> ExecResult:
+        return await self.__client.exec_run(self.container.id, cmd)
+
+    async def aset_cpus(self, cores: t.Sequence[int], quota: t.Optional[float]) -> None:
+        await self.__client.update_container(
+            self.container.id, format_cpu_list(cores), cpu_period=_CPU_PERIOD, cpu_quota=_cpu_quota(cores, quota)
+        )
+
+
+class DockerBackend(ExecutionBackend):
+    """Executes programs in containers leased from the pool. Derived images are built on first use"""
+
+    def __init__(
+            self,
+            pool: ContainerPool,
+            image_builder: ImageBuilder,
+            client: AsyncDockerClient = async_client,
+            allocator: CoreAllocator = core_allocator
+    ):
+        """:param allocator: Dedicated cores of the Docker host, each host must have its own allocator"""
+        self.pool = pool
+        self.image_builder = image_builder
+        self.__client = client
+        self.__core_allocator = allocator
+
+    def lease(
+            self,
+            image: str,
+            derived_image: t.Optional[DerivedImage],
+            memory_limit: str,
+            affinity_key: t.Optional[str] = None
+    ) -> DockerSandbox:
+        if derived_image is not None:
+            image = self.image_builder.resolve(derived_image)
+        return DockerSandbox(self.pool.lease(image, memory_limit), self.__client, self.__core_allocator)
+
+    def release(self, sandbox: Sandbox) -> None:
+        # Container will be reset before the next lease
+        assert isinstance(sandbox, DockerSandbox)
+        self.pool.release(sandbox.container)
+
+    def warm_up(self, image: str, derived_image: t.Optional[DerivedImage], memory_limit: str) -> None:
+        if derived_image is not None:
+            image = self.image_builder.resolve(derived_image)
+        self.pool.warm_up(image, memory_limit)
+
+    def pool_stats(self) -> t.List[PoolStats]:
+        return self.pool.stats()
+
+    def reap(self) -> None:
+        self.pool.reap()
+
+    def reaped(self) -> t.Dict[ReapReason, int]:
+        return self.pool.reaped()
+
+    def close(self) -> None:
+        # Removing all pre-started containers
+        self.pool.close()
@@ -0,0 +1,434 @@
+import asyncio
+import io
+import math
+import os
+import posixpath
+import resource
+import selectors
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import typing as t
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+from docker.utils import parse_bytes
+
+from driver.config import (
+    DOCKER_COMPILED_FILES_DIR,
+    DOCKER_STDIN_DIR,
+    DOCKER_USER_SCRIPTS_DIR,
+    DOCKER_ZYGOTE_DIR,
+    LOCAL_SANDBOX_DIR,
+    LOCAL_SANDBOX_FILE_SIZE,
+    LOCAL_SANDBOX_MAX_PROCESSES,
+    LOCAL_SANDBOX_WALL_LIMIT,
+    LOCAL_USER_SCRIPTS_DIR,
+    SOURCE_UPLOAD_MODE,
+)
+from driver.libs.containers.async_client import STDERR, STDOUT
+from driver.libs.containers.backends.base import Archive, ExecutionBackend, Sandbox
+from driver.libs.containers.cores import CoreAllocator, core_allocator, format_cpu_list
+from driver.libs.containers.pool import SCRIPTS
+from driver.libs.enums import SourceUploadMode
+from driver.libs.types import DerivedImage
+
+# Scripts that replace the ones from `SCRIPTS` in the local sandbox (name -> content)
+LOCAL_SCRIPTS: t.Mapping[str, bytes] = {
+    path.name: path.read_bytes()
+    for path in sorted((Path(__file__).parent.parent / 'scripts' / 'local').iterdir())
+    if path.is_file()
+}
+
+# Directory for temporary files of commands (e.g. of the run script), it is removed together with the sandbox
+_TMP_DIR = 'tmp'
+_CHUNK_SIZE = 64 * 1024
+# Exit code of the command that can't be started, the same as the one of shells
+_COMMAND_NOT_FOUND_EXIT_CODE = 127
+
+
+@dataclass
+class _Exec:
+    args: t.List[str]
+    # `None` until the command has exited
+    exit_code: t.Optional[int] = None
+
+
+def _exit_code(returncode: int) -> int:
+    """Exit code of the process killed by a signal is reported as `128 + signal`, the same as Docker does"""
+    return 128 - returncode if returncode < 0 else returncode
+
+
+def _limit(kind: int, value: int) -> int:
+    """Value of both soft and hard limits, which never raises the hard one of the driver (only root can do it)"""
+    _, hard = resource.getrlimit(kind)
+    return value if hard == resource.RLIM_INFINITY else min(value, hard)
+
+
+class _ChunksReader(io.RawIOBase):
+    """File-like object over chunks of a streamed archive, so the archive is read without joining it"""
+
+    def __init__(self, chunks: t.Iterable[bytes]):
+        self.__chunks = iter(chunks)
+        self.__chunk = memoryview(b'')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: t.Any) -> int:
+        while not self.__chunk:
+            chunk = next(self.__chunks, None)
+            if chunk is None:
+                return 0
+            self.__chunk = memoryview(chunk)
+        size = min(len(buffer), len(self.__chunk))
+        buffer[:size] = self.__chunk[:size]
+        self.__chunk = self.__chunk[size:]
+        return size
+
+
+async def _pump(stream: int, reader: asyncio.StreamReader, queue: 'asyncio.Queue[t.Tuple[int, bytes]]') -> None:
+    """Passes output of the stream to the queue chunk by chunk, the empty chunk means EOF"""
+    while chunk := await reader.read(_CHUNK_SIZE):
+        await queue.put((stream, chunk))
+    await queue.put((stream, b''))
+
+
+class LocalSandbox(Sandbox):
+    """
+    Temporary directory on the host, in which commands are executed as subprocesses of the driver
+
+    Each command is started in its own process group with rlimits on CPU time, size of written files and number
+    of processes, and the whole group is killed once the command runs longer than the wall limit. Limits and
+    affinity are set by `prlimit` and `taskset` that exec the command, since the driver is multithreaded and
+    nothing may run in the child between fork and exec. Programs started
+    by the run scripts are also limited in address space (see `scripts/local/launch.py`). Process groups that
+    are still alive (e.g. of the zygote) are killed when the sandbox is released.
+    It doesn't isolate programs from the host and from each other, so it must be used only for trusted code
+    """
+
+    def __init__(
+            self,
+            directory: Path,
+            scripts_dir: Path,
+            image: str,
+            memory_limit: int,
+            wall_limit: float,
+            file_size: int,
+            max_processes: int,
+            allocator: CoreAllocator = core_allocator
+    ):
+        self.directory = directory
+        self.__core_allocator = allocator
+        self.__scripts_dir = scripts_dir
+        self.__image = image
+        self.__wall_limit = wall_limit
+        self.__file_size = file_size
+        self.__max_processes = max_processes
+        self.__environment = {
+            'PATH': os.environ.get('PATH', os.defpath),
+            'HOME': str(directory),
+            'TMPDIR': str(directory / _TMP_DIR),
+            'LANG': 'C.UTF-8',
+            # Interpreter that runs scripts of the sandbox (`launch.py`)
+            'DRIVER_PYTHON': sys.executable,
+            # Programs share cgroup of the driver, so its statistics don't belong to them
+            'DRIVER_CGROUP': '',
+            'DRIVER_MEMORY_LIMIT': str(memory_limit),
+        }
+
+        self.__lock = threading.Lock()
+        self.__execs: t.Dict[str, _Exec] = {}
+        # Ids of process groups that may still be alive (process group id is equal to pid of the command)
+        self.__process_groups: t.Set[int] = set()
+        # Cores of new commands (see `set_cpus`), commands inherit affinity of the driver if it is empty
+        self.__cores: t.Tuple[int, ...] = ()
+
+    @property
+    def id(self) -> str:
+        return self.directory.name
+
+    @property
+    def core_allocator(self) -> CoreAllocator:
+        return self.__core_allocator
+
+    @property
+    def working_dir(self) -> str:
+        return str(self.directory)
+
+    @property
+    def scripts_dir(self) -> str:
+        return str(self.__scripts_dir)
+
+    @property
+    def image_id(self) -> str:
+        # Programs are compiled by compilers of the host, and the compilation cache is stored on the same host
+        return f'local:{self.__image}'
+
+    def put_archive(self, path: str, archive: Archive) -> None:
+        # Archive is read as a stream, so files are extracted as soon as their chunks arrive
+        fileobj = io.BytesIO(archive) if isinstance(archive, bytes) else _ChunksReader(archive)
+        with tarfile.open(fileobj=fileobj, mode='r|') as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                source = tar.extractfile(member)
+                assert source is not None
+                target = self.__resolve(posixpath.join(path, member.name))
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with target.open('wb') as file:
+                    shutil.copyfileobj(source, file, _CHUNK_SIZE)
+                target.chmod(member.mode & 0o777)
+
+    def get_archive(self, path: str) -> bytes:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w') as tar:
+            tar.add(self.__resolve(path), arcname=posixpath.basename(path))
+        return buffer.getvalue()
+
+    def exec_create(self, cmd: str) -> str:
+        exec_id = uuid.uuid4().hex
+        with self.__lock:
+            self.__execs[exec_id] = _Exec(args=shlex.split(cmd))
+        return exec_id
+
+    def exec_start(self, exec_id: str) -> t.Iterator[t.Tuple[int, bytes]]:
+        execution = self.__execs[exec_id]
+        try:
+            process = subprocess.Popen(self.__command(execution.args), **self.__process_options())
+        except OSError as error:
+            execution.exit_code = _COMMAND_NOT_FOUND_EXIT_CODE
+            yield STDERR, f'{execution.args[0]}: {error.strerror}\n'.encode()
+            return
+
+        self.__started(process.pid)
+        assert process.stdout is not None and process.stderr is not None
+        deadline: t.Optional[float] = time.monotonic() + self.__wall_limit
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(process.stdout, selectors.EVENT_READ, STDOUT)
+                selector.register(process.stderr, selectors.EVENT_READ, STDERR)
+                while selector.get_map():
+                    timeout = None if deadline is None else deadline - time.monotonic()
+                    if timeout is not None and timeout <= 0:
+                        # Output is read until EOF, which comes as soon as the killed processes have closed it
+                        self.__kill(process.pid)
+                        deadline = timeout = None
+                    for key, _ in selector.select(timeout):
+                        chunk = os.read(key.fd, _CHUNK_SIZE)
+                        if chunk:
+                            yield key.data, chunk
+                        else:
+                            selector.unregister(key.fileobj)
+            execution.exit_code = _exit_code(process.wait())
+        finally:
+            # The command is killed if output is no more read, background processes started by it are kept
+            if process.poll() is None:
+                self.__kill(process.pid)
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+            self.__finished(process.pid)
+
+    async def aexec_start(self, exec_id: str) -> t.AsyncIterator[t.Tuple[int, bytes]]:
+        execution = self.__execs[exec_id]
+        try:
+            process = await asyncio.create_subprocess_exec(*self.__command(execution.args), **self.__process_options())
+        except OSError as error:
+            execution.exit_code = _COMMAND_NOT_FOUND_EXIT_CODE
+            yield STDERR, f'{execution.args[0]}: {error.strerror}\n'.encode()
+            return
+
+        self.__started(process.pid)
+        assert process.stdout is not None and process.stderr is not None
+        queue: asyncio.Queue[t.Tuple[int, bytes]] = asyncio.Queue()
+        pumps = [
+            asyncio.create_task(_pump(STDOUT, process.stdout, queue)),
+            asyncio.create_task(_pump(STDERR, process.stderr, queue)),
+        ]
+        loop = asyncio.get_running_loop()
+        deadline: t.Optional[float] = loop.time() + self.__wall_limit
+        try:
+            open_streams = len(pumps)
+            while open_streams:
+                try:
+                    timeout = None if deadline is None else max(deadline - loop.time(), 0)
+                    stream, chunk = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    self.__kill(process.pid)
+                    deadline = None
+                    continue
+
+                if chunk:
+                    yield stream, chunk
+                else:
+                    open_streams -= 1
+            execution.exit_code = _exit_code(await process.wait())
+        finally:
+            for pump in pumps:
+                pump.cancel()
+            if process.returncode is None:
+                self.__kill(process.pid)
+            self.__finished(process.pid)
+
+    def exec_inspect(self, exec_id: str) -> int:
+        with self.__lock:
+            execution = self.__execs.pop(exec_id)
+        if execution.exit_code is None:
+            raise RuntimeError(f'Exec {exec_id} has not finished!')
+        return execution.exit_code
+
+    def set_cpus(self, cores: t.Sequence[int], quota: t.Optional[float]) -> None:
+        # CPU quota needs a cgroup, so only affinity of commands that are started afterwards is changed
+        self.__cores = tuple(cores)
+
+    async def aset_cpus(self, cores: t.Sequence[int], quota: t.Optional[float]) -> None:
+        self.set_cpus(cores, quota)
+
+    def kill(self) -> None:
+        """Kills all processes started in the sandbox"""
+        with self.__lock:
+            process_groups = list(self.__process_groups)
+            self.__process_groups.clear()
+        for process_group in process_groups:
+            self.__kill(process_group)
+
+    def __process_options(self) -> t.Dict[str, t.Any]:
+        return {
+            'cwd': self.directory,
+            'env': self.__environment,
+            'stdin': subprocess.DEVNULL,
+            'stdout': subprocess.PIPE,
+            'stderr': subprocess.PIPE,
+            # Each command gets its own process group, so it is killed together with processes started by it
+            'start_new_session': True,
+        }
+
+    def __command(self, args: t.List[str]) -> t.List[str]:
+        """Command wrapped into `prlimit` and, if cores are set, `taskset`, which both exec the next command"""
+        limits = [
+            f'--cpu={_limit(resource.RLIMIT_CPU, math.ceil(self.__wall_limit))}',
+            f'--fsize={_limit(resource.RLIMIT_FSIZE, self.__file_size)}',
+        ]
+        if self.__max_processes:
+            limits.append(f'--nproc={_limit(resource.RLIMIT_NPROC, self.__max_processes)}')
+        affinity = ['taskset', '--cpu-list', format_cpu_list(self.__cores)] if self.__cores else []
+        return ['prlimit', *limits, '--', *affinity, *args]
+
+    def __resolve(self, path: str) -> Path:
+        """Returns path on the host, which must be inside of the sandbox"""
+        resolved = Path(os.path.normpath(os.path.join(self.directory, path)))
+        if resolved != self.directory and self.directory not in resolved.parents:
+            raise ValueError(f'Path {path} is outside of the sandbox!')
+        return resolved
+
+    def __started(self, process_group: int) -> None:
+        with self.__lock:
+            self.__process_groups.add(process_group)
+
+    def __finished(self, process_group: int) -> None:
+        """Forgets the process group if no processes are left in it, so its id can't be reused by another one"""
+        try:
+            os.killpg(process_group, 0)
+        except ProcessLookupError:
+            with self.__lock:
+                self.__process_groups.discard(process_group)
+        except PermissionError:
+            pass
+
+    @staticmethod
+    def __kill(process_group: int) -> None:
+        try:
+            os.killpg(process_group, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+class LocalBackend(ExecutionBackend):
+    """
+    Executes programs as subprocesses of the driver, so Docker is not needed (e.g. for tests or development).
+    Images are ignored: compilers and interpreters of languages must be installed on the host
+    """
+
+    def __init__(
+            self,
+            directory: t.Optional[str] = LOCAL_SANDBOX_DIR,
+            wall_limit: float = LOCAL_SANDBOX_WALL_LIMIT,
+            file_size: int = LOCAL_SANDBOX_FILE_SIZE,
+            max_processes: int = LOCAL_SANDBOX_MAX_PROCESSES,
+            source_upload_mode: SourceUploadMode = SourceUploadMode(SOURCE_UPLOAD_MODE),
+            allocator: CoreAllocator = core_allocator
+    ):
+        """
+        :param directory: Directory in which sandboxes are created, `None` means the system temporary directory
+        :param wall_limit: Number of seconds after which any command of a sandbox is killed
+        :param file_size: Maximum size of a file written by a command in bytes
+        :param max_processes: Maximum number of processes of the user (0 means it is not limited)
+        :param source_upload_mode: In `SourceUploadMode.VOLUME` directory with users' scripts is linked
+                                   into sandboxes, otherwise scripts are uploaded to each sandbox separately
+        :param allocator: Dedicated cores of the host
+        """
+        self.__directory = directory
+        self.__wall_limit = wall_limit
+        self.__file_size = file_size
+        self.__max_processes = max_processes
+        self.__source_upload_mode = source_upload_mode
+        self.__core_allocator = allocator
+
+        self.__lock = threading.Lock()
+        self.__scripts_dir: t.Optional[Path] = None
+
+    def lease(
+            self,
+            image: str,
+            derived_image: t.Optional[DerivedImage],
+            memory_limit: str,
+            affinity_key: t.Optional[str] = None
+    ) -> LocalSandbox:
+        directory = Path(tempfile.mkdtemp(prefix='sandbox-', dir=self.__directory))
+        for name in (DOCKER_COMPILED_FILES_DIR, DOCKER_STDIN_DIR, DOCKER_ZYGOTE_DIR, _TMP_DIR):
+            (directory / name).mkdir()
+        if self.__source_upload_mode is SourceUploadMode.VOLUME:
+            (directory / DOCKER_USER_SCRIPTS_DIR).symlink_to(LOCAL_USER_SCRIPTS_DIR, target_is_directory=True)
+        else:
+            (directory / DOCKER_USER_SCRIPTS_DIR).mkdir()
+
+        return LocalSandbox(
+            directory=directory,
+            scripts_dir=self.__install_scripts(),
+            image=image,
+            memory_limit=parse_bytes(memory_limit),
+            wall_limit=self.__wall_limit,
+            file_size=self.__file_size,
+            max_processes=self.__max_processes,
+            allocator=self.__core_allocator,
+        )
+
+    def release(self, sandbox: Sandbox) -> None:
+        assert isinstance(sandbox, LocalSandbox)
+        sandbox.kill()
+        shutil.rmtree(sandbox.directory, ignore_errors=True)
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__scripts_dir is not None:
+                shutil.rmtree(self.__scripts_dir, ignore_errors=True)
+                self.__scripts_dir = None
+
+    def __install_scripts(self) -> Path:
+        """Writes scripts that run programs to a directory shared by all sandboxes, once"""
+        with self.__lock:
+            if self.__scripts_dir is None:
+                scripts_dir = Path(tempfile.mkdtemp(prefix='sandbox-scripts-', dir=self.__directory))
+                for name, content in {**SCRIPTS, **LOCAL_SCRIPTS}.items():
+                    (scripts_dir / name).write_bytes(content)
+                    (scripts_dir / name).chmod(0o755)
+                self.__scripts_dir = scripts_dir
+            return self.__scripts_dir
@@ -0,0 +1,309 @@
+import logging
+import math
+import threading
+import typing as t
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+import docker
+from docker.utils import parse_bytes
+
+from driver.config import (
+    CONTAINERS_POOL_IDLE_TIMEOUT,
+    CONTAINERS_POOL_MAX_SIZE,
+    CONTAINERS_POOL_MIN_SIZE,
+    DERIVED_IMAGES_REPOSITORY,
+    DOCKER_HOSTS_HEALTH_CHECK_INTERVAL,
+    SCHEDULER_AFFINITY_KEYS,
+    SCHEDULER_AFFINITY_WEIGHT,
+)
+from driver.libs.containers.async_client import AsyncDockerClient
+from driver.libs.containers.backends.base import ExecutionBackend, Sandbox, SandboxUnavailable
+from driver.libs.containers.backends.docker_backend import DockerBackend
+from driver.libs.containers.cores import core_allocator
+from driver.libs.containers.images import ImageBuilder
+from driver.libs.containers.pool import ContainerPool
+from driver.libs.enums import ReapReason
+from driver.libs.types import DerivedImage, DockerHostConfig, HostStats, PoolStats
+
+logger = logging.getLogger(__name__)
+
+
+def parse_docker_hosts(value: str, default_slots: int) -> t.List[DockerHostConfig]:
+    """
+    Parses space-separated URLs of Docker daemons with capacity in the query (see `DOCKER_HOSTS`):
+    `tcp://10.0.0.2:2375?slots=16&memory=32g`
+    """
+    hosts = []
+    for item in value.split():
+        url, _, query_string = item.partition('?')
+        query = parse_qs(query_string)
+        unknown = set(query) - {'slots', 'memory'}
+        if unknown:
+            raise ValueError(f'Unknown parameters {sorted(unknown)} of Docker host {item}!')
+        hosts.append(DockerHostConfig(
+            url=url,
+            cpu_slots=int(query['slots'][0]) if 'slots' in query else default_slots,
+            memory=parse_bytes(query['memory'][0]) if 'memory' in query else 0,
+        ))
+    return hosts
+
+
+class ScheduledHost:
+    """Host with its own execution backend, whose load and health are tracked by the scheduler"""
+
+    def __init__(self, config: DockerHostConfig, backend: ExecutionBackend, health_check: t.Callable[[], object]):
+        """
+        :param health_check: Callable that raises an exception (or returns `False`) if the host is unhealthy
+        """
+        self.config = config
+        self.backend = backend
+        self.health_check = health_check
+        self.healthy = True
+        self.leased = 0
+        self.leased_memory = 0
+        # Affinity keys (or images of leases without them) that have been leased on the host, the latest are the last
+        self.affinity_keys: 'OrderedDict[str, None]' = OrderedDict()
+
+    def fits(self, memory: int) -> bool:
+        """Whether the container with passed memory limit can be leased on the host right now"""
+        if self.leased >= self.config.cpu_slots:
+            return False
+        return not self.config.memory or self.leased_memory + memory <= self.config.memory
+
+    def can_ever_fit(self, memory: int) -> bool:
+        return self.config.cpu_slots > 0 and (not self.config.memory or memory <= self.config.memory)
+
+    @property
+    def load(self) -> float:
+        return self.leased / self.config.cpu_slots
+
+    def stats(self) -> HostStats:
+        return HostStats(
+            url=self.config.url,
+            healthy=self.healthy,
+            cpu_slots=self.config.cpu_slots,
+            memory=self.config.memory,
+            leased=self.leased,
+            leased_memory=self.leased_memory,
+        )
+
+
+def create_docker_host(config: DockerHostConfig) -> ScheduledHost:
+    """Returns host with its own pool of containers and builder of derived images"""
+    def client_factory() -> docker.DockerClient:
+        return docker.DockerClient(base_url=config.url)
+
+    pool = ContainerPool(
+        min_size=CONTAINERS_POOL_MIN_SIZE,
+        max_size=CONTAINERS_POOL_MAX_SIZE,
+        idle_timeout=CONTAINERS_POOL_IDLE_TIMEOUT,
+        client_factory=client_factory,
+        cpuset_cpus=core_allocator.idle_cpuset,
+    )
+    # The same core numbers are used on every host, but each host has its own free cores
+    backend = DockerBackend(
+        pool,
+        ImageBuilder(DERIVED_IMAGES_REPOSITORY, client_factory),
+        AsyncDockerClient.from_url(config.url),
+        core_allocator.copy(),
+    )
+    return ScheduledHost(config, backend, health_check=lambda: pool.client.ping())
+
+
+class MultiHostBackend(ExecutionBackend):
+    """
+    Schedules sandboxes among several hosts (e.g. Docker daemons), each of which has its own backend
+
+    Sandbox is leased on the least loaded healthy host that has free capacity (slots and memory). Hosts on which
+    the same affinity key (language and hash of the source) has already been leased are preferred, since the source
+    has been compiled there, so the entry of the compilation cache (key of which depends on id of the image on
+    the host) and the containers of the image are warm. Leases without affinity key prefer hosts that have leased
+    the image. If all hosts are busy, the lease waits until a sandbox is released. Unhealthy hosts are drained:
+    leased sandboxes are released as usual, but no new ones are leased until the host passes health check again
+    """
+
+    def __init__(
+            self,
+            hosts: t.Sequence[ScheduledHost],
+            health_check_interval: float = DOCKER_HOSTS_HEALTH_CHECK_INTERVAL,
+            affinity_weight: float = SCHEDULER_AFFINITY_WEIGHT,
+            affinity_keys: int = SCHEDULER_AFFINITY_KEYS
+    ):
+        """:param affinity_keys: Number of the latest affinity keys that are remembered for each host"""
+        if not hosts:
+            raise ValueError('At least one host is required!')
+        self.hosts = list(hosts)
+        self.__health_check_interval = health_check_interval
+        self.__affinity_weight = affinity_weight
+        self.__affinity_keys = affinity_keys
+
+        self.__condition = threading.Condition()
+        # Key - id of leased sandbox, value - host of the sandbox and its memory limit in bytes
+        self.__leased: t.Dict[str, t.Tuple[ScheduledHost, int]] = {}
+
+        self.__health_checker: t.Optional[threading.Thread] = None
+        self.__closed = threading.Event()
+
+    def lease(
+            self,
+            image: str,
+            derived_image: t.Optional[DerivedImage],
+            memory_limit: str,
+            affinity_key: t.Optional[str] = None
+    ) -> Sandbox:
+        memory = parse_bytes(memory_limit)
+        self.__start_health_checker()
+
+        while True:
+            host = self.__reserve(affinity_key or image, memory)
+            try:
+                sandbox = host.backend.lease(image, derived_image, memory_limit)
+            except Exception:
+                with self.__condition:
+                    self.__unreserve(host, memory)
+                # Errors that aren't caused by the host (e.g. unknown image) are not retried on other hosts
+                if self.__probe(host):
+                    raise
+                logger.warning('Failed to lease sandbox on %s, host is drained', host.config.url, exc_info=True)
+                self.__set_healthy(host, False)
+                continue
+
+            with self.__condition:
+                self.__remember(host, image)
+                if affinity_key is not None:
+                    self.__remember(host, affinity_key)
+                self.__leased[sandbox.id] = (host, memory)
+            return sandbox
+
+    def release(self, sandbox: Sandbox) -> None:
+        with self.__condition:
+            host, memory = self.__leased.pop(sandbox.id)
+        try:
+            host.backend.release(sandbox)
+        finally:
+            with self.__condition:
+                self.__unreserve(host, memory)
+
+    def check_available(self, memory_limit: str) -> None:
+        memory = parse_bytes(memory_limit)
+        with self.__condition:
+            self.__candidates(memory)
+
+    def warm_up(self, image: str, derived_image: t.Optional[DerivedImage], memory_limit: str) -> None:
+        # Containers are pre-started on every healthy host, unreachable hosts are skipped
+        for host in self.hosts:
+            if not host.healthy:
+                continue
+            try:
+                host.backend.warm_up(image, derived_image, memory_limit)
+            except Exception:
+                logger.warning('Failed to warm up containers on %s', host.config.url, exc_info=True)
+
+    def stats(self) -> t.List[HostStats]:
+        with self.__condition:
+            return [host.stats() for host in self.hosts]
+
+    def pool_stats(self) -> t.List[PoolStats]:
+        # Containers of the same image and memory limit on different hosts are summed up
+        merged: t.Dict[t.Tuple[str, str], PoolStats] = {}
+        for host in self.hosts:
+            for stats in host.backend.pool_stats():
+                key = (stats.image, stats.memory_limit)
+                if key not in merged:
+                    merged[key] = PoolStats(stats.image, stats.memory_limit, idle=0, busy=0, waiting=0)
+                merged[key].idle += stats.idle
+                merged[key].busy += stats.busy
+                merged[key].waiting += stats.waiting
+        return list(merged.values())
+
+    def reap(self) -> None:
+        # Unreachable hosts are skipped, their containers are reaped by the background reapers of their pools
+        for host in self.hosts:
+            try:
+                host.backend.reap()
+            except Exception:
+                logger.warning('Failed to reap containers on %s', host.config.url, exc_info=True)
+
+    def reaped(self) -> t.Dict[ReapReason, int]:
+        merged: t.Dict[ReapReason, int] = {}
+        for host in self.hosts:
+            for reason, count in host.backend.reaped().items():
+                merged[reason] = merged.get(reason, 0) + count
+        return merged
+
+    def check_health(self) -> None:
+        """Runs health checks of all hosts, it is done periodically in background"""
+        for host in self.hosts:
+            healthy = self.__probe(host)
+            if healthy != host.healthy:
+                logger.warning('Host %s is %s', host.config.url, 'healthy' if healthy else 'unhealthy, it is drained')
+            self.__set_healthy(host, healthy)
+
+    def close(self) -> None:
+        self.__closed.set()
+        for host in self.hosts:
+            host.backend.close()
+
+    @staticmethod
+    def __probe(host: ScheduledHost) -> bool:
+        try:
+            return host.health_check() is not False
+        except Exception:
+            return False
+
+    def __set_healthy(self, host: ScheduledHost, healthy: bool) -> None:
+        with self.__condition:
+            host.healthy = healthy
+            # Leases that wait for capacity fail if there are no healthy hosts left
+            self.__condition.notify_all()
+
+    def __candidates(self, memory: int) -> t.List[ScheduledHost]:
+        """Healthy hosts on which the sandbox can be leased once they have free capacity"""
+        candidates = [host for host in self.hosts if host.healthy and host.can_ever_fit(memory)]
+        if not candidates:
+            # Hosts may become healthy on the next health check
+            raise SandboxUnavailable(
+                f'There are no healthy hosts that can lease sandbox with {memory} bytes!',
+                retry_after=max(1, math.ceil(self.__health_check_interval)),
+            )
+        return candidates
+
+    def __reserve(self, affinity_key: str, memory: int) -> ScheduledHost:
+        """Reserves capacity on the host selected for the sandbox, waiting until there is one"""
+        with self.__condition:
+            while True:
+                available = [host for host in self.__candidates(memory) if host.fits(memory)]
+                if available:
+                    # `min` returns the first of equal hosts, so ties are broken by order of hosts
+                    host = min(available, key=lambda item: self.__score(item, affinity_key))
+                    host.leased += 1
+                    host.leased_memory += memory
+                    return host
+                self.__condition.wait()
+
+    def __unreserve(self, host: ScheduledHost, memory: int) -> None:
+        host.leased -= 1
+        host.leased_memory -= memory
+        self.__condition.notify_all()
+
+    def __remember(self, host: ScheduledHost, affinity_key: str) -> None:
+        host.affinity_keys[affinity_key] = None
+        host.affinity_keys.move_to_end(affinity_key)
+        while len(host.affinity_keys) > self.__affinity_keys:
+            host.affinity_keys.popitem(last=False)
+
+    def __score(self, host: ScheduledHost, affinity_key: str) -> float:
+        """The less the better"""
+        return host.load + (0 if affinity_key in host.affinity_keys else self.__affinity_weight)
+
+    def __start_health_checker(self) -> None:
+        with self.__condition:
+            if self.__health_checker is not None:
+                return
+            self.__health_checker = threading.Thread(target=self.__check_health_periodically, daemon=True)
+        self.__health_checker.start()
+
+    def __check_health_periodically(self) -> None:
+        while not self.__closed.wait(self.__health_check_interval):
+            self.check_health()
@@ -0,0 +1,80 @@
+import typing as t
+
+from driver.libs.containers.output_capture import OutputCapture
+
+# Creates captures of stdout and stderr for the test case with passed index
+_CreateCaptures: t.TypeAlias = t.Callable[[int], t.Tuple[OutputCapture, OutputCapture]]
+
+
+class _Frame:
+    """Output of a single test case, which is being read"""
+
+    def __init__(self, index: int, stdout: OutputCapture, stderr: OutputCapture, stdout_size: int, stderr_size: int):
+        self.index = index
+        self.stdout = stdout
+        self.stderr = stderr
+        self.__stdout_remaining = stdout_size
+        self.__stderr_remaining = stderr_size
+
+    @property
+    def is_complete(self) -> bool:
+        return self.__stdout_remaining == 0 and self.__stderr_remaining == 0
+
+    def consume(self, data: bytes, position: int) -> int:
+        """Feeds bytes of the frame from `data` starting at `position`, returns position after them"""
+        size = min(self.__stdout_remaining, len(data) - position)
+        if size:
+            self.stdout.feed(data[position:position + size])
+            self.__stdout_remaining -= size
+            position += size
+
+        size = min(self.__stderr_remaining, len(data) - position)
+        if size:
+            self.stderr.feed(data[position:position + size])
+            self.__stderr_remaining -= size
+            position += size
+        return position
+
+
+class BatchStreamParser:
+    """
+    Splits stdout of the batch script into outputs of separate test cases
+
+    Each frame starts with header `<marker> <index> <stdout size> <stderr size>\\n`,
+    followed by stdout and stderr of the test case. They are passed to captures as soon as they arrive
+    """
+
+    def __init__(self, marker: str, create_captures: _CreateCaptures):
+        self.__marker = marker.encode()
+        self.__create_captures = create_captures
+        self.__header = bytearray()
+        self.__frame: t.Optional[_Frame] = None
+
+    def feed(self, data: bytes) -> t.Iterator[t.Tuple[int, OutputCapture, OutputCapture]]:
+        """Yields `(index, stdout, stderr)` of each test case whose frame has been read entirely"""
+        position = 0
+        while True:
+            if self.__frame is None:
+                end = data.find(b'\n', position)
+                if end == -1:
+                    self.__header += data[position:]
+                    return
+                self.__header += data[position:end]
+                position = end + 1
+                self.__frame = self.__start_frame(bytes(self.__header))
+                self.__header.clear()
+
+            position = self.__frame.consume(data, position)
+            if not self.__frame.is_complete:
+                return
+            yield self.__frame.index, self.__frame.stdout, self.__frame.stderr
+            self.__frame = None
+
+    def __start_frame(self, header: bytes) -> _Frame:
+        values = header.split()
+        if len(values) != 4 or values[0] != self.__marker:
+            raise ValueError(f'Unexpected header of batch frame: {header!r}')
+
+        index, stdout_size, stderr_size = (int(value) for value in values[1:])
+        stdout, stderr = self.__create_captures(index)
+        return _Frame(index, stdout, stderr, stdout_size, stderr_size)
@@ -0,0 +1,103 @@
+import asyncio
+import collections
+import heapq
+import os
+import typing as t
+
+from driver.config import CPU_HOUSEKEEPING_CORES, CPU_PINNING_CORES
+
+
+def parse_cpu_list(value: str) -> t.List[int]:
+    """Parses list of cores in the format of cpuset, e.g. "0-3,6" -> [0, 1, 2, 3, 6]"""
+    cores: t.Set[int] = set()
+    for item in value.replace(' ', '').split(','):
+        if not item:
+            continue
+        first, separator, last = item.partition('-')
+        try:
+            start, end = int(first), int(last if separator else first)
+        except ValueError:
+            raise ValueError(f'Invalid list of cores "{value}"!')
+        if start < 0 or end < start:
+            raise ValueError(f'Invalid range of cores "{item}"!')
+        cores.update(range(start, end + 1))
+    return sorted(cores)
+
+
+def format_cpu_list(cores: t.Iterable[int]) -> str:
+    """Returns list of cores in the format of cpuset (`cpuset_cpus` of Docker)"""
+    return ','.join(str(core) for core in sorted(cores))
+
+
+class CoreAllocator:
+    """
+    Dedicated cores of running test cases of a host, so a program doesn't compete for its core with other programs.
+    Test cases wait for a free core (see `atake`). The lowest free core is taken, so the same cores are reused.
+    It is used from the event loop only
+    """
+
+    def __init__(self, cores: t.Sequence[int], housekeeping_cores: t.Sequence[int] = ()):
+        """
+        :param cores: Cores that are dedicated to running test cases, pinning is disabled if it is empty
+        :param housekeeping_cores: Cores of idle containers and compilers. By default all cores of the host
+                                   except the dedicated ones (or all cores, if every one of them is dedicated)
+        """
+        overlapping = set(cores) & set(housekeeping_cores)
+        if overlapping:
+            raise ValueError(f'Cores {format_cpu_list(overlapping)} are both dedicated and housekeeping!')
+        if not housekeeping_cores:
+            all_cores = range(os.cpu_count() or 1)
+            housekeeping_cores = [core for core in all_cores if core not in cores] or list(all_cores)
+
+        self.cores = tuple(sorted(cores))
+        self.housekeeping_cores = tuple(sorted(housekeeping_cores))
+        self.__free = list(self.cores)
+        self.__waiters: t.Deque[asyncio.Future[None]] = collections.deque()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cores)
+
+    @property
+    def idle_cpuset(self) -> t.Optional[str]:
+        """`cpuset_cpus` of containers that run no test cases, `None` if pinning is disabled"""
+        return format_cpu_list(self.housekeeping_cores) if self.enabled else None
+
+    def copy(self) -> 'CoreAllocator':
+        """Returns allocator of the same cores of another host"""
+        return CoreAllocator(self.cores, self.housekeeping_cores)
+
+    def take(self) -> t.Optional[int]:
+        """Returns the lowest free core, `None` if pinning is disabled or all cores are taken"""
+        return heapq.heappop(self.__free) if self.__free else None
+
+    async def atake(self) -> t.Optional[int]:
+        """Waits until a core is free and takes it, `None` if pinning is disabled"""
+        while self.enabled and not self.__free:
+            waiter = asyncio.get_running_loop().create_future()
+            self.__waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # The core this waiter has been woken up for is passed to the next one
+                if waiter.done() and not waiter.cancelled():
+                    self.__wake_up()
+                raise
+            finally:
+                if waiter in self.__waiters:
+                    self.__waiters.remove(waiter)
+        return self.take()
+
+    def give_back(self, core: int) -> None:
+        heapq.heappush(self.__free, core)
+        self.__wake_up()
+
+    def __wake_up(self) -> None:
+        while self.__waiters:
+            waiter = self.__waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+
+core_allocator = CoreAllocator(parse_cpu_list(CPU_PINNING_CORES), parse_cpu_list(CPU_HOUSEKEEPING_CORES))
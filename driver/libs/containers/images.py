@@ -0,0 +1,97 @@
+import hashlib
+import io
+import logging
+import re
+import threading
+import typing as t
+
+import docker
+from docker.errors import DockerException, ImageNotFound
+
+from driver.config import DERIVED_IMAGES_REPOSITORY
+from driver.libs.types import DerivedImage
+
+logger = logging.getLogger(__name__)
+
+
+class ImageBuilder:
+    """
+    Builds docker images derived from images of languages (for example, with precompiled headers)
+
+    Tag of a derived image depends on id of the base image and on the commands, so the image is rebuilt
+    only if one of them changes. Images that already exist locally are reused, so they survive restarts of the driver
+    """
+
+    def __init__(self, repository: str, client_factory: t.Callable[[], docker.DockerClient] = docker.from_env):
+        """
+        :param repository: Repository in which derived images are tagged
+        :param client_factory: Callable that returns docker client. It is invoked lazily, on first use
+        """
+        self.__repository = repository
+        self.__client_factory = client_factory
+        self.__client: t.Optional[docker.DockerClient] = None
+
+        self.__lock = threading.Lock()
+        # Each image is built only once, even if it is requested by several threads at the same time
+        self.__image_locks: t.Dict[DerivedImage, threading.Lock] = {}
+        # Key - derived image, value - name of the image that is used instead of it
+        self.__resolved: t.Dict[DerivedImage, str] = {}
+
+    @property
+    def client(self) -> docker.DockerClient:
+        if self.__client is None:
+            self.__client = self.__client_factory()
+        return self.__client
+
+    @staticmethod
+    def build_dockerfile(image: DerivedImage) -> str:
+        return '\n'.join([f'FROM {image.base}', *(f'RUN {command}' for command in image.commands)]) + '\n'
+
+    def build_tag(self, image: DerivedImage, base_id: str) -> str:
+        """Returns tag that is unique for the base image and the commands"""
+        digest = hashlib.sha256(f'{base_id}\n{self.build_dockerfile(image)}'.encode()).hexdigest()
+        # Tag can't contain slashes and colons of the base image name
+        base_name = re.sub(r'[^\w.-]', '-', image.base)
+        return f'{self.__repository}:{base_name}-{digest[:16]}'
+
+    def resolve(self, image: DerivedImage) -> str:
+        """
+        Returns name of the derived image, building it if it doesn't exist.
+        If the image can't be built, name of the base image is returned, so programs still can be executed
+        """
+        with self.__lock:
+            if image in self.__resolved:
+                return self.__resolved[image]
+            image_lock = self.__image_locks.setdefault(image, threading.Lock())
+
+        with image_lock:
+            with self.__lock:
+                if image in self.__resolved:
+                    return self.__resolved[image]
+
+            try:
+                name = self.__build(image)
+            except DockerException as error:
+                logger.warning('Failed to build image derived from %s, it is used as is: %s', image.base, error)
+                name = image.base
+
+            with self.__lock:
+                self.__resolved[image] = name
+            return name
+
+    def __build(self, image: DerivedImage) -> str:
+        try:
+            base = self.client.images.get(image.base)
+        except ImageNotFound:
+            base = self.client.images.pull(image.base)
+
+        tag = self.build_tag(image, base.id)
+        try:
+            self.client.images.get(tag)
+        except ImageNotFound:
+            dockerfile = io.BytesIO(self.build_dockerfile(image).encode())
+            self.client.images.build(fileobj=dockerfile, tag=tag, rm=True, forcerm=True)
+        return tag
+
+
+image_builder = ImageBuilder(DERIVED_IMAGES_REPOSITORY)
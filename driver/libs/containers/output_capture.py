@@ -0,0 +1,70 @@
+import codecs
+import typing as t
+
+from driver.libs.checkers import Checker
+
+
+class OutputCapture:
+    """
+    Collects output stream of the program chunk by chunk, keeping only the first `limit` bytes of it.
+    Kept bytes are decoded incrementally, invalid UTF-8 sequences are replaced
+
+    The last `holdback` bytes of the stream are not decoded until it is finished,
+    so service data printed at the end of the stream can be cut off.
+    If `checker` is passed, kept bytes are passed to it instead of being decoded
+    """
+
+    def __init__(self, limit: int, holdback: int = 0, checker: t.Optional[Checker] = None):
+        self.__limit = limit
+        self.__holdback = holdback
+        self.__checker = checker
+        # Total number of bytes in the stream (including the ones that haven't been kept)
+        self.size = 0
+
+        self.__kept = 0
+        self.__decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.__decoded: t.List[str] = []
+        self.__pending = bytearray()
+
+    @property
+    def is_exceeded(self) -> bool:
+        return self.size > self.__limit
+
+    @property
+    def tail(self) -> bytes:
+        """The last bytes of the stream, which are held back"""
+        return bytes(self.__pending)
+
+    def feed(self, data: bytes) -> None:
+        self.size += len(data)
+        self.__pending += data
+
+        excess = len(self.__pending) - self.__holdback
+        if excess > 0:
+            self.__keep(bytes(self.__pending[:excess]))
+            del self.__pending[:excess]
+
+    def finish(self, tail: t.Optional[bytes] = None) -> str:
+        """
+        Returns decoded output (empty if it has been passed to the checker)
+
+        :param tail: Replacement of held back bytes (for example, without service data)
+        """
+        if tail is None:
+            tail = bytes(self.__pending)
+        self.size -= len(self.__pending) - len(tail)
+        self.__pending.clear()
+
+        self.__keep(tail)
+        self.__decoded.append(self.__decoder.decode(b'', final=True))
+        return ''.join(self.__decoded)
+
+    def __keep(self, data: bytes) -> None:
+        data = data[:self.__limit - self.__kept]
+        if not data:
+            return
+        self.__kept += len(data)
+        if self.__checker is not None:
+            self.__checker.feed(data)
+        else:
+            self.__decoded.append(self.__decoder.decode(data))
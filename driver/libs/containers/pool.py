@@ -0,0 +1,484 @@
+import logging
+import os
+import posixpath
+import threading
+import time
+import typing as t
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+
+import docker
+from docker.errors import DockerException
+from docker.models.containers import Container
+from docker.types import Mount
+
+from driver.config import (
+    CONTAINERS_LEASE_TIMEOUT,
+    CONTAINERS_POOL_IDLE_TIMEOUT,
+    CONTAINERS_POOL_MAX_SIZE,
+    CONTAINERS_POOL_MIN_SIZE,
+    CONTAINERS_REAPER_INTERVAL,
+    DOCKER_COMPILED_FILES_DIR,
+    DOCKER_SANDBOX_DIR,
+    DOCKER_SANDBOX_SIZE,
+    DOCKER_SCRIPTS_DIR,
+    DOCKER_STDIN_DIR,
+    DOCKER_USER_SCRIPTS_DIR,
+    DOCKER_ZYGOTE_DIR,
+    DRIVER_INSTANCE_ID,
+    DRIVER_SESSIONS_DIR,
+    LOCAL_USER_SCRIPTS_DIR,
+    SOURCE_UPLOAD_MODE,
+    USER_SCRIPTS_VOLUME_FULLNAME,
+)
+from driver.libs.containers.cores import core_allocator
+from driver.libs.enums import Phase, ReapReason, SourceUploadMode
+from driver.libs.files.utils import iter_files_archive
+from driver.libs.profiling import measure_phase
+from driver.libs.types import PoolStats
+
+logger = logging.getLogger(__name__)
+
+# Labels of containers created by the pool: id of the driver instance, id of the session of the pool that has created
+# the container (a new one on every start of the driver), image and memory limit (key of the pool) and Unix time of creation
+INSTANCE_LABEL = 'contester.driver.instance'
+SESSION_LABEL = 'contester.driver.session'
+IMAGE_LABEL = 'contester.driver.image'
+MEMORY_LIMIT_LABEL = 'contester.driver.memory_limit'
+CREATED_AT_LABEL = 'contester.driver.created_at'
+
+# Scripts that run programs inside containers (name inside `DOCKER_SCRIPTS_DIR` -> content)
+SCRIPTS: t.Mapping[str, bytes] = {
+    path.name: path.read_bytes()
+    for path in sorted((Path(__file__).parent / 'scripts').iterdir())
+    if path.is_file()
+}
+
+# Heartbeat of a session is refreshed every reaper interval, the session is considered dead after this many intervals
+_MISSED_HEARTBEATS = 3
+
+# Docker image and memory limit of containers
+PoolKey: t.TypeAlias = t.Tuple[str, str]
+
+
+@dataclass
+class _IdleContainer:
+    container: Container
+    # Value of `time.monotonic()` at the moment the container was returned to the pool
+    released_at: float
+
+
+class ContainerPool:
+    """
+    Pool of pre-started containers, grouped by docker image and memory limit
+
+    Instead of creating and removing container on every request, containers are leased from the pool
+    and returned back to it once they are no more needed. Between leases each container is reset:
+    stray processes are killed and directories with source code, compiled files and inputs are wiped.
+    Working directory of each container is tmpfs, so all these files are kept in memory
+    """
+
+    def __init__(
+            self,
+            min_size: int,
+            max_size: int,
+            idle_timeout: float,
+            client_factory: t.Callable[[], docker.DockerClient] = docker.from_env,
+            source_upload_mode: SourceUploadMode = SourceUploadMode(SOURCE_UPLOAD_MODE),
+            cpuset_cpus: t.Optional[str] = None,
+            instance_id: str = DRIVER_INSTANCE_ID,
+            lease_timeout: float = CONTAINERS_LEASE_TIMEOUT,
+            reaper_interval: float = CONTAINERS_REAPER_INTERVAL,
+            sessions_dir: Path = DRIVER_SESSIONS_DIR
+    ):
+        """
+        :param min_size: Number of idle containers per key that are never evicted
+        :param max_size: Maximum number of containers (both idle and leased) per key.
+                         If all of them are leased, `lease` blocks until one is released
+        :param idle_timeout: How many seconds a container can stay idle before it is evicted
+        :param client_factory: Callable that returns docker client. It is invoked lazily, on first use
+        :param source_upload_mode: In `SourceUploadMode.VOLUME` directory with users' scripts is mounted
+                                   into containers, otherwise scripts are uploaded to each container separately
+        :param cpuset_cpus: Cores of new containers (e.g. "0-1"), all cores of the host are used by default.
+                            Containers are moved to the dedicated cores while they run test cases (see `cores`)
+        :param instance_id: Id of the driver instance, containers of the instance that are left by its stopped sessions
+                            are removed by `reap`
+        :param lease_timeout: How many seconds a container can stay leased before it is killed and removed by `reap`
+        :param reaper_interval: How often `reap` is invoked in background and the heartbeat is refreshed, in seconds
+        :param sessions_dir: Directory with heartbeats of sessions, shared by all pools of the instance
+        """
+        if min_size > max_size:
+            raise ValueError(f'Min size of the pool ({min_size}) is greater than max size ({max_size})!')
+
+        self.__min_size = min_size
+        self.__max_size = max_size
+        self.__idle_timeout = idle_timeout
+        self.__client_factory = client_factory
+        self.__source_upload_mode = source_upload_mode
+        self.__cpuset_cpus = cpuset_cpus
+        self.__instance_id = instance_id
+        self.__session_id = uuid.uuid4().hex
+        self.__lease_timeout = lease_timeout
+        self.__reaper_interval = reaper_interval
+        self.__sessions_dir = sessions_dir
+        self.__client: t.Optional[docker.DockerClient] = None
+
+        self.__condition = threading.Condition()
+        # Idle containers are stored as stacks, so the most recently used container is leased first
+        self.__idle: t.DefaultDict[PoolKey, t.List[_IdleContainer]] = defaultdict(list)
+        # Number of all containers (idle, leased and being created) per key
+        self.__sizes: t.DefaultDict[PoolKey, int] = defaultdict(int)
+        # Key - id of leased container, value - key of the pool it belongs to
+        self.__leased: t.Dict[str, PoolKey] = {}
+        # Key - id of leased container, value - `time.monotonic()` at the moment it was leased
+        self.__leased_at: t.Dict[str, float] = {}
+        # Ids of all containers of the pool that have been set up and haven't been destroyed yet
+        self.__containers: t.Set[str] = set()
+        # Number of leases that are blocked until a container is released, per key
+        self.__waiting: t.DefaultDict[PoolKey, int] = defaultdict(int)
+
+        # Number of containers removed by `reap`
+        self.__reaped: t.DefaultDict[ReapReason, int] = defaultdict(int)
+
+        # Evictor of idle containers, reaper of leaked ones and heartbeat of the session
+        self.__background_threads: t.List[threading.Thread] = []
+        self.__closed = threading.Event()
+
+    @property
+    def client(self) -> docker.DockerClient:
+        if self.__client is None:
+            self.__client = self.__client_factory()
+        return self.__client
+
+    def lease(self, image: str, memory_limit: str) -> Container:
+        """Returns healthy running container. Creates a new one if there are no idle containers"""
+        key = (image, memory_limit)
+        self.__start_background_threads()
+
+        while True:
+            with self.__condition:
+                while not self.__idle[key] and self.__sizes[key] >= self.__max_size:
+                    self.__waiting[key] += 1
+                    try:
+                        self.__condition.wait()
+                    finally:
+                        self.__waiting[key] -= 1
+
+                if self.__idle[key]:
+                    container: t.Optional[Container] = self.__idle[key].pop().container
+                else:
+                    # Reserving place for a new container
+                    container = None
+                    self.__sizes[key] += 1
+
+            if container is None:
+                container = self.__create_reserved(key)
+            elif not self.__is_healthy(container):
+                self.__destroy(key, container)
+                continue
+
+            with self.__condition:
+                self.__leased[container.id] = key
+                self.__leased_at[container.id] = time.monotonic()
+            return container
+
+    def release(self, container: Container) -> None:
+        """Resets container and returns it to the pool. Broken containers are removed"""
+        with self.__condition:
+            key = self.__leased.pop(container.id, None)
+            self.__leased_at.pop(container.id, None)
+        if key is None:
+            # Lease has expired, and the container has been removed by `reap`
+            return
+
+        with measure_phase(Phase.CONTAINER_TEARDOWN):
+            is_reset = not self.__closed.is_set() and self.__reset(container)
+        if not is_reset:
+            self.__destroy(key, container)
+            return
+
+        with self.__condition:
+            self.__idle[key].append(_IdleContainer(container=container, released_at=time.monotonic()))
+            self.__condition.notify_all()
+
+    def stats(self) -> t.List[PoolStats]:
+        with self.__condition:
+            return [
+                PoolStats(
+                    image=image,
+                    memory_limit=memory_limit,
+                    idle=len(self.__idle[(image, memory_limit)]),
+                    busy=size - len(self.__idle[(image, memory_limit)]),
+                    waiting=self.__waiting[(image, memory_limit)],
+                )
+                for (image, memory_limit), size in self.__sizes.items()
+            ]
+
+    def warm_up(self, image: str, memory_limit: str) -> None:
+        """Creates idle containers until there are at least `min_size` of them"""
+        key = (image, memory_limit)
+        self.__start_background_threads()
+
+        while True:
+            with self.__condition:
+                if len(self.__idle[key]) >= self.__min_size or self.__sizes[key] >= self.__max_size:
+                    return
+                self.__sizes[key] += 1
+
+            container = self.__create_reserved(key)
+            with self.__condition:
+                self.__idle[key].append(_IdleContainer(container=container, released_at=time.monotonic()))
+                self.__condition.notify_all()
+
+    def evict_idle(self) -> None:
+        """Removes containers that have been idle for too long, keeping at least `min_size` of them per key"""
+        now = time.monotonic()
+        evicted: t.List[t.Tuple[PoolKey, Container]] = []
+
+        with self.__condition:
+            for key, idle in self.__idle.items():
+                # Oldest containers are at the beginning of the stack
+                while len(idle) > self.__min_size and now - idle[0].released_at > self.__idle_timeout:
+                    evicted.append((key, idle.pop(0).container))
+
+        for key, container in evicted:
+            self.__destroy(key, container)
+
+    def reap(self) -> None:
+        """
+        Kills and removes leaked containers of the driver instance: containers leased for longer than `lease_timeout`,
+        containers of sessions whose heartbeat is stale (e.g. if the driver has crashed) and containers that
+        are unknown to the pool for longer than `lease_timeout` (e.g. if setup has been interrupted).
+        Containers of other live sessions of the instance (e.g. other workers of the driver) are kept.
+        It is invoked on startup of the driver and then periodically in background
+        """
+        containers: t.List[Container] = self.client.containers.list(
+            all=True, filters={'label': f'{INSTANCE_LABEL}={self.__instance_id}'}
+        )
+        now = time.monotonic()
+        orphaned: t.List[Container] = []
+        expired: t.List[t.Tuple[PoolKey, Container]] = []
+        # Key - id of a session, value - whether it is alive
+        sessions: t.Dict[str, bool] = {}
+        for container in containers:
+            session_id = container.labels.get(SESSION_LABEL, '')
+            if session_id not in sessions:
+                sessions[session_id] = self.__is_alive(session_id)
+
+        with self.__condition:
+            for container in containers:
+                if container.id in self.__leased:
+                    if now - self.__leased_at[container.id] > self.__lease_timeout:
+                        expired.append((self.__leased.pop(container.id), container))
+                        del self.__leased_at[container.id]
+                    continue
+
+                labels = container.labels
+                # Containers that are being created are unknown to the pool until their setup is finished
+                age = time.time() - float(labels.get(CREATED_AT_LABEL, 0))
+                is_unknown = container.id not in self.__containers and age > self.__lease_timeout
+                if not sessions[labels.get(SESSION_LABEL, '')] or is_unknown:
+                    orphaned.append(container)
+
+        for key, container in expired:
+            logger.warning('Removing container %s, which has been leased for too long', container.id)
+            self.__destroy(key, container)
+            self.__count_reaped(ReapReason.EXPIRED)
+        for container in orphaned:
+            logger.warning('Removing orphaned container %s', container.id)
+            self.__remove(container)
+            self.__count_reaped(ReapReason.ORPHANED)
+
+        # Heartbeats of dead sessions, whose containers have been removed
+        for path in self.__sessions_dir.glob('*'):
+            if not self.__is_alive(path.name):
+                path.unlink(missing_ok=True)
+
+    def reaped(self) -> t.Dict[ReapReason, int]:
+        """Returns number of containers removed by `reap` for each reason"""
+        with self.__condition:
+            return dict(self.__reaped)
+
+    def close(self) -> None:
+        """Removes all idle containers. Leased containers are removed as soon as they are released"""
+        self.__closed.set()
+        with self.__condition:
+            idle = [(key, item.container) for key, items in self.__idle.items() for item in items]
+            self.__idle.clear()
+
+        for key, container in idle:
+            self.__destroy(key, container)
+
+    def __create_reserved(self, key: PoolKey) -> Container:
+        """Creates container in a place that has already been reserved in `__sizes`"""
+        try:
+            container = self.__create(key)
+        except BaseException:
+            with self.__condition:
+                self.__sizes[key] -= 1
+                self.__condition.notify_all()
+            raise
+
+        with self.__condition:
+            self.__containers.add(container.id)
+        return container
+
+    def __create(self, key: PoolKey) -> Container:
+        image, memory_limit = key
+
+        volumes = []
+        if self.__source_upload_mode is SourceUploadMode.VOLUME:
+            # Read-only volume with users' scripts
+            scripts_dir = posixpath.join(DOCKER_SANDBOX_DIR, DOCKER_USER_SCRIPTS_DIR)
+            if os.environ.get('DOCKER_FLAG') == '1':
+                # Mounting volume
+                volumes.append(f'{USER_SCRIPTS_VOLUME_FULLNAME}:{scripts_dir}:ro')
+            else:
+                # Mounting directory
+                volumes.append(f'{LOCAL_USER_SCRIPTS_DIR}:{scripts_dir}:ro')
+
+        # Inputs of programs are kept on the disk, in an anonymous volume of the container (it is removed together with
+        # the container). Unlike tmpfs, its pages are reclaimable, so inputs of any size don't take memory of programs
+        inputs_dir = posixpath.join(DOCKER_SANDBOX_DIR, DOCKER_STDIN_DIR)
+        mounts = [Mount(target=inputs_dir, source=None, type='volume')]
+
+        # Creating and starting the container
+        with measure_phase(Phase.CONTAINER_CREATE):
+            container: Container = self.client.containers.create(
+                image=image,
+                volumes=volumes,
+                mounts=mounts,
+                # Source code and compiled files are kept in memory. Note that tmpfs is counted in memory usage
+                tmpfs={DOCKER_SANDBOX_DIR: f'rw,exec,nosuid,size={DOCKER_SANDBOX_SIZE}'},
+                working_dir=DOCKER_SANDBOX_DIR,
+                mem_limit=memory_limit,
+                cpuset_cpus=self.__cpuset_cpus,
+                labels={
+                    INSTANCE_LABEL: self.__instance_id,
+                    SESSION_LABEL: self.__session_id,
+                    IMAGE_LABEL: image,
+                    MEMORY_LIMIT_LABEL: memory_limit,
+                    CREATED_AT_LABEL: str(time.time()),
+                },
+                tty=True,
+                detach=True,
+            )
+            container.start()
+
+        with measure_phase(Phase.CONTAINER_SETUP):
+            # Installing scripts that run programs
+            container.exec_run(f'mkdir -p {DOCKER_SCRIPTS_DIR}')
+            container.put_archive(DOCKER_SCRIPTS_DIR, iter_files_archive(SCRIPTS.items(), mode=0o755))
+            is_reset = self.__reset(container)
+
+        if not is_reset:
+            container.remove(force=True, v=True)
+            raise RuntimeError(f'Failed to set up container from image {image}!')
+        return container
+
+    def __reset(self, container: Container) -> bool:
+        """
+        Kills all processes except the main one (including the zygote), recreates directories for compiled files,
+        for FIFOs of the zygote and for uploaded source code, removes inputs of programs
+        """
+        directories = f'{DOCKER_COMPILED_FILES_DIR} {DOCKER_ZYGOTE_DIR}'
+        if self.__source_upload_mode is SourceUploadMode.ARCHIVE:
+            directories += f' {DOCKER_USER_SCRIPTS_DIR}'
+        # Directory with inputs is a mount point, so only its content (including hidden files) is removed
+        inputs = f'{DOCKER_STDIN_DIR}/* {DOCKER_STDIN_DIR}/.[!.]* {DOCKER_STDIN_DIR}/..?*'
+        # `kill -1` sends signal to every process except init and the shell itself
+        command = f'sh -c \'kill -9 -1 2>/dev/null; rm -rf {directories} {inputs} && mkdir {directories}\''
+        try:
+            exit_code, _ = container.exec_run(command)
+        except DockerException:
+            return False
+        return exit_code == 0
+
+    @staticmethod
+    def __is_healthy(container: Container) -> bool:
+        try:
+            container.reload()
+        except DockerException:
+            return False
+        return container.status == 'running'
+
+    def __destroy(self, key: PoolKey, container: Container) -> None:
+        self.__remove(container)
+        with self.__condition:
+            self.__containers.discard(container.id)
+            self.__sizes[key] -= 1
+            self.__condition.notify_all()
+
+    @staticmethod
+    def __remove(container: Container) -> None:
+        try:
+            # Anonymous volume with inputs is removed as well
+            container.remove(force=True, v=True)
+        except DockerException:
+            # Container has already been removed
+            pass
+
+    def __count_reaped(self, reason: ReapReason) -> None:
+        with self.__condition:
+            self.__reaped[reason] += 1
+
+    def __start_background_threads(self) -> None:
+        with self.__condition:
+            if self.__background_threads:
+                return
+            # Containers of the session must not be created before its first heartbeat
+            self.__beat()
+            self.__background_threads = [
+                threading.Thread(target=self.__evict_periodically, daemon=True),
+                threading.Thread(target=self.__reap_periodically, daemon=True),
+                threading.Thread(target=self.__beat_periodically, daemon=True),
+            ]
+        for thread in self.__background_threads:
+            thread.start()
+
+    def __evict_periodically(self) -> None:
+        while not self.__closed.wait(self.__idle_timeout / 2):
+            self.evict_idle()
+
+    def __reap_periodically(self) -> None:
+        while not self.__closed.wait(self.__reaper_interval):
+            try:
+                self.reap()
+            except Exception:
+                # E.g. the daemon is unreachable, the next attempt is made after the interval
+                logger.warning('Failed to reap leaked containers', exc_info=True)
+
+    def __beat_periodically(self) -> None:
+        while not self.__closed.wait(self.__reaper_interval):
+            try:
+                self.__beat()
+            except OSError:
+                logger.warning('Failed to refresh heartbeat of the session', exc_info=True)
+
+    def __beat(self) -> None:
+        """Refreshes modification time of the heartbeat file of the session"""
+        self.__sessions_dir.mkdir(parents=True, exist_ok=True)
+        (self.__sessions_dir / self.__session_id).touch()
+
+    def __is_alive(self, session_id: str) -> bool:
+        """Whether the session has refreshed its heartbeat recently. Sessions without heartbeat are dead"""
+        if session_id == self.__session_id:
+            return True
+        if not session_id.isalnum():
+            # Not an id of a session (e.g. the label is missing)
+            return False
+        try:
+            beaten_at = (self.__sessions_dir / session_id).stat().st_mtime
+        except FileNotFoundError:
+            return False
+        return time.time() - beaten_at <= _MISSED_HEARTBEATS * self.__reaper_interval
+
+
+container_pool = ContainerPool(
+    min_size=CONTAINERS_POOL_MIN_SIZE,
+    max_size=CONTAINERS_POOL_MAX_SIZE,
+    idle_timeout=CONTAINERS_POOL_IDLE_TIMEOUT,
+    cpuset_cpus=core_allocator.idle_cpuset,
+)
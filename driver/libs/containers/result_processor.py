@@ -2,14 +2,25 @@ import typing as t
 
 from docker.models.containers import ExecResult as DockerExecResult
 
-from driver.libs.enums import DriverError
-from driver.libs.types import ProcessedContainerExecutionResult
+from driver.libs.checkers import Checker
+from driver.libs.containers.output_capture import OutputCapture
+from driver.libs.enums import DriverError, Verdict
+from driver.libs.types import ExecutionStats, ProcessedContainerExecutionResult
 
 _Stream = t.Optional[bytes]
 
+# Number of bytes at the end of stdout that are enough to hold the line with measurements printed by the run script
+MAX_STATS_LINE_SIZE = 256
+
 
 class ResultProcessor:
-    def __init__(self):
+    def __init__(self, time_limit: t.Optional[float] = None):
+        """
+        :param time_limit: Time limit of the program in seconds. If CPU time of the program exceeds it,
+                           "Time Limit Exceeded" error is reported even if the program has finished successfully
+        """
+        self.__time_limit = time_limit
+        # Used only if resources could not be measured via cgroup
         self.EXIT_CODE_TO_ERROR_MAP: t.Mapping[int, DriverError] = {
             9: DriverError.MEMORY_LIMIT_EXCEEDED,
             15: DriverError.TIME_LIMIT_EXCEEDED
@@ -25,17 +36,68 @@ class ResultProcessor:
         return stdout_decoded, stderr_decoded
 
     @staticmethod
-    def __process_stdout(stdout: str) -> t.Tuple[str, float]:
-        """Separates actual stdout from execution time"""
-        split_stdout = stdout.rsplit('\n', 2)
-
-        if len(split_stdout) == 2:
-            actual_output = ''
-            execution_time, _ = split_stdout
-        else:
-            actual_output, execution_time, _ = stdout.rsplit('\n', 2)
-
-        return actual_output, float(execution_time)
+    def __parse_stats(
+            stats_line: t.Optional[bytes],
+            exit_code: int,
+            is_exclusive: bool
+    ) -> t.Tuple[ExecutionStats, bool]:
+        """
+        Parses the line with measurements printed by the run script.
+        Returns measurements and a flag telling whether they come from cgroup
+        """
+        if stats_line is None:
+            # Script has been killed before it has printed measurements
+            stats = ExecutionStats(exit_code=exit_code, wall_time=0, cpu_time=0, peak_memory=0, oom_killed=False)
+            return stats, False
+
+        values = stats_line.split()
+        exit_code = int(values[0])
+        cgroup_cpu_usec, cgroup_oom_kills = int(values[1]), int(values[2])
+        wall_time, user_time, system_time = (float(value) for value in values[3:6])
+        max_rss_kb = int(values[6])
+
+        from_cgroup = cgroup_cpu_usec >= 0 and cgroup_oom_kills >= 0
+        if from_cgroup and not is_exclusive:
+            # cgroup is shared with other programs: CPU time is taken from rusage of the program,
+            # OOM kill is attributed to the program only if it has been killed with SIGKILL
+            stats = ExecutionStats(
+                exit_code=exit_code,
+                wall_time=wall_time,
+                cpu_time=user_time + system_time,
+                peak_memory=max_rss_kb * 1024,
+                oom_killed=cgroup_oom_kills > 0 and exit_code == 9,
+            )
+            return stats, True
+
+        stats = ExecutionStats(
+            exit_code=exit_code,
+            wall_time=wall_time,
+            cpu_time=cgroup_cpu_usec / 1_000_000 if from_cgroup else user_time + system_time,
+            peak_memory=max_rss_kb * 1024,
+            oom_killed=from_cgroup and cgroup_oom_kills > 0,
+        )
+        return stats, from_cgroup
+
+    def __detect_error(
+            self,
+            stats: ExecutionStats,
+            from_cgroup: bool,
+            is_output_exceeded: bool
+    ) -> t.Optional[DriverError]:
+        if stats.oom_killed:
+            return DriverError.MEMORY_LIMIT_EXCEEDED
+        # The program has been killed on the first write after its output has exceeded the limit
+        if is_output_exceeded:
+            return DriverError.OUTPUT_LIMIT_EXCEEDED
+        # Exit code 15 means that the program has been terminated by `timeout`
+        if stats.exit_code == 15 or (self.__time_limit is not None and stats.cpu_time > self.__time_limit):
+            return DriverError.TIME_LIMIT_EXCEEDED
+        if stats.exit_code == 0:
+            return None
+
+        if from_cgroup:
+            return DriverError.RUNTIME_ERROR
+        return self.EXIT_CODE_TO_ERROR_MAP.get(stats.exit_code, DriverError.RUNTIME_ERROR)
 
     def handle_compilation(self, compilation_result: DockerExecResult) -> ProcessedContainerExecutionResult:
         stdout, stderr = self.__decode_streams(compilation_result.output)
@@ -56,29 +118,66 @@ class ResultProcessor:
             error_message=''
         )
 
-    def handle_execution(self, execution_result: DockerExecResult) -> ProcessedContainerExecutionResult:
-        # Retrieving actual stdout and execution time
-        stdout, stderr = self.__decode_streams(execution_result.output)
+    @staticmethod
+    def handle_lost_execution(exit_code: int) -> ProcessedContainerExecutionResult:
+        """Result of the execution whose output hasn't been received (e.g. the batch script has been killed)"""
+        return ProcessedContainerExecutionResult(
+            exit_code=exit_code,
+            output='',
+            execution_time=0,
+            error_message=DriverError.UNKNOWN_ERROR.value.message
+        )
 
-        if execution_result.exit_code == 0:
-            output, execution_time = self.__process_stdout(stdout)
+    def handle_execution(
+            self,
+            exit_code: int,
+            stdout: OutputCapture,
+            stderr: OutputCapture,
+            marker: str,
+            is_exclusive: bool = True,
+            checker: t.Optional[Checker] = None
+    ) -> ProcessedContainerExecutionResult:
+        """
+        :param stdout: Captured stdout. Its held back tail must contain measurements printed by the run script
+        :param marker: Marker after which the run script has printed measurements
+        :param is_exclusive: Whether the program was the only one running in the container.
+                             Otherwise, cgroup statistics include other programs, so they are not used
+        :param checker: Checker to which stdout has been passed by the capture
+        """
+        # Cutting measurements off the actual stdout
+        tail, separator, stats_line = stdout.tail.rpartition(marker.encode())
+        if not separator:
+            tail = stdout.tail
+        stats, from_cgroup = self.__parse_stats(stats_line if separator else None, exit_code, is_exclusive)
+
+        output, error_output = stdout.finish(tail), stderr.finish()
+        is_output_exceeded = stdout.is_exceeded or stderr.is_exceeded
+
+        error_data = self.__detect_error(stats, from_cgroup, is_output_exceeded)
+        verdict = None
+        if error_data is None:
+            execution_time = stats.wall_time
             error_message = ''
+            if checker is not None:
+                verdict = (Verdict.ACCEPTED if checker.finish() else Verdict.WRONG_ANSWER).value
         else:
             # Execution time
             execution_time = 0
-
-            # Error message and output
-            error_data = self.EXIT_CODE_TO_ERROR_MAP.get(execution_result.exit_code, DriverError.RUNTIME_ERROR)
             error_message = error_data.value.message
             # Setting output as value from stderr
-            output = stderr
+            output = error_output
             # If this error implies that stdout must be hidden, setting output as empty string
             if not error_data.value.show_output:
                 output = ''
 
         return ProcessedContainerExecutionResult(
-            exit_code=execution_result.exit_code,
+            exit_code=stats.exit_code,
             output=output,
             execution_time=execution_time,
-            error_message=error_message
+            error_message=error_message,
+            cpu_time=stats.cpu_time,
+            wall_time=stats.wall_time,
+            peak_memory=stats.peak_memory,
+            oom_killed=stats.oom_killed,
+            verdict=verdict,
         )
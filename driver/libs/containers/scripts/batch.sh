@@ -0,0 +1,33 @@
+#!/bin/sh
+# Runs the program once per test case via the run script, so all test cases are executed in a single exec
+#
+# Usage: batch.sh <run script> <marker> <time limit> <output limit> <stdin prefix> <tests count> <command...>
+#
+# Input of test case with index `i` is read from file `<stdin prefix>-<i>`.
+# For each test case a frame is printed:
+# <marker> <index> <stdout size> <stderr size>\n<stdout><stderr>
+# where stdout is the one printed by the run script, i.e. it ends with measurements
+
+run_script=$1
+marker=$2
+time_limit=$3
+output_limit=$4
+stdin_prefix=$5
+tests_count=$6
+shift 6
+
+stdout_file=$(mktemp)
+stderr_file=$(mktemp)
+
+index=0
+while [ "$index" -lt "$tests_count" ]; do
+    sh "$run_script" "$marker" "$time_limit" "$output_limit" "$stdin_prefix-$index" "$@" \
+        > "$stdout_file" 2> "$stderr_file"
+
+    # Arithmetic expansion strips spaces that some implementations of `wc` add
+    printf '%s %s %s %s\n' "$marker" "$index" "$(($(wc -c < "$stdout_file")))" "$(($(wc -c < "$stderr_file")))"
+    cat "$stdout_file" "$stderr_file"
+    index=$((index + 1))
+done
+
+rm -f "$stdout_file" "$stderr_file"
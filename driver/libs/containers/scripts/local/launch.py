@@ -0,0 +1,59 @@
+"""
+Runs the program with time limit and measures resources it has used,
+the same as `time -f '%e %U %S %M' -o <rusage file> timeout <time limit> <command...>` does
+
+Usage: <python> launch.py <time limit> <rusage file> <command...>
+
+Exit code is the one of the program. Exit code of the program killed by a signal is the number of the signal,
+so the program that exceeds time limit is reported with exit code 15, as if it had been terminated by `timeout`.
+If `DRIVER_MEMORY_LIMIT` environment variable is set, address space of the program is limited by it (in bytes)
+
+The script is executed by the interpreter of the driver without `site`, so it must use only built-in modules
+"""
+import os
+import resource
+import signal
+import sys
+import time
+
+COMMAND_NOT_FOUND_EXIT_CODE = 127
+
+
+def _start(command: list[str], memory_limit: int) -> int:
+    pid = os.fork()
+    if pid != 0:
+        return pid
+
+    try:
+        if memory_limit:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        os.execvp(command[0], command)
+    except OSError as error:
+        os.write(2, f'{command[0]}: {error.strerror}\n'.encode())
+    os._exit(COMMAND_NOT_FOUND_EXIT_CODE)
+
+
+def main() -> int:
+    time_limit, rusage_file, command = float(sys.argv[1]), sys.argv[2], sys.argv[3:]
+    memory_limit = int(os.environ.get('DRIVER_MEMORY_LIMIT') or 0)
+
+    started_at = time.monotonic()
+    pid = _start(command, memory_limit)
+
+    # The alarm interrupts waiting, and `wait4` is retried after the handler has terminated the program
+    signal.signal(signal.SIGALRM, lambda signum, frame: os.kill(pid, signal.SIGTERM))
+    signal.setitimer(signal.ITIMER_REAL, time_limit)
+    _, status, rusage = os.wait4(pid, 0)
+    signal.setitimer(signal.ITIMER_REAL, 0)
+    wall_time = time.monotonic() - started_at
+
+    with open(rusage_file, 'w') as file:
+        file.write(f'{wall_time:.2f} {rusage.ru_utime:.2f} {rusage.ru_stime:.2f} {rusage.ru_maxrss}\n')
+
+    if os.WIFSIGNALED(status):
+        return os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
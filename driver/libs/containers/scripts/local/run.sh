@@ -0,0 +1,18 @@
+#!/bin/sh
+# Runs the program and measures resources it has used, the local sandbox's version of run.sh
+#
+# Usage: run.sh <marker> <time limit> <output limit> <stdin file> <command...>
+#
+# `timeout` and GNU `time` are not guaranteed to be installed on the host, so the program is started
+# by launch.py, which does the same. See measure.sh for details
+
+launch() {
+    launch_time_limit=$1
+    launch_stdin_file=$2
+    launch_rusage_file=$3
+    shift 3
+    "$DRIVER_PYTHON" -S -E "$(dirname "$0")/launch.py" "$launch_time_limit" "$launch_rusage_file" "$@" \
+        < "$launch_stdin_file"
+}
+
+. "$(dirname "$0")/measure.sh"
@@ -0,0 +1,80 @@
+# Runs the program via the `launch` function and measures resources it has used.
+# The file is sourced by run scripts, which define `launch`:
+#
+# launch <time limit> <stdin file> <rusage file> <command...>
+#
+# The function runs the program with stdin from the file and writes `<wall seconds> <user seconds> <sys seconds>
+# <max rss kb>` of it to the rusage file. Its exit status must be exit code of the program.
+#
+# Arguments of the run script: <marker> <time limit> <output limit> <stdin file> <command...>
+#
+# Only the first `output limit + 1` bytes of stdout and stderr of the program are passed through:
+# as soon as the program writes more, it is killed with SIGPIPE, and the driver reports exceeded limit.
+#
+# After stdout of the program a line with measurements is printed:
+# <marker> <exit code> <cgroup cpu usec> <cgroup oom kills> <wall seconds> <user seconds> <sys seconds> <max rss kb>
+# Values that can't be taken from cgroup are reported as -1
+
+marker=$1
+time_limit=$2
+output_limit=$3
+stdin_file=$4
+shift 4
+
+# The local sandbox sets `DRIVER_CGROUP` to an empty string, since programs share cgroup of the driver there
+cgroup=${DRIVER_CGROUP-/sys/fs/cgroup}
+rusage_file=$(mktemp)
+exit_code_file=$(mktemp)
+
+cpu_usage() {
+    # cgroup v2 reports microseconds, cgroup v1 reports nanoseconds
+    if [ -r $cgroup/cpu.stat ]; then
+        awk '$1 == "usage_usec" { print $2 }' $cgroup/cpu.stat
+    elif [ -r $cgroup/cpuacct/cpuacct.usage ]; then
+        echo $(( $(cat $cgroup/cpuacct/cpuacct.usage) / 1000 ))
+    else
+        echo -1
+    fi
+}
+
+oom_kills() {
+    if [ -r $cgroup/memory.events ]; then
+        awk '$1 == "oom_kill" { print $2 }' $cgroup/memory.events
+    elif [ -r $cgroup/memory/memory.oom_control ]; then
+        awk '$1 == "oom_kill" { print $2 }' $cgroup/memory/memory.oom_control
+    else
+        echo -1
+    fi
+}
+
+difference() {
+    if [ "$1" = -1 ] || [ "$2" = -1 ]; then
+        echo -1
+    else
+        echo $(( $2 - $1 ))
+    fi
+}
+
+cpu_before=$(cpu_usage)
+oom_before=$(oom_kills)
+
+# Stdout of the program goes to descriptor 3, stderr goes to the inner pipe.
+# Exit code is saved to the file, because exit status of a pipeline is the one of its last command
+{
+    {
+        launch "$time_limit" "$stdin_file" "$rusage_file" "$@" 2>&1 1>&3 3>&-
+        echo $? > "$exit_code_file"
+    } | head -c $((output_limit + 1)) 1>&2 3>&-
+} 3>&1 | head -c $((output_limit + 1))
+exit_code=$(cat "$exit_code_file")
+
+cpu_after=$(cpu_usage)
+oom_after=$(oom_kills)
+
+# `time` writes a note about non-zero exit status before the formatted line, so only the last line is taken
+rusage=$(tail -n 1 "$rusage_file")
+printf '%s %s %s %s %s\n' "$marker" "$exit_code" "$(difference "$cpu_before" "$cpu_after")" \
+    "$(difference "$oom_before" "$oom_after")" "${rusage:-0 0 0 0}"
+
+rm -f "$rusage_file" "$exit_code_file" "$stdin_file"
+exit $exit_code
@@ -0,0 +1,16 @@
+#!/bin/sh
+# Runs the program and measures resources it has used
+#
+# Usage: run.sh <marker> <time limit> <output limit> <stdin file> <command...>
+#
+# The program is started under `timeout` and `time`, see measure.sh for details
+
+launch() {
+    launch_time_limit=$1
+    launch_stdin_file=$2
+    launch_rusage_file=$3
+    shift 3
+    time -f '%e %U %S %M' -o "$launch_rusage_file" timeout "$launch_time_limit" "$@" < "$launch_stdin_file"
+}
+
+. "$(dirname "$0")/measure.sh"
@@ -0,0 +1,49 @@
+#!/bin/sh
+# Runs the script in a child forked by the zygote and measures resources it has used
+#
+# Usage: zygote-run.sh <marker> <time limit> <output limit> <stdin file> <zygote dir> <script>
+#
+# The zygote (zygote.py) must be running in `zygote dir`. It enforces time limit of the child and reports its rusage,
+# output of the child is passed through FIFOs of the request. The child runs on the cores of this script.
+# See measure.sh for the rest of details
+
+launch() {
+    launch_time_limit=$1
+    launch_stdin_file=$2
+    launch_rusage_file=$3
+    launch_zygote_dir=$4
+    launch_script=$5
+
+    request=$(mktemp -d "$launch_zygote_dir/request.XXXXXX")
+    mkfifo "$request/stdout" "$request/stderr" "$request/status"
+    # Status FIFO is opened before the request is sent, so the zygote never misses the reader
+    exec 4<> "$request/status"
+
+    cat "$request/stdout" &
+    stdout_pid=$!
+    cat "$request/stderr" >&2 &
+    stderr_pid=$!
+
+    # Request is shorter than PIPE_BUF, so requests of simultaneous executions are not interleaved.
+    # Both waits are bounded in case the zygote has died
+    timeout 1 sh -c 'echo "$1" > "$2"' sh \
+        "$request $launch_time_limit $launch_stdin_file $launch_script $$" "$launch_zygote_dir/requests"
+    status=$(timeout $((launch_time_limit + 5)) head -n 1 <&4)
+    exec 4<&-
+
+    if [ -z "$status" ]; then
+        kill "$stdout_pid" "$stderr_pid" 2>/dev/null
+        wait
+        rm -rf "$request"
+        return 255
+    fi
+    wait
+    rm -rf "$request"
+
+    # <exit code> <wall seconds> <user seconds> <sys seconds> <max rss kb>
+    set -- $status
+    echo "$2 $3 $4 $5" > "$launch_rusage_file"
+    return "$1"
+}
+
+. "$(dirname "$0")/measure.sh"
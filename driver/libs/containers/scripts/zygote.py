@@ -0,0 +1,254 @@
+"""
+Zygote: preloaded interpreter that forks a clean child for every execution of a user's script,
+so executions don't pay for startup of the interpreter
+
+Usage: <python> zygote.py <directory>
+
+Requests are read from FIFO `<directory>/requests`, one per line:
+`<request dir> <time limit> <stdin file> <script> <client pid>`
+
+The request directory must contain FIFOs `stdout` and `stderr`, to which output of the script is written,
+and FIFO `status`, to which `<exit code> <wall seconds> <user seconds> <sys seconds> <max rss kb>` is written
+after the child has exited. Exit code of the child killed by a signal is the number of the signal.
+The child that exceeds time limit is killed and reported with exit code 15, as if it had been terminated by `timeout`
+
+If `DRIVER_MEMORY_LIMIT` environment variable is set, address space of children is limited by it (in bytes).
+The child runs on the same cores as the client (e.g. the one started by `taskset`), rather than the zygote.
+
+The script is executed by the container's interpreter (CPython or PyPy), so it must not depend on the driver
+"""
+import os
+import resource
+import runpy
+import select
+import signal
+import sys
+import time
+import traceback
+import typing as t
+
+# Modules that are imported before forking, so children don't spend time on it
+PRELOADED_MODULES = (
+    'array', 'bisect', 'collections', 'copy', 'decimal', 'fractions', 'functools', 'heapq',
+    'itertools', 'math', 'operator', 'random', 're', 'string',
+)
+
+TIMED_OUT_EXIT_CODE = 15
+
+
+class _Child(t.NamedTuple):
+    request_dir: str
+    started_at: float
+    deadline: float
+
+
+def _exit_code(exception: SystemExit) -> int:
+    """Exit code of the interpreter that has been stopped by `exception`"""
+    if exception.code is None:
+        return 0
+    if isinstance(exception.code, int):
+        return exception.code
+    print(exception.code, file=sys.stderr)
+    return 1
+
+
+def _print_exception(exception: BaseException, script: str) -> None:
+    """Prints traceback like the interpreter does, i.e. without frames of the zygote and `runpy`"""
+    frames = exception.__traceback__
+    while frames is not None and frames.tb_frame.f_code.co_filename != script:
+        frames = frames.tb_next
+    traceback.print_exception(type(exception), exception, frames)
+
+
+def _inherit_affinity(client_pid: int) -> None:
+    """Moves the child to the cores of the client, which has been pinned to its core"""
+    try:
+        os.sched_setaffinity(0, os.sched_getaffinity(client_pid))
+    except (AttributeError, OSError):
+        # The interpreter doesn't support affinity, or the client has gone
+        pass
+
+
+def _run_child(request_dir: str, time_limit: float, stdin_file: str, script: str) -> int:
+    """Runs the script as `__main__` with standard streams redirected to the request, returns exit code"""
+    # Output FIFOs are opened first, so the client always gets EOF, even if the script can't be started
+    stdout = os.open(os.path.join(request_dir, 'stdout'), os.O_WRONLY)
+    stderr = os.open(os.path.join(request_dir, 'stderr'), os.O_WRONLY)
+    os.dup2(stdout, 1)
+    os.dup2(stderr, 2)
+    os.close(stdout)
+    os.close(stderr)
+
+    exit_code = 0
+    try:
+        stdin = os.open(stdin_file, os.O_RDONLY)
+        os.dup2(stdin, 0)
+        os.close(stdin)
+
+        # Wall time is watched by the zygote, CPU time limit protects from the child that outlives it
+        cpu_limit = int(time_limit) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit))
+        # Outside of containers (in the local sandbox) memory is limited per process
+        memory_limit = int(os.environ.get('DRIVER_MEMORY_LIMIT') or 0)
+        if memory_limit:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+        sys.argv = [script]
+        sys.path[0] = os.path.dirname(os.path.abspath(script))
+        runpy.run_path(script, run_name='__main__')
+    except SystemExit as exception:
+        exit_code = _exit_code(exception)
+    except BaseException as exception:
+        _print_exception(exception, script)
+        exit_code = 1
+
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except OSError:
+        # Output exceeds the limit, and the reader has gone
+        exit_code = exit_code or 120
+    return exit_code
+
+
+class Zygote:
+    def __init__(self, directory: str):
+        self.__children: t.Dict[int, _Child] = {}
+        # Children that have been killed because of time limit
+        self.__timed_out: t.Set[int] = set()
+        self.__buffer = b''
+
+        # SIGCHLD wakes up `select`, so exited children are reaped without polling
+        self.__wakeup_read, self.__wakeup_write = os.pipe()
+        os.set_blocking(self.__wakeup_read, False)
+        os.set_blocking(self.__wakeup_write, False)
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+        signal.set_wakeup_fd(self.__wakeup_write)
+
+        # FIFO is opened for both reading and writing, so it never reports EOF.
+        # It appears under its name only when the zygote is ready to serve requests
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, 'requests')
+        os.mkfifo(f'{path}.tmp')
+        self.__requests = os.open(f'{path}.tmp', os.O_RDWR | os.O_NONBLOCK)
+        os.rename(f'{path}.tmp', path)
+
+    def serve(self) -> None:
+        while True:
+            timeout = None
+            deadlines = [child.deadline for pid, child in self.__children.items() if pid not in self.__timed_out]
+            if deadlines:
+                timeout = max(min(deadlines) - time.monotonic(), 0)
+
+            readable, _, _ = select.select([self.__requests, self.__wakeup_read], [], [], timeout)
+            if self.__wakeup_read in readable:
+                self.__drain(self.__wakeup_read)
+            if self.__requests in readable:
+                self.__read_requests()
+            self.__reap()
+            self.__kill_timed_out()
+
+    def __read_requests(self) -> None:
+        try:
+            self.__buffer += os.read(self.__requests, 65536)
+        except BlockingIOError:
+            return
+        *lines, self.__buffer = self.__buffer.split(b'\n')
+        for line in lines:
+            if line.strip():
+                self.__start(line.decode())
+
+    def __start(self, request: str) -> None:
+        request_dir, time_limit, stdin_file, script, client_pid = request.split()
+        started_at = time.monotonic()
+        try:
+            pid = os.fork()
+        except OSError:
+            # The client gives up once its own timeout expires
+            return
+
+        if pid == 0:
+            exit_code = 1
+            try:
+                self.__prepare_child()
+                _inherit_affinity(int(client_pid))
+                exit_code = _run_child(request_dir, float(time_limit), stdin_file, script)
+            finally:
+                os._exit(exit_code)
+
+        # Child gets its own process group, so processes started by it are killed together with it
+        try:
+            os.setpgid(pid, pid)
+        except OSError:
+            pass
+        self.__children[pid] = _Child(request_dir, started_at, started_at + float(time_limit))
+
+    def __prepare_child(self) -> None:
+        """Drops state of the zygote that must not be visible to the script"""
+        os.setpgid(0, 0)
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for descriptor in (self.__requests, self.__wakeup_read, self.__wakeup_write):
+            os.close(descriptor)
+
+    def __reap(self) -> None:
+        while self.__children:
+            pid, status, rusage = os.wait4(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            child = self.__children.pop(pid)
+            wall_time = time.monotonic() - child.started_at
+
+            if pid in self.__timed_out:
+                self.__timed_out.remove(pid)
+                exit_code = TIMED_OUT_EXIT_CODE
+            elif os.WIFSIGNALED(status):
+                exit_code = os.WTERMSIG(status)
+            else:
+                exit_code = os.WEXITSTATUS(status)
+
+            self.__report(child.request_dir, (
+                f'{exit_code} {wall_time:.2f} {rusage.ru_utime:.2f} {rusage.ru_stime:.2f} {rusage.ru_maxrss}\n'
+            ))
+
+    def __kill_timed_out(self) -> None:
+        now = time.monotonic()
+        for pid, child in self.__children.items():
+            if pid in self.__timed_out or now < child.deadline:
+                continue
+            self.__timed_out.add(pid)
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except OSError:
+                # Child has already exited, it will be reaped on the next iteration
+                pass
+
+    @staticmethod
+    def __report(request_dir: str, status: str) -> None:
+        try:
+            descriptor = os.open(os.path.join(request_dir, 'status'), os.O_WRONLY | os.O_NONBLOCK)
+        except OSError:
+            # Client has gone
+            return
+        try:
+            os.write(descriptor, status.encode())
+        finally:
+            os.close(descriptor)
+
+    @staticmethod
+    def __drain(descriptor: int) -> None:
+        try:
+            while os.read(descriptor, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+
+def main() -> None:
+    for module in PRELOADED_MODULES:
+        __import__(module)
+    Zygote(sys.argv[1]).serve()
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,7 @@ class ProgrammingLanguage(Enum):
 class DriverError(Enum):
     TIME_LIMIT_EXCEEDED = DriverErrorData('Time Limit Exceeded', show_output=False)
     MEMORY_LIMIT_EXCEEDED = DriverErrorData('Memory Limit Exceeded', show_output=False)
+    OUTPUT_LIMIT_EXCEEDED = DriverErrorData('Output Limit Exceeded', show_output=False)
     COMPILATION_ERROR = DriverErrorData('Compilation Error', show_output=True)
     RUNTIME_ERROR = DriverErrorData('Run-Time Error', show_output=True)
     UNKNOWN_ERROR = DriverErrorData('Unknown Error', show_output=False)
@@ -24,3 +25,102 @@ class DriverError(Enum):
     @property
     def value(self) -> DriverErrorData:
         return super().value
+
+
+class ParallelismMode(Enum):
+    # Test cases are executed one by one
+    SEQUENTIAL = 'sequential'
+    # Test cases are executed as several simultaneous exec sessions inside one container
+    # (note that they share memory limit of the container)
+    EXEC_SESSIONS = 'exec-sessions'
+    # Test cases are distributed between several sibling containers
+    CONTAINERS = 'containers'
+
+
+class JobStatus(Enum):
+    # Submission is waiting for admission
+    PENDING = 'pending'
+    # Submission is admitted, its test cases are executed
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+
+
+class CheckerMode(Enum):
+    # Output must be equal to the expected one byte to byte
+    EXACT = 'exact'
+    # Output must consist of the same whitespace-separated tokens
+    TOKENS = 'tokens'
+    # Same as tokens, but numbers are compared with an epsilon
+    FLOAT = 'float'
+
+
+class Verdict(Enum):
+    ACCEPTED = 'Accepted'
+    WRONG_ANSWER = 'Wrong Answer'
+    # Test case wasn't executed, since the submission has already failed enough test cases (see `max_failures`)
+    SKIPPED = 'Skipped'
+
+
+class SourceUploadMode(Enum):
+    # Source code is uploaded into tmpfs of each container via in-memory tar archive
+    ARCHIVE = 'archive'
+    # Source code is written to the disk of the host, and the directory is mounted into every container
+    VOLUME = 'volume'
+
+
+class SubmissionPriority(Enum):
+    # Submissions are admitted in this order, submissions of the same priority are admitted in order of arrival
+    CONTEST = 'contest'
+    PRACTICE = 'practice'
+    REJUDGE = 'rejudge'
+
+
+class ExecutionBackendType(Enum):
+    # Programs are executed in Docker containers leased from the pool
+    DOCKER = 'docker'
+    # Programs are executed as subprocesses of the driver with rlimits, no Docker daemon is needed
+    LOCAL = 'local'
+
+
+class ReapReason(Enum):
+    # Container was created by a previous run of the driver instance, or it is unknown to the pool
+    # (e.g. it has been leaked between creation and setup)
+    ORPHANED = 'orphaned'
+    # Container has been leased for longer than `CONTAINERS_LEASE_TIMEOUT`
+    EXPIRED = 'expired'
+
+
+class WireCompression(Enum):
+    # Values are the same as tokens of Content-Encoding and Accept-Encoding headers
+    IDENTITY = 'identity'
+    GZIP = 'gzip'
+    # Requires `zstandard` package, which is not installed by default
+    ZSTD = 'zstd'
+
+
+class WireFrame(Enum):
+    # Result of a test case
+    RESULT = 0
+    # The last frame of a response that has been finished, with number of results
+    END = 1
+    # The last frame of a response that has been interrupted by an error of the driver, with its message
+    ERROR = 2
+
+
+class Phase(Enum):
+    # Creating and starting a new container of the pool
+    CONTAINER_CREATE = 'container_create'
+    # Installing scripts into the new container and preparing its directories
+    CONTAINER_SETUP = 'container_setup'
+    # Writing source code to the file (or preparing it for upload)
+    FILE_CREATION = 'file_creation'
+    # Uploading source code into the leased container
+    SOURCE_UPLOAD = 'source_upload'
+    COMPILATION = 'compilation'
+    # Uploading input, running the program and reading its output
+    EXECUTION = 'execution'
+    # Parsing measurements and output of the program
+    RESULT_PROCESSING = 'result_processing'
+    # Resetting the container before it is returned to the pool
+    CONTAINER_TEARDOWN = 'container_teardown'
@@ -2,33 +2,70 @@ import os
 import typing as t
 import uuid
 
-from driver.config import LOCAL_USER_SCRIPTS_DIR
-from driver.libs.enums import ProgrammingLanguage
+from driver.config import LOCAL_USER_SCRIPTS_DIR, SOURCE_UPLOAD_MODE
+from driver.libs.enums import Phase, ProgrammingLanguage, SourceUploadMode
+from driver.libs.profiling import measure_phase
 from driver.libs.types import Filename
 
 ProgrammingLanguagesMember = t.TypeVar('ProgrammingLanguagesMember', bound=ProgrammingLanguage)
 
 
+def generate_filename(programming_language: ProgrammingLanguage) -> Filename:
+    """Generates unique name of the file with source code"""
+    name = str(uuid.uuid4())
+    extension = programming_language.value.file_extension
+    return f'{name}.{extension}'
+
+
 class FileCreator:
+    """Writes source code to the file in `LOCAL_USER_SCRIPTS_DIR`, which is mounted into every container"""
+
     def __init__(self, source_code: str, programming_language: ProgrammingLanguage):
         self.__source_code = source_code
         self.__programming_language = programming_language
-
-    def __generate_filename(self) -> Filename:
-        name = str(uuid.uuid4())
-        extension = self.__programming_language.value.file_extension
-        return f'{name}.{extension}'
+        # Source code is read by containers from the mounted directory, so it isn't uploaded to them
+        self.content: t.Optional[bytes] = None
 
     def __enter__(self):
-        # Generating unique name of the file
-        self.filename = self.__generate_filename()
-        # Building path to file
-        self.__file_path = LOCAL_USER_SCRIPTS_DIR / self.filename
-
-        # Writing passed source code to the file
-        with open(self.__file_path, 'w') as file:
-            file.write(self.__source_code)
+        with measure_phase(Phase.FILE_CREATION):
+            # Generating unique name of the file
+            self.filename = generate_filename(self.__programming_language)
+            # Building path to file
+            self.__file_path = LOCAL_USER_SCRIPTS_DIR / self.filename
+
+            # Writing passed source code to the file
+            with open(self.__file_path, 'w') as file:
+                file.write(self.__source_code)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         os.remove(self.__file_path)
+
+
+class InMemoryFileCreator:
+    """
+    Same as `FileCreator`, but nothing is written to the disk:
+    `content` of the file is uploaded straight into each container that executes it
+    """
+
+    def __init__(self, source_code: str, programming_language: ProgrammingLanguage):
+        self.__programming_language = programming_language
+        self.content: t.Optional[bytes] = source_code.encode()
+
+    def __enter__(self):
+        with measure_phase(Phase.FILE_CREATION):
+            self.filename = generate_filename(self.__programming_language)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+def create_file_creator(
+        source_code: str,
+        programming_language: ProgrammingLanguage
+) -> t.Union[FileCreator, InMemoryFileCreator]:
+    """Returns file creator that corresponds to `SOURCE_UPLOAD_MODE`"""
+    if SourceUploadMode(SOURCE_UPLOAD_MODE) is SourceUploadMode.VOLUME:
+        return FileCreator(source_code, programming_language)
+    return InMemoryFileCreator(source_code, programming_language)
@@ -1,3 +1,8 @@
+import io
+import tarfile
+import typing as t
+from pathlib import Path
+
 from driver.libs.types import Filename
 
 
@@ -15,3 +20,64 @@ def get_compiled_filename(original_filename: Filename, save_extension: bool = Fa
     if save_extension:
         return f'{name}-{suffix}.{extension}'
     return f'{name}-{suffix}'
+
+
+def iter_files_archive(
+        files: t.Iterable[t.Tuple[Filename, t.Union[bytes, Path]]],
+        mode: int = 0o644,
+        chunk_size: int = 64 * 1024
+) -> t.Iterator[bytes]:
+    """
+    Yields tar archive with passed files chunk by chunk, so it can be uploaded via `Container.put_archive`
+    without loading the whole archive into memory
+
+    :param files: Pairs of filename and content of the file or path to the file on the host,
+                  which will be read chunk by chunk
+    """
+    for filename, content in files:
+        info = tarfile.TarInfo(name=filename)
+        info.mode = mode
+        info.size = len(content) if isinstance(content, bytes) else content.stat().st_size
+        yield info.tobuf()
+
+        if isinstance(content, bytes):
+            for start in range(0, len(content), chunk_size):
+                yield content[start:start + chunk_size]
+        else:
+            with open(content, 'rb') as file:
+                while chunk := file.read(chunk_size):
+                    yield chunk
+
+        # Content of each file is padded to the size of tar block
+        remainder = info.size % tarfile.BLOCKSIZE
+        if remainder:
+            yield tarfile.NUL * (tarfile.BLOCKSIZE - remainder)
+
+    # Archive ends with two empty blocks
+    yield tarfile.NUL * (2 * tarfile.BLOCKSIZE)
+
+
+def iter_file_archive(
+        filename: Filename,
+        content: t.Union[bytes, Path],
+        mode: int = 0o644,
+        chunk_size: int = 64 * 1024
+) -> t.Iterator[bytes]:
+    """Same as `iter_files_archive`, but for a single file"""
+    return iter_files_archive([(filename, content)], mode, chunk_size)
+
+
+def pack_file(filename: Filename, content: bytes, mode: int = 0o644) -> bytes:
+    """Creates in-memory tar archive with a single file, so it can be uploaded via `Container.put_archive`"""
+    return b''.join(iter_file_archive(filename, content, mode))
+
+
+def unpack_file(chunks: t.Iterable[bytes]) -> bytes:
+    """Returns content of the first file from tar archive (e.g. the one returned by `Container.get_archive`)"""
+    with tarfile.open(fileobj=io.BytesIO(b''.join(chunks)), mode='r') as archive:
+        for member in archive:
+            if member.isfile():
+                file = archive.extractfile(member)
+                assert file is not None
+                return file.read()
+    raise ValueError('Archive does not contain any files!')
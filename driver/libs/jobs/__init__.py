@@ -0,0 +1,134 @@
+import asyncio
+import contextlib
+import time
+import typing as t
+import uuid
+
+from driver.config import JOBS_TTL
+from driver.libs.admission import Ticket
+from driver.libs.enums import JobStatus
+from driver.libs.types import JobState, ProcessedContainerExecutionResult
+
+
+class Job:
+    """Execution of a submission that runs in background and collects results of test cases one by one"""
+
+    def __init__(self, total: int):
+        self.id = str(uuid.uuid4())
+        self.total = total
+        self.status = JobStatus.PENDING
+        self.results: t.List[ProcessedContainerExecutionResult] = []
+        self.error: t.Optional[str] = None
+        # Value of `time.monotonic()` at the moment the job was finished
+        self.finished_at: t.Optional[float] = None
+        # Notifies streaming consumers about new results
+        self.__changed = asyncio.Condition()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.FINISHED, JobStatus.FAILED)
+
+    def state(self) -> JobState:
+        return JobState(
+            job_id=self.id,
+            status=self.status.value,
+            total=self.total,
+            completed=len(self.results),
+            results=list(self.results),
+            error=self.error,
+        )
+
+    async def run(
+            self,
+            results: t.AsyncIterator[ProcessedContainerExecutionResult],
+            ticket: t.Optional[Ticket] = None
+    ) -> None:
+        """
+        Consumes results of test cases, saving and broadcasting each of them. The job is pending until the ticket
+        of the submission is admitted (`results` enter the ticket as well, entering it again doesn't wait)
+        """
+        try:
+            async with ticket or contextlib.nullcontext():
+                await self.__update(status=JobStatus.RUNNING)
+                async for result in results:
+                    await self.__update(result=result)
+        except Exception as error:
+            await self.__update(status=JobStatus.FAILED, error=str(error) or type(error).__name__)
+        else:
+            await self.__update(status=JobStatus.FINISHED)
+
+    async def stream(self) -> t.AsyncIterator[ProcessedContainerExecutionResult]:
+        """Yields all results of the job (both already saved and upcoming ones) until it is finished"""
+        index = 0
+        while True:
+            async with self.__changed:
+                await self.__changed.wait_for(lambda: index < len(self.results) or self.is_finished)
+                new_results = self.results[index:]
+                is_finished = self.is_finished
+
+            for result in new_results:
+                yield result
+            index += len(new_results)
+
+            if is_finished and index == len(self.results):
+                return
+
+    async def __update(
+            self,
+            status: t.Optional[JobStatus] = None,
+            result: t.Optional[ProcessedContainerExecutionResult] = None,
+            error: t.Optional[str] = None
+    ) -> None:
+        async with self.__changed:
+            if result is not None:
+                self.results.append(result)
+            if error is not None:
+                self.error = error
+            if status is not None:
+                self.status = status
+                if self.is_finished:
+                    self.finished_at = time.monotonic()
+            self.__changed.notify_all()
+
+
+class JobStore:
+    """In-process storage of jobs. Finished jobs are evicted after `ttl` seconds"""
+
+    def __init__(self, ttl: float):
+        self.__ttl = ttl
+        self.__jobs: t.Dict[str, Job] = {}
+        # Strong references to running tasks, so they are not garbage collected
+        self.__tasks: t.Set[asyncio.Task[None]] = set()
+
+    def start(
+            self,
+            total: int,
+            results: t.AsyncIterator[ProcessedContainerExecutionResult],
+            ticket: t.Optional[Ticket] = None
+    ) -> Job:
+        """Creates job and starts consuming passed results (once the ticket is admitted) in background"""
+        self.evict_expired()
+
+        job = Job(total)
+        self.__jobs[job.id] = job
+
+        task = asyncio.create_task(job.run(results, ticket))
+        self.__tasks.add(task)
+        task.add_done_callback(self.__tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> t.Optional[Job]:
+        self.evict_expired()
+        return self.__jobs.get(job_id)
+
+    def evict_expired(self) -> None:
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self.__jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.__ttl
+        ]
+        for job_id in expired:
+            del self.__jobs[job_id]
+
+
+job_store = JobStore(ttl=JOBS_TTL)
@@ -0,0 +1,140 @@
+import typing as t
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.metrics_core import CounterMetricFamily, GaugeMetricFamily
+
+from driver.libs.admission import admission_controller
+from driver.libs.containers import MultiHostBackend, execution_backend
+from driver.libs.enums import DriverError, Phase, ProgrammingLanguage, Verdict
+from driver.libs.metrics.registry import DEFAULT_BUCKETS, CollectedMetric
+from driver.libs.metrics.tracing import span
+from driver.libs.types import ProcessedContainerExecutionResult, RejudgeResult
+
+# Label of test cases that have finished successfully, but haven't been checked
+SUCCESS = 'OK'
+
+# Phases that are repeated for each test case, so their durations are labelled with verdicts of test cases.
+# Other phases are done once per submission (or per container) and are labelled with verdict of the submission
+TEST_PHASES = frozenset({Phase.EXECUTION, Phase.RESULT_PROCESSING})
+
+
+def _collect_pool_containers() -> t.Iterable[t.Tuple[t.Mapping[str, str], float]]:
+    for stats in execution_backend.pool_stats():
+        labels = {'image': stats.image, 'memory_limit': stats.memory_limit}
+        yield {**labels, 'state': 'idle'}, stats.idle
+        yield {**labels, 'state': 'busy'}, stats.busy
+
+
+def _collect_pool_waiting() -> t.Iterable[t.Tuple[t.Mapping[str, str], float]]:
+    for stats in execution_backend.pool_stats():
+        yield {'image': stats.image, 'memory_limit': stats.memory_limit}, stats.waiting
+
+
+def _collect_admission_queue() -> t.Iterable[t.Tuple[t.Mapping[str, str], float]]:
+    for priority, queued in admission_controller.stats().queued.items():
+        yield {'priority': priority}, queued
+
+
+def _collect_admission_reserved() -> t.Iterable[t.Tuple[t.Mapping[str, str], float]]:
+    stats = admission_controller.stats()
+    yield {'resource': 'memory'}, stats.reserved_memory
+    yield {'resource': 'cpu_slots'}, stats.reserved_cpu_slots
+
+
+def _collect_reaped_containers() -> t.Iterable[t.Tuple[t.Mapping[str, str], float]]:
+    for reason, count in execution_backend.reaped().items():
+        yield {'reason': reason.value}, count
+
+
+def _collect_host_leases() -> t.Iterable[t.Tuple[t.Mapping[str, str], float]]:
+    if isinstance(execution_backend, MultiHostBackend):
+        for stats in execution_backend.stats():
+            yield {'host': stats.url, 'healthy': str(stats.healthy).lower()}, stats.leased
+
+
+registry = CollectorRegistry()
+
+phase_duration = Histogram(
+    'driver_phase_duration_seconds', 'Duration of phases of submissions', ('phase', 'language', 'verdict'),
+    buckets=DEFAULT_BUCKETS, registry=registry
+)
+tests_total = Counter('driver_tests_total', 'Executed test cases', ('language', 'verdict'), registry=registry)
+submissions_total = Counter(
+    'driver_submissions_total', 'Processed submissions', ('language', 'verdict'), registry=registry
+)
+rejudged_submissions_total = Counter(
+    'driver_rejudged_submissions_total', 'Submissions processed by `/rejudge`, each of identical sources is counted',
+    ('language', 'verdict'), registry=registry
+)
+submissions_queued = CollectedMetric(
+    GaugeMetricFamily, 'driver_submissions_queued', 'Submissions waiting for admission', ('priority',),
+    _collect_admission_queue, registry
+)
+admission_wait = Histogram(
+    'driver_admission_wait_seconds', 'Time that submissions have spent waiting for admission', ('priority',),
+    buckets=DEFAULT_BUCKETS, registry=registry
+)
+admission_rejected = Counter(
+    'driver_admission_rejected_total', 'Submissions rejected because the queue is full', ('priority',),
+    registry=registry
+)
+admission_reserved = CollectedMetric(
+    GaugeMetricFamily, 'driver_admission_reserved', 'Memory (in bytes) and CPU slots reserved by admitted submissions',
+    ('resource',), _collect_admission_reserved, registry
+)
+submissions_in_progress = Gauge('driver_submissions_in_progress', 'Submissions being processed', registry=registry)
+tests_queued = Gauge('driver_tests_queued', 'Test cases waiting for `HOST_CPU_BUDGET` slot', registry=registry)
+pool_containers = CollectedMetric(
+    GaugeMetricFamily, 'driver_pool_containers', 'Containers of the pool', ('image', 'memory_limit', 'state'),
+    _collect_pool_containers, registry
+)
+pool_waiting = CollectedMetric(
+    GaugeMetricFamily, 'driver_pool_waiting_leases', 'Leases waiting for a container of the pool',
+    ('image', 'memory_limit'), _collect_pool_waiting, registry
+)
+reaped_containers = CollectedMetric(
+    CounterMetricFamily, 'driver_reaped_containers_total', 'Leaked containers removed by the reaper', ('reason',),
+    _collect_reaped_containers, registry
+)
+host_leases = CollectedMetric(
+    GaugeMetricFamily, 'driver_host_leased_sandboxes', 'Sandboxes leased on each of `DOCKER_HOSTS`',
+    ('host', 'healthy'), _collect_host_leases, registry
+)
+
+
+def render() -> bytes:
+    """Returns all metrics in the text format of Prometheus"""
+    return generate_latest(registry)
+
+
+def language_label(language: ProgrammingLanguage) -> str:
+    return language.name.lower()
+
+
+def verdict_label(result: ProcessedContainerExecutionResult) -> str:
+    """Returns verdict of the checked test case, error message of the failed one or `SUCCESS`"""
+    return result.verdict or result.error_message or SUCCESS
+
+
+def submission_verdict_label(verdicts: t.Sequence[str]) -> str:
+    """Returns the first verdict that isn't successful, otherwise the common one of successful test cases"""
+    # Skipped test cases are caused by other failures, which determine the verdict of the submission
+    verdicts = [verdict for verdict in verdicts if verdict != Verdict.SKIPPED.value]
+    for verdict in verdicts:
+        if verdict not in (SUCCESS, Verdict.ACCEPTED.value):
+            return verdict
+    return verdicts[-1] if verdicts else SUCCESS
+
+
+def rejudge_verdict_label(result: RejudgeResult) -> str:
+    """Returns verdict of the rejudged submission, an error that has interrupted it is an unknown error"""
+    verdicts = [verdict_label(test_result) for test_result in result.results]
+    if result.error is not None:
+        verdicts.append(DriverError.UNKNOWN_ERROR.value.message)
+    return submission_verdict_label(verdicts)
+
+
+def observe_phases(durations: t.Mapping[Phase, t.Sequence[float]], language: str, verdict: str) -> None:
+    for phase, phase_durations in durations.items():
+        for duration in phase_durations:
+            phase_duration.labels(phase=phase.value, language=language, verdict=verdict).observe(duration)
@@ -0,0 +1,45 @@
+import typing as t
+
+from prometheus_client.metrics_core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector, CollectorRegistry
+
+# Returns current values of a metric (labels -> value), it is invoked on every scrape
+Values: t.TypeAlias = t.Callable[[], t.Iterable[t.Tuple[t.Mapping[str, str], float]]]
+
+# Upper bounds of buckets of histograms in seconds, from creation of files to compilation of heavy programs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class CollectedMetric(Collector):
+    """
+    Counter or gauge whose values are read from `values` on every scrape instead of being changed directly,
+    e.g. statistics of the pool or of the admission controller
+    """
+
+    def __init__(
+            self,
+            family: t.Type[t.Union[CounterMetricFamily, GaugeMetricFamily]],
+            name: str,
+            documentation: str,
+            labels: t.Sequence[str],
+            values: Values,
+            registry: CollectorRegistry
+    ):
+        self.__family = family
+        self.__name = name
+        self.__documentation = documentation
+        self.__labels = tuple(labels)
+        self.__values = values
+        registry.register(self)
+
+    def describe(self) -> t.Iterable[Metric]:
+        # Values are not collected on registration
+        return [self.__family(self.__name, self.__documentation, labels=self.__labels)]
+
+    def collect(self) -> t.Iterable[Metric]:
+        metric = self.__family(self.__name, self.__documentation, labels=self.__labels)
+        for labels, value in self.__values():
+            if set(labels) != set(self.__labels):
+                raise ValueError(f'Metric {self.__name} has labels {self.__labels}, got {tuple(labels)}!')
+            metric.add_metric([str(labels[name]) for name in self.__labels], value)
+        return [metric]
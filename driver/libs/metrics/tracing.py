@@ -0,0 +1,27 @@
+import contextlib
+import typing as t
+
+from driver.config import TRACING
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    # Tracing is an optional feature (`tracing` extra), spans are not created without OpenTelemetry
+    trace = None  # type: ignore[assignment]
+
+# Values of attributes of spans that OpenTelemetry accepts
+AttributeValue: t.TypeAlias = t.Union[str, bool, int, float]
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: AttributeValue) -> t.Iterator[None]:
+    """
+    Wraps the enclosed code in a span of OpenTelemetry, if `TRACING` is enabled and OpenTelemetry is installed.
+    Spans are exported by the SDK that is configured by the application (without it they are no-op)
+    """
+    if not TRACING or trace is None:
+        yield
+        return
+
+    with trace.get_tracer('driver').start_as_current_span(name, attributes=attributes):
+        yield
@@ -0,0 +1,64 @@
+import contextlib
+import contextvars
+import threading
+import time
+import typing as t
+from collections import defaultdict
+
+from driver.libs.enums import Phase
+
+# Recorders can be nested (e.g. per submission and per test case), each of them gets all measurements
+_active_recorders: contextvars.ContextVar[t.Tuple['PhaseRecorder', ...]] = contextvars.ContextVar(
+    'active_recorders', default=()
+)
+
+
+class PhaseRecorder:
+    """
+    Collects durations of phases of requests, which are measured by `measure_phase` while the recorder is active.
+    Threads and tasks started from the active context (e.g. via `asyncio.to_thread`) report to the same recorder
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__durations: t.DefaultDict[Phase, t.List[float]] = defaultdict(list)
+
+    @property
+    def durations(self) -> t.Dict[Phase, t.List[float]]:
+        """Durations of each phase in seconds, in order of completion"""
+        with self.__lock:
+            return {phase: list(durations) for phase, durations in self.__durations.items()}
+
+    def add(self, phase: Phase, duration: float) -> None:
+        with self.__lock:
+            self.__durations[phase].append(duration)
+
+    @contextlib.contextmanager
+    def activate(self) -> t.Iterator['PhaseRecorder']:
+        token = _active_recorders.set((*_active_recorders.get(), self))
+        try:
+            yield self
+        finally:
+            try:
+                _active_recorders.reset(token)
+            except ValueError:
+                # Async generator that has activated the recorder is closed in another context
+                # (e.g. by the garbage collector), which has never seen the recorder
+                pass
+
+
+@contextlib.contextmanager
+def measure_phase(phase: Phase) -> t.Iterator[None]:
+    """Measures duration of the enclosed code. Does nothing if there are no active recorders"""
+    recorders = _active_recorders.get()
+    if not recorders:
+        yield
+        return
+
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started_at
+        for recorder in recorders:
+            recorder.add(phase, duration)
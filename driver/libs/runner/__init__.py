@@ -0,0 +1,473 @@
+import asyncio
+import contextlib
+import typing as t
+from dataclasses import dataclass
+from pathlib import Path
+
+from docker.errors import DockerException
+from docker.utils import parse_bytes
+
+from driver.config import HOST_CPU_BUDGET, OUTPUT_LIMIT, RESULT_CACHE_TIME_MARGIN
+from driver.libs import metrics
+from driver.libs.cache import ResultCache, result_cache
+from driver.libs.checkers import DEFAULT_FLOAT_EPSILON, Checker, CheckersFactory
+from driver.libs.containers import ContainersFactory, CoreAllocator, _BaseContainer
+from driver.libs.enums import CheckerMode, DriverError, ParallelismMode, ProgrammingLanguage, Verdict
+from driver.libs.files import create_file_creator
+from driver.libs.profiling import PhaseRecorder
+from driver.libs.types import (
+    AdmissionRequest,
+    BatchCodeExecutionCommandOptions,
+    CodeExecutionCommandOptions,
+    Filename,
+    ProcessedContainerExecutionResult,
+    Stdin,
+)
+
+# Results with these errors are never cached, since they depend on load of the host rather than on the program
+_NONDETERMINISTIC_ERRORS = frozenset({
+    DriverError.TIME_LIMIT_EXCEEDED.value.message,
+    DriverError.UNKNOWN_ERROR.value.message,
+})
+
+# Limits number of test cases that are executed simultaneously on the host
+cpu_budget = asyncio.Semaphore(HOST_CPU_BUDGET)
+
+
+@contextlib.asynccontextmanager
+async def _take_cpu_slot(allocator: CoreAllocator) -> t.AsyncIterator[t.Optional[int]]:
+    """
+    Takes a slot of `cpu_budget`, test cases that are waiting for it are counted by `metrics.tests_queued`.
+    If CPU pinning is enabled, a dedicated core of the host of the container is taken first (so test cases that
+    wait for cores of a busy host don't take slots of other hosts), and it is yielded
+    """
+    with metrics.tests_queued.track_inprogress():
+        core = await allocator.atake()
+        try:
+            await cpu_budget.acquire()
+        except BaseException:
+            if core is not None:
+                allocator.give_back(core)
+            raise
+    try:
+        yield core
+    finally:
+        if core is not None:
+            allocator.give_back(core)
+        cpu_budget.release()
+
+
+@dataclass(frozen=True)
+class _Source:
+    filename: Filename
+    # Content of the file, if it must be uploaded to containers
+    content: t.Optional[bytes]
+    # Hash of source code, which is a part of keys of `result_cache`
+    digest: str
+
+
+@dataclass(frozen=True)
+class _TestCase:
+    stdin: Stdin
+    expected_output: t.Optional[Stdin]
+
+
+def _read(content: Stdin) -> bytes:
+    """Returns content of input or expected output, reading the file if path is passed"""
+    if isinstance(content, Path):
+        return content.read_bytes()
+    return content.encode() if isinstance(content, str) else content
+
+
+def _cache_key_part(content: t.Optional[Stdin]) -> bytes:
+    if content is None:
+        return b''
+    # Files are referenced by their paths instead of being read, since files of test sets are content-addressed
+    if isinstance(content, Path):
+        return f'path:{content}'.encode()
+    return b'content:' + (content.encode() if isinstance(content, str) else content)
+
+
+def _is_failure(result: ProcessedContainerExecutionResult) -> bool:
+    return bool(result.error_message) or result.verdict == Verdict.WRONG_ANSWER.value
+
+
+def _skipped_result() -> ProcessedContainerExecutionResult:
+    return ProcessedContainerExecutionResult(
+        exit_code=0, output='', execution_time=0, error_message='', verdict=Verdict.SKIPPED.value
+    )
+
+
+class _FailureLimit:
+    """Counts failed test cases, remaining test cases are skipped once `max_failures` of them have failed"""
+
+    def __init__(self, max_failures: t.Optional[int]):
+        self.__max_failures = max_failures
+        self.__failures = 0
+
+    @property
+    def reached(self) -> bool:
+        return self.__max_failures is not None and self.__failures >= self.__max_failures
+
+    def observe(self, result: ProcessedContainerExecutionResult) -> None:
+        if _is_failure(result):
+            self.__failures += 1
+
+
+# Callback that saves result of the test case with passed index
+_Publish: t.TypeAlias = t.Callable[[int, ProcessedContainerExecutionResult], None]
+
+
+class SubmissionRunner:
+    """Executes source code against every test case of a submission"""
+
+    def __init__(
+            self,
+            language: ProgrammingLanguage,
+            time_limit: int,
+            memory_limit: str,
+            parallelism: int = 1,
+            mode: ParallelismMode = ParallelismMode.SEQUENTIAL,
+            output_limit: int = OUTPUT_LIMIT,
+            checker_mode: CheckerMode = CheckerMode.TOKENS,
+            float_epsilon: float = DEFAULT_FLOAT_EPSILON,
+            batch: bool = False,
+            max_failures: t.Optional[int] = None
+    ):
+        """
+        :param parallelism: How many test cases of the submission can be executed at the same time
+        :param mode: How test cases are distributed if `parallelism` is greater than 1
+        :param output_limit: Maximum size of output of a single test case in bytes
+        :param checker_mode: How output is compared with the expected one (if expected outputs are passed)
+        :param float_epsilon: Absolute or relative error of numbers in `CheckerMode.FLOAT`
+        :param batch: Whether all test cases are executed one by one in a single exec (see `execute_batch`)
+        :param max_failures: Number of failed test cases (with an error or "Wrong Answer") after which
+                             the remaining ones are cancelled and reported as "Skipped" (e.g. 1 to stop on
+                             the first failure). All test cases are executed if it is `None`
+        """
+        if parallelism < 1:
+            raise ValueError(f'Parallelism must be positive, got {parallelism}!')
+        if max_failures is not None and max_failures < 1:
+            raise ValueError(f'Maximum number of failures must be positive, got {max_failures}!')
+        if batch and parallelism > 1:
+            raise ValueError('Batch mode executes test cases one by one, so parallelism can\'t be used with it!')
+        try:
+            self.__memory_limit_bytes = parse_bytes(memory_limit)
+        except DockerException as error:
+            raise ValueError(str(error))
+
+        self.__language = language
+        self.__time_limit = time_limit
+        self.__memory_limit = memory_limit
+        self.__parallelism = parallelism
+        self.__mode = mode
+        self.__output_limit = output_limit
+        self.__checker_mode = checker_mode
+        self.__float_epsilon = float_epsilon
+        self.__batch = batch
+        self.__max_failures = max_failures
+
+    def admission_request(self, tests: int) -> AdmissionRequest:
+        """Returns resources that are used by the submission with passed number of test cases at most"""
+        workers = max(1, min(self.__parallelism, tests))
+        if self.__batch or self.__mode is ParallelismMode.SEQUENTIAL:
+            workers = 1
+        # Only in `ParallelismMode.CONTAINERS` each worker leases its own container
+        containers = workers if self.__mode is ParallelismMode.CONTAINERS else 1
+        return AdmissionRequest(memory=self.__memory_limit_bytes * containers, cpu_slots=workers)
+
+    async def run(
+            self,
+            source_code: str,
+            stdin_list: t.Sequence[Stdin],
+            expected_outputs: t.Optional[t.Sequence[Stdin]] = None,
+            container: t.Optional[_BaseContainer] = None
+    ) -> t.List[ProcessedContainerExecutionResult]:
+        """Returns results in the same order as `stdin_list`, regardless of parallelism mode"""
+        return [result async for result in self.iter_results(source_code, stdin_list, expected_outputs, container)]
+
+    async def iter_results(
+            self,
+            source_code: str,
+            stdin_list: t.Sequence[Stdin],
+            expected_outputs: t.Optional[t.Sequence[Stdin]] = None,
+            container: t.Optional[_BaseContainer] = None
+    ) -> t.AsyncIterator[ProcessedContainerExecutionResult]:
+        """
+        Yields results in the same order as `stdin_list`.
+        Each result is yielded as soon as it and all the previous ones are ready
+
+        :param stdin_list: Inputs of test cases: their contents or paths to files on the host (e.g. of a stored test set),
+                           which are streamed to containers without being loaded into memory
+
+        :param expected_outputs: Expected outputs of test cases (contents or paths as well). If they are passed,
+                                 outputs are checked while they arrive, and only verdicts are returned
+        :param container: Already leased container of the language, which is used instead of leasing a new one
+                          (except for `ParallelismMode.CONTAINERS`). Files of the source are removed from it afterwards
+        """
+        if expected_outputs is not None and len(expected_outputs) != len(stdin_list):
+            raise ValueError(
+                f'Number of expected outputs ({len(expected_outputs)}) '
+                f'differs from number of test cases ({len(stdin_list)})!'
+            )
+        tests = [
+            _TestCase(stdin, None if expected_outputs is None else expected_outputs[index])
+            for index, stdin in enumerate(stdin_list)
+        ]
+
+        language = metrics.language_label(self.__language)
+        verdicts: t.List[str] = []
+        recorder = PhaseRecorder()
+        with recorder.activate(), metrics.span('submission', language=language, tests=len(tests)):
+            try:
+                # Containers of the submission are released as soon as consumer stops iterating
+                async with contextlib.aclosing(self.__iter_results(source_code, tests, container)) as results:
+                    async for result in results:
+                        verdict = metrics.verdict_label(result)
+                        metrics.tests_total.labels(language=language, verdict=verdict).inc()
+                        verdicts.append(verdict)
+                        yield result
+            except Exception:
+                verdicts.append(DriverError.UNKNOWN_ERROR.value.message)
+                raise
+            finally:
+                submission_verdict = metrics.submission_verdict_label(verdicts)
+                metrics.submissions_total.labels(language=language, verdict=submission_verdict).inc()
+                # Phases of test cases are observed by `__execute`, except for the batch mode
+                durations = {
+                    phase: phase_durations for phase, phase_durations in recorder.durations.items()
+                    if self.__batch or phase not in metrics.TEST_PHASES
+                }
+                metrics.observe_phases(durations, language, submission_verdict)
+
+    async def __iter_results(
+            self,
+            source_code: str,
+            tests: t.Sequence[_TestCase],
+            leased_container: t.Optional[_BaseContainer]
+    ) -> t.AsyncGenerator[ProcessedContainerExecutionResult, None]:
+        with create_file_creator(source_code, self.__language) as file_creator:
+            source = _Source(file_creator.filename, file_creator.content, ResultCache.build_key(source_code))
+            try:
+                async with contextlib.aclosing(self.__iter_source_results(source, tests, leased_container)) as results:
+                    async for result in results:
+                        yield result
+            finally:
+                if leased_container is not None:
+                    await leased_container.aremove_source(source.filename)
+
+    async def __iter_source_results(
+            self,
+            source: _Source,
+            tests: t.Sequence[_TestCase],
+            leased_container: t.Optional[_BaseContainer]
+    ) -> t.AsyncGenerator[ProcessedContainerExecutionResult, None]:
+        workers = min(self.__parallelism, len(tests))
+        failure_limit = _FailureLimit(self.__max_failures)
+
+        if self.__batch:
+            executed = 0
+            async with self.__lease_container(leased_container, source) as container:
+                # Batch exec is stopped as soon as the generator is closed
+                async with contextlib.aclosing(self.__execute_batch(container, source, tests)) as results:
+                    async for result in results:
+                        failure_limit.observe(result)
+                        executed += 1
+                        yield result
+                        if failure_limit.reached:
+                            break
+            for _ in range(len(tests) - executed):
+                yield _skipped_result()
+            return
+
+        if self.__mode is ParallelismMode.SEQUENTIAL or workers <= 1:
+            async with self.__lease_container(leased_container, source) as container:
+                for test in tests:
+                    if failure_limit.reached:
+                        yield _skipped_result()
+                        continue
+                    result = await self.__execute(container, source, test)
+                    failure_limit.observe(result)
+                    yield result
+            return
+
+        loop = asyncio.get_running_loop()
+        futures: t.List[asyncio.Future[ProcessedContainerExecutionResult]] = [
+            loop.create_future() for _ in tests
+        ]
+
+        def publish(index: int, result: ProcessedContainerExecutionResult) -> None:
+            if futures[index].done():
+                # Test case has already been skipped
+                return
+            futures[index].set_result(result)
+            failure_limit.observe(result)
+            if failure_limit.reached:
+                # Test cases that are queued or still running are reported at once, and the producer is cancelled
+                for future in futures:
+                    if not future.done():
+                        future.set_result(_skipped_result())
+
+        if self.__mode is ParallelismMode.EXEC_SESSIONS:
+            async with self.__lease_container(leased_container, source) as container:
+                producer = self.__run_in_exec_sessions(container, source, tests, workers, publish)
+                async for result in self.__iter_in_order(futures, producer, failure_limit):
+                    yield result
+        else:
+            producer = self.__run_in_containers(source, tests, workers, publish)
+            async for result in self.__iter_in_order(futures, producer, failure_limit):
+                yield result
+
+    @staticmethod
+    async def __iter_in_order(
+            futures: t.Sequence['asyncio.Future[ProcessedContainerExecutionResult]'],
+            producer: t.Coroutine[t.Any, t.Any, None],
+            failure_limit: _FailureLimit
+    ) -> t.AsyncIterator[ProcessedContainerExecutionResult]:
+        """
+        Runs `producer` in background and yields results it publishes in order of their indexes.
+        Once the failure limit is reached, the producer is cancelled
+        """
+        task: asyncio.Future[t.Any] = asyncio.create_task(producer)
+        try:
+            for future in futures:
+                if failure_limit.reached:
+                    # Remaining results are skipped, so test cases that are still running are cancelled right away
+                    task.cancel()
+                await asyncio.wait([future, task], return_when=asyncio.FIRST_COMPLETED)
+                if not future.done():
+                    # Producer has finished without publishing this result, so it must have failed
+                    task.result()
+                    raise RuntimeError('Test case was not executed!')
+                yield future.result()
+            if not failure_limit.reached:
+                await task
+        finally:
+            # Stopping the producer if consumer is not interested in results anymore
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def __run_in_exec_sessions(
+            self,
+            container: _BaseContainer,
+            source: _Source,
+            tests: t.Sequence[_TestCase],
+            workers: int,
+            publish: _Publish
+    ) -> None:
+        sessions = asyncio.Semaphore(workers)
+
+        async def execute(index: int) -> None:
+            async with sessions:
+                publish(index, await self.__execute(container, source, tests[index]))
+
+        await asyncio.gather(*(execute(index) for index in range(len(tests))))
+
+    async def __run_in_containers(
+            self,
+            source: _Source,
+            tests: t.Sequence[_TestCase],
+            workers: int,
+            publish: _Publish
+    ) -> None:
+        """Each worker leases its own container and takes next test cases from the shared iterator"""
+        indexes = iter(range(len(tests)))
+
+        async def worker() -> None:
+            async with self.__create_container(source) as container:
+                for index in indexes:
+                    publish(index, await self.__execute(container, source, tests[index]))
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    def __lease_container(
+            self,
+            container: t.Optional[_BaseContainer],
+            source: _Source
+    ) -> t.AsyncContextManager[_BaseContainer]:
+        """Leases a new container, unless the already leased one is passed"""
+        if container is not None:
+            return contextlib.nullcontext(container)
+        return self.__create_container(source)
+
+    def __create_container(self, source: _Source) -> _BaseContainer:
+        """Returns container that is leased where the source has already been compiled, if there is such a host"""
+        Container = ContainersFactory.get(self.__language)
+        container = Container(self.__time_limit, self.__memory_limit, self.__output_limit)
+        container.set_affinity(source.digest)
+        return container
+
+    def __create_checker(self, test: _TestCase) -> t.Optional[Checker]:
+        if test.expected_output is None:
+            return None
+        return CheckersFactory.create(self.__checker_mode, _read(test.expected_output), self.__float_epsilon)
+
+    async def __execute_batch(
+            self,
+            container: _BaseContainer,
+            source: _Source,
+            tests: t.Sequence[_TestCase]
+    ) -> t.AsyncGenerator[ProcessedContainerExecutionResult, None]:
+        # Test cases of the batch are executed one by one, so the whole batch takes a single slot
+        async with _take_cpu_slot(container.core_allocator) as core:
+            execution_options = BatchCodeExecutionCommandOptions(
+                filename=source.filename,
+                stdin_list=[test.stdin for test in tests],
+                checkers=[self.__create_checker(test) for test in tests],
+                source_code=source.content,
+                cpu_core=core,
+            )
+            async with contextlib.aclosing(container.aiter_batch(options=execution_options)) as results:
+                async for result in results:
+                    yield result
+
+    async def __execute(
+            self,
+            container: _BaseContainer,
+            source: _Source,
+            test: _TestCase
+    ) -> ProcessedContainerExecutionResult:
+        cache_key = self.__result_cache_key(container, source, test) if result_cache.enabled else None
+        if cache_key is not None:
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                # The program hasn't been executed this time
+                cached.cpu_core = None
+                return cached
+
+        language = metrics.language_label(self.__language)
+        with PhaseRecorder().activate() as recorder, metrics.span('test', language=language):
+            async with _take_cpu_slot(container.core_allocator) as core:
+                execution_options = CodeExecutionCommandOptions(
+                    filename=source.filename,
+                    stdin=test.stdin,
+                    checker=self.__create_checker(test),
+                    source_code=source.content,
+                    cpu_core=core,
+                )
+                result = await container.aexecute(options=execution_options)
+
+        durations = {
+            phase: phase_durations for phase, phase_durations in recorder.durations.items()
+            if phase in metrics.TEST_PHASES
+        }
+        metrics.observe_phases(durations, language, metrics.verdict_label(result))
+        if cache_key is not None and self.__is_deterministic(result):
+            result_cache.put(cache_key, result)
+        return result
+
+    def __result_cache_key(self, container: _BaseContainer, source: _Source, test: _TestCase) -> str:
+        return ResultCache.build_key(
+            self.__language.name, container.image_id, source.digest, _cache_key_part(test.stdin),
+            f'{self.__checker_mode.value} {self.__float_epsilon}', _cache_key_part(test.expected_output),
+            f'{self.__time_limit} {self.__memory_limit} {self.__output_limit}',
+        )
+
+    def __is_deterministic(self, result: ProcessedContainerExecutionResult) -> bool:
+        """Whether the same result is expected if the test case is executed again"""
+        if result.error_message in _NONDETERMINISTIC_ERRORS:
+            return False
+        # Verdicts of programs that are close to the time limit depend on load of the host
+        spent_time = max(result.execution_time, result.cpu_time, result.wall_time)
+        return spent_time < self.__time_limit * RESULT_CACHE_TIME_MARGIN
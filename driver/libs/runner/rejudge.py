@@ -0,0 +1,163 @@
+import asyncio
+import typing as t
+
+from docker.utils import parse_bytes
+
+from driver.config import OUTPUT_LIMIT
+from driver.libs import metrics
+from driver.libs.checkers import DEFAULT_FLOAT_EPSILON
+from driver.libs.containers import ContainersFactory, _BaseContainer
+from driver.libs.enums import CheckerMode, ProgrammingLanguage
+from driver.libs.runner import SubmissionRunner
+from driver.libs.types import AdmissionRequest, ProcessedContainerExecutionResult, RejudgeResult, Stdin
+
+# Language and source code of a submission
+SubmissionSource: t.TypeAlias = t.Tuple[ProgrammingLanguage, str]
+
+
+def _group(submissions: t.Mapping[str, SubmissionSource]) -> t.Dict[ProgrammingLanguage, t.Dict[str, t.List[str]]]:
+    """Returns distinct sources of each language and ids of submissions with each of them"""
+    groups: t.Dict[ProgrammingLanguage, t.Dict[str, t.List[str]]] = {}
+    for submission_id, (language, source_code) in submissions.items():
+        groups.setdefault(language, {}).setdefault(source_code, []).append(submission_id)
+    return groups
+
+
+class RejudgeRunner:
+    """
+    Executes many submissions against the same test cases
+
+    Submissions are grouped by language, and each group leases its own containers, which execute distinct sources
+    one after another (so containers are not leased and reset for every submission). A container is replaced once
+    execution of a source fails with an error, since the container itself may be broken. Identical sources are executed
+    once, and their results are shared by all their submissions. Groups are executed in parallel
+    """
+
+    def __init__(
+            self,
+            time_limit: int,
+            memory_limit: str,
+            parallelism: int = 1,
+            output_limit: int = OUTPUT_LIMIT,
+            checker_mode: CheckerMode = CheckerMode.TOKENS,
+            float_epsilon: float = DEFAULT_FLOAT_EPSILON,
+            batch: bool = False,
+            max_failures: t.Optional[int] = None
+    ):
+        """
+        :param parallelism: How many containers of each language execute sources at the same time
+        Other parameters are the same as parameters of `SubmissionRunner`
+        """
+        if parallelism < 1:
+            raise ValueError(f'Parallelism must be positive, got {parallelism}!')
+        # Options are validated the same way as for a single submission
+        SubmissionRunner(
+            ProgrammingLanguage.PYTHON, time_limit, memory_limit, output_limit=output_limit, batch=batch,
+            max_failures=max_failures
+        )
+
+        self.__time_limit = time_limit
+        self.__memory_limit = memory_limit
+        self.__parallelism = parallelism
+        self.__output_limit = output_limit
+        self.__checker_mode = checker_mode
+        self.__float_epsilon = float_epsilon
+        self.__batch = batch
+        self.__max_failures = max_failures
+
+    def admission_request(self, submissions: t.Mapping[str, SubmissionSource]) -> AdmissionRequest:
+        """Returns resources that are used by the rejudge at most: containers of all groups"""
+        containers = sum(min(self.__parallelism, len(sources)) for sources in _group(submissions).values())
+        return AdmissionRequest(memory=parse_bytes(self.__memory_limit) * containers, cpu_slots=max(1, containers))
+
+    async def iter_results(
+            self,
+            submissions: t.Mapping[str, SubmissionSource],
+            stdin_list: t.Sequence[Stdin],
+            expected_outputs: t.Optional[t.Sequence[Stdin]] = None
+    ) -> t.AsyncIterator[RejudgeResult]:
+        """
+        Yields result of each submission as soon as all its test cases are executed, in order of completion
+
+        :param submissions: Key - id of the submission, value - its language and source code
+        """
+        groups = _group(submissions)
+        results: asyncio.Queue[RejudgeResult] = asyncio.Queue()
+        tasks = [
+            asyncio.create_task(self.__run_group(language, sources, stdin_list, expected_outputs, results.put_nowait))
+            for language, sources in groups.items()
+        ]
+        try:
+            for _ in submissions:
+                result = await results.get()
+                language, _ = submissions[result.submission_id]
+                metrics.rejudged_submissions_total.labels(
+                    language=metrics.language_label(language), verdict=metrics.rejudge_verdict_label(result)
+                ).inc()
+                yield result
+        finally:
+            # Stopping groups if consumer is not interested in results anymore
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __run_group(
+            self,
+            language: ProgrammingLanguage,
+            sources: t.Mapping[str, t.Sequence[str]],
+            stdin_list: t.Sequence[Stdin],
+            expected_outputs: t.Optional[t.Sequence[Stdin]],
+            publish: t.Callable[[RejudgeResult], None]
+    ) -> None:
+        """Each worker leases its own container and takes next sources of the group from the shared iterator"""
+        runner = SubmissionRunner(
+            language, self.__time_limit, self.__memory_limit, output_limit=self.__output_limit,
+            checker_mode=self.__checker_mode, float_epsilon=self.__float_epsilon, batch=self.__batch,
+            max_failures=self.__max_failures
+        )
+        pending = iter(sources.items())
+
+        def publish_source(
+                submission_ids: t.Sequence[str],
+                results: t.List[ProcessedContainerExecutionResult],
+                error: t.Optional[str]
+        ) -> None:
+            for submission_id in submission_ids:
+                publish(RejudgeResult(submission_id, results, error))
+
+        async def execute(container: _BaseContainer, source_code: str, submission_ids: t.Sequence[str]) -> bool:
+            """Returns whether the source has been executed without errors of the driver or of the container"""
+            results: t.List[ProcessedContainerExecutionResult] = []
+            try:
+                async for result in runner.iter_results(source_code, stdin_list, expected_outputs, container):
+                    results.append(result)
+            except Exception as error:
+                publish_source(submission_ids, results, str(error) or type(error).__name__)
+                return False
+            publish_source(submission_ids, results, None)
+            return True
+
+        async def execute_in_container() -> bool:
+            """Executes next sources in a new container, returns whether it has been stopped by an error"""
+            Container = ContainersFactory.get(language)
+            async with Container(self.__time_limit, self.__memory_limit, self.__output_limit) as container:
+                for source_code, submission_ids in pending:
+                    if not await execute(container, source_code, submission_ids):
+                        # Container may be broken (e.g. removed, or its host is down), so next sources get a new one
+                        return True
+            return False
+
+        errors: t.List[Exception] = []
+
+        async def worker() -> None:
+            try:
+                while await execute_in_container():
+                    pass
+            except Exception as error:
+                # Container can't be leased, so sources are left to other workers
+                errors.append(error)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.__parallelism, len(sources)))))
+        # All workers have failed to lease containers
+        for _, submission_ids in pending:
+            publish_source(submission_ids, [], str(errors[0]) or type(errors[0]).__name__)
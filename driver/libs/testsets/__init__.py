@@ -0,0 +1,253 @@
+import asyncio
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import threading
+import typing as t
+from collections import OrderedDict
+from pathlib import Path
+
+from driver.config import LOCAL_TEST_SETS_DIR, TEST_SETS_MAX_SIZE
+from driver.libs.types import CacheStats, TestSet, TestSetInfo
+
+
+class TestSetNotFound(KeyError):
+    """Test set has never been uploaded or has been evicted, so it must be uploaded again"""
+
+
+class TestSetStore:
+    """
+    Content-addressed storage of test sets on the host, so inputs are uploaded once and referenced by id
+
+    Each input and expected output is stored as `files/<hash of content>`, so files shared by several test sets
+    (and several test cases) are stored once. Test set is stored as `sets/<id>.json` with hashes of its files,
+    its id is hash of this list, so uploading the same test set again returns the same id.
+    When total size of files exceeds `max_size`, least recently used test sets are evicted,
+    except for the ones that are being used by executions. Files are written outside of the lock of the index,
+    so uploads of large test sets don't block leases of other ones
+    """
+
+    def __init__(self, directory: Path, max_size: int):
+        """
+        :param directory: Directory on the host where test sets are stored
+        :param max_size: Maximum total size of stored files in bytes
+        """
+        self.__directory = directory
+        self.__max_size = max_size
+        self.__lock = threading.Lock()
+        # Key - id of the test set, value - hashes of its inputs and expected outputs.
+        # The most recently used test sets are at the end
+        self.__sets: t.Optional[OrderedDict[str, t.Tuple[t.List[str], t.Optional[t.List[str]]]]] = None
+        # Key - hash of the file, value - its size in bytes and number of references from test sets
+        self.__files: t.Dict[str, t.List[int]] = {}
+        self.__size = 0
+        # Key - id of the test set, value - number of executions that use it
+        self.__leases: t.Dict[str, int] = {}
+
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def put(self, inputs: t.Sequence[bytes], expected_outputs: t.Optional[t.Sequence[bytes]] = None) -> TestSetInfo:
+        """Stores test set (files that are already stored are not written again) and returns its id"""
+        if expected_outputs is not None and len(expected_outputs) != len(inputs):
+            raise ValueError(
+                f'Number of expected outputs ({len(expected_outputs)}) differs from number of inputs ({len(inputs)})!'
+            )
+        size = sum(len(content) for content in inputs) + sum(len(content) for content in expected_outputs or ())
+        if size > self.__max_size:
+            raise ValueError(f'Test set takes {size} bytes, but only {self.__max_size} bytes can be stored!')
+
+        input_hashes = [hashlib.sha256(content).hexdigest() for content in inputs]
+        output_hashes = None if expected_outputs is None else [
+            hashlib.sha256(content).hexdigest() for content in expected_outputs
+        ]
+        manifest = json.dumps({'inputs': input_hashes, 'expected_outputs': output_hashes}).encode()
+        test_set_id = hashlib.sha256(manifest).hexdigest()
+
+        # Key - hash of the file, value - its content
+        contents = dict(zip(input_hashes + (output_hashes or []), [*inputs, *(expected_outputs or ())]))
+        while True:
+            with self.__lock:
+                sets = self.__load()
+                if test_set_id in sets:
+                    sets.move_to_end(test_set_id)
+                    return self.__info(test_set_id)
+                missing = [file_hash for file_hash in contents if not self.__file_path(file_hash).exists()]
+                if not missing:
+                    # Manifest is written last, so test set without some of its files is never loaded
+                    self.__write(self.__set_path(test_set_id), manifest)
+                    self.__add(test_set_id, input_hashes, output_hashes)
+                    # New test set is kept even if leased ones take all the space, they are evicted once released
+                    self.__evict(keep=test_set_id)
+                    return self.__info(test_set_id)
+
+            # Files are content-addressed, so the same file may be written by several uploads at the same time.
+            # Stored files may be evicted before the test set is added, so they are checked again under the lock
+            for file_hash in missing:
+                self.__write(self.__file_path(file_hash), contents[file_hash])
+
+    def info(self, test_set_id: str) -> TestSetInfo:
+        with self.__lock:
+            if test_set_id not in self.__load():
+                raise TestSetNotFound(test_set_id)
+            return self.__info(test_set_id)
+
+    @contextlib.contextmanager
+    def lease(self, test_set_id: str) -> t.Iterator[TestSet]:
+        """
+        Returns paths of files of the test set, which is not evicted until the lease is over
+
+        :raises TestSetNotFound: If the test set is not stored
+        """
+        test_set = self.__acquire(test_set_id)
+        try:
+            yield test_set
+        finally:
+            self.__release(test_set_id)
+
+    @contextlib.asynccontextmanager
+    async def alease(self, test_set_id: str) -> t.AsyncIterator[TestSet]:
+        """Async version of `lease`, the index is loaded and files are evicted outside of the event loop"""
+        # Lease is acquired even if the task is cancelled while it waits, so it is shielded and released afterwards
+        acquired = asyncio.ensure_future(asyncio.to_thread(self.__acquire, test_set_id))
+        try:
+            test_set = await asyncio.shield(acquired)
+        except asyncio.CancelledError:
+            acquired.add_done_callback(functools.partial(self.__release_acquired, test_set_id))
+            raise
+        try:
+            yield test_set
+        finally:
+            await asyncio.to_thread(self.__release, test_set_id)
+
+    def stats(self) -> CacheStats:
+        with self.__lock:
+            sets = self.__load()
+            return CacheStats(
+                hits=self.__hits,
+                misses=self.__misses,
+                evictions=self.__evictions,
+                entries=len(sets),
+                size=self.__size,
+            )
+
+    def __acquire(self, test_set_id: str) -> TestSet:
+        with self.__lock:
+            sets = self.__load()
+            if test_set_id not in sets:
+                self.__misses += 1
+                raise TestSetNotFound(test_set_id)
+            sets.move_to_end(test_set_id)
+            self.__hits += 1
+            self.__leases[test_set_id] = self.__leases.get(test_set_id, 0) + 1
+            input_hashes, output_hashes = sets[test_set_id]
+
+        return TestSet(
+            test_set_id=test_set_id,
+            inputs=[self.__file_path(file_hash) for file_hash in input_hashes],
+            expected_outputs=None if output_hashes is None else [
+                self.__file_path(file_hash) for file_hash in output_hashes
+            ],
+        )
+
+    def __release(self, test_set_id: str) -> None:
+        with self.__lock:
+            self.__leases[test_set_id] -= 1
+            if not self.__leases[test_set_id]:
+                del self.__leases[test_set_id]
+            self.__evict()
+
+    def __release_acquired(self, test_set_id: str, acquired: 'asyncio.Future[TestSet]') -> None:
+        """Releases the lease that has been acquired after its waiter was cancelled"""
+        if not acquired.cancelled() and acquired.exception() is None:
+            asyncio.get_running_loop().run_in_executor(None, self.__release, test_set_id)
+
+    def __file_path(self, file_hash: str) -> Path:
+        return self.__directory / 'files' / file_hash
+
+    def __set_path(self, test_set_id: str) -> Path:
+        return self.__directory / 'sets' / f'{test_set_id}.json'
+
+    @staticmethod
+    def __write(path: Path, content: bytes) -> None:
+        # File is renamed after it is written, so partially written files are never used
+        temporary_path = path.with_name(f'.{path.name}.{threading.get_ident()}')
+        temporary_path.write_bytes(content)
+        os.replace(temporary_path, path)
+
+    def __info(self, test_set_id: str) -> TestSetInfo:
+        assert self.__sets is not None
+        input_hashes, output_hashes = self.__sets[test_set_id]
+        hashes = input_hashes + (output_hashes or [])
+        return TestSetInfo(
+            test_set_id=test_set_id,
+            tests=len(input_hashes),
+            size=sum(self.__files[file_hash][0] for file_hash in hashes),
+            has_expected_outputs=output_hashes is not None,
+        )
+
+    def __add(self, test_set_id: str, input_hashes: t.List[str], output_hashes: t.Optional[t.List[str]]) -> None:
+        assert self.__sets is not None
+        # Each distinct file is referenced once by the test set
+        file_hashes = set(input_hashes + (output_hashes or []))
+        # Sizes of new files are read before the index is changed, since some of the files may be missing
+        new_files = {
+            file_hash: self.__file_path(file_hash).stat().st_size
+            for file_hash in file_hashes if file_hash not in self.__files
+        }
+        for file_hash, size in new_files.items():
+            self.__files[file_hash] = [size, 0]
+            self.__size += size
+        for file_hash in file_hashes:
+            self.__files[file_hash][1] += 1
+        self.__sets[test_set_id] = (input_hashes, output_hashes)
+
+    def __load(self) -> 'OrderedDict[str, t.Tuple[t.List[str], t.Optional[t.List[str]]]]':
+        """Builds index of test sets that were stored by previous runs (oldest ones first)"""
+        if self.__sets is not None:
+            return self.__sets
+
+        (self.__directory / 'files').mkdir(parents=True, exist_ok=True)
+        (self.__directory / 'sets').mkdir(parents=True, exist_ok=True)
+        self.__sets = OrderedDict()
+        manifest_paths = sorted((self.__directory / 'sets').glob('*.json'), key=lambda path: path.stat().st_mtime)
+        for manifest_path in manifest_paths:
+            try:
+                manifest = json.loads(manifest_path.read_bytes())
+                self.__add(manifest_path.stem, manifest['inputs'], manifest['expected_outputs'])
+            except (OSError, ValueError, KeyError):
+                # Test set is broken (e.g. some of its files were removed by someone else)
+                manifest_path.unlink(missing_ok=True)
+
+        self.__evict()
+        return self.__sets
+
+    def __evict(self, keep: t.Optional[str] = None) -> None:
+        assert self.__sets is not None
+        evictable = (
+            test_set_id for test_set_id in list(self.__sets)
+            if test_set_id not in self.__leases and test_set_id != keep
+        )
+        while self.__size > self.__max_size:
+            test_set_id = next(evictable, None)
+            if test_set_id is None:
+                return
+            self.__remove(test_set_id)
+            self.__evictions += 1
+
+    def __remove(self, test_set_id: str) -> None:
+        assert self.__sets is not None
+        input_hashes, output_hashes = self.__sets.pop(test_set_id)
+        self.__set_path(test_set_id).unlink(missing_ok=True)
+        for file_hash in set(input_hashes + (output_hashes or [])):
+            self.__files[file_hash][1] -= 1
+            if not self.__files[file_hash][1]:
+                size, _ = self.__files.pop(file_hash)
+                self.__size -= size
+                self.__file_path(file_hash).unlink(missing_ok=True)
+
+
+test_set_store = TestSetStore(directory=LOCAL_TEST_SETS_DIR, max_size=TEST_SETS_MAX_SIZE)
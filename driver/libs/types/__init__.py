@@ -1,5 +1,19 @@
-from .driver_base import ExecutableCommand, Filename
-from .driver_compilation import CompiledFileData
+from .driver_admission import AdmissionRequest, AdmissionStats
+from .driver_base import ExecutableCommand, Filename, Stdin
+from .driver_cache import CacheStats
+from .driver_compilation import CachedCompilation, CompiledFileData
 from .driver_error_data import DriverErrorData
-from .driver_execution import CodeExecutionCommandOptions, ProcessedContainerExecutionResult
+from .driver_execution import (
+    BatchCodeExecutionCommandOptions,
+    CodeExecutionCommandOptions,
+    ExecutionStats,
+    ProcessedContainerExecutionResult,
+)
+from .driver_hosts import DockerHostConfig, HostStats
+from .driver_images import DerivedImage
+from .driver_jobs import JobState
+from .driver_pool import PoolStats
+from .driver_rejudge import RejudgeResult, RejudgeSubmission
+from .driver_testsets import TestSet, TestSetInfo
+from .driver_wire import BinaryExecutionRequest
 from .programming_langiages_data import ProgrammingLanguageData
@@ -0,0 +1,22 @@
+import typing as t
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class AdmissionRequest:
+    # Total memory limit of containers of the submission in bytes
+    memory: int
+    # Maximum number of test cases of the submission that are executed at the same time
+    cpu_slots: int
+
+
+@dataclass
+class AdmissionStats:
+    # Capacity of the host and resources reserved by admitted submissions
+    memory_capacity: int
+    reserved_memory: int
+    cpu_slots: int
+    reserved_cpu_slots: int
+    admitted: int
+    # Key - value of `SubmissionPriority` enum, value - number of submissions waiting for admission
+    queued: t.Dict[str, int]
@@ -1,4 +1,7 @@
 import typing as t
+from pathlib import Path
 
 Filename: t.TypeAlias = str
 ExecutableCommand: t.TypeAlias = str
+# Input of the program: its content or path to the file on the host that contains it
+Stdin: t.TypeAlias = t.Union[str, bytes, Path]
@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    # Number of stored entries and their total size in bytes
+    entries: int
+    size: int
@@ -1,3 +1,4 @@
+import typing as t
 from dataclasses import dataclass
 
 from docker.models.containers import ExecResult
@@ -9,3 +10,12 @@ from .driver_base import Filename
 class CompiledFileData:
     filename: Filename
     compilation_result: ExecResult
+
+
+@dataclass(frozen=True)
+class CachedCompilation:
+    exit_code: int
+    stdout: bytes
+    stderr: bytes
+    # Compiled binary, `None` if compilation failed
+    binary: t.Optional[bytes]
@@ -1,12 +1,47 @@
+import typing as t
 from dataclasses import dataclass
 
-from .driver_base import Filename
+from .driver_base import Filename, Stdin
+
+if t.TYPE_CHECKING:
+    from driver.libs.checkers import Checker
 
 
 @dataclass(frozen=True)
 class CodeExecutionCommandOptions:
     filename: Filename
-    stdin: str
+    stdin: Stdin
+    # Checker of output. If it is passed, output is compared with the expected one instead of being returned
+    checker: t.Optional['Checker'] = None
+    # Content of the file. If it is passed, it is uploaded to the container instead of being read from mounted directory
+    source_code: t.Optional[bytes] = None
+    # Dedicated core of the test case, the container is restricted to it while the program is running
+    cpu_core: t.Optional[int] = None
+
+
+@dataclass(frozen=True)
+class BatchCodeExecutionCommandOptions:
+    """Options of execution of all test cases in a single exec"""
+    filename: Filename
+    stdin_list: t.Sequence[Stdin]
+    # Checkers of outputs of test cases (either none or one per test case)
+    checkers: t.Optional[t.Sequence[t.Optional['Checker']]] = None
+    # Same as `CodeExecutionCommandOptions.source_code`
+    source_code: t.Optional[bytes] = None
+    # Dedicated core of the whole batch, test cases are executed on it one by one
+    cpu_core: t.Optional[int] = None
+
+
+@dataclass(frozen=True)
+class ExecutionStats:
+    """Resources used by a single execution of the program"""
+    exit_code: int
+    # Seconds
+    wall_time: float
+    cpu_time: float
+    # Peak resident set size in bytes
+    peak_memory: int
+    oom_killed: bool
 
 
 @dataclass
@@ -15,3 +50,15 @@ class ProcessedContainerExecutionResult:
     output: str
     execution_time: float
     error_message: str
+    # Seconds of user + system CPU time and wall-clock time
+    cpu_time: float = 0
+    wall_time: float = 0
+    # Peak resident set size in bytes
+    peak_memory: int = 0
+    # Whether the program was killed because of exceeded memory limit
+    oom_killed: bool = False
+    # Result of comparison with the expected output ("Accepted" or "Wrong Answer"),
+    # if the program has finished successfully and has been checked, or "Skipped" if it hasn't been executed
+    verdict: t.Optional[str] = None
+    # Dedicated core on which the program has been executed, if CPU pinning is enabled (see `CPU_PINNING_CORES`)
+    cpu_core: t.Optional[int] = None
@@ -0,0 +1,22 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class DockerHostConfig:
+    # URL of Docker daemon, e.g. `unix:///var/run/docker.sock` or `tcp://10.0.0.2:2375`
+    url: str
+    # Maximum number of containers leased on the host at the same time
+    cpu_slots: int
+    # Maximum total memory limit of containers leased on the host in bytes (0 means it is not limited)
+    memory: int = 0
+
+
+@dataclass
+class HostStats:
+    url: str
+    healthy: bool
+    cpu_slots: int
+    memory: int
+    # Number of leased containers and their total memory limit in bytes
+    leased: int
+    leased_memory: int
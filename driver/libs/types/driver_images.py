@@ -0,0 +1,10 @@
+import typing as t
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class DerivedImage:
+    # Image on top of which the derived one is built
+    base: str
+    # Shell commands that are run on top of the base image, each one is a separate `RUN` instruction
+    commands: t.Tuple[str, ...]
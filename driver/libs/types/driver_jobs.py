@@ -0,0 +1,16 @@
+import typing as t
+from dataclasses import dataclass
+
+from .driver_execution import ProcessedContainerExecutionResult
+
+
+@dataclass
+class JobState:
+    job_id: str
+    # Value of `JobStatus` enum
+    status: str
+    # Number of test cases in the job and number of already executed ones
+    total: int
+    completed: int
+    results: t.List[ProcessedContainerExecutionResult]
+    error: t.Optional[str]
@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class PoolStats:
+    image: str
+    memory_limit: str
+    # Number of idle containers and of leased ones (including containers that are being created)
+    idle: int
+    busy: int
+    # Number of leases that are waiting for a container, because all of them are busy
+    waiting: int
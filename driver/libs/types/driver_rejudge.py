@@ -0,0 +1,21 @@
+import typing as t
+from dataclasses import dataclass
+
+from .driver_execution import ProcessedContainerExecutionResult
+
+
+@dataclass
+class RejudgeSubmission:
+    submission_id: str
+    # Same as `language` parameter of `/execute`, e.g. "python" or "cpp"
+    language: str
+    source_code: str
+
+
+@dataclass
+class RejudgeResult:
+    submission_id: str
+    # Results of test cases in the same order as inputs
+    results: t.List[ProcessedContainerExecutionResult]
+    # Error that has interrupted execution of the submission (results of executed test cases are kept)
+    error: t.Optional[str] = None
@@ -0,0 +1,21 @@
+import typing as t
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class TestSet:
+    """Files of the stored test set on the host"""
+    test_set_id: str
+    inputs: t.List[Path]
+    # Expected outputs in the same order as inputs, if they have been uploaded
+    expected_outputs: t.Optional[t.List[Path]]
+
+
+@dataclass
+class TestSetInfo:
+    test_set_id: str
+    # Number of test cases and total size of their inputs and expected outputs in bytes
+    tests: int
+    size: int
+    has_expected_outputs: bool
@@ -0,0 +1,11 @@
+import typing as t
+from dataclasses import dataclass
+
+
+@dataclass
+class BinaryExecutionRequest:
+    """Large parts of the request to `/execute/binary`, which are passed in the body instead of the query string"""
+    source_code: str
+    stdin_list: t.List[bytes]
+    # Expected outputs in the same order as inputs, if they have been passed
+    expected_output_list: t.Optional[t.List[bytes]]
@@ -0,0 +1,320 @@
+"""
+Compact binary format of `/execute/binary`, so large source code, inputs and outputs are neither URL-encoded
+nor JSON-escaped.
+
+All integers are big-endian, a string is its length (uint32) followed by its bytes (UTF-8 for text),
+an optional string has length 0xFFFFFFFF if it is absent.
+
+Request: magic, source code, number of test cases (uint32), whether expected outputs are passed (uint8),
+inputs and then expected outputs (if they are passed) as strings.
+
+Response: magic, then frames. Each frame is its type (uint8, see `WireFrame`), length of the rest of the frame
+(uint32) and its payload. A result frame is sent for each test case as soon as it is executed: exit code (int64),
+execution, CPU and wall time (float64), peak memory (uint64), whether the program was killed by OOM (uint8),
+dedicated core of the program (int32, -1 if CPU pinning is disabled), output, error message and optional verdict
+as strings. The response is finished by an end frame with the number of results (uint32) or, if the driver has
+failed after the response has started, by an error frame with the message. A response without either of them has
+been cut (e.g. the connection is lost)
+"""
+import logging
+import struct
+import typing as t
+import zlib
+
+from driver.libs.enums import WireCompression, WireFrame
+from driver.libs.types import BinaryExecutionRequest, ProcessedContainerExecutionResult
+
+try:
+    import zstandard
+except ImportError:
+    # Zstandard is an optional compression (`pip install zstandard`), gzip is used without it
+    zstandard = None  # type: ignore[assignment, unused-ignore]
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPE = 'application/x-driver-binary'
+MAGIC = b'DRV1'
+
+_LENGTH = struct.Struct('>I')
+_FLAG = struct.Struct('>B')
+_FRAME = struct.Struct('>BI')
+_RESULT = struct.Struct('>qdddQBi')
+_ABSENT = 0xFFFFFFFF
+_NO_CORE = -1
+
+
+class WireFormatError(ValueError):
+    """Payload is truncated or doesn't follow the binary format"""
+
+
+class PayloadTooLarge(WireFormatError):
+    def __init__(self, max_size: int):
+        super().__init__(f'Payload is larger than {max_size} bytes!')
+
+
+class ExecutionAborted(Exception):
+    """Driver has failed after the response has started, results received before the error are kept"""
+
+    def __init__(self, message: str, results: t.List[ProcessedContainerExecutionResult]):
+        super().__init__(message)
+        self.results = results
+
+
+class _Reader:
+    def __init__(self, data: t.Union[bytes, memoryview]):
+        self.__data = memoryview(data)
+        self.__offset = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return self.__offset == len(self.__data)
+
+    @property
+    def remaining(self) -> int:
+        return len(self.__data) - self.__offset
+
+    def read(self, size: int) -> memoryview:
+        if self.__offset + size > len(self.__data):
+            raise WireFormatError(f'Payload is truncated at {len(self.__data)} bytes!')
+        chunk = self.__data[self.__offset:self.__offset + size]
+        self.__offset += size
+        return chunk
+
+    def unpack(self, layout: struct.Struct) -> t.Tuple[t.Any, ...]:
+        return layout.unpack(self.read(layout.size))
+
+    def binary(self) -> t.Optional[bytes]:
+        length, = self.unpack(_LENGTH)
+        return None if length == _ABSENT else bytes(self.read(length))
+
+    def text(self) -> t.Optional[str]:
+        data = self.binary()
+        try:
+            return None if data is None else data.decode()
+        except UnicodeDecodeError as error:
+            raise WireFormatError(f'Text is not valid UTF-8: {error}')
+
+    def required(self, value: t.Optional[t.AnyStr]) -> t.AnyStr:
+        if value is None:
+            raise WireFormatError('Required string is absent!')
+        return value
+
+
+def _pack(data: t.Union[str, bytes, None]) -> bytes:
+    if data is None:
+        return _LENGTH.pack(_ABSENT)
+    content = data.encode() if isinstance(data, str) else data
+    return _LENGTH.pack(len(content)) + content
+
+
+def _check_magic(reader: _Reader) -> None:
+    if reader.read(len(MAGIC)) != MAGIC:
+        raise WireFormatError('Payload doesn\'t start with the magic of the binary format!')
+
+
+def encode_request(request: BinaryExecutionRequest) -> bytes:
+    parts = [
+        MAGIC,
+        _pack(request.source_code),
+        _LENGTH.pack(len(request.stdin_list)),
+        _FLAG.pack(request.expected_output_list is not None),
+    ]
+    if request.expected_output_list is not None and len(request.expected_output_list) != len(request.stdin_list):
+        raise ValueError('Number of expected outputs differs from number of inputs!')
+    parts.extend(_pack(stdin) for stdin in request.stdin_list)
+    parts.extend(_pack(expected_output) for expected_output in request.expected_output_list or ())
+    return b''.join(parts)
+
+
+def decode_request(data: bytes) -> BinaryExecutionRequest:
+    reader = _Reader(data)
+    _check_magic(reader)
+    source_code = reader.required(reader.text())
+    tests, = reader.unpack(_LENGTH)
+    has_expected_outputs, = reader.unpack(_FLAG)
+    stdin_list = [reader.required(reader.binary()) for _ in range(tests)]
+    expected_output_list = [reader.required(reader.binary()) for _ in range(tests)] if has_expected_outputs else None
+    if not reader.exhausted:
+        raise WireFormatError('Payload has trailing bytes after the last test case!')
+    return BinaryExecutionRequest(source_code, stdin_list, expected_output_list)
+
+
+def _frame(frame_type: WireFrame, payload: bytes) -> bytes:
+    return _FRAME.pack(frame_type.value, len(payload)) + payload
+
+
+def encode_result(result: ProcessedContainerExecutionResult) -> bytes:
+    """Returns frame of the result"""
+    return _frame(WireFrame.RESULT, b''.join((
+        _RESULT.pack(
+            result.exit_code, result.execution_time, result.cpu_time, result.wall_time, result.peak_memory,
+            result.oom_killed, _NO_CORE if result.cpu_core is None else result.cpu_core,
+        ),
+        _pack(result.output),
+        _pack(result.error_message),
+        _pack(result.verdict),
+    )))
+
+
+def encode_end(results: int) -> bytes:
+    """Returns frame that finishes the response with passed number of results"""
+    return _frame(WireFrame.END, _LENGTH.pack(results))
+
+
+def encode_error(message: str) -> bytes:
+    """Returns frame that finishes the response interrupted by an error"""
+    return _frame(WireFrame.ERROR, _pack(message))
+
+
+def _decode_result(record: _Reader) -> ProcessedContainerExecutionResult:
+    exit_code, execution_time, cpu_time, wall_time, peak_memory, oom_killed, cpu_core = record.unpack(_RESULT)
+    return ProcessedContainerExecutionResult(
+        exit_code=exit_code,
+        output=record.required(record.text()),
+        execution_time=execution_time,
+        error_message=record.required(record.text()),
+        cpu_time=cpu_time,
+        wall_time=wall_time,
+        peak_memory=peak_memory,
+        oom_killed=bool(oom_killed),
+        verdict=record.text(),
+        cpu_core=None if cpu_core == _NO_CORE else cpu_core,
+    )
+
+
+def decode_results(data: bytes, partial: bool = False) -> t.List[ProcessedContainerExecutionResult]:
+    """
+    Decodes the whole (decompressed) response
+
+    :param partial: Whether the response is still being received, so it may be not finished yet
+    :raises ExecutionAborted: If the response is finished by an error frame
+    :raises WireFormatError: If the response is cut before its end frame (unless it is `partial`) or is malformed
+    """
+    reader = _Reader(data)
+    _check_magic(reader)
+    results = []
+    while not reader.exhausted:
+        frame_type, length = reader.unpack(_FRAME)
+        frame = _Reader(reader.read(length))
+        if frame_type == WireFrame.RESULT.value:
+            results.append(_decode_result(frame))
+        elif frame_type == WireFrame.END.value:
+            expected, = frame.unpack(_LENGTH)
+            if expected != len(results):
+                raise WireFormatError(f'Response has {len(results)} results, but its end frame says {expected}!')
+            if reader.remaining:
+                raise WireFormatError('Payload has trailing bytes after the end frame!')
+            return results
+        elif frame_type == WireFrame.ERROR.value:
+            raise ExecutionAborted(frame.required(frame.text()), results)
+        else:
+            raise WireFormatError(f'Unknown type of frame {frame_type}!')
+    if not partial:
+        raise WireFormatError('Response is cut before its end frame!')
+    return results
+
+
+def supported_compressions() -> t.List[WireCompression]:
+    return [
+        compression for compression in WireCompression
+        if compression is not WireCompression.ZSTD or zstandard is not None
+    ]
+
+
+def negotiate(accept_encoding: str) -> WireCompression:
+    """Returns the best supported compression that is accepted by the client (by value of Accept-Encoding header)"""
+    accepted = set()
+    for token in accept_encoding.split(','):
+        name, _, parameters = token.partition(';')
+        _, _, quality = parameters.replace(' ', '').partition('q=')
+        try:
+            # Encodings with zero quality are refused by the client
+            refused = bool(quality) and float(quality) == 0
+        except ValueError:
+            refused = False
+        if not refused:
+            accepted.add(name.strip().lower())
+    for compression in (WireCompression.ZSTD, WireCompression.GZIP):
+        if compression.value in accepted and compression in supported_compressions():
+            return compression
+    return WireCompression.IDENTITY
+
+
+def decompress(data: bytes, compression: WireCompression, max_size: int) -> bytes:
+    """
+    Decompresses the body, but never produces more than `max_size` bytes, so small compressed bodies can't exhaust
+    memory of the driver
+
+    :raises PayloadTooLarge: If decompressed body is larger than `max_size`
+    :raises WireFormatError: If the body can't be decompressed
+    """
+    if compression not in supported_compressions():
+        raise WireFormatError(f'Compression {compression.value} is not supported!')
+    errors: t.Tuple[t.Type[Exception], ...] = (zlib.error,) if zstandard is None else (zlib.error, zstandard.ZstdError)
+    try:
+        if compression is WireCompression.GZIP:
+            decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+            data = decompressor.decompress(data, max_size + 1)
+            if len(data) <= max_size and not decompressor.eof:
+                raise WireFormatError('Compressed payload is truncated!')
+        elif compression is WireCompression.ZSTD:
+            reader = zstandard.ZstdDecompressor().stream_reader(data)
+            chunks: t.List[bytes] = []
+            size = 0
+            while size <= max_size:
+                chunk = reader.read(max_size + 1 - size)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+            data = b''.join(chunks)
+    except errors as error:
+        raise WireFormatError(f'Payload can\'t be decompressed: {error}')
+    if len(data) > max_size:
+        raise PayloadTooLarge(max_size)
+    return data
+
+
+class StreamCompressor:
+    """Compresses a stream of records, flushing after each of them, so the client decodes records as they arrive"""
+
+    def __init__(self, compression: WireCompression):
+        self.__compression = compression
+        self.__compressor: t.Any = None
+        if compression is WireCompression.GZIP:
+            self.__compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+        elif compression is WireCompression.ZSTD:
+            self.__compressor = zstandard.ZstdCompressor().compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        if self.__compression is WireCompression.GZIP:
+            return self.__compressor.compress(data) + self.__compressor.flush(zlib.Z_SYNC_FLUSH)
+        if self.__compression is WireCompression.ZSTD:
+            return self.__compressor.compress(data) + self.__compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return data
+
+    def finish(self) -> bytes:
+        return b'' if self.__compressor is None else self.__compressor.flush()
+
+
+async def iter_encoded_results(
+        results: t.AsyncIterator[ProcessedContainerExecutionResult],
+        compression: WireCompression = WireCompression.IDENTITY
+) -> t.AsyncIterator[bytes]:
+    """
+    Yields the (compressed) response chunk by chunk, a chunk for each result. If `results` fail, the error is sent
+    in the error frame instead of the end one, since the status of the response has already been sent
+    """
+    compressor = StreamCompressor(compression)
+    yield compressor.compress(MAGIC)
+    count = 0
+    try:
+        async for result in results:
+            yield compressor.compress(encode_result(result))
+            count += 1
+    except Exception as error:
+        logger.exception('Execution has failed after %d results have been sent', count)
+        yield compressor.compress(encode_error(str(error) or type(error).__name__))
+    else:
+        yield compressor.compress(encode_end(count))
+    yield compressor.finish()
@@ -1,38 +1,446 @@
+import asyncio
+import dataclasses
+import json
+import logging
 import typing as t
+from contextlib import AsyncExitStack, asynccontextmanager
 
-from fastapi import FastAPI, Query
+from fastapi import Body, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+from starlette.types import Receive, Scope, Send
 
-from driver.libs.containers import ContainersFactory
-from driver.libs.enums import ProgrammingLanguage
-from driver.libs.files import FileCreator
-from driver.libs.types import CodeExecutionCommandOptions, ProcessedContainerExecutionResult
+from driver.config import (
+    BINARY_REQUEST_MAX_SIZE,
+    CONTAINERS_WARM_UP_LANGUAGES,
+    CONTAINERS_WARM_UP_MEMORY_LIMITS,
+    LOG_LEVEL,
+    OUTPUT_LIMIT,
+)
+from driver.libs import metrics, wire
+from driver.libs.admission import AdmissionRejected, Ticket, admission_controller
+from driver.libs.cache import compilation_cache, result_cache
+from driver.libs.checkers import DEFAULT_FLOAT_EPSILON
+from driver.libs.containers import MultiHostBackend, SandboxUnavailable, execution_backend, warm_up_containers
+from driver.libs.enums import CheckerMode, ParallelismMode, ProgrammingLanguage, SubmissionPriority, WireCompression
+from driver.libs.jobs import Job, job_store
+from driver.libs.runner import SubmissionRunner
+from driver.libs.runner.rejudge import RejudgeRunner, SubmissionSource
+from driver.libs.testsets import TestSetNotFound, test_set_store
+from driver.libs.types import (
+    AdmissionRequest,
+    AdmissionStats,
+    BinaryExecutionRequest,
+    CacheStats,
+    HostStats,
+    JobState,
+    ProcessedContainerExecutionResult,
+    RejudgeSubmission,
+    Stdin,
+    TestSetInfo,
+)
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> t.AsyncIterator[None]:
+    # Removing containers left by the previous run of the driver (e.g. if it has crashed)
+    try:
+        await asyncio.to_thread(execution_backend.reap)
+    except Exception:
+        logger.warning('Failed to reap containers left by the previous run', exc_info=True)
+    # Pre-starting containers, so the first submission of each language doesn't wait for its container to be created
+    languages = [languages_map[name] for name in CONTAINERS_WARM_UP_LANGUAGES.split()]
+    await asyncio.to_thread(warm_up_containers, languages, CONTAINERS_WARM_UP_MEMORY_LIMITS.split())
+    yield
+    # Removing all pre-started containers (or files of the local sandbox)
+    execution_backend.close()
+
+
+logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+app = FastAPI(lifespan=lifespan)
+
+languages_map = {
+    'python': ProgrammingLanguage.PYTHON,
+    'pypy': ProgrammingLanguage.PYPY,
+    'cpp': ProgrammingLanguage.CPP,
+    'pascal-abc': ProgrammingLanguage.PASCAL_ABC,
+}
+
+
+@app.exception_handler(SandboxUnavailable)
+async def sandbox_unavailable_handler(_: Request, error: SandboxUnavailable) -> Response:
+    # Sandboxes may become available again (e.g. hosts pass health check), so the client should retry
+    return JSONResponse(
+        status_code=503, content={'detail': str(error)}, headers={'Retry-After': str(error.retry_after)}
+    )
+
+
+def enqueue_submission(request: AdmissionRequest, priority: SubmissionPriority, memory_limit: str) -> Ticket:
+    """
+    Puts submission into the admission queue, responding with 429 if the queue is full,
+    or with 503 if sandboxes with the memory limit can't be leased right now (e.g. all hosts are unhealthy)
+    """
+    try:
+        execution_backend.check_available(memory_limit)
+        return admission_controller.enqueue(request, priority)
+    except AdmissionRejected as error:
+        metrics.admission_rejected.labels(priority=priority.value).inc()
+        raise HTTPException(status_code=429, detail=str(error), headers={'Retry-After': str(error.retry_after)})
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+
+async def iter_submission_results(
+        ticket: Ticket,
+        runner: SubmissionRunner,
+        source_code: str,
+        stdin_list: t.Sequence[Stdin],
+        expected_output_list: t.Optional[t.Sequence[Stdin]],
+        test_set_lease: AsyncExitStack
+) -> t.AsyncGenerator[ProcessedContainerExecutionResult, None]:
+    """
+    Executes the submission once it is admitted, resources are reserved (and the test set is leased)
+    until the last result is yielded
+    """
+    async with test_set_lease:
+        async with ticket:
+            metrics.admission_wait.labels(priority=ticket.priority.value).observe(ticket.wait_time)
+            with metrics.submissions_in_progress.track_inprogress():
+                async for result in runner.iter_results(source_code, stdin_list, expected_output_list):
+                    yield result
+
+
+class SubmissionResponse(StreamingResponse):
+    """
+    Streams results of submissions, which are produced by `results`. The ticket and the lease of the test set
+    are released once the response is over, even if its body has never been iterated (e.g. the client has
+    disconnected before): `results` would release the ticket, but a generator that has never been started
+    doesn't run its `finally` blocks
+    """
+
+    def __init__(
+            self,
+            content: t.AsyncIterable[t.Union[str, bytes]],
+            results: t.AsyncGenerator[t.Any, None],
+            ticket: Ticket,
+            test_set_lease: t.Optional[AsyncExitStack] = None,
+            **kwargs: t.Any
+    ):
+        super().__init__(content, **kwargs)
+        self.__results = results
+        self.__ticket = ticket
+        self.__test_set_lease = test_set_lease or AsyncExitStack()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        async with self.__test_set_lease:
+            try:
+                await super().__call__(scope, receive, send)
+            finally:
+                # Submission is stopped (its containers are released) before its resources are
+                await self.__results.aclose()
+                self.__ticket.release()
+
+
+def create_runner(*args: t.Any) -> SubmissionRunner:
+    """Creates runner with passed arguments, responding with 400 if they are invalid"""
+    try:
+        return SubmissionRunner(*args)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+
+async def lease_tests(
+        stdin_list: t.Optional[t.List[str]],
+        expected_output_list: t.Optional[t.List[str]],
+        test_set_id: t.Optional[str],
+        stack: AsyncExitStack
+) -> t.Tuple[t.Sequence[Stdin], t.Optional[t.Sequence[Stdin]]]:
+    """
+    Returns inputs and expected outputs that are either passed in the request or stored in the test set.
+    Files of the test set are not evicted until `stack` is closed
+    """
+    if test_set_id is None:
+        if stdin_list is None:
+            raise HTTPException(status_code=400, detail='Either stdin_list or test_set_id must be passed')
+        if expected_output_list is not None and len(expected_output_list) != len(stdin_list):
+            raise HTTPException(
+                status_code=400,
+                detail=f'Got {len(expected_output_list)} expected outputs for {len(stdin_list)} test cases',
+            )
+        return stdin_list, expected_output_list
+
+    if stdin_list is not None or expected_output_list is not None:
+        raise HTTPException(
+            status_code=400, detail='Inputs and expected outputs are taken from the test set, they can\'t be passed'
+        )
+    try:
+        test_set = await stack.enter_async_context(test_set_store.alease(test_set_id))
+    except TestSetNotFound:
+        raise HTTPException(status_code=404, detail=f'Test set {test_set_id} is not found, it must be uploaded')
+    return test_set.inputs, test_set.expected_outputs
+
+
+async def read_binary_request(request: Request) -> BinaryExecutionRequest:
+    """Reads and decodes the body in the binary format, compressed as set by Content-Encoding header"""
+    compressions = {compression.value: compression for compression in wire.supported_compressions()}
+    encoding = request.headers.get('content-encoding', WireCompression.IDENTITY.value).strip().lower()
+    if encoding not in compressions:
+        raise HTTPException(status_code=415, detail=f'Supported encodings: {", ".join(compressions)}')
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        # Compression of incompressible data adds less than 1% of its size
+        if len(body) > BINARY_REQUEST_MAX_SIZE * 101 // 100 + 1024:
+            raise HTTPException(status_code=413, detail=str(wire.PayloadTooLarge(BINARY_REQUEST_MAX_SIZE)))
+    try:
+        return wire.decode_request(wire.decompress(bytes(body), compressions[encoding], BINARY_REQUEST_MAX_SIZE))
+    except wire.PayloadTooLarge as error:
+        raise HTTPException(status_code=413, detail=str(error))
+    except wire.WireFormatError as error:
+        raise HTTPException(status_code=400, detail=str(error))
 
 
 @app.post("/execute")
-def execute(
+async def execute(
         language: str = Query(),
         source_code: str = Query(),
         time_limit: int = Query(),
         memory_limit: str = Query(),
-        stdin_list: t.List[str] = Query()
+        stdin_list: t.Optional[t.List[str]] = Query(default=None),
+        parallelism: int = Query(default=1, ge=1),
+        parallelism_mode: ParallelismMode = Query(default=ParallelismMode.SEQUENTIAL),
+        output_limit: int = Query(default=OUTPUT_LIMIT, ge=0, le=OUTPUT_LIMIT),
+        expected_output_list: t.Optional[t.List[str]] = Query(default=None),
+        checker_mode: CheckerMode = Query(default=CheckerMode.TOKENS),
+        float_epsilon: float = Query(default=DEFAULT_FLOAT_EPSILON, ge=0),
+        batch: bool = Query(default=False),
+        priority: SubmissionPriority = Query(default=SubmissionPriority.PRACTICE),
+        max_failures: t.Optional[int] = Query(default=None, ge=1),
+        test_set_id: t.Optional[str] = Query(default=None),
 ) -> t.List[ProcessedContainerExecutionResult]:
-    languages_map = {
-        'python': ProgrammingLanguage.PYTHON,
-        'pypy': ProgrammingLanguage.PYPY,
-        'cpp': ProgrammingLanguage.CPP,
-        'pascal-abc': ProgrammingLanguage.PASCAL_ABC,
-    }
+    programming_language = languages_map[language]
+    runner = create_runner(
+        programming_language, time_limit, memory_limit, parallelism, parallelism_mode, output_limit,
+        checker_mode, float_epsilon, batch, max_failures
+    )
+    # Test set is released once the submission is finished (or rejected)
+    async with AsyncExitStack() as stack:
+        inputs, expected_outputs = await lease_tests(stdin_list, expected_output_list, test_set_id, stack)
+        ticket = enqueue_submission(runner.admission_request(len(inputs)), priority, memory_limit)
+        results = iter_submission_results(ticket, runner, source_code, inputs, expected_outputs, AsyncExitStack())
+        return [result async for result in results]
 
-    response = []
 
+@app.post("/execute/binary")
+async def execute_binary(
+        request: Request,
+        language: str = Query(),
+        time_limit: int = Query(),
+        memory_limit: str = Query(),
+        parallelism: int = Query(default=1, ge=1),
+        parallelism_mode: ParallelismMode = Query(default=ParallelismMode.SEQUENTIAL),
+        output_limit: int = Query(default=OUTPUT_LIMIT, ge=0, le=OUTPUT_LIMIT),
+        checker_mode: CheckerMode = Query(default=CheckerMode.TOKENS),
+        float_epsilon: float = Query(default=DEFAULT_FLOAT_EPSILON, ge=0),
+        batch: bool = Query(default=False),
+        priority: SubmissionPriority = Query(default=SubmissionPriority.PRACTICE),
+        max_failures: t.Optional[int] = Query(default=None, ge=1),
+) -> StreamingResponse:
+    """
+    Same as `/execute`, but source code, inputs and expected outputs are passed in the body in the binary format
+    of `driver.libs.wire`, and results are streamed back in the same format as soon as they are ready.
+    The body may be compressed (Content-Encoding header), results are compressed as the client accepts
+    """
     programming_language = languages_map[language]
-    Container = ContainersFactory.get(programming_language)
-    with Container(time_limit, memory_limit) as container:
-        with FileCreator(source_code, programming_language) as fc:
-            for stdin in stdin_list:
-                execution_options = CodeExecutionCommandOptions(filename=fc.filename, stdin=stdin)
-                result = container.execute(options=execution_options)
-                response.append(result)
-            return response
+    body = await read_binary_request(request)
+    runner = create_runner(
+        programming_language, time_limit, memory_limit, parallelism, parallelism_mode, output_limit,
+        checker_mode, float_epsilon, batch, max_failures
+    )
+    ticket = enqueue_submission(runner.admission_request(len(body.stdin_list)), priority, memory_limit)
+    results = iter_submission_results(
+        ticket, runner, body.source_code, body.stdin_list, body.expected_output_list, AsyncExitStack()
+    )
+
+    compression = wire.negotiate(request.headers.get('accept-encoding', ''))
+    headers = {} if compression is WireCompression.IDENTITY else {'Content-Encoding': compression.value}
+    return SubmissionResponse(
+        wire.iter_encoded_results(results, compression), results, ticket, media_type=wire.MEDIA_TYPE, headers=headers
+    )
+
+
+@app.post("/jobs")
+async def create_job(
+        language: str = Query(),
+        source_code: str = Query(),
+        time_limit: int = Query(),
+        memory_limit: str = Query(),
+        stdin_list: t.Optional[t.List[str]] = Query(default=None),
+        parallelism: int = Query(default=1, ge=1),
+        parallelism_mode: ParallelismMode = Query(default=ParallelismMode.SEQUENTIAL),
+        output_limit: int = Query(default=OUTPUT_LIMIT, ge=0, le=OUTPUT_LIMIT),
+        expected_output_list: t.Optional[t.List[str]] = Query(default=None),
+        checker_mode: CheckerMode = Query(default=CheckerMode.TOKENS),
+        float_epsilon: float = Query(default=DEFAULT_FLOAT_EPSILON, ge=0),
+        batch: bool = Query(default=False),
+        priority: SubmissionPriority = Query(default=SubmissionPriority.PRACTICE),
+        max_failures: t.Optional[int] = Query(default=None, ge=1),
+        test_set_id: t.Optional[str] = Query(default=None),
+) -> JobState:
+    """Starts execution in background and immediately returns id of the job"""
+    programming_language = languages_map[language]
+    runner = create_runner(
+        programming_language, time_limit, memory_limit, parallelism, parallelism_mode, output_limit,
+        checker_mode, float_epsilon, batch, max_failures
+    )
+    # Test set is released if the submission is rejected, otherwise it is released once the submission is finished
+    async with AsyncExitStack() as stack:
+        inputs, expected_outputs = await lease_tests(stdin_list, expected_output_list, test_set_id, stack)
+        ticket = enqueue_submission(runner.admission_request(len(inputs)), priority, memory_limit)
+        results = iter_submission_results(ticket, runner, source_code, inputs, expected_outputs, stack.pop_all())
+    job = job_store.start(len(inputs), results, ticket)
+    return job.state()
+
+
+@app.post("/rejudge")
+async def rejudge(
+        submissions: t.List[RejudgeSubmission] = Body(),
+        time_limit: int = Body(),
+        memory_limit: str = Body(),
+        stdin_list: t.Optional[t.List[str]] = Body(default=None),
+        parallelism: int = Body(default=1, ge=1),
+        output_limit: int = Body(default=OUTPUT_LIMIT, ge=0, le=OUTPUT_LIMIT),
+        expected_output_list: t.Optional[t.List[str]] = Body(default=None),
+        checker_mode: CheckerMode = Body(default=CheckerMode.TOKENS),
+        float_epsilon: float = Body(default=DEFAULT_FLOAT_EPSILON, ge=0),
+        batch: bool = Body(default=False),
+        priority: SubmissionPriority = Body(default=SubmissionPriority.REJUDGE),
+        max_failures: t.Optional[int] = Body(default=None, ge=1),
+        test_set_id: t.Optional[str] = Body(default=None),
+) -> StreamingResponse:
+    """
+    Executes many submissions against the same test cases (passed in JSON body, since they are large).
+    Result of each submission is streamed as a line of newline-delimited JSON as soon as it is ready
+    """
+    sources: t.Dict[str, SubmissionSource] = {}
+    for submission in submissions:
+        if submission.language not in languages_map:
+            raise HTTPException(status_code=400, detail=f'Unknown language {submission.language}')
+        if submission.submission_id in sources:
+            raise HTTPException(status_code=400, detail=f'Duplicate submission {submission.submission_id}')
+        sources[submission.submission_id] = (languages_map[submission.language], submission.source_code)
+
+    try:
+        runner = RejudgeRunner(
+            time_limit, memory_limit, parallelism, output_limit, checker_mode, float_epsilon, batch, max_failures
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    # Test set is released if the submission is rejected, otherwise the response releases it once it is over
+    async with AsyncExitStack() as stack:
+        inputs, expected_outputs = await lease_tests(stdin_list, expected_output_list, test_set_id, stack)
+        ticket = enqueue_submission(runner.admission_request(sources), priority, memory_limit)
+        test_set_lease = stack.pop_all()
+
+    async def lines() -> t.AsyncGenerator[str, None]:
+        async with ticket:
+            metrics.admission_wait.labels(priority=ticket.priority.value).observe(ticket.wait_time)
+            with metrics.submissions_in_progress.track_inprogress():
+                async for result in runner.iter_results(sources, inputs, expected_outputs):
+                    yield json.dumps(dataclasses.asdict(result)) + '\n'
+
+    results = lines()
+    return SubmissionResponse(results, results, ticket, test_set_lease, media_type='application/x-ndjson')
+
+
+def get_job_or_404(job_id: str) -> Job:
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f'Job {job_id} is not found')
+    return job
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> JobState:
+    return get_job_or_404(job_id).state()
+
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str) -> StreamingResponse:
+    """Streams results of the job as newline-delimited JSON, one line per test case"""
+    job = get_job_or_404(job_id)
+
+    async def lines() -> t.AsyncIterator[str]:
+        index = 0
+        async for result in job.stream():
+            yield json.dumps({'index': index, 'result': dataclasses.asdict(result)}) + '\n'
+            index += 1
+        if job.error is not None:
+            yield json.dumps({'error': job.error}) + '\n'
+
+    return StreamingResponse(lines(), media_type='application/x-ndjson')
+
+
+@app.post("/testsets")
+def upload_test_set(
+        inputs: t.List[str] = Body(),
+        expected_outputs: t.Optional[t.List[str]] = Body(default=None),
+) -> TestSetInfo:
+    """
+    Stores inputs (and expected outputs) of test cases on the host, so they are passed to `/execute`, `/jobs`
+    and `/rejudge` by `test_set_id` instead of being sent with every submission
+    """
+    try:
+        return test_set_store.put(
+            [content.encode() for content in inputs],
+            None if expected_outputs is None else [content.encode() for content in expected_outputs],
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+
+@app.get("/testsets/{test_set_id}")
+def get_test_set(test_set_id: str) -> TestSetInfo:
+    try:
+        return test_set_store.info(test_set_id)
+    except TestSetNotFound:
+        raise HTTPException(status_code=404, detail=f'Test set {test_set_id} is not found')
+
+
+@app.get("/cache/compilation")
+def compilation_cache_stats() -> CacheStats:
+    return compilation_cache.stats()
+
+
+@app.get("/cache/testsets")
+def test_sets_stats() -> CacheStats:
+    return test_set_store.stats()
+
+
+@app.get("/cache/results")
+def result_cache_stats() -> CacheStats:
+    return result_cache.stats()
+
+
+@app.get("/admission")
+def admission_stats() -> AdmissionStats:
+    """Resources reserved by admitted submissions and number of submissions waiting for admission"""
+    return admission_controller.stats()
+
+
+@app.get("/hosts")
+def hosts_stats() -> t.List[HostStats]:
+    """Load and health of `DOCKER_HOSTS` (empty if containers are run by a single daemon)"""
+    if isinstance(execution_backend, MultiHostBackend):
+        return execution_backend.stats()
+    return []
+
+
+@app.get("/metrics")
+def prometheus_metrics() -> Response:
+    """Metrics in the text format of Prometheus"""
+    return Response(metrics.render(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,124 @@
+import asyncio
+import typing as t
+
+import pytest
+
+from driver.libs.admission import AdmissionController, AdmissionRejected, Ticket
+from driver.libs.enums import ParallelismMode, ProgrammingLanguage, SubmissionPriority
+from driver.libs.runner import SubmissionRunner
+from driver.libs.types import AdmissionRequest
+
+MB = 1024 * 1024
+
+
+def create_controller(queue_size: int = 8) -> AdmissionController:
+    return AdmissionController(memory_capacity=1024 * MB, cpu_slots=4, max_admitted=8, queue_size=queue_size)
+
+
+async def enter(ticket: Ticket, admitted: t.List[Ticket]) -> None:
+    async with ticket:
+        admitted.append(ticket)
+        await asyncio.Event().wait()
+
+
+def test_submissions_are_admitted_within_capacity():
+    async def main() -> None:
+        controller = create_controller()
+        admitted: t.List[Ticket] = []
+        tickets = [controller.enqueue(AdmissionRequest(512 * MB, 1), SubmissionPriority.PRACTICE) for _ in range(3)]
+        tasks = [asyncio.create_task(enter(ticket, admitted)) for ticket in tickets]
+        await asyncio.sleep(0.01)
+
+        # The third submission doesn't fit into memory capacity
+        assert admitted == tickets[:2]
+        stats = controller.stats()
+        assert (stats.reserved_memory, stats.reserved_cpu_slots, stats.admitted) == (1024 * MB, 2, 2)
+        assert stats.queued == {'contest': 0, 'practice': 1, 'rejudge': 0}
+
+        tasks[0].cancel()
+        await asyncio.sleep(0.01)
+        assert admitted == tickets
+        assert tickets[2].wait_time > 0
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert controller.stats().reserved_memory == 0
+
+    asyncio.run(main())
+
+
+def test_tickets_are_released_without_being_entered():
+    async def main() -> None:
+        controller = create_controller()
+        tickets = [controller.enqueue(AdmissionRequest(512 * MB, 1), SubmissionPriority.PRACTICE) for _ in range(3)]
+        assert controller.stats().admitted == 2
+
+        # E.g. the client has disconnected before its results have been streamed
+        tickets[0].release()
+        tickets[0].release()
+        tickets[2].release()
+        stats = controller.stats()
+        assert (stats.reserved_memory, stats.admitted) == (512 * MB, 1)
+        assert stats.queued == {'contest': 0, 'practice': 0, 'rejudge': 0}
+
+    asyncio.run(main())
+
+
+def test_submissions_are_admitted_in_order_of_priority():
+    async def main() -> None:
+        controller = create_controller()
+        admitted: t.List[Ticket] = []
+        blocker = controller.enqueue(AdmissionRequest(MB, 4), SubmissionPriority.REJUDGE)
+        tickets = [
+            controller.enqueue(AdmissionRequest(MB, 1), priority)
+            for priority in (SubmissionPriority.REJUDGE, SubmissionPriority.PRACTICE, SubmissionPriority.CONTEST)
+        ]
+        tasks = [asyncio.create_task(enter(ticket, admitted)) for ticket in (blocker, *tickets)]
+        await asyncio.sleep(0.01)
+        assert admitted == [blocker]
+
+        tasks[0].cancel()
+        await asyncio.sleep(0.01)
+        assert [ticket.priority for ticket in admitted[1:]] == [
+            SubmissionPriority.CONTEST, SubmissionPriority.PRACTICE, SubmissionPriority.REJUDGE
+        ]
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(main())
+
+
+def test_full_queue_rejects_submissions():
+    async def main() -> None:
+        controller = create_controller(queue_size=1)
+        admitted = controller.enqueue(AdmissionRequest(1024 * MB, 1), SubmissionPriority.CONTEST)
+        queued = controller.enqueue(AdmissionRequest(MB, 1), SubmissionPriority.CONTEST)
+
+        with pytest.raises(AdmissionRejected) as error:
+            controller.enqueue(AdmissionRequest(MB, 1), SubmissionPriority.CONTEST)
+        assert error.value.retry_after >= 1
+
+        # Submission that has left the queue frees its place
+        controller.release(queued)
+        controller.enqueue(AdmissionRequest(MB, 1), SubmissionPriority.CONTEST)
+
+        with pytest.raises(ValueError):
+            controller.enqueue(AdmissionRequest(2048 * MB, 1), SubmissionPriority.CONTEST)
+        controller.release(admitted)
+
+    asyncio.run(main())
+
+
+def test_admission_request_of_runner():
+    def request(**kwargs: t.Any) -> AdmissionRequest:
+        return SubmissionRunner(ProgrammingLanguage.PYTHON, 1, '128m', **kwargs).admission_request(tests=3)
+
+    assert request() == AdmissionRequest(128 * MB, 1)
+    assert request(parallelism=4, mode=ParallelismMode.EXEC_SESSIONS) == AdmissionRequest(128 * MB, 3)
+    assert request(parallelism=2, mode=ParallelismMode.CONTAINERS) == AdmissionRequest(256 * MB, 2)
+
+    with pytest.raises(ValueError):
+        SubmissionRunner(ProgrammingLanguage.PYTHON, 1, 'a lot')
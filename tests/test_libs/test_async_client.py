@@ -0,0 +1,128 @@
+import asyncio
+import json
+import struct
+import threading
+import typing as t
+
+import pytest
+from docker.errors import DockerException
+
+from driver.libs.containers.async_client import AsyncDockerClient
+
+
+def frame(stream: int, data: bytes) -> bytes:
+    return struct.pack('>BxxxL', stream, len(data)) + data
+
+
+def http_response(status: int, body: bytes, chunked: bool = False, raw_stream: bool = False) -> bytes:
+    head = f'HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n'
+    if chunked:
+        half = len(body) // 2
+        chunks = [body[:half], body[half:]]
+        encoded = b''.join(f'{len(chunk):x}\r\n'.encode() + chunk + b'\r\n' for chunk in chunks if chunk)
+        return (head + 'Transfer-Encoding: chunked\r\n\r\n').encode() + encoded + b'0\r\n\r\n'
+    if raw_stream:
+        # Body of hijacked connection lasts until the connection is closed
+        return (head + '\r\n').encode() + body
+    return (head + f'Content-Length: {len(body)}\r\n\r\n').encode() + body
+
+
+def run_with_server(tmp_path, responses: t.Dict[t.Tuple[str, str], bytes], coroutine_factory, tcp: bool = False):
+    socket_path = str(tmp_path / 'docker.sock')
+    requests: t.List[t.Tuple[str, str, bytes]] = []
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        method, path, _ = (await reader.readline()).decode().split()
+        headers = {}
+        while (line := await reader.readline()) != b'\r\n':
+            name, _, value = line.decode().partition(':')
+            headers[name.lower()] = value.strip()
+        if headers.get('transfer-encoding') == 'chunked':
+            body = b''
+            while size := int(await reader.readline(), 16):
+                body += await reader.readexactly(size)
+                await reader.readline()
+            await reader.readline()
+        else:
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+        requests.append((method, path, body))
+
+        writer.write(responses[(method, path.split('?')[0])])
+        await writer.drain()
+        writer.close()
+
+    async def main() -> t.Any:
+        if tcp:
+            server = await asyncio.start_server(handle, host='127.0.0.1', port=0)
+            port = server.sockets[0].getsockname()[1]
+            client = AsyncDockerClient.from_url(f'tcp://127.0.0.1:{port}')
+        else:
+            server = await asyncio.start_unix_server(handle, path=socket_path)
+            client = AsyncDockerClient.from_url(f'unix://{socket_path}')
+        async with server:
+            return await coroutine_factory(client)
+
+    return asyncio.run(main()), requests
+
+
+@pytest.mark.parametrize('tcp', [False, True])
+def test_exec_run(tmp_path, tcp):
+    output = frame(1, b'Hello ') + frame(2, b'warning') + frame(1, b'World!')
+    responses = {
+        ('POST', '/containers/container-id/exec'): http_response(201, json.dumps({'Id': 'exec-id'}).encode()),
+        ('POST', '/exec/exec-id/start'): http_response(200, output, raw_stream=True),
+        ('GET', '/exec/exec-id/json'): http_response(200, json.dumps({'ExitCode': 3}).encode(), chunked=True),
+    }
+
+    result, requests = run_with_server(
+        tmp_path, responses, lambda client: client.exec_run('container-id', 'sh -c \'echo "a b"\''), tcp
+    )
+
+    assert result.exit_code == 3
+    assert result.output == (b'Hello World!', b'warning')
+    # Command is split the same way `docker` package does it
+    assert json.loads(requests[0][2])['Cmd'] == ['sh', '-c', 'echo "a b"']
+
+
+def test_archives(tmp_path):
+    responses = {
+        ('GET', '/containers/container-id/archive'): http_response(200, b'tar-content'),
+        ('PUT', '/containers/container-id/archive'): http_response(200, b''),
+    }
+
+    reading_threads = set()
+
+    def read_chunks() -> t.Iterator[bytes]:
+        for chunk in (b'streamed-', b'', b'tar'):
+            reading_threads.add(threading.current_thread())
+            yield chunk
+
+    async def use_archives(client: AsyncDockerClient) -> bytes:
+        await client.put_archive('container-id', '/compiled dir', b'uploaded-tar')
+        await client.put_archive('container-id', '/stdin', read_chunks())
+        return await client.get_archive('container-id', '/compiled dir/file')
+
+    content, requests = run_with_server(tmp_path, responses, use_archives)
+
+    assert content == b'tar-content'
+    # Chunks (e.g. read from files) are read outside of the event loop
+    assert threading.current_thread() not in reading_threads
+    assert requests[0] == ('PUT', '/containers/container-id/archive?path=/compiled%20dir', b'uploaded-tar')
+    assert requests[1] == ('PUT', '/containers/container-id/archive?path=/stdin', b'streamed-tar')
+
+
+def test_error_response(tmp_path):
+    responses = {
+        ('GET', '/exec/missing/json'): http_response(404, b'{"message": "No such exec instance"}'),
+    }
+
+    with pytest.raises(DockerException, match='No such exec instance'):
+        run_with_server(tmp_path, responses, lambda client: client.exec_inspect('missing'))
+
+
+def test_update_container(tmp_path):
+    responses = {('POST', '/containers/container-id/update'): http_response(200, b'{"Warnings": []}')}
+    _, requests = run_with_server(
+        tmp_path, responses, lambda client: client.update_container('container-id', '2,3', 100000, 200000)
+    )
+    assert json.loads(requests[0][2]) == {'CpusetCpus': '2,3', 'CpuPeriod': 100000, 'CpuQuota': 200000}
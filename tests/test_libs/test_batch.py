@@ -0,0 +1,65 @@
+import shutil
+import subprocess
+import typing as t
+from pathlib import Path
+
+import pytest
+
+import driver.libs.containers
+from driver.libs.containers.batch import BatchStreamParser
+from driver.libs.containers.output_capture import OutputCapture
+from driver.libs.containers.result_processor import MAX_STATS_LINE_SIZE, ResultProcessor
+
+MARKER = 'f0e1d2c3'
+SCRIPTS_DIR = Path(driver.libs.containers.__file__).parent / 'scripts'
+
+
+def create_captures(index: int) -> t.Tuple[OutputCapture, OutputCapture]:
+    return OutputCapture(1024, holdback=MAX_STATS_LINE_SIZE), OutputCapture(1024)
+
+
+def make_frame(index: int, stdout: bytes, stderr: bytes) -> bytes:
+    return f'{MARKER} {index} {len(stdout)} {len(stderr)}\n'.encode() + stdout + stderr
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 1024])
+def test_frames_are_split(chunk_size):
+    stream = make_frame(0, b'1\n2\n', b'') + make_frame(1, b'', b'') + make_frame(2, b'3 4\n', b'warning')
+
+    parser = BatchStreamParser(MARKER, create_captures)
+    frames: t.List[t.Tuple[int, OutputCapture, OutputCapture]] = []
+    for index in range(0, len(stream), chunk_size):
+        frames.extend(parser.feed(stream[index:index + chunk_size]))
+
+    assert [(index, stdout.finish(), stderr.finish()) for index, stdout, stderr in frames] == [
+        (0, '1\n2\n', ''),
+        (1, '', ''),
+        (2, '3 4\n', 'warning'),
+    ]
+
+
+def test_unexpected_header():
+    parser = BatchStreamParser(MARKER, create_captures)
+    with pytest.raises(ValueError):
+        list(parser.feed(b'garbage\n'))
+
+
+@pytest.mark.skipif(shutil.which('time') is None, reason='`time` utility is not installed')
+def test_batch_script(tmp_path):
+    stdin_list = [b'1 2', b'', b'3']
+    for index, stdin in enumerate(stdin_list):
+        (tmp_path / f'input-{index}').write_bytes(stdin)
+
+    command = [
+        'sh', str(SCRIPTS_DIR / 'batch.sh'), str(SCRIPTS_DIR / 'run.sh'),
+        MARKER, '1', '1024', str(tmp_path / 'input'), str(len(stdin_list)), 'cat',
+    ]
+    completed = subprocess.run(command, capture_output=True)
+
+    result_processor = ResultProcessor(time_limit=1)
+    results = [
+        result_processor.handle_execution(-1, stdout, stderr, MARKER)
+        for _, stdout, stderr in BatchStreamParser(MARKER, create_captures).feed(completed.stdout)
+    ]
+    assert [result.output for result in results] == ['1 2', '', '3']
+    assert all(result.exit_code == 0 for result in results)
@@ -0,0 +1,46 @@
+import typing as t
+
+import pytest
+
+from driver.libs.checkers import CheckersFactory
+from driver.libs.enums import CheckerMode
+
+
+def check(mode: CheckerMode, output: bytes, expected: bytes, chunk_size: int, epsilon: float = 1e-6) -> bool:
+    checker = CheckersFactory.create(mode, expected, epsilon)
+    for index in range(0, len(output), chunk_size):
+        checker.feed(output[index:index + chunk_size])
+    return checker.finish()
+
+
+CASES: t.List[t.Tuple[CheckerMode, bytes, bytes, bool]] = [
+    (CheckerMode.EXACT, b'1 2\n3\n', b'1 2\n3\n', True),
+    (CheckerMode.EXACT, b'1 2\n3', b'1 2\n3\n', False),
+    (CheckerMode.EXACT, b'1 2\n3\n\n', b'1 2\n3\n', False),
+    (CheckerMode.EXACT, b'1 3\n3\n', b'1 2\n3\n', False),
+    (CheckerMode.TOKENS, b'1  2\r\n3', b'1 2\n3\n', True),
+    (CheckerMode.TOKENS, b'hello world\n', b'hello world', True),
+    (CheckerMode.TOKENS, b'hello worl\n', b'hello world', False),
+    (CheckerMode.TOKENS, b'hello worlds', b'hello world', False),
+    (CheckerMode.TOKENS, b'helloworld', b'hello world', False),
+    (CheckerMode.TOKENS, b'hello world !', b'hello world', False),
+    (CheckerMode.TOKENS, b'hello', b'hello world', False),
+    (CheckerMode.TOKENS, b'', b'\n', True),
+    (CheckerMode.FLOAT, b'0.3333333 2', b'0.333333333 2', True),
+    (CheckerMode.FLOAT, b'1000000.5', b'1000000', True),
+    (CheckerMode.FLOAT, b'0.334', b'0.333333333', False),
+    (CheckerMode.FLOAT, b'YES 1e-9', b'YES 0', True),
+    (CheckerMode.FLOAT, b'NO 0', b'YES 0', False),
+    (CheckerMode.FLOAT, b'1.0 2.0', b'1.0', False),
+]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 1024])
+@pytest.mark.parametrize('mode, output, expected, is_correct', CASES)
+def test_checkers(mode, output, expected, is_correct, chunk_size):
+    assert check(mode, output, expected, chunk_size) is is_correct
+
+
+def test_float_epsilon():
+    assert check(CheckerMode.FLOAT, b'3.15', b'3.14159', chunk_size=2, epsilon=1e-2)
+    assert not check(CheckerMode.FLOAT, b'3.15', b'3.14159', chunk_size=2, epsilon=1e-3)
@@ -0,0 +1,54 @@
+from driver.libs.cache import CompilationCache
+from driver.libs.types import CachedCompilation
+
+
+def make_entry(binary: bytes = b'\x7fELF') -> CachedCompilation:
+    return CachedCompilation(exit_code=0, stdout=b'', stderr=b'', binary=binary)
+
+
+def test_key_depends_on_all_parts():
+    key = CompilationCache.build_key('CppContainer', 'sha256:1', 'g++ -O2', b'int main() {}')
+
+    assert key == CompilationCache.build_key('CppContainer', 'sha256:1', 'g++ -O2', b'int main() {}')
+    assert key != CompilationCache.build_key('PascalABCContainer', 'sha256:1', 'g++ -O2', b'int main() {}')
+    assert key != CompilationCache.build_key('CppContainer', 'sha256:2', 'g++ -O2', b'int main() {}')
+    assert key != CompilationCache.build_key('CppContainer', 'sha256:1', 'g++', b'int main() {}')
+    assert key != CompilationCache.build_key('CppContainer', 'sha256:1', 'g++ -O2', b'int main() { }')
+
+
+def test_hits_and_misses(tmp_path):
+    cache = CompilationCache(directory=tmp_path, max_size=1024)
+
+    assert cache.get('key') is None
+    cache.put('key', make_entry())
+    assert cache.get('key') == make_entry()
+
+    # Compilation errors are cached as well
+    error = CachedCompilation(exit_code=1, stdout=b'', stderr=b'error: expected ;', binary=None)
+    cache.put('error', error)
+    assert cache.get('error') == error
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (2, 1, 2)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry_size = len(b'x' * 400) + 100
+    cache = CompilationCache(directory=tmp_path, max_size=2 * entry_size + 50)
+
+    cache.put('first', make_entry(b'x' * 400))
+    cache.put('second', make_entry(b'x' * 400))
+    # Using the first entry, so the second one becomes the least recently used
+    assert cache.get('first') is not None
+    cache.put('third', make_entry(b'x' * 400))
+
+    assert cache.get('second') is None
+    assert cache.get('first') is not None
+    assert cache.get('third') is not None
+    assert cache.stats().evictions == 1
+
+
+def test_entries_survive_restart(tmp_path):
+    CompilationCache(directory=tmp_path, max_size=1024).put('key', make_entry())
+
+    assert CompilationCache(directory=tmp_path, max_size=1024).get('key') == make_entry()
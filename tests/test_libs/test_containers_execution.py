@@ -4,7 +4,7 @@ import pytest
 
 from driver.libs.containers import ContainersFactory, _BaseContainer
 from driver.libs.enums import DriverError, ProgrammingLanguage
-from driver.libs.files import FileCreator
+from driver.libs.files import create_file_creator
 from driver.libs.types import CodeExecutionCommandOptions, ProcessedContainerExecutionResult
 
 
@@ -39,8 +39,10 @@ class BaseTestContainer(ABC):
         pass
 
     def run_source_code(self, source_code: str, container: _BaseContainer) -> ProcessedContainerExecutionResult:
-        with FileCreator(source_code, self._programming_language) as file_creator:
-            execution_options = CodeExecutionCommandOptions(filename=file_creator.filename, stdin='')
+        with create_file_creator(source_code, self._programming_language) as file_creator:
+            execution_options = CodeExecutionCommandOptions(
+                filename=file_creator.filename, stdin='', source_code=file_creator.content
+            )
             return container.execute(execution_options)
 
 
@@ -65,7 +67,7 @@ class TestInterpretedContainer(BaseInterpretedTestContainer):
         result = self.run_source_code(code, container)
 
         assert result.exit_code == 0
-        assert result.output == "Hello World!"
+        assert result.output == "Hello World!\n"
         assert result.execution_time > 0
         assert result.error_message == ''
 
@@ -99,13 +101,13 @@ class TestCompiledContainer(BaseCompiledTestContainer):
         result = self.run_source_code(code, container)
 
         assert result.exit_code == 0
-        assert result.output == "Hello World!"
+        assert result.output == "Hello World!\n"
         assert result.execution_time >= 0
         assert result.error_message == ''
 
     def test_runtime_error(self, container: _BaseContainer) -> None:
         # Division by zero
-        function_content = '\n\tint a = 1;\n\tint b = 0;\n\tint c = a / b;\n\treturn 0;'
+        function_content = '\n\tvolatile int a = 1;\n\tvolatile int b = 0;\n\treturn a / b;'
         code = f'#include <iostream>\n\nint main() {{{function_content}}}'
         result = self.run_source_code(code, container)
 
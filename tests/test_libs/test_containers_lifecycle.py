@@ -1,9 +1,12 @@
 import pytest
 from docker import from_env
 
-from driver.libs.containers import ContainersFactory
+from driver.libs.containers import ContainersFactory, DockerBackend, execution_backend
+from driver.libs.containers.backends import DockerSandbox
 from driver.libs.enums import ProgrammingLanguage
 
+pytestmark = pytest.mark.skipif(not isinstance(execution_backend, DockerBackend), reason='Docker backend is not used')
+
 
 @pytest.fixture
 def client():
@@ -14,7 +17,13 @@ def client():
 def test_container_context_menu(client):
     ContainerClass = ContainersFactory.get(language=ProgrammingLanguage.PYTHON)
     with ContainerClass(time_limit=1, memory_limit='128m') as container:
-        actual_container = container._container
+        assert isinstance(container._sandbox, DockerSandbox)
+        actual_container = container._sandbox.container
         assert actual_container in client.containers.list()
 
-    assert actual_container not in client.containers.list()
+    # After exiting context menu container is returned to the pool, so it keeps running
+    assert actual_container in client.containers.list()
+
+    # The same container is leased again
+    with ContainerClass(time_limit=1, memory_limit='128m') as container:
+        assert container._sandbox.id == actual_container.id
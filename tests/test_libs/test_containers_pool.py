@@ -0,0 +1,302 @@
+import asyncio
+import itertools
+import os
+import posixpath
+import threading
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from driver.config import DOCKER_SANDBOX_DIR, DOCKER_STDIN_DIR, DOCKER_USER_SCRIPTS_DIR, DRIVER_SESSIONS_DIR
+from driver.libs.containers import _base_containers, warm_up_containers
+from driver.libs.containers.backends import DockerBackend
+from driver.libs.containers.images import ImageBuilder
+from driver.libs.containers.pool import IMAGE_LABEL, INSTANCE_LABEL, SESSION_LABEL, ContainerPool
+from driver.libs.enums import ProgrammingLanguage, ReapReason, SourceUploadMode
+
+
+class FakeContainer:
+    _ids = itertools.count()
+
+    def __init__(self, image: str, mem_limit: str, **kwargs: t.Any):
+        self.id = f'container-{next(self._ids)}'
+        self.image = image
+        self.mem_limit = mem_limit
+        self.options = kwargs
+        self.labels: t.Dict[str, str] = kwargs.get('labels', {})
+        self.status = 'created'
+        self.commands: t.List[str] = []
+        self.removed = False
+
+    def start(self) -> None:
+        self.status = 'running'
+
+    def reload(self) -> None:
+        pass
+
+    def exec_run(self, cmd: str, **kwargs: t.Any) -> t.Tuple[int, bytes]:
+        self.commands.append(cmd)
+        return 0, b''
+
+    def put_archive(self, path: str, data: bytes) -> bool:
+        return True
+
+    def remove(self, force: bool = False, v: bool = False) -> None:
+        # Anonymous volumes must be removed together with containers
+        assert v
+        self.removed = True
+        self.status = 'removed'
+
+
+class FakeClient:
+    def __init__(self):
+        self.created: t.List[FakeContainer] = []
+        self.containers = self
+
+    def create(self, **kwargs: t.Any) -> FakeContainer:
+        container = FakeContainer(**kwargs)
+        self.created.append(container)
+        return container
+
+    def list(self, all: bool = False, filters: t.Optional[t.Dict[str, str]] = None) -> t.List[FakeContainer]:
+        name, _, value = (filters or {})['label'].partition('=')
+        return [
+            container for container in self.created
+            if not container.removed and container.labels.get(name) == value
+        ]
+
+
+@pytest.fixture
+def client():
+    return FakeClient()
+
+
+def make_pool(
+        client: FakeClient,
+        min_size: int = 0,
+        max_size: int = 2,
+        idle_timeout: float = 60,
+        source_upload_mode: SourceUploadMode = SourceUploadMode.ARCHIVE,
+        instance_id: str = 'driver',
+        lease_timeout: float = 60,
+        sessions_dir: Path = DRIVER_SESSIONS_DIR
+) -> ContainerPool:
+    return ContainerPool(
+        min_size=min_size,
+        max_size=max_size,
+        idle_timeout=idle_timeout,
+        client_factory=lambda: client,
+        source_upload_mode=source_upload_mode,
+        instance_id=instance_id,
+        lease_timeout=lease_timeout,
+        sessions_dir=sessions_dir,
+    )
+
+
+def test_container_is_reused(client):
+    pool = make_pool(client)
+
+    container = pool.lease('python:3.8-alpine', '128m')
+    pool.release(container)
+    assert pool.lease('python:3.8-alpine', '128m') is container
+    assert len(client.created) == 1
+
+    # Container was reset before being returned to the pool
+    assert any('kill -9 -1' in command for command in container.commands)
+
+
+def test_containers_are_keyed_by_image_and_memory_limit(client):
+    pool = make_pool(client)
+
+    container = pool.lease('python:3.8-alpine', '128m')
+    pool.release(container)
+
+    assert pool.lease('python:3.8-alpine', '256m') is not container
+    assert pool.lease('frolvlad/alpine-gxx', '128m') is not container
+    assert len(client.created) == 3
+
+
+def test_unhealthy_container_is_replaced(client):
+    pool = make_pool(client)
+
+    container = pool.lease('python:3.8-alpine', '128m')
+    pool.release(container)
+    container.status = 'exited'
+
+    new_container = pool.lease('python:3.8-alpine', '128m')
+    assert new_container is not container
+    assert container.removed
+
+
+def test_lease_blocks_when_pool_is_full(client):
+    pool = make_pool(client, max_size=1)
+    container = pool.lease('python:3.8-alpine', '128m')
+
+    leased = []
+    thread = threading.Thread(target=lambda: leased.append(pool.lease('python:3.8-alpine', '128m')))
+    thread.start()
+    thread.join(timeout=0.2)
+    # Second lease waits for the first container
+    assert thread.is_alive()
+
+    pool.release(container)
+    thread.join(timeout=1)
+    assert leased == [container]
+
+
+def test_waiting_async_leases_dont_block_releases(client):
+    backend = DockerBackend(make_pool(client, max_size=2), ImageBuilder('derived', client_factory=lambda: client))
+
+    async def lease_and_release() -> None:
+        sandbox = await backend.alease('python:3.8-alpine', None, '128m')
+        await asyncio.sleep(0.01)
+        await backend.arelease(sandbox)
+
+    async def main() -> None:
+        # More leases wait for containers than there are threads in the default executor, which runs releases
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=8))
+        await asyncio.wait_for(asyncio.gather(*(lease_and_release() for _ in range(10))), timeout=10)
+
+    asyncio.run(main())
+    stats, = backend.pool_stats()
+    assert (stats.idle, stats.busy, stats.waiting) == (2, 0, 0)
+
+
+def test_idle_containers_are_evicted(client):
+    pool = make_pool(client, min_size=1, idle_timeout=0)
+
+    first = pool.lease('python:3.8-alpine', '128m')
+    second = pool.lease('python:3.8-alpine', '128m')
+    pool.release(first)
+    pool.release(second)
+
+    pool.evict_idle()
+    # One container is kept because of min size
+    assert first.removed
+    assert not second.removed
+
+
+def test_warm_up_and_close(client):
+    pool = make_pool(client, min_size=2)
+
+    pool.warm_up('python:3.8-alpine', '128m')
+    assert len(client.created) == 2
+    assert all(container.status == 'running' for container in client.created)
+
+    pool.close()
+    assert all(container.removed for container in client.created)
+
+
+def test_containers_are_warmed_up_before_first_lease(client, monkeypatch):
+    backend = DockerBackend(make_pool(client, min_size=2), ImageBuilder('derived', client_factory=lambda: client))
+    monkeypatch.setattr(_base_containers, 'execution_backend', backend)
+
+    # As on startup of the driver
+    warm_up_containers([ProgrammingLanguage.PYTHON], ['128m'])
+    assert [(stats.image, stats.idle, stats.busy) for stats in backend.pool_stats()] == [('python:3.8-alpine', 2, 0)]
+    assert all(container.status == 'running' for container in client.created)
+
+    sandbox = backend.lease('python:3.8-alpine', None, '128m')
+    assert len(client.created) == 2
+    backend.release(sandbox)
+
+
+def test_sources_are_kept_in_tmpfs(client):
+    pool = make_pool(client)
+    container = pool.lease('python:3.8-alpine', '128m')
+
+    assert DOCKER_SANDBOX_DIR in container.options['tmpfs']
+    assert container.options['working_dir'] == DOCKER_SANDBOX_DIR
+    # Directory with users' scripts is not shared between containers
+    assert container.options['volumes'] == []
+    # Uploaded scripts are wiped between leases
+    assert DOCKER_USER_SCRIPTS_DIR in container.commands[-1]
+
+
+def test_inputs_are_kept_out_of_tmpfs(client):
+    pool = make_pool(client)
+    container = pool.lease('python:3.8-alpine', '64m')
+
+    # Inputs larger than tmpfs (and memory limit) are stored in a volume on the disk
+    inputs_dir = posixpath.join(DOCKER_SANDBOX_DIR, DOCKER_STDIN_DIR)
+    assert [(mount['Target'], mount['Type']) for mount in container.options['mounts']] == [(inputs_dir, 'volume')]
+    # The mount point is kept, only its content is removed between leases
+    pool.release(container)
+    assert f'{DOCKER_STDIN_DIR}/*' in container.commands[-1]
+    assert f'rm -rf {DOCKER_STDIN_DIR} ' not in container.commands[-1]
+
+
+def test_sources_are_mounted_in_volume_mode(client):
+    pool = make_pool(client, source_upload_mode=SourceUploadMode.VOLUME)
+    container = pool.lease('python:3.8-alpine', '128m')
+
+    [volume] = container.options['volumes']
+    assert volume.endswith(f'{DOCKER_SANDBOX_DIR}/{DOCKER_USER_SCRIPTS_DIR}:ro')
+    assert DOCKER_USER_SCRIPTS_DIR not in container.commands[-1]
+
+
+def test_containers_of_previous_runs_are_reaped(client, tmp_path):
+    previous_run = make_pool(client, sessions_dir=tmp_path)
+    container = previous_run.lease('python:3.8-alpine', '128m')
+    assert container.labels[INSTANCE_LABEL] == 'driver'
+    assert container.labels[IMAGE_LABEL] == 'python:3.8-alpine'
+    other_instance = make_pool(client, instance_id='other', sessions_dir=tmp_path)
+    other_container = other_instance.lease('python:3.8-alpine', '128m')
+
+    # The driver has crashed, so heartbeat of its session isn't refreshed anymore, and then it is started again
+    previous_run.close()
+    heartbeat = tmp_path / container.labels[SESSION_LABEL]
+    os.utime(heartbeat, (0, 0))
+    pool = make_pool(client, sessions_dir=tmp_path)
+    pool.reap()
+    assert container.removed
+    assert not other_container.removed
+    assert pool.reaped() == {ReapReason.ORPHANED: 1}
+    assert not heartbeat.exists()
+
+
+def test_containers_of_live_sessions_are_kept(client, tmp_path):
+    # E.g. two workers of the driver on the same host
+    first = make_pool(client, sessions_dir=tmp_path)
+    second = make_pool(client, sessions_dir=tmp_path)
+    first_container = first.lease('python:3.8-alpine', '128m')
+    second_container = second.lease('python:3.8-alpine', '128m')
+
+    first.reap()
+    second.reap()
+    assert not first_container.removed and not second_container.removed
+    assert not any(container.removed for container in client.created)
+    assert first.reaped() == second.reaped() == {}
+
+    # Heartbeat of the first worker is missing, e.g. it has been started with another directory
+    (tmp_path / first_container.labels[SESSION_LABEL]).unlink()
+    second.reap()
+    assert first_container.removed and not second_container.removed
+    assert second.reaped() == {ReapReason.ORPHANED: 1}
+
+
+def test_leaked_and_expired_containers_are_reaped(client, monkeypatch):
+    pool = make_pool(client, lease_timeout=0)
+    leased = pool.lease('python:3.8-alpine', '128m')
+    idle = pool.lease('python:3.8-alpine', '128m')
+    pool.release(idle)
+
+    # Container is leaked if the driver is interrupted between its creation and setup
+    def interrupt(self: FakeContainer) -> None:
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(FakeContainer, 'start', interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        pool.lease('python:3.8-alpine', '256m')
+    leaked = client.created[-1]
+
+    pool.reap()
+    assert leaked.removed and leased.removed
+    assert not idle.removed
+    assert pool.reaped() == {ReapReason.ORPHANED: 1, ReapReason.EXPIRED: 1}
+
+    # Container is removed from the pool, so its release is ignored
+    pool.release(leased)
+    assert [stats.busy for stats in pool.stats() if stats.memory_limit == '128m'] == [0]
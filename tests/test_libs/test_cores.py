@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from driver.libs.containers.cores import CoreAllocator, format_cpu_list, parse_cpu_list
+
+
+def test_cpu_lists_are_parsed():
+    assert parse_cpu_list('') == []
+    assert parse_cpu_list('2-4, 7,3') == [2, 3, 4, 7]
+    assert format_cpu_list([7, 2, 3]) == '2,3,7'
+    for invalid in ('a', '3-1', '1-', '-1'):
+        with pytest.raises(ValueError):
+            parse_cpu_list(invalid)
+
+
+def test_lowest_free_cores_are_taken():
+    allocator = CoreAllocator([4, 2, 3], housekeeping_cores=[0, 1])
+    assert allocator.enabled
+    assert allocator.idle_cpuset == '0,1'
+    assert [allocator.take(), allocator.take()] == [2, 3]
+
+    allocator.give_back(2)
+    assert [allocator.take(), allocator.take(), allocator.take()] == [2, 4, None]
+
+
+def test_housekeeping_cores_are_separate():
+    with pytest.raises(ValueError):
+        CoreAllocator([0, 1], housekeeping_cores=[1, 2])
+
+    # By default idle containers use the cores that are not dedicated, or all of them if every core is dedicated
+    allocator = CoreAllocator(list(range(1024)))
+    assert allocator.housekeeping_cores == allocator.cores[:len(allocator.housekeeping_cores)]
+
+    disabled = CoreAllocator([])
+    assert not disabled.enabled
+    assert disabled.take() is None
+    assert disabled.idle_cpuset is None
+
+
+def test_cores_are_waited_for():
+    async def main() -> None:
+        allocator = CoreAllocator([2], housekeeping_cores=[0])
+        assert await allocator.atake() == 2
+
+        first = asyncio.create_task(allocator.atake())
+        second = asyncio.create_task(allocator.atake())
+        await asyncio.sleep(0.01)
+        assert not first.done()
+
+        # The core is passed to the next waiter if the woken one has been cancelled
+        allocator.give_back(2)
+        first.cancel()
+        assert await second == 2
+
+        # Each host has its own cores
+        assert await allocator.copy().atake() == 2
+        assert await CoreAllocator([]).atake() is None
+
+    asyncio.run(main())
@@ -1,9 +1,17 @@
+import io
 import os
+import tarfile
 
 from driver.config import LOCAL_USER_SCRIPTS_DIR
 from driver.libs.enums import ProgrammingLanguage
-from driver.libs.files import FileCreator
-from driver.libs.files.utils import get_compiled_filename
+from driver.libs.files import FileCreator, InMemoryFileCreator
+from driver.libs.files.utils import (
+    get_compiled_filename,
+    iter_file_archive,
+    iter_files_archive,
+    pack_file,
+    unpack_file,
+)
 
 
 def test_file_creator_context_menu():
@@ -26,6 +34,14 @@ def test_file_creator_context_menu():
     assert not os.path.exists(path_to_file)
 
 
+def test_in_memory_file_creator():
+    with InMemoryFileCreator('print(1)', ProgrammingLanguage.PYTHON) as file_creator:
+        assert file_creator.filename.endswith('.py')
+        assert file_creator.content == b'print(1)'
+        # Nothing is written to the disk
+        assert not os.path.exists(LOCAL_USER_SCRIPTS_DIR / file_creator.filename)
+
+
 def test_get_compiled_filename():
     original_filename = 'script-name.cpp'
 
@@ -34,3 +50,34 @@ def test_get_compiled_filename():
 
     compiled_filename = get_compiled_filename(original_filename, save_extension=False)
     assert compiled_filename == 'script-name-compiled'
+
+
+def test_pack_and_unpack_file():
+    archive = pack_file('binary', b'\x7fELF', mode=0o755)
+    assert unpack_file([archive[:100], archive[100:]]) == b'\x7fELF'
+
+
+def test_iter_file_archive_from_path(tmp_path):
+    content = os.urandom(200 * 1024 + 7)
+    path = tmp_path / 'input'
+    path.write_bytes(content)
+
+    chunks = list(iter_file_archive('stdin', path, mode=0o444, chunk_size=64 * 1024))
+    # Content is read chunk by chunk instead of being loaded at once
+    assert max(len(chunk) for chunk in chunks) <= 64 * 1024
+
+    with tarfile.open(fileobj=io.BytesIO(b''.join(chunks))) as archive:
+        member = archive.getmember('stdin')
+        assert member.mode == 0o444
+        extracted = archive.extractfile(member)
+        assert extracted is not None and extracted.read() == content
+
+
+def test_iter_files_archive():
+    files = [('input-0', b'1 2'), ('input-1', b''), ('input-2', b'x' * 1000)]
+
+    with tarfile.open(fileobj=io.BytesIO(b''.join(iter_files_archive(files)))) as archive:
+        assert archive.getnames() == ['input-0', 'input-1', 'input-2']
+        for name, content in files:
+            extracted = archive.extractfile(name)
+            assert extracted is not None and extracted.read() == content
@@ -0,0 +1,94 @@
+import typing as t
+
+from docker.errors import BuildError, ImageNotFound
+
+from driver.config import DOCKER_PCH_DIR
+from driver.libs.containers import CppContainer
+from driver.libs.containers.images import ImageBuilder
+from driver.libs.types import DerivedImage
+
+IMAGE = DerivedImage(base='frolvlad/alpine-gxx', commands=('mkdir /pch', 'touch /pch/header.gch'))
+
+
+class FakeImage:
+    def __init__(self, id: str):
+        self.id = id
+
+
+class FakeImages:
+    def __init__(self, existing: t.Dict[str, str], fail_build: bool = False):
+        # Key - name of the image, value - its id
+        self.existing = existing
+        self.fail_build = fail_build
+        self.built: t.List[t.Tuple[str, bytes]] = []
+
+    def get(self, name: str) -> FakeImage:
+        if name not in self.existing:
+            raise ImageNotFound(name)
+        return FakeImage(self.existing[name])
+
+    def pull(self, name: str) -> FakeImage:
+        self.existing[name] = f'sha256:pulled-{name}'
+        return FakeImage(self.existing[name])
+
+    def build(self, fileobj: t.BinaryIO, tag: str, **kwargs: t.Any) -> t.Tuple[FakeImage, t.List[str]]:
+        if self.fail_build:
+            raise BuildError('compiler has crashed', [])
+        self.built.append((tag, fileobj.read()))
+        self.existing[tag] = f'sha256:built-{tag}'
+        return FakeImage(self.existing[tag]), []
+
+
+class FakeClient:
+    def __init__(self, images: FakeImages):
+        self.images = images
+
+
+def make_builder(images: FakeImages) -> ImageBuilder:
+    return ImageBuilder('derived', client_factory=lambda: FakeClient(images))
+
+
+def test_image_is_built_once():
+    images = FakeImages({IMAGE.base: 'sha256:base'})
+    builder = make_builder(images)
+
+    tag = builder.resolve(IMAGE)
+    assert builder.resolve(IMAGE) == tag
+    assert tag.startswith('derived:frolvlad-alpine-gxx-')
+
+    assert len(images.built) == 1
+    built_tag, dockerfile = images.built[0]
+    assert built_tag == tag
+    assert dockerfile == b'FROM frolvlad/alpine-gxx\nRUN mkdir /pch\nRUN touch /pch/header.gch\n'
+
+
+def test_existing_image_is_reused():
+    images = FakeImages({IMAGE.base: 'sha256:base'})
+    make_builder(images).resolve(IMAGE)
+
+    # New builder (e.g. after restart of the driver) finds the image among local ones
+    make_builder(images).resolve(IMAGE)
+    assert len(images.built) == 1
+
+
+def test_tag_depends_on_base_image():
+    builder = make_builder(FakeImages({}))
+    assert builder.build_tag(IMAGE, 'sha256:old') != builder.build_tag(IMAGE, 'sha256:new')
+    assert builder.build_tag(IMAGE, 'sha256:old') == builder.build_tag(IMAGE, 'sha256:old')
+
+
+def test_base_image_is_used_if_build_fails():
+    images = FakeImages({IMAGE.base: 'sha256:base'}, fail_build=True)
+    assert make_builder(images).resolve(IMAGE) == IMAGE.base
+
+
+def test_cpp_compilation_uses_flags_and_precompiled_header():
+    container = CppContainer(time_limit=1, memory_limit='128m')
+    command, _ = container._build_code_compilation_command('source.cpp')
+    assert command.startswith('g++ -O2 -std=c++17 ')
+    assert f'-I{DOCKER_PCH_DIR}' in command
+
+    # Header is precompiled with the same flags, otherwise GCC ignores it
+    derived_image = container._derived_image
+    assert derived_image is not None
+    assert any(command.startswith('g++ -O2 -std=c++17 -x c++-header') for command in derived_image.commands)
@@ -0,0 +1,85 @@
+import asyncio
+import typing as t
+
+from driver.libs.admission import AdmissionController
+from driver.libs.enums import JobStatus, SubmissionPriority
+from driver.libs.jobs import JobStore
+from driver.libs.types import AdmissionRequest, ProcessedContainerExecutionResult
+
+
+def make_result(output: str) -> ProcessedContainerExecutionResult:
+    return ProcessedContainerExecutionResult(exit_code=0, output=output, execution_time=0.01, error_message='')
+
+
+async def produce(outputs: t.List[str], fail: bool = False) -> t.AsyncIterator[ProcessedContainerExecutionResult]:
+    for output in outputs:
+        await asyncio.sleep(0.01)
+        yield make_result(output)
+    if fail:
+        raise RuntimeError('Container is broken')
+
+
+def test_results_are_streamed():
+    async def main() -> None:
+        store = JobStore(ttl=60)
+        job = store.start(3, produce(['1', '2', '3']))
+        assert store.get(job.id) is job
+
+        streamed = [result.output async for result in job.stream()]
+        assert streamed == ['1', '2', '3']
+
+        state = job.state()
+        assert state.status == JobStatus.FINISHED.value
+        assert (state.total, state.completed) == (3, 3)
+
+        # Late consumer gets all the results as well
+        assert [result.output async for result in job.stream()] == ['1', '2', '3']
+
+    asyncio.run(main())
+
+
+def test_failed_job():
+    async def main() -> None:
+        job = JobStore(ttl=60).start(3, produce(['1'], fail=True))
+
+        assert [result.output async for result in job.stream()] == ['1']
+        assert job.status is JobStatus.FAILED
+        assert job.error == 'Container is broken'
+
+    asyncio.run(main())
+
+
+def test_jobs_are_pending_until_admitted():
+    async def main() -> None:
+        controller = AdmissionController(memory_capacity=1024, cpu_slots=1, max_admitted=8, queue_size=8)
+        running = controller.enqueue(AdmissionRequest(memory=1024, cpu_slots=1), SubmissionPriority.PRACTICE)
+        ticket = controller.enqueue(AdmissionRequest(memory=1024, cpu_slots=1), SubmissionPriority.PRACTICE)
+
+        async def results() -> t.AsyncIterator[ProcessedContainerExecutionResult]:
+            async with ticket:
+                async for result in produce(['1']):
+                    yield result
+
+        job = JobStore(ttl=60).start(1, results(), ticket)
+        await asyncio.sleep(0.05)
+        assert job.state().status == JobStatus.PENDING.value
+
+        running.release()
+        assert [result.output async for result in job.stream()] == ['1']
+        assert job.status is JobStatus.FINISHED
+        assert controller.stats().admitted == 0
+
+    asyncio.run(main())
+
+
+def test_finished_jobs_are_evicted():
+    async def main() -> None:
+        store = JobStore(ttl=0)
+        job = store.start(1, produce(['1']))
+        assert store.get(job.id) is job
+
+        _ = [result async for result in job.stream()]
+        await asyncio.sleep(0.01)
+        assert store.get(job.id) is None
+
+    asyncio.run(main())
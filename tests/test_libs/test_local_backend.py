@@ -0,0 +1,231 @@
+import asyncio
+import io
+import os
+import shutil
+import tarfile
+import time
+import typing as t
+from pathlib import Path
+
+import pytest
+from docker.utils import parse_bytes
+
+from driver.config import DOCKER_SANDBOX_SIZE, DOCKER_STDIN_DIR
+from driver.libs.cache import CompilationCache
+from driver.libs.containers import CppContainer, PythonContainer, _base_containers
+from driver.libs.containers.backends import LocalBackend, LocalSandbox
+from driver.libs.containers.cores import CoreAllocator
+from driver.libs.enums import DriverError
+from driver.libs.files.utils import pack_file, unpack_file
+from driver.libs.types import BatchCodeExecutionCommandOptions, CodeExecutionCommandOptions
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    backend = LocalBackend(str(tmp_path), wall_limit=5)
+    monkeypatch.setattr(_base_containers, 'execution_backend', backend)
+    monkeypatch.setattr(_base_containers, 'compilation_cache', CompilationCache(tmp_path / 'cache', max_size=0))
+    yield backend
+    backend.close()
+
+
+def test_sandbox_executes_commands_in_its_directory(backend):
+    sandbox = backend.lease('python:3.8-alpine', None, '128m')
+    try:
+        sandbox.put_archive(sandbox.working_dir, pack_file('input.txt', b'hello', mode=0o444))
+        result = sandbox.exec_run('sh -c "cat input.txt; echo error >&2; exit 3"')
+        assert result.exit_code == 3
+        assert result.output == (b'hello', b'error\n')
+
+        assert unpack_file([sandbox.get_archive(f'{sandbox.working_dir}/input.txt')]) == b'hello'
+        with pytest.raises(ValueError):
+            sandbox.get_archive('/etc/passwd')
+
+        result = sandbox.exec_run('missing-command')
+        assert result.exit_code == 127
+    finally:
+        backend.release(sandbox)
+
+
+def test_streamed_archives_are_extracted(backend):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w') as archive:
+        for name, content in (('first.txt', b'a' * 100_000), ('dir/second.txt', b'b' * 10)):
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    data = buffer.getvalue()
+
+    sandbox = backend.lease('python:3.8-alpine', None, '128m')
+    try:
+        # Chunks don't match boundaries of blocks of the archive
+        sandbox.put_archive(sandbox.working_dir, (data[start:start + 1000] for start in range(0, len(data), 1000)))
+        assert (sandbox.directory / 'first.txt').read_bytes() == b'a' * 100_000
+        assert (sandbox.directory / 'dir' / 'second.txt').read_bytes() == b'b' * 10
+    finally:
+        backend.release(sandbox)
+
+
+def test_sandbox_rejects_archives_outside_of_it(backend):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w') as archive:
+        info = tarfile.TarInfo('../escaped')
+        archive.addfile(info, io.BytesIO())
+
+    sandbox = backend.lease('python:3.8-alpine', None, '128m')
+    try:
+        with pytest.raises(ValueError):
+            sandbox.put_archive(sandbox.working_dir, buffer.getvalue())
+    finally:
+        backend.release(sandbox)
+
+
+def test_commands_are_killed_after_wall_limit(tmp_path):
+    backend = LocalBackend(str(tmp_path), wall_limit=0.5)
+    sandbox = backend.lease('python:3.8-alpine', None, '128m')
+    try:
+        started_at = time.monotonic()
+        assert sandbox.exec_run('sleep 10').exit_code == 137
+        assert asyncio.run(sandbox.aexec_run('sleep 10')).exit_code == 137
+        assert time.monotonic() - started_at < 5
+    finally:
+        backend.release(sandbox)
+        backend.close()
+
+
+def test_release_kills_background_processes_and_removes_directory(backend):
+    sandbox = backend.lease('python:3.8-alpine', None, '128m')
+    result = sandbox.exec_run('sh -c "sleep 30 </dev/null >/dev/null 2>&1 & echo $!"')
+    stdout, _ = result.output
+    pid = int(stdout)
+    backend.release(sandbox)
+    assert not sandbox.directory.exists()
+
+    # Killed process may stay a zombie for a moment, until it is reaped
+    deadline = time.monotonic() + 5
+    while Path(f'/proc/{pid}').exists() and 'Z' not in Path(f'/proc/{pid}/stat').read_text().split()[2]:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_python_programs_are_judged(backend):
+    code = b'import sys\nprint(sys.stdin.read().upper(), end="")\n'
+    with PythonContainer(time_limit=1, memory_limit='128m') as container:
+        result = container.execute(CodeExecutionCommandOptions(filename='a.py', stdin='abc', source_code=code))
+        assert (result.exit_code, result.output, result.error_message) == (0, 'ABC', '')
+        assert result.cpu_time >= 0 and result.peak_memory > 0
+
+        results = container.execute_batch(
+            BatchCodeExecutionCommandOptions(filename='a.py', stdin_list=['x', 'y'], source_code=code)
+        )
+        assert [result.output for result in results] == ['X', 'Y']
+
+    async def execute_async() -> str:
+        async with PythonContainer(time_limit=1, memory_limit='128m') as container:
+            options = CodeExecutionCommandOptions(filename='a.py', stdin='async', source_code=code)
+            return (await container.aexecute(options)).output
+
+    assert asyncio.run(execute_async()) == 'ASYNC'
+
+
+def test_inputs_larger_than_sandbox_are_executed(backend):
+    # Input is read chunk by chunk, so it takes neither size of the sandbox nor memory of the program
+    code = b'import sys\nprint(sum(len(chunk) for chunk in iter(lambda: sys.stdin.buffer.read(1 << 20), b"")))\n'
+    size = parse_bytes(DOCKER_SANDBOX_SIZE) + 1
+    stdin = b'x' * size
+    with PythonContainer(time_limit=10, memory_limit='64m') as container:
+        options = CodeExecutionCommandOptions(filename='a.py', stdin=stdin, source_code=code)
+        result = container.execute(options)
+        assert (result.output, result.error_message) == (f'{size}\n', '')
+        assert result.peak_memory < parse_bytes('64m')
+
+        results = container.execute_batch(
+            BatchCodeExecutionCommandOptions(filename='a.py', stdin_list=[stdin, b'x'], source_code=code)
+        )
+        assert [result.output for result in results] == [f'{size}\n', '1\n']
+        # Inputs are removed as soon as their test cases are executed
+        assert isinstance(container._sandbox, LocalSandbox)
+        assert not any((container._sandbox.directory / DOCKER_STDIN_DIR).iterdir())
+
+
+@pytest.mark.parametrize('zygote', [False, True])
+def test_limits_are_applied(backend, zygote):
+    programs = {
+        'tle.py': (b'while True:\n    pass\n', DriverError.TIME_LIMIT_EXCEEDED),
+        'memory.py': (b'data = bytearray(512 * 1024 * 1024)\n', DriverError.RUNTIME_ERROR),
+        'error.py': (b'print(1 / 0)\n', DriverError.RUNTIME_ERROR),
+    }
+    with PythonContainer(time_limit=1, memory_limit='128m', zygote=zygote) as container:
+        for filename, (code, error) in programs.items():
+            result = container.execute(CodeExecutionCommandOptions(filename=filename, stdin='', source_code=code))
+            assert result.error_message == error.value.message, filename
+
+
+@pytest.mark.parametrize('zygote', [False, True])
+def test_programs_are_pinned_to_dedicated_cores(tmp_path, monkeypatch, zygote):
+    cores = sorted(os.sched_getaffinity(0))[:2]
+    allocator = CoreAllocator(cores)
+    backend = LocalBackend(str(tmp_path), wall_limit=5, allocator=allocator)
+    monkeypatch.setattr(_base_containers, 'execution_backend', backend)
+    calls = []
+    set_cpus = LocalSandbox.set_cpus
+
+    def record(self: LocalSandbox, *args: t.Any) -> None:
+        calls.append(args)
+        set_cpus(self, *args)
+
+    monkeypatch.setattr(LocalSandbox, 'set_cpus', record)
+
+    code = b'import os\nprint(sorted(os.sched_getaffinity(0)))\n'
+    try:
+        with PythonContainer(time_limit=1, memory_limit='128m', zygote=zygote) as container:
+            for core in (cores[0], cores[0], cores[-1]):
+                options = CodeExecutionCommandOptions(filename='a.py', stdin='', source_code=code, cpu_core=core)
+                result = container.execute(options)
+                # The program runs only on its own core, even if the container has more of them
+                assert (result.output, result.cpu_core) == (f'[{core}]\n', core)
+    finally:
+        backend.close()
+
+    # The container isn't updated for test cases that run on its cores, and it is moved back to
+    # housekeeping cores without quota once it is released
+    expected = [((cores[0],), 1.0)] + ([(tuple(cores), 1.0)] if len(cores) > 1 else [])
+    assert calls == expected + [(allocator.housekeeping_cores, None)]
+
+
+@pytest.mark.skipif(shutil.which('g++') is None, reason='g++ is not installed')
+def test_cpp_programs_are_compiled(backend):
+    code = b'#include <iostream>\nint main() { int a, b; std::cin >> a >> b; std::cout << a + b; }\n'
+    with CppContainer(time_limit=1, memory_limit='256m') as container:
+        result = container.execute(CodeExecutionCommandOptions(filename='a.cpp', stdin='2 3', source_code=code))
+        assert (result.exit_code, result.output) == (0, '5')
+
+        result = container.execute(CodeExecutionCommandOptions(filename='b.cpp', stdin='', source_code=b'int main() {'))
+        assert result.error_message == DriverError.COMPILATION_ERROR.value.message
+
+
+@pytest.mark.skipif(shutil.which('g++') is None, reason='g++ is not installed')
+def test_killed_compiler_is_not_cached(backend, tmp_path, monkeypatch):
+    cache = CompilationCache(tmp_path / 'compiled', max_size=64 * 1024 * 1024)
+    monkeypatch.setattr(_base_containers, 'compilation_cache', cache)
+    exec_run = LocalSandbox.exec_run
+
+    def killed_compiler(self, cmd, *args, **kwargs):
+        if cmd.startswith('g++'):
+            # The same as if the compiler has run out of memory
+            return exec_run(self, 'sh -c "echo Killed >&2; kill -9 $$"')
+        return exec_run(self, cmd, *args, **kwargs)
+
+    code = b'int main() { return 0; }\n'
+    with monkeypatch.context() as patch:
+        patch.setattr(LocalSandbox, 'exec_run', killed_compiler)
+        with CppContainer(time_limit=1, memory_limit='256m') as container:
+            result = container.execute(CodeExecutionCommandOptions(filename='a.cpp', stdin='', source_code=code))
+            assert result.error_message == DriverError.COMPILATION_ERROR.value.message
+    assert cache.stats().entries == 0
+
+    # The same source compiles once the compiler has enough memory
+    with CppContainer(time_limit=1, memory_limit='256m') as container:
+        result = container.execute(CodeExecutionCommandOptions(filename='a.cpp', stdin='', source_code=code))
+        assert result.exit_code == 0
+    assert cache.stats().entries == 1
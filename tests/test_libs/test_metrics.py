@@ -0,0 +1,40 @@
+import pytest
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client.metrics_core import CounterMetricFamily, GaugeMetricFamily
+
+from driver.libs.metrics import submission_verdict_label
+from driver.libs.metrics.registry import CollectedMetric
+
+
+def test_collected_metrics_are_rendered_in_prometheus_format():
+    registry = CollectorRegistry()
+    CollectedMetric(GaugeMetricFamily, 'containers', 'Containers', ('state',), lambda: [({'state': 'idle'}, 2)], registry)
+    CollectedMetric(
+        CounterMetricFamily, 'reaped_total', 'Reaped containers', ('reason',), lambda: [({'reason': 'expired'}, 3)],
+        registry
+    )
+
+    assert generate_latest(registry).decode() == (
+        '# HELP containers Containers\n'
+        '# TYPE containers gauge\n'
+        'containers{state="idle"} 2.0\n'
+        '# HELP reaped_total Reaped containers\n'
+        '# TYPE reaped_total counter\n'
+        'reaped_total{reason="expired"} 3.0\n'
+    )
+    assert registry.get_sample_value('containers', {'state': 'idle'}) == 2
+
+
+def test_labels_of_collected_metrics_must_match():
+    registry = CollectorRegistry()
+    CollectedMetric(GaugeMetricFamily, 'containers', 'Containers', ('state',), lambda: [({'image': 'a'}, 1)], registry)
+    with pytest.raises(ValueError):
+        generate_latest(registry)
+
+
+def test_verdict_of_submission_is_the_first_failed_one():
+    assert submission_verdict_label(['Accepted', 'Time Limit Exceeded', 'Wrong Answer']) == 'Time Limit Exceeded'
+    assert submission_verdict_label(['Accepted', 'Accepted']) == 'Accepted'
+    assert submission_verdict_label([]) == 'OK'
+    # Skipped test cases are caused by failures, so they don't determine the verdict
+    assert submission_verdict_label(['Skipped', 'Wrong Answer', 'Skipped']) == 'Wrong Answer'
@@ -0,0 +1,198 @@
+import threading
+import time
+import typing as t
+
+import pytest
+
+from driver.libs.containers.backends import (
+    LocalBackend,
+    LocalSandbox,
+    MultiHostBackend,
+    SandboxUnavailable,
+    ScheduledHost,
+    parse_docker_hosts,
+)
+from driver.libs.types import DerivedImage, DockerHostConfig
+
+IMAGE = 'python:3.8-alpine'
+
+
+class StubBackend(LocalBackend):
+    """Backend of a stubbed Docker host, sandboxes are created locally unless the host is down"""
+
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        self.fail_leases = False
+
+    def lease(
+            self,
+            image: str,
+            derived_image: t.Optional[DerivedImage],
+            memory_limit: str,
+            affinity_key: t.Optional[str] = None
+    ) -> LocalSandbox:
+        if self.fail_leases:
+            raise ConnectionError('Host is down')
+        return super().lease(image, derived_image, memory_limit, affinity_key)
+
+
+class StubHost(ScheduledHost):
+    """Host whose health is switched by tests"""
+
+    def __init__(self, directory: str, url: str, cpu_slots: int, memory: int = 0):
+        self.stub = StubBackend(directory)
+        super().__init__(DockerHostConfig(url, cpu_slots, memory), self.stub, self.__check)
+        self.is_up = True
+
+    def __check(self) -> bool:
+        if not self.is_up:
+            raise ConnectionError(f'{self.config.url} is down')
+        return True
+
+
+@pytest.fixture
+def hosts(tmp_path) -> t.List[StubHost]:
+    return [
+        StubHost(str(tmp_path), 'tcp://first:2375', cpu_slots=2, memory=512 * 1024 * 1024),
+        StubHost(str(tmp_path), 'tcp://second:2375', cpu_slots=4),
+    ]
+
+
+@pytest.fixture
+def backend(hosts):
+    backend = MultiHostBackend(hosts, health_check_interval=60, affinity_weight=0.25)
+    yield backend
+    backend.close()
+
+
+def leased_hosts(backend: MultiHostBackend) -> t.Dict[str, int]:
+    return {stats.url: stats.leased for stats in backend.stats()}
+
+
+def test_parse_docker_hosts():
+    hosts = parse_docker_hosts('unix:///var/run/docker.sock?slots=8&memory=1g  tcp://10.0.0.2:2375', default_slots=4)
+    assert hosts == [
+        DockerHostConfig('unix:///var/run/docker.sock', cpu_slots=8, memory=1024 ** 3),
+        DockerHostConfig('tcp://10.0.0.2:2375', cpu_slots=4, memory=0),
+    ]
+    assert parse_docker_hosts('', default_slots=4) == []
+    with pytest.raises(ValueError):
+        parse_docker_hosts('tcp://10.0.0.2:2375?cpus=2', default_slots=4)
+
+
+def test_least_loaded_host_is_selected(backend):
+    sandboxes = [backend.lease(IMAGE, None, '128m') for _ in range(6)]
+    # Share of leased slots is kept equal: 2 of 2 and 4 of 4
+    assert leased_hosts(backend) == {'tcp://first:2375': 2, 'tcp://second:2375': 4}
+
+    for sandbox in sandboxes:
+        backend.release(sandbox)
+    assert leased_hosts(backend) == {'tcp://first:2375': 0, 'tcp://second:2375': 0}
+
+
+def test_host_with_the_image_is_preferred(backend):
+    backend.release(backend.lease(IMAGE, None, '128m'))
+
+    # The first host has already leased the image, so it is preferred while it isn't much more loaded
+    first = backend.lease(IMAGE, None, '128m')
+    assert leased_hosts(backend) == {'tcp://first:2375': 1, 'tcp://second:2375': 0}
+    # Other images go to the least loaded host
+    other = backend.lease('frolvlad/alpine-gxx', None, '128m')
+    assert leased_hosts(backend) == {'tcp://first:2375': 1, 'tcp://second:2375': 1}
+
+    backend.release(first)
+    backend.release(other)
+
+
+def test_host_that_has_compiled_the_source_is_preferred(backend):
+    first = backend.lease(IMAGE, None, '128m', affinity_key='CppContainer:first')
+    second = backend.lease(IMAGE, None, '128m', affinity_key='CppContainer:second')
+    assert leased_hosts(backend) == {'tcp://first:2375': 1, 'tcp://second:2375': 1}
+    backend.release(first)
+    backend.release(second)
+
+    # Both hosts have leased the image, but only the second one has compiled the source
+    again = backend.lease(IMAGE, None, '128m', affinity_key='CppContainer:second')
+    assert leased_hosts(backend) == {'tcp://first:2375': 0, 'tcp://second:2375': 1}
+    backend.release(again)
+
+
+def test_only_latest_affinity_keys_are_remembered(hosts):
+    backend = MultiHostBackend(hosts, health_check_interval=60, affinity_weight=0.25, affinity_keys=2)
+    for key in ('first', 'second', 'third'):
+        backend.release(backend.lease(IMAGE, None, '128m', affinity_key=key))
+    # Image is remembered as well, for leases without affinity key
+    assert list(hosts[0].affinity_keys) == [IMAGE, 'third']
+    backend.close()
+
+
+def test_memory_capacity_is_respected(backend):
+    # The first host has 512m, the second one is not limited in memory
+    large = backend.lease(IMAGE, None, '400m')
+    another = backend.lease(IMAGE, None, '400m')
+    assert leased_hosts(backend) == {'tcp://first:2375': 1, 'tcp://second:2375': 1}
+    backend.release(large)
+    backend.release(another)
+
+
+def test_lease_waits_until_capacity_is_released(tmp_path):
+    backend = MultiHostBackend([StubHost(str(tmp_path), 'tcp://only:2375', cpu_slots=1)], health_check_interval=60)
+    sandbox = backend.lease(IMAGE, None, '128m')
+
+    leased = []
+    thread = threading.Thread(target=lambda: leased.append(backend.lease(IMAGE, None, '128m')))
+    thread.start()
+    time.sleep(0.1)
+    assert not leased
+
+    backend.release(sandbox)
+    thread.join(timeout=5)
+    assert len(leased) == 1
+    backend.release(leased[0])
+    backend.close()
+
+
+def test_unhealthy_hosts_are_drained(backend, hosts):
+    first, second = hosts
+    leased = backend.lease(IMAGE, None, '128m')
+    assert leased_hosts(backend)['tcp://first:2375'] == 1
+
+    first.is_up = False
+    backend.check_health()
+    sandboxes = [backend.lease(IMAGE, None, '128m') for _ in range(3)]
+    assert leased_hosts(backend) == {'tcp://first:2375': 1, 'tcp://second:2375': 3}
+
+    # Sandboxes leased before the host has become unhealthy are released as usual
+    backend.release(leased)
+    for sandbox in sandboxes:
+        backend.release(sandbox)
+
+    second.is_up = False
+    backend.check_health()
+    # Submissions are rejected before admission, and the client retries after the next health check
+    with pytest.raises(SandboxUnavailable) as error:
+        backend.check_available('128m')
+    assert error.value.retry_after == 60
+    with pytest.raises(SandboxUnavailable):
+        backend.lease(IMAGE, None, '128m')
+
+    first.is_up = second.is_up = True
+    backend.check_health()
+    backend.release(backend.lease(IMAGE, None, '128m'))
+
+
+def test_failed_lease_is_retried_on_another_host(backend, hosts):
+    first, second = hosts
+    first.is_up = False
+    first.stub.fail_leases = True
+
+    sandbox = backend.lease(IMAGE, None, '128m')
+    assert [stats.healthy for stats in backend.stats()] == [False, True]
+    assert leased_hosts(backend) == {'tcp://first:2375': 0, 'tcp://second:2375': 1}
+    backend.release(sandbox)
+
+    # Errors of healthy hosts are not caused by them, so they are raised
+    second.stub.fail_leases = True
+    with pytest.raises(ConnectionError):
+        backend.lease(IMAGE, None, '128m')
+    assert [stats.healthy for stats in backend.stats()] == [False, True]
@@ -0,0 +1,38 @@
+from driver.libs.containers.output_capture import OutputCapture
+
+
+def test_only_first_bytes_are_kept():
+    capture = OutputCapture(limit=5)
+    for chunk in (b'abc', b'def', b'ghi'):
+        capture.feed(chunk)
+
+    assert capture.is_exceeded
+    assert capture.size == 9
+    assert capture.finish() == 'abcde'
+
+
+def test_multibyte_characters_split_between_chunks():
+    data = 'привет'.encode()
+    capture = OutputCapture(limit=100)
+    for index in range(len(data)):
+        capture.feed(data[index:index + 1])
+
+    assert not capture.is_exceeded
+    assert capture.finish() == 'привет'
+
+
+def test_invalid_utf8_is_replaced():
+    capture = OutputCapture(limit=100)
+    capture.feed(b'ok\xff\xfe')
+    assert capture.finish() == 'ok��'
+
+
+def test_tail_is_held_back():
+    capture = OutputCapture(limit=100, holdback=4)
+    capture.feed(b'output')
+    capture.feed(b'#42\n')
+    assert capture.tail == b'#42\n'
+
+    # Tail is replaced by its part without service data
+    assert capture.finish(b'') == 'output'
+    assert capture.size == 6
@@ -0,0 +1,44 @@
+import threading
+
+from benchmarks.fake_docker import Cassette, RecordingDockerClient, ReplayingDockerClient
+from benchmarks.phases import create_docker_backend, measure
+
+from driver.libs.enums import Phase, ProgrammingLanguage
+from driver.libs.profiling import PhaseRecorder, measure_phase
+
+
+def test_phases_are_recorded_only_while_recorder_is_active():
+    recorder = PhaseRecorder()
+    with measure_phase(Phase.EXECUTION):
+        pass
+
+    with recorder.activate():
+        with measure_phase(Phase.EXECUTION):
+            pass
+        # Threads started from the active context report to the same recorder
+        thread = threading.Thread(target=lambda: recorder.add(Phase.COMPILATION, 1.5))
+        thread.start()
+        thread.join()
+
+    with measure_phase(Phase.EXECUTION):
+        pass
+
+    durations = recorder.durations
+    assert len(durations[Phase.EXECUTION]) == 1
+    assert durations[Phase.COMPILATION] == [1.5]
+
+
+def test_recorded_interactions_are_replayed(tmp_path):
+    # Synthetic responses stand in for the Docker daemon while recording
+    cassette = Cassette()
+    backend = create_docker_backend(lambda: RecordingDockerClient(ReplayingDockerClient(), cassette))
+    durations = measure(ProgrammingLanguage.CPP, backend, 1, 2)
+    assert len(durations[Phase.EXECUTION]) == 2
+    assert len(durations[Phase.COMPILATION]) == 1
+    cassette.save(tmp_path / 'cassette.json')
+
+    # Markers and names of files differ from the recorded ones, so output is checked only if they are substituted
+    replayed = Cassette.load(tmp_path / 'cassette.json')
+    durations = measure(ProgrammingLanguage.CPP, create_docker_backend(lambda: ReplayingDockerClient(replayed)), 1, 2)
+    assert set(durations) == set(Phase)
+    assert replayed.replay('exec_stream') is None
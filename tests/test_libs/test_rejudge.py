@@ -0,0 +1,136 @@
+import asyncio
+import shutil
+import typing as t
+
+import pytest
+
+import driver.libs.runner
+from driver.libs import metrics
+from driver.libs.cache import CompilationCache
+from driver.libs.containers import _base_containers
+from driver.libs.containers.backends import LocalBackend, LocalSandbox
+from driver.libs.enums import DriverError, ProgrammingLanguage, Verdict
+from driver.libs.runner.rejudge import RejudgeRunner, SubmissionSource
+from driver.libs.types import AdmissionRequest, DerivedImage, RejudgeResult
+
+ECHO = 'print(input())\n'
+
+
+class CountingBackend(LocalBackend):
+    """Local backend that counts leased sandboxes"""
+
+    def __init__(self, directory: str):
+        super().__init__(directory, wall_limit=5)
+        self.leases = 0
+        # Number of the next leased sandboxes that are broken: their commands can't be executed
+        self.broken = 0
+
+    def lease(
+            self,
+            image: str,
+            derived_image: t.Optional[DerivedImage],
+            memory_limit: str,
+            affinity_key: t.Optional[str] = None
+    ) -> LocalSandbox:
+        self.leases += 1
+        sandbox = super().lease(image, derived_image, memory_limit, affinity_key)
+        if self.broken:
+            self.broken -= 1
+            sandbox.exec_create = self.__fail  # type: ignore[method-assign]
+        return sandbox
+
+    @staticmethod
+    def __fail(cmd: str) -> str:
+        raise ConnectionError('Container is gone')
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    backend = CountingBackend(str(tmp_path))
+    monkeypatch.setattr(_base_containers, 'execution_backend', backend)
+    monkeypatch.setattr(_base_containers, 'compilation_cache', CompilationCache(tmp_path / 'cache', max_size=0))
+    # Semaphore is bound to the event loop, while each test runs its own loop
+    monkeypatch.setattr(driver.libs.runner, 'cpu_budget', asyncio.Semaphore(8))
+    yield backend
+    backend.close()
+
+
+def rejudge(runner: RejudgeRunner, submissions: t.Mapping[str, SubmissionSource]) -> t.Dict[str, RejudgeResult]:
+    async def main() -> t.List[RejudgeResult]:
+        return [result async for result in runner.iter_results(submissions, ['1', '2'], ['1', '2'])]
+
+    results = asyncio.run(main())
+    assert sorted(result.submission_id for result in results) == sorted(submissions)
+    return {result.submission_id: result for result in results}
+
+
+def test_submissions_share_containers(backend):
+    submissions = {
+        str(index): (ProgrammingLanguage.PYTHON, ECHO if index % 2 else f'print(input() + "{index}")\n')
+        for index in range(6)
+    }
+    results = rejudge(RejudgeRunner(time_limit=1, memory_limit='128m'), submissions)
+
+    for submission_id, result in results.items():
+        expected = Verdict.ACCEPTED if int(submission_id) % 2 else Verdict.WRONG_ANSWER
+        assert [result.verdict for result in result.results] == [expected.value] * 2, submission_id
+        assert result.error is None
+    # All submissions of the language are executed in the same container
+    assert backend.leases == 1
+
+
+@pytest.mark.skipif(shutil.which('g++') is None, reason='g++ is not installed')
+def test_languages_are_executed_in_parallel_groups(backend):
+    submissions = {
+        'python': (ProgrammingLanguage.PYTHON, ECHO),
+        'cpp': (ProgrammingLanguage.CPP, '#include <iostream>\nint main() { int a; std::cin >> a; std::cout << a; }\n'),
+        'broken': (ProgrammingLanguage.CPP, 'int main() {'),
+    }
+    runner = RejudgeRunner(time_limit=1, memory_limit='256m', parallelism=2)
+    assert runner.admission_request(submissions) == AdmissionRequest(memory=3 * 256 * 1024 * 1024, cpu_slots=3)
+
+    results = rejudge(runner, submissions)
+    assert [result.verdict for result in results['python'].results] == [Verdict.ACCEPTED.value] * 2
+    assert [result.verdict for result in results['cpp'].results] == [Verdict.ACCEPTED.value] * 2
+    assert [result.error_message for result in results['broken'].results] == (
+        [DriverError.COMPILATION_ERROR.value.message] * 2
+    )
+    assert backend.leases == 3
+
+
+def test_failed_leases_are_reported(backend, monkeypatch):
+    def fail(*args: t.Any) -> LocalSandbox:
+        raise ConnectionError('Docker is down')
+
+    monkeypatch.setattr(backend, 'lease', fail)
+    results = rejudge(RejudgeRunner(time_limit=1, memory_limit='128m'), {'1': (ProgrammingLanguage.PYTHON, ECHO)})
+    assert results['1'].error == 'Docker is down'
+    assert results['1'].results == []
+
+
+def test_broken_container_is_replaced(backend):
+    backend.broken = 1
+    submissions = {'1': (ProgrammingLanguage.PYTHON, ECHO), '2': (ProgrammingLanguage.PYTHON, f'{ECHO}\n')}
+    results = rejudge(RejudgeRunner(time_limit=1, memory_limit='128m'), submissions)
+
+    # The first source has failed in the broken container, the next one is executed in a new container
+    assert results['1'].error == 'Container is gone'
+    assert results['2'].error is None
+    assert [result.verdict for result in results['2'].results] == [Verdict.ACCEPTED.value] * 2
+    assert backend.leases == 2
+
+
+def test_metrics_are_counted_for_each_submission(backend):
+    def value(verdict: str) -> float:
+        labels = {'language': 'python', 'verdict': verdict}
+        return metrics.registry.get_sample_value('driver_rejudged_submissions_total', labels) or 0
+
+    before = value(Verdict.ACCEPTED.value), value(Verdict.WRONG_ANSWER.value)
+    submissions = {
+        'first': (ProgrammingLanguage.PYTHON, ECHO),
+        'same': (ProgrammingLanguage.PYTHON, ECHO),
+        'wrong': (ProgrammingLanguage.PYTHON, 'print(0)\n'),
+    }
+    rejudge(RejudgeRunner(time_limit=1, memory_limit='128m'), submissions)
+    # Identical sources are executed once, but each submission is counted
+    assert (value(Verdict.ACCEPTED.value) - before[0], value(Verdict.WRONG_ANSWER.value) - before[1]) == (2, 1)
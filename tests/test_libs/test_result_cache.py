@@ -0,0 +1,54 @@
+import time
+
+from driver.libs.cache import ResultCache
+from driver.libs.types import ProcessedContainerExecutionResult
+
+
+def make_result(output: str) -> ProcessedContainerExecutionResult:
+    return ProcessedContainerExecutionResult(exit_code=0, output=output, execution_time=0.01, error_message='')
+
+
+def test_results_are_cached():
+    cache = ResultCache(max_size=1024 * 1024, ttl=60)
+    key = ResultCache.build_key('PYTHON', 'sha256:image', b'print(input())', '1')
+    assert key != ResultCache.build_key('PYTHON', 'sha256:image', b'print(input())1', '')
+
+    assert cache.get(key) is None
+    cache.put(key, make_result('1'))
+    result = cache.get(key)
+    assert result == make_result('1')
+
+    # Stored result can't be changed by callers
+    assert result is not None
+    result.output = '2'
+    assert cache.get(key) == make_result('1')
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (2, 1, 1)
+
+
+def test_least_recently_used_results_are_evicted():
+    cache = ResultCache(max_size=2500, ttl=60)
+    cache.put('first', make_result('1' * 500))
+    cache.put('second', make_result('2' * 500))
+    assert cache.get('first') is not None
+
+    cache.put('third', make_result('3' * 500))
+    assert cache.get('second') is None
+    assert cache.get('first') is not None and cache.get('third') is not None
+    assert cache.stats().evictions == 1
+
+    # Result that is larger than the cache is not stored
+    cache.put('large', make_result('4' * 2500))
+    assert cache.get('large') is None
+
+
+def test_results_expire():
+    cache = ResultCache(max_size=1024 * 1024, ttl=0.05)
+    cache.put('key', make_result('1'))
+    assert cache.get('key') is not None
+    time.sleep(0.1)
+    assert cache.get('key') is None
+    assert cache.stats().entries == 0
+
+    assert not ResultCache(max_size=0, ttl=60).enabled
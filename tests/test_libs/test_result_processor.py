@@ -0,0 +1,168 @@
+import shutil
+import subprocess
+import typing as t
+from pathlib import Path
+
+import pytest
+
+import driver.libs.containers
+from driver.libs.checkers import Checker, ExactChecker
+from driver.libs.containers.output_capture import OutputCapture
+from driver.libs.containers.result_processor import MAX_STATS_LINE_SIZE, ResultProcessor
+from driver.libs.enums import DriverError, Verdict
+
+MARKER = 'f0e1d2c3'
+RUN_SCRIPT_PATH = Path(driver.libs.containers.__file__).parent / 'scripts' / 'run.sh'
+
+
+def make_captures(
+        stdout: bytes,
+        stderr: bytes = b'',
+        output_limit: int = 1024,
+        checker: t.Optional[Checker] = None
+) -> t.Tuple[OutputCapture, OutputCapture]:
+    stdout_capture = OutputCapture(output_limit, holdback=MAX_STATS_LINE_SIZE, checker=checker)
+    stderr_capture = OutputCapture(output_limit)
+    # Feeding output in small chunks, as it arrives from Docker
+    for index in range(0, len(stdout), 7):
+        stdout_capture.feed(stdout[index:index + 7])
+    stderr_capture.feed(stderr)
+    return stdout_capture, stderr_capture
+
+
+def make_execution_result(
+        stdout: bytes,
+        exit_code: int = 0,
+        cpu_usec: int = 20000,
+        oom_kills: int = 0,
+        rusage: str = '0.05 0.03 0.01 2048',
+        stderr: bytes = b'',
+        output_limit: int = 1024,
+        checker: t.Optional[Checker] = None
+) -> t.Tuple[int, OutputCapture, OutputCapture]:
+    stats_line = f'{MARKER} {exit_code} {cpu_usec} {oom_kills} {rusage}\n'.encode()
+    return (exit_code, *make_captures(stdout + stats_line, stderr, output_limit, checker))
+
+
+def test_success():
+    result = ResultProcessor(time_limit=1).handle_execution(*make_execution_result(b'1\n2\n3\n'), MARKER)
+
+    assert result.exit_code == 0
+    assert result.output == '1\n2\n3\n'
+    assert result.error_message == ''
+    assert result.execution_time == result.wall_time == 0.05
+    assert result.cpu_time == 0.02
+    assert result.peak_memory == 2048 * 1024
+    assert not result.oom_killed
+
+
+def test_output_without_trailing_linebreak():
+    result = ResultProcessor(time_limit=1).handle_execution(*make_execution_result(b'a'), MARKER)
+    assert result.output == 'a'
+
+    result = ResultProcessor(time_limit=1).handle_execution(*make_execution_result(b''), MARKER)
+    assert result.output == ''
+
+
+def test_memory_limit_is_detected_by_oom_kill():
+    execution_result = make_execution_result(b'', exit_code=9, oom_kills=1)
+    result = ResultProcessor(time_limit=1).handle_execution(*execution_result, MARKER)
+
+    assert result.oom_killed
+    assert result.error_message == DriverError.MEMORY_LIMIT_EXCEEDED.value.message
+
+    # SIGKILL without OOM kill is not a memory limit
+    execution_result = make_execution_result(b'', exit_code=9, oom_kills=0)
+    result = ResultProcessor(time_limit=1).handle_execution(*execution_result, MARKER)
+    assert result.error_message == DriverError.RUNTIME_ERROR.value.message
+
+
+def test_time_limit_is_detected_by_cpu_time():
+    execution_result = make_execution_result(b'42\n', cpu_usec=1_500_000, rusage='1.52 1.49 0.01 2048')
+    result = ResultProcessor(time_limit=1).handle_execution(*execution_result, MARKER)
+
+    assert result.error_message == DriverError.TIME_LIMIT_EXCEEDED.value.message
+    assert result.output == ''
+    assert result.cpu_time == 1.5
+
+
+def test_shared_cgroup_is_not_trusted():
+    # Other programs were running in the container, so cgroup CPU time belongs to all of them
+    execution_result = make_execution_result(b'42\n', cpu_usec=5_000_000, rusage='0.05 0.03 0.01 2048')
+    result = ResultProcessor(time_limit=1).handle_execution(*execution_result, MARKER, is_exclusive=False)
+
+    assert result.error_message == ''
+    assert result.cpu_time == 0.04
+
+
+def test_cgroup_is_unavailable():
+    execution_result = make_execution_result(b'', exit_code=9, cpu_usec=-1, oom_kills=-1)
+    result = ResultProcessor(time_limit=1).handle_execution(*execution_result, MARKER)
+
+    # Falling back to exit codes
+    assert result.error_message == DriverError.MEMORY_LIMIT_EXCEEDED.value.message
+
+
+def test_runtime_error_shows_stderr():
+    execution_result = make_execution_result(b'partial', exit_code=1, stderr=b'ZeroDivisionError')
+    result = ResultProcessor(time_limit=1).handle_execution(*execution_result, MARKER)
+
+    assert result.error_message == DriverError.RUNTIME_ERROR.value.message
+    assert result.output == 'ZeroDivisionError'
+    assert result.execution_time == 0
+
+
+def test_output_limit_exceeded():
+    # Run script passes through one byte more than the limit, then the program is killed with SIGPIPE
+    execution_result = make_execution_result(b'y\n' * 6, exit_code=141, output_limit=11)
+    result = ResultProcessor(time_limit=1).handle_execution(*execution_result, MARKER)
+
+    assert result.error_message == DriverError.OUTPUT_LIMIT_EXCEEDED.value.message
+    assert result.output == ''
+
+    # Output of exactly the limit size is fine
+    execution_result = make_execution_result(b'y\n' * 6, output_limit=12)
+    result = ResultProcessor(time_limit=1).handle_execution(*execution_result, MARKER)
+    assert result.error_message == ''
+    assert result.output == 'y\n' * 6
+
+    execution_result = make_execution_result(b'', exit_code=141, stderr=b'e' * 12, output_limit=11)
+    result = ResultProcessor(time_limit=1).handle_execution(*execution_result, MARKER)
+    assert result.error_message == DriverError.OUTPUT_LIMIT_EXCEEDED.value.message
+
+
+def test_output_is_checked_instead_of_being_returned():
+    checker = ExactChecker(b'1\n2\n')
+    execution_result = make_execution_result(b'1\n2\n', checker=checker)
+    result = ResultProcessor(time_limit=1).handle_execution(*execution_result, MARKER, checker=checker)
+
+    assert result.verdict == Verdict.ACCEPTED.value
+    assert result.output == ''
+
+    checker = ExactChecker(b'1\n2\n')
+    execution_result = make_execution_result(b'1\n3\n', checker=checker)
+    result = ResultProcessor(time_limit=1).handle_execution(*execution_result, MARKER, checker=checker)
+    assert result.verdict == Verdict.WRONG_ANSWER.value
+
+    # Failed program gets no verdict
+    checker = ExactChecker(b'1\n2\n')
+    execution_result = make_execution_result(b'1\n', exit_code=1, stderr=b'error', checker=checker)
+    result = ResultProcessor(time_limit=1).handle_execution(*execution_result, MARKER, checker=checker)
+    assert result.verdict is None
+    assert result.output == 'error'
+
+
+@pytest.mark.skipif(shutil.which('time') is None, reason='`time` utility is not installed')
+def test_run_script(tmp_path):
+    stdin_file = tmp_path / 'stdin'
+    stdin_file.write_bytes(b'3 4')
+    command = ['sh', str(RUN_SCRIPT_PATH), MARKER, '1', '1024', str(stdin_file), 'cat']
+    completed = subprocess.run(command, capture_output=True)
+    execution_result = (completed.returncode, *make_captures(completed.stdout, completed.stderr))
+
+    result = ResultProcessor(time_limit=1).handle_execution(*execution_result, MARKER)
+    assert result.exit_code == 0
+    assert result.output == '3 4'
+    assert result.peak_memory > 0
+    # Input file is removed after execution
+    assert not stdin_file.exists()
@@ -0,0 +1,269 @@
+import asyncio
+import random
+import typing as t
+
+import pytest
+
+import driver.libs.runner
+from driver.libs import metrics
+from driver.libs.cache import ResultCache
+from driver.libs.containers import ContainersFactory, CoreAllocator
+from driver.libs.enums import CheckerMode, ParallelismMode, Phase, ProgrammingLanguage, Verdict
+from driver.libs.profiling import measure_phase
+from driver.libs.runner import SubmissionRunner
+from driver.libs.types import (
+    BatchCodeExecutionCommandOptions,
+    CodeExecutionCommandOptions,
+    ProcessedContainerExecutionResult,
+)
+
+
+class FakeContainer:
+    """Container that "executes" code by echoing stdin after random delay"""
+    entered: t.List['FakeContainer'] = []
+    executions = 0
+    image_id = 'sha256:fake'
+    # Dedicated cores of running executions, cores of each host (allocator) are separate
+    busy_cores: t.Set[t.Tuple[int, t.Optional[int]]] = set()
+    max_busy_cores = 0
+    core_allocator = CoreAllocator([])
+
+    def __init__(self, time_limit: int, memory_limit: str, output_limit: int):
+        self.running = 0
+        self.max_running = 0
+        self.batches = 0
+        self.sources: t.Set[t.Optional[bytes]] = set()
+        self.affinity: t.Optional[str] = None
+
+    def set_affinity(self, source_digest: str) -> None:
+        self.affinity = source_digest
+
+    async def __aenter__(self) -> 'FakeContainer':
+        FakeContainer.entered.append(self)
+        return self
+
+    async def __aexit__(self, *args: t.Any) -> None:
+        pass
+
+    async def aexecute(self, options: CodeExecutionCommandOptions) -> ProcessedContainerExecutionResult:
+        self.sources.add(options.source_code)
+        FakeContainer.executions += 1
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        core = (id(self.core_allocator), options.cpu_core)
+        if options.cpu_core is not None:
+            assert core not in FakeContainer.busy_cores
+            FakeContainer.busy_cores.add(core)
+            FakeContainer.max_busy_cores = max(FakeContainer.max_busy_cores, len(FakeContainer.busy_cores))
+        with measure_phase(Phase.EXECUTION):
+            await asyncio.sleep(random.uniform(0, 0.01))
+        FakeContainer.busy_cores.discard(core)
+        self.running -= 1
+
+        if options.checker is not None:
+            options.checker.feed(str(options.stdin).encode())
+            verdict = (Verdict.ACCEPTED if options.checker.finish() else Verdict.WRONG_ANSWER).value
+            return ProcessedContainerExecutionResult(
+                exit_code=0, output='', execution_time=0.01, error_message='', verdict=verdict,
+                cpu_core=options.cpu_core,
+            )
+        return ProcessedContainerExecutionResult(
+            exit_code=0, output=str(options.stdin), execution_time=0.01, error_message='', cpu_core=options.cpu_core
+        )
+
+    async def aiter_batch(
+            self,
+            options: BatchCodeExecutionCommandOptions
+    ) -> t.AsyncGenerator[ProcessedContainerExecutionResult, None]:
+        self.batches += 1
+        for stdin, checker in zip(options.stdin_list, options.checkers or [None] * len(options.stdin_list)):
+            yield await self.aexecute(
+                CodeExecutionCommandOptions(
+                    filename=options.filename, stdin=stdin, checker=checker, cpu_core=options.cpu_core
+                )
+            )
+
+
+@pytest.fixture(autouse=True)
+def fake_container(monkeypatch):
+    FakeContainer.entered = []
+    FakeContainer.executions = 0
+    FakeContainer.busy_cores = set()
+    FakeContainer.max_busy_cores = 0
+    monkeypatch.setattr(ContainersFactory, 'get', staticmethod(lambda language: FakeContainer))
+    # Semaphore is bound to the event loop, while each test runs its own loop
+    monkeypatch.setattr(driver.libs.runner, 'cpu_budget', asyncio.Semaphore(8))
+
+
+@pytest.mark.parametrize('mode', list(ParallelismMode))
+def test_results_are_ordered(mode):
+    stdin_list = [str(index) for index in range(20)]
+    runner = SubmissionRunner(ProgrammingLanguage.PYTHON, time_limit=1, memory_limit='128m', parallelism=4, mode=mode)
+
+    results = asyncio.run(runner.run('print(input())', stdin_list))
+    assert [result.output for result in results] == stdin_list
+
+
+def test_exec_sessions_share_container():
+    runner = SubmissionRunner(
+        ProgrammingLanguage.PYTHON, 1, '128m', parallelism=4, mode=ParallelismMode.EXEC_SESSIONS
+    )
+    asyncio.run(runner.run('print(input())', [str(index) for index in range(20)]))
+
+    assert len(FakeContainer.entered) == 1
+    assert FakeContainer.entered[0].max_running == 4
+
+
+def test_containers_mode_uses_sibling_containers():
+    runner = SubmissionRunner(
+        ProgrammingLanguage.PYTHON, 1, '128m', parallelism=3, mode=ParallelismMode.CONTAINERS
+    )
+    asyncio.run(runner.run('print(input())', [str(index) for index in range(20)]))
+
+    assert len(FakeContainer.entered) == 3
+
+
+@pytest.mark.parametrize('mode', list(ParallelismMode))
+def test_outputs_are_checked(mode):
+    runner = SubmissionRunner(
+        ProgrammingLanguage.PYTHON, 1, '128m', parallelism=2, mode=mode, checker_mode=CheckerMode.FLOAT
+    )
+    results = asyncio.run(runner.run('print(input())', ['1.0', '2', '3'], expected_outputs=['1', '2.0000001', '4']))
+
+    assert [result.verdict for result in results] == ['Accepted', 'Accepted', 'Wrong Answer']
+    assert all(result.output == '' for result in results)
+
+
+def test_number_of_expected_outputs_must_match():
+    runner = SubmissionRunner(ProgrammingLanguage.PYTHON, 1, '128m')
+    with pytest.raises(ValueError):
+        asyncio.run(runner.run('print(input())', ['1', '2'], expected_outputs=['1']))
+
+
+def test_batch_mode():
+    runner = SubmissionRunner(ProgrammingLanguage.PYTHON, 1, '128m', batch=True)
+    stdin_list = [str(index) for index in range(5)]
+    results = asyncio.run(runner.run('print(input())', stdin_list))
+
+    assert [result.output for result in results] == stdin_list
+    assert len(FakeContainer.entered) == 1
+    assert FakeContainer.entered[0].batches == 1
+
+    with pytest.raises(ValueError):
+        SubmissionRunner(ProgrammingLanguage.PYTHON, 1, '128m', parallelism=2, batch=True)
+
+
+def test_source_code_is_uploaded():
+    runner = SubmissionRunner(ProgrammingLanguage.PYTHON, 1, '128m')
+    asyncio.run(runner.run('print(input())', ['1', '2']))
+
+    assert FakeContainer.entered[0].sources == {b'print(input())'}
+
+
+@pytest.mark.parametrize('mode', list(ParallelismMode))
+def test_containers_are_leased_with_affinity_to_the_source(mode):
+    runner = SubmissionRunner(ProgrammingLanguage.PYTHON, 1, '128m', parallelism=2, mode=mode)
+    asyncio.run(runner.run('print(input())', ['1', '2']))
+
+    assert {container.affinity for container in FakeContainer.entered} == {ResultCache.build_key('print(input())')}
+
+
+@pytest.mark.parametrize('batch', [False, True])
+def test_metrics_are_labelled_with_verdicts(batch):
+    runner = SubmissionRunner(ProgrammingLanguage.PYPY, 1, '128m', batch=batch)
+
+    def value(name: str, **labels: str) -> float:
+        return metrics.registry.get_sample_value(name, {'language': 'pypy', **labels}) or 0
+
+    def counts() -> t.Tuple[float, ...]:
+        return (
+            value('driver_tests_total', verdict='Accepted'),
+            value('driver_tests_total', verdict='Wrong Answer'),
+            value('driver_submissions_total', verdict='Wrong Answer'),
+            value('driver_phase_duration_seconds_count', phase='execution', verdict='Accepted'),
+            value('driver_phase_duration_seconds_count', phase='execution', verdict='Wrong Answer'),
+        )
+
+    before = counts()
+    asyncio.run(runner.run('print(input())', ['1', '2', '3'], expected_outputs=['1', '2', '4']))
+    increments = [new - old for old, new in zip(before, counts())]
+
+    # In the batch mode phases of test cases can't be told apart, so they are labelled with verdict of the submission
+    assert increments == ([2, 1, 1, 0, 3] if batch else [2, 1, 1, 2, 1])
+    assert metrics.registry.get_sample_value('driver_tests_queued') == 0
+
+
+def test_deterministic_results_are_cached(monkeypatch):
+    monkeypatch.setattr(driver.libs.runner, 'result_cache', ResultCache(max_size=1024 * 1024, ttl=60))
+
+    def run(source_code: str, time_limit: int = 1) -> t.List[str]:
+        runner = SubmissionRunner(ProgrammingLanguage.PYTHON, time_limit=time_limit, memory_limit='128m')
+        return [result.output for result in asyncio.run(runner.run(source_code, ['1', '2']))]
+
+    assert run('print(input())') == ['1', '2']
+    assert run('print(input())') == ['1', '2']
+    assert FakeContainer.executions == 2
+
+    # Results of another source code or with other limits are not reused
+    run('print(input() )')
+    run('print(input())', time_limit=2)
+    assert FakeContainer.executions == 6
+
+    # Results that are close to the time limit are not cached
+    monkeypatch.setattr(driver.libs.runner, 'RESULT_CACHE_TIME_MARGIN', 0.001)
+    run('input()')
+    run('input()')
+    assert FakeContainer.executions == 10
+
+
+@pytest.mark.parametrize('mode, batch', [*((mode, False) for mode in ParallelismMode), (ParallelismMode.SEQUENTIAL, True)])
+def test_remaining_tests_are_skipped_after_failures(mode, batch):
+    runner = SubmissionRunner(
+        ProgrammingLanguage.PYTHON, 1, '128m', parallelism=1 if batch else 4, mode=mode, batch=batch, max_failures=2
+    )
+    stdin_list = [str(index) for index in range(20)]
+    expected_outputs = ['wrong' if index in (3, 5) else stdin for index, stdin in enumerate(stdin_list)]
+    verdicts = [result.verdict for result in asyncio.run(runner.run('print(input())', stdin_list, expected_outputs))]
+
+    if mode is ParallelismMode.SEQUENTIAL:
+        expected = ['Accepted'] * 3 + ['Wrong Answer', 'Accepted', 'Wrong Answer'] + ['Skipped'] * 14
+        assert verdicts == expected
+        assert FakeContainer.executions == 6
+    else:
+        # Test cases that are still running once the second one fails are cancelled and skipped as well
+        assert verdicts[3] == verdicts[5] == 'Wrong Answer'
+        assert set(verdicts) == {'Accepted', 'Wrong Answer', 'Skipped'}
+        assert FakeContainer.executions < 20
+
+    with pytest.raises(ValueError):
+        SubmissionRunner(ProgrammingLanguage.PYTHON, 1, '128m', max_failures=0)
+
+
+@pytest.mark.parametrize('mode', list(ParallelismMode))
+def test_running_tests_get_dedicated_cores(mode, monkeypatch):
+    # Test cases wait for a free core, even if there are free slots of `cpu_budget`
+    monkeypatch.setattr(FakeContainer, 'core_allocator', CoreAllocator([5, 6], housekeeping_cores=[0]))
+    runner = SubmissionRunner(ProgrammingLanguage.PYTHON, 1, '128m', parallelism=4, mode=mode)
+
+    # Fake container asserts that no other test case is running on the same core
+    results = asyncio.run(runner.run('print(input())', [str(index) for index in range(20)]))
+    assert {result.cpu_core for result in results} <= {5, 6}
+    if mode is not ParallelismMode.SEQUENTIAL:
+        assert {result.cpu_core for result in results} == {5, 6}
+
+
+def test_each_host_has_its_own_cores(monkeypatch):
+    allocator = CoreAllocator([5], housekeeping_cores=[0])
+    init = FakeContainer.__init__
+
+    def init_on_new_host(self: FakeContainer, *args: t.Any) -> None:
+        init(self, *args)
+        self.core_allocator = allocator.copy()
+
+    monkeypatch.setattr(FakeContainer, '__init__', init_on_new_host)
+    runner = SubmissionRunner(ProgrammingLanguage.PYTHON, 1, '128m', parallelism=3, mode=ParallelismMode.CONTAINERS)
+
+    results = asyncio.run(runner.run('print(input())', [str(index) for index in range(20)]))
+    assert {result.cpu_core for result in results} == {5}
+    # Containers on different hosts run test cases on the same core at the same time
+    assert FakeContainer.max_busy_cores > 1
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+import driver.libs.runner
+from driver.libs import testsets
+from driver.libs.cache import CompilationCache
+from driver.libs.containers import _base_containers
+from driver.libs.containers.backends import LocalBackend
+from driver.libs.enums import ProgrammingLanguage, Verdict
+from driver.libs.runner import SubmissionRunner
+
+
+def test_test_sets_are_deduplicated(tmp_path):
+    store = testsets.TestSetStore(tmp_path, max_size=1024)
+    info = store.put([b'1 2', b'3 4', b'1 2'], [b'3', b'7', b'3'])
+    assert (info.tests, info.size, info.has_expected_outputs) == (3, 12, True)
+
+    # The same test set gets the same id, files shared with other test sets are stored once
+    assert store.put([b'1 2', b'3 4', b'1 2'], [b'3', b'7', b'3']) == info
+    other = store.put([b'1 2'])
+    assert other.test_set_id != info.test_set_id
+    assert store.stats().size == 8
+    assert len(list((tmp_path / 'files').iterdir())) == 4
+
+    with store.lease(info.test_set_id) as test_set:
+        assert [path.read_bytes() for path in test_set.inputs] == [b'1 2', b'3 4', b'1 2']
+        assert test_set.expected_outputs is not None
+        assert [path.read_bytes() for path in test_set.expected_outputs] == [b'3', b'7', b'3']
+
+    # Index is restored from the disk
+    assert testsets.TestSetStore(tmp_path, max_size=1024).info(info.test_set_id) == info
+    with pytest.raises(testsets.TestSetNotFound):
+        store.info('missing')
+
+
+def test_least_recently_used_test_sets_are_evicted(tmp_path):
+    store = testsets.TestSetStore(tmp_path, max_size=10)
+    first = store.put([b'aaaa'])
+    second = store.put([b'bbbb'])
+    with store.lease(first.test_set_id):
+        pass
+
+    store.put([b'cccc'])
+    with pytest.raises(testsets.TestSetNotFound):
+        store.info(second.test_set_id)
+    assert store.info(first.test_set_id) == first
+    assert store.stats().evictions == 1
+
+    # Leased test sets are not evicted until they are released
+    with store.lease(first.test_set_id) as test_set:
+        last = store.put([b'ddddddd'])
+        assert store.stats().size == 11
+        assert test_set.inputs[0].read_bytes() == b'aaaa'
+    with pytest.raises(testsets.TestSetNotFound):
+        store.info(first.test_set_id)
+    assert store.info(last.test_set_id) == last
+    assert store.stats().size == 7
+
+    with pytest.raises(ValueError):
+        store.put([b'too large test set'])
+
+
+def test_files_are_written_outside_of_the_lock(tmp_path, monkeypatch):
+    store = testsets.TestSetStore(tmp_path, max_size=1024)
+    stored = store.put([b'1 2'])
+
+    writing, resume = threading.Event(), threading.Event()
+    write = testsets.TestSetStore._TestSetStore__write  # type: ignore[attr-defined]
+
+    def slow_write(path: Path, content: bytes) -> None:
+        if path.parent.name == 'files':
+            writing.set()
+            resume.wait(timeout=5)
+        write(path, content)
+
+    monkeypatch.setattr(testsets.TestSetStore, '_TestSetStore__write', staticmethod(slow_write))
+    upload = threading.Thread(target=store.put, args=([b'3 4'],))
+    upload.start()
+    try:
+        assert writing.wait(timeout=5)
+        # Other test sets are leased while files of the new one are being written
+        with store.lease(stored.test_set_id) as test_set:
+            assert test_set.inputs[0].read_bytes() == b'1 2'
+        assert store.stats().entries == 1
+    finally:
+        resume.set()
+        upload.join(timeout=5)
+    assert store.stats().entries == 2
+
+
+def test_async_leases_release_test_sets(tmp_path):
+    store = testsets.TestSetStore(tmp_path, max_size=10)
+    first = store.put([b'aaaa'])
+
+    async def main() -> None:
+        async with store.alease(first.test_set_id) as test_set:
+            assert test_set.inputs[0].read_bytes() == b'aaaa'
+            # Leased test set is not evicted until it is released
+            store.put([b'bbbbbbb'])
+            assert store.stats().size == 11
+        with pytest.raises(testsets.TestSetNotFound):
+            async with store.alease('missing'):
+                pass
+
+    asyncio.run(main())
+    assert store.stats().size == 7
+    with pytest.raises(testsets.TestSetNotFound):
+        store.info(first.test_set_id)
+
+
+def test_inputs_are_streamed_from_files(tmp_path, monkeypatch):
+    (tmp_path / 'sandboxes').mkdir()
+    backend = LocalBackend(str(tmp_path / 'sandboxes'), wall_limit=5)
+    monkeypatch.setattr(_base_containers, 'execution_backend', backend)
+    monkeypatch.setattr(_base_containers, 'compilation_cache', CompilationCache(tmp_path / 'cache', max_size=0))
+    monkeypatch.setattr(driver.libs.runner, 'cpu_budget', asyncio.Semaphore(8))
+
+    store = testsets.TestSetStore(tmp_path / 'testsets', max_size=1024)
+    info = store.put([b'1 2', b'3 4'], [b'3', b'8'])
+    runner = SubmissionRunner(ProgrammingLanguage.PYTHON, time_limit=1, memory_limit='128m')
+    try:
+        with store.lease(info.test_set_id) as test_set:
+            results = asyncio.run(runner.run('print(sum(map(int, input().split())))', test_set.inputs,
+                                             test_set.expected_outputs))
+    finally:
+        backend.close()
+    assert [result.verdict for result in results] == [Verdict.ACCEPTED.value, Verdict.WRONG_ANSWER.value]
@@ -0,0 +1,102 @@
+import asyncio
+import gzip
+import typing as t
+import zlib
+
+import pytest
+
+from driver.libs import wire
+from driver.libs.enums import WireCompression
+from driver.libs.types import BinaryExecutionRequest, ProcessedContainerExecutionResult
+
+RESULTS = [
+    ProcessedContainerExecutionResult(
+        exit_code=-9, output='ünïcode "quoted"\n', execution_time=1.5, error_message='Time Limit Exceeded',
+        cpu_time=1.25, wall_time=2.0, peak_memory=64 * 1024 * 1024, oom_killed=True, cpu_core=3,
+    ),
+    ProcessedContainerExecutionResult(
+        exit_code=0, output='', execution_time=0.01, error_message='', verdict='Accepted',
+    ),
+]
+
+
+def test_requests_are_decoded():
+    request = BinaryExecutionRequest('print(input())', [b'1\n', b'', b'\x00\xff'], [b'1', b'', b'2'])
+    assert wire.decode_request(wire.encode_request(request)) == request
+
+    request = BinaryExecutionRequest('print(input())', [b'1'], None)
+    data = wire.encode_request(request)
+    assert wire.decode_request(data) == request
+    for broken in (data[:-1], data + b'\x00', b'JSON' + data[4:]):
+        with pytest.raises(wire.WireFormatError):
+            wire.decode_request(broken)
+
+
+def decompress_prefix(data: bytes, compression: WireCompression) -> bytes:
+    """Decompresses beginning of the stream, which is not finished yet"""
+    if compression is WireCompression.GZIP:
+        return zlib.decompressobj(wbits=zlib.MAX_WBITS | 16).decompress(data)
+    if compression is WireCompression.ZSTD:
+        return wire.zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+@pytest.mark.parametrize('compression', wire.supported_compressions())
+def test_results_are_streamed(compression):
+    async def encode() -> t.List[bytes]:
+        async def results() -> t.AsyncIterator[ProcessedContainerExecutionResult]:
+            for result in RESULTS:
+                yield result
+
+        return [chunk async for chunk in wire.iter_encoded_results(results(), compression)]
+
+    chunks = asyncio.run(encode())
+    assert wire.decode_results(wire.decompress(b''.join(chunks), compression, 1024)) == RESULTS
+    # Each result is flushed, so it is decoded before the stream is finished
+    prefix = decompress_prefix(b''.join(chunks[:2]), compression)
+    assert wire.decode_results(prefix, partial=True) == RESULTS[:1]
+    with pytest.raises(wire.WireFormatError):
+        wire.decode_results(prefix)
+
+
+@pytest.mark.parametrize('compression', wire.supported_compressions())
+def test_failed_stream_is_finished_with_error(compression):
+    async def encode() -> bytes:
+        async def results() -> t.AsyncIterator[ProcessedContainerExecutionResult]:
+            yield RESULTS[0]
+            raise ConnectionError('Container is gone')
+
+        return b''.join([chunk async for chunk in wire.iter_encoded_results(results(), compression)])
+
+    data = wire.decompress(asyncio.run(encode()), compression, 1024)
+    with pytest.raises(wire.ExecutionAborted) as error:
+        wire.decode_results(data)
+    assert str(error.value) == 'Container is gone'
+    assert error.value.results == RESULTS[:1]
+
+
+def test_malformed_responses_are_rejected():
+    results = [wire.encode_result(result) for result in RESULTS]
+    assert wire.decode_results(b''.join([wire.MAGIC, *results, wire.encode_end(2)])) == RESULTS
+    for broken in (
+            [wire.MAGIC, *results, wire.encode_end(3)],
+            [wire.MAGIC, *results, wire.encode_end(2), results[0]],
+            [wire.MAGIC, b'\x07\x00\x00\x00\x00'],
+    ):
+        with pytest.raises(wire.WireFormatError):
+            wire.decode_results(b''.join(broken))
+
+
+def test_decompression_is_limited():
+    data = gzip.compress(b'\x00' * 10000)
+    assert wire.decompress(data, WireCompression.GZIP, 10000) == b'\x00' * 10000
+    with pytest.raises(wire.PayloadTooLarge):
+        wire.decompress(data, WireCompression.GZIP, 9999)
+    with pytest.raises(wire.WireFormatError):
+        wire.decompress(data[:-10], WireCompression.GZIP, 10000)
+
+
+def test_compression_is_negotiated():
+    assert wire.negotiate('') is WireCompression.IDENTITY
+    assert wire.negotiate('br, gzip;q=0.5') is WireCompression.GZIP
+    assert wire.negotiate('gzip;q=0, deflate') is WireCompression.IDENTITY
@@ -0,0 +1,96 @@
+import os
+import shutil
+import subprocess
+import sys
+import time
+import typing as t
+from pathlib import Path
+
+import pytest
+
+import driver.libs.containers
+from driver.libs.containers.output_capture import OutputCapture
+from driver.libs.containers.result_processor import MAX_STATS_LINE_SIZE, ResultProcessor
+from driver.libs.enums import DriverError
+from driver.libs.types import ProcessedContainerExecutionResult
+
+MARKER = 'f0e1d2c3'
+SCRIPTS_DIR = Path(driver.libs.containers.__file__).parent / 'scripts'
+
+
+@pytest.fixture
+def zygote_dir(tmp_path) -> t.Iterator[Path]:
+    directory = tmp_path / 'zygote'
+    process = subprocess.Popen(
+        [sys.executable, str(SCRIPTS_DIR / 'zygote.py'), str(directory)],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 10
+        while not (directory / 'requests').exists():
+            assert time.monotonic() < deadline, 'Zygote has not started'
+            time.sleep(0.01)
+        yield directory
+    finally:
+        process.kill()
+        process.wait()
+
+
+def run(
+        zygote_dir: Path,
+        source: str,
+        stdin: bytes = b'',
+        time_limit: int = 2,
+        prefix: t.Sequence[str] = ()
+) -> ProcessedContainerExecutionResult:
+    script = zygote_dir.parent / 'script.py'
+    script.write_text(source)
+    stdin_file = zygote_dir.parent / 'input'
+    stdin_file.write_bytes(stdin)
+
+    command = [
+        *prefix, 'sh', str(SCRIPTS_DIR / 'zygote-run.sh'),
+        MARKER, str(time_limit), '1024', str(stdin_file), str(zygote_dir), str(script),
+    ]
+    completed = subprocess.run(command, capture_output=True, timeout=time_limit + 10)
+
+    stdout, stderr = OutputCapture(1024, holdback=MAX_STATS_LINE_SIZE), OutputCapture(1024)
+    stdout.feed(completed.stdout)
+    stderr.feed(completed.stderr)
+    return ResultProcessor(time_limit).handle_execution(completed.returncode, stdout, stderr, MARKER)
+
+
+def test_child_reads_stdin(zygote_dir):
+    result = run(zygote_dir, 'import sys\nprint(sum(map(int, sys.stdin.read().split())), sys.argv[0][-9:])', b'2 3')
+    assert result.error_message == ''
+    assert result.output == '5 script.py\n'
+    assert result.peak_memory > 0
+
+
+def test_children_are_isolated(zygote_dir):
+    source = 'import math\nprint(getattr(math, "leaked", None))\nmath.leaked = True'
+    assert run(zygote_dir, source).output == 'None\n'
+    assert run(zygote_dir, source).output == 'None\n'
+
+
+def test_exit_code_and_traceback(zygote_dir):
+    result = run(zygote_dir, 'def f():\n    return 1 / 0\nf()')
+    assert result.exit_code == 1
+    assert result.error_message == DriverError.RUNTIME_ERROR.value.message
+    assert 'zygote.py' not in result.output
+    assert result.output.endswith('ZeroDivisionError: division by zero\n')
+
+    assert run(zygote_dir, 'raise SystemExit(3)').exit_code == 3
+
+
+def test_time_limit(zygote_dir):
+    result = run(zygote_dir, 'while True:\n    pass', time_limit=1)
+    assert result.exit_code == 15
+    assert result.error_message == DriverError.TIME_LIMIT_EXCEEDED.value.message
+
+
+@pytest.mark.skipif(shutil.which('taskset') is None, reason='taskset is not installed')
+def test_child_runs_on_cores_of_client(zygote_dir):
+    core = max(os.sched_getaffinity(0))
+    result = run(zygote_dir, 'import os\nprint(sorted(os.sched_getaffinity(0)))', prefix=('taskset', '-c', str(core)))
+    assert result.output == f'[{core}]\n'